@@ -0,0 +1,73 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add room participants hash
+
+Revision ID: 0b7d3e5a9f21
+Revises: f2a4d6c81e95
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0b7d3e5a9f21'
+down_revision = 'f2a4d6c81e95'
+
+
+def upgrade() -> None:
+    op.add_column(
+        'chatd_room',
+        sa.Column('participants_hash', sa.String(64), nullable=True),
+    )
+    # Same as wazo_chatd.database.models.room_participants_hash: sha256 of the
+    # sorted distinct user uuids joined by commas
+    op.execute(
+        """
+        UPDATE chatd_room
+        SET participants_hash = members.participants_hash
+        FROM (
+            SELECT
+                room_uuid,
+                encode(
+                    sha256(convert_to(string_agg(
+                        DISTINCT uuid::text COLLATE "C", ','
+                        ORDER BY uuid::text COLLATE "C"
+                    ), 'UTF8')),
+                    'hex'
+                ) AS participants_hash
+            FROM chatd_room_user
+            GROUP BY room_uuid
+        ) AS members
+        WHERE chatd_room.uuid = members.room_uuid
+        """
+    )
+    op.execute(
+        """
+        UPDATE chatd_room
+        SET participants_hash = encode(sha256(''::bytea), 'hex')
+        WHERE participants_hash IS NULL
+        """
+    )
+    op.alter_column('chatd_room', 'participants_hash', nullable=False)
+
+    op.create_index(
+        'chatd_room__idx__tenant_uuid_participants_hash',
+        'chatd_room',
+        ['tenant_uuid', 'participants_hash'],
+    )
+    op.drop_index('chatd_room__idx__tenant_uuid', 'chatd_room')
+    op.create_index(
+        'chatd_room_user__idx__uuid_room_uuid',
+        'chatd_room_user',
+        ['uuid', 'room_uuid'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('chatd_room_user__idx__uuid_room_uuid', 'chatd_room_user')
+    op.create_index('chatd_room__idx__tenant_uuid', 'chatd_room', ['tenant_uuid'])
+    op.drop_index('chatd_room__idx__tenant_uuid_participants_hash', 'chatd_room')
+    op.drop_column('chatd_room', 'participants_hash')
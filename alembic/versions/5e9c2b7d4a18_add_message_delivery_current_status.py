@@ -0,0 +1,62 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add message delivery current status
+
+Revision ID: 5e9c2b7d4a18
+Revises: 0b7d3e5a9f21
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5e9c2b7d4a18'
+down_revision = '0b7d3e5a9f21'
+
+
+def upgrade() -> None:
+    op.add_column(
+        'chatd_message_delivery',
+        sa.Column('current_status', sa.String, nullable=True),
+    )
+    op.add_column(
+        'chatd_message_delivery',
+        sa.Column('status_updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE chatd_message_delivery
+        SET current_status = latest.status, status_updated_at = latest.timestamp
+        FROM (
+            SELECT DISTINCT ON (delivery_id) delivery_id, status, timestamp
+            FROM chatd_delivery_record
+            ORDER BY delivery_id, timestamp DESC, id DESC
+        ) AS latest
+        WHERE chatd_message_delivery.id = latest.delivery_id
+        """
+    )
+    op.create_index(
+        'chatd_message_delivery__idx__tracking',
+        'chatd_message_delivery',
+        ['backend'],
+        postgresql_where=sa.text(
+            'external_id IS NOT NULL AND current_status NOT IN '
+            "('delivered', 'failed', 'dead_letter')"
+        ),
+    )
+    op.create_index(
+        'chatd_message_delivery__idx__recoverable',
+        'chatd_message_delivery',
+        ['current_status'],
+        postgresql_where=sa.text("current_status IN ('pending', 'retrying')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('chatd_message_delivery__idx__recoverable', 'chatd_message_delivery')
+    op.drop_index('chatd_message_delivery__idx__tracking', 'chatd_message_delivery')
+    op.drop_column('chatd_message_delivery', 'status_updated_at')
+    op.drop_column('chatd_message_delivery', 'current_status')
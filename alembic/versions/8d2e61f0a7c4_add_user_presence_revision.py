@@ -0,0 +1,45 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add user presence revision
+
+Revision ID: 8d2e61f0a7c4
+Revises: 4ca51d8f3bb2
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateSequence, DropSequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8d2e61f0a7c4'
+down_revision = '4ca51d8f3bb2'
+
+SEQUENCE_NAME = 'chatd_user_presence_revision_seq'
+
+
+def upgrade() -> None:
+    op.execute(CreateSequence(sa.Sequence(SEQUENCE_NAME)))
+    # Existing users each get a distinct revision from the server default
+    op.add_column(
+        'chatd_user',
+        sa.Column(
+            'presence_revision',
+            sa.BigInteger,
+            server_default=sa.text(f"nextval('{SEQUENCE_NAME}')"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        'chatd_user__idx__tenant_uuid_presence_revision',
+        'chatd_user',
+        ['tenant_uuid', 'presence_revision'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('chatd_user__idx__tenant_uuid_presence_revision', 'chatd_user')
+    op.drop_column('chatd_user', 'presence_revision')
+    op.execute(DropSequence(sa.Sequence(SEQUENCE_NAME)))
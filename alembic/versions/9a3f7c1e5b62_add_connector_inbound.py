@@ -0,0 +1,50 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add connector inbound
+
+Revision ID: 9a3f7c1e5b62
+Revises: 5e9c2b7d4a18
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy_utils import UUIDType
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9a3f7c1e5b62'
+down_revision = '5e9c2b7d4a18'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chatd_connector_inbound',
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('tenant_uuid', UUIDType(), nullable=False),
+        sa.Column('backend', sa.String, nullable=False),
+        sa.Column('kind', sa.String, nullable=False),
+        sa.Column('payload', JSONB, nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text("(now() at time zone 'utc')"),
+            nullable=False,
+        ),
+        sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint(
+            "kind in ('message', 'status')",
+            name='chatd_connector_inbound_kind_check',
+        ),
+    )
+    op.create_index(
+        'chatd_connector_inbound__idx__claimed_until',
+        'chatd_connector_inbound',
+        ['claimed_until'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('chatd_connector_inbound')
@@ -0,0 +1,38 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add room message keyset index
+
+Revision ID: c51f7a9e03b6
+Revises: 8d2e61f0a7c4
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c51f7a9e03b6'
+down_revision = '8d2e61f0a7c4'
+
+
+def upgrade() -> None:
+    # Serves the message history order and its (created_at, uuid) cursors
+    op.create_index(
+        'chatd_room_message__idx__room_uuid_created_at_uuid',
+        'chatd_room_message',
+        ['room_uuid', sa.text('created_at DESC'), sa.text('uuid DESC')],
+    )
+    op.drop_index('chatd_room_message__idx__room_uuid', 'chatd_room_message')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'chatd_room_message__idx__room_uuid',
+        'chatd_room_message',
+        ['room_uuid'],
+    )
+    op.drop_index(
+        'chatd_room_message__idx__room_uuid_created_at_uuid', 'chatd_room_message'
+    )
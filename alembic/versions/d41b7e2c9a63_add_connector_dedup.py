@@ -0,0 +1,91 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add connector dedup
+
+Revision ID: d41b7e2c9a63
+Revises: 9a3f7c1e5b62
+
+"""
+
+import sqlalchemy as sa
+from sqlalchemy_utils import UUIDType
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7e2c9a63'
+down_revision = '9a3f7c1e5b62'
+
+# Must match INBOUND_DEDUP_WINDOW_SECONDS of the connectors executor
+INBOUND_DEDUP_WINDOW = '7 days'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chatd_connector_dedup',
+        sa.Column(
+            'tenant_uuid',
+            UUIDType(),
+            sa.ForeignKey('chatd_tenant.uuid', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('backend', sa.String, primary_key=True),
+        sa.Column('key', sa.String, primary_key=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        'chatd_connector_dedup__idx__expires_at',
+        'chatd_connector_dedup',
+        ['expires_at'],
+    )
+    op.execute(
+        f"""
+        INSERT INTO chatd_connector_dedup (tenant_uuid, backend, key, expires_at)
+        SELECT
+            chatd_room_message.tenant_uuid,
+            chatd_message_delivery.backend,
+            chatd_message_meta.extra->>'inbound_idempotency_key',
+            max(chatd_room_message.created_at) + interval '{INBOUND_DEDUP_WINDOW}'
+        FROM chatd_message_meta
+        JOIN chatd_room_message
+            ON chatd_room_message.uuid = chatd_message_meta.message_uuid
+        JOIN chatd_message_delivery
+            ON chatd_message_delivery.message_uuid = chatd_message_meta.message_uuid
+        WHERE chatd_message_meta.extra ? 'inbound_idempotency_key'
+            AND chatd_room_message.created_at
+                >= now() - interval '{INBOUND_DEDUP_WINDOW}'
+        GROUP BY 1, 2, 3
+        """
+    )
+
+    op.add_column(
+        'chatd_message_meta',
+        sa.Column('message_signature', sa.String, nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE chatd_message_meta
+        SET message_signature = extra->>'message_signature'
+        WHERE extra ? 'message_signature'
+        """
+    )
+    op.create_index(
+        'chatd_message_meta__idx__message_signature',
+        'chatd_message_meta',
+        ['message_signature'],
+        postgresql_where=sa.text('message_signature IS NOT NULL'),
+    )
+    op.drop_index('chatd_message_meta__idx__extra', 'chatd_message_meta')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'chatd_message_meta__idx__extra',
+        'chatd_message_meta',
+        ['extra'],
+        postgresql_using='gin',
+    )
+    op.drop_index('chatd_message_meta__idx__message_signature', 'chatd_message_meta')
+    op.drop_column('chatd_message_meta', 'message_signature')
+    op.drop_table('chatd_connector_dedup')
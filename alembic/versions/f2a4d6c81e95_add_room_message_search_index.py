@@ -0,0 +1,54 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""add room message search index
+
+Revision ID: f2a4d6c81e95
+Revises: c51f7a9e03b6
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f2a4d6c81e95'
+down_revision = 'c51f7a9e03b6'
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # The extension may live in any schema, and the wrapper must not depend
+    # on the search_path of the session using it
+    schema = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT extnamespace::regnamespace::text FROM pg_extension"
+                " WHERE extname = 'unaccent'"
+            )
+        )
+        .scalar()
+    )
+    # unaccent() is only STABLE (its dictionary can change), which prevents
+    # indexing it. The dictionary is pinned here, so the wrapper is IMMUTABLE.
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION chatd_unaccent(text) RETURNS text
+        AS $$ SELECT {schema}.unaccent('{schema}.unaccent'::regdictionary, $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX chatd_room_message__idx__content_trgm
+        ON chatd_room_message USING gin (chatd_unaccent(content) gin_trgm_ops)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('chatd_room_message__idx__content_trgm', 'chatd_room_message')
+    op.execute('DROP FUNCTION IF EXISTS chatd_unaccent(text)')
@@ -1,7 +1,7 @@
-# Copyright 2020 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from hamcrest import assert_that, equal_to
+from hamcrest import assert_that, contains_inanyorder, equal_to
 from sqlalchemy.inspection import inspect
 
 from .helpers import fixtures
@@ -21,6 +21,12 @@ class TestChannel(DBIntegrationTest):
         result = self._dao.channel.find(UNKNOWN_NAME)
         assert_that(result, equal_to(None))
 
+    @fixtures.db.channel()
+    @fixtures.db.channel()
+    def test_list(self, channel_1, channel_2):
+        result = self._dao.channel.list_()
+        assert_that(result, contains_inanyorder(channel_1, channel_2))
+
     @fixtures.db.channel(state='ringing')
     def test_update(self, channel):
         state = 'undefined'
@@ -0,0 +1,68 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Integration tests for the connector idempotency key DAO."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from wazo_chatd.database.models import ConnectorDedup
+from wazo_chatd.database.queries.async_.connector_dedup import AsyncConnectorDedupDAO
+
+from .helpers.async_ import run_async
+from .helpers.base import TOKEN_TENANT_UUID, DBIntegrationTest, use_asset
+
+TENANT_UUID = str(TOKEN_TENANT_UUID)
+TTL = timedelta(days=7)
+EXPIRED = timedelta(seconds=-1)
+
+
+@use_asset('database')
+class TestConnectorDedup(DBIntegrationTest):
+    def tearDown(self):
+        self._session.query(ConnectorDedup).delete()
+        self._session.commit()
+        super().tearDown()
+
+    @run_async
+    async def test_claim_only_once(self):
+        dao = AsyncConnectorDedupDAO()
+
+        assert await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL) is True
+        assert await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL) is False
+
+    @run_async
+    async def test_claim_scoped_to_backend(self):
+        dao = AsyncConnectorDedupDAO()
+
+        assert await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL) is True
+        assert await dao.claim(TENANT_UUID, 'other', 'idem-123', TTL) is True
+
+    @run_async
+    async def test_expired_key_claimable_again(self):
+        dao = AsyncConnectorDedupDAO()
+
+        await dao.claim(TENANT_UUID, 'twilio', 'idem-123', EXPIRED)
+
+        assert await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL) is True
+
+    @run_async
+    async def test_exists(self):
+        dao = AsyncConnectorDedupDAO()
+        await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL)
+        await dao.claim(TENANT_UUID, 'twilio', 'idem-old', EXPIRED)
+
+        assert await dao.exists(TENANT_UUID, 'twilio', 'idem-123') is True
+        assert await dao.exists(TENANT_UUID, 'twilio', 'idem-old') is False
+        assert await dao.exists(TENANT_UUID, 'other', 'idem-123') is False
+        assert await dao.exists(TENANT_UUID, 'twilio', 'idem-missing') is False
+
+    @run_async
+    async def test_purge_expired(self):
+        dao = AsyncConnectorDedupDAO()
+        await dao.claim(TENANT_UUID, 'twilio', 'idem-123', TTL)
+        await dao.claim(TENANT_UUID, 'twilio', 'idem-old', EXPIRED)
+
+        assert await dao.purge_expired() == 1
+        assert await dao.exists(TENANT_UUID, 'twilio', 'idem-123') is True
@@ -0,0 +1,69 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Integration tests for the connector inbound staging DAOs."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from wazo_chatd.database.models import ConnectorInbound
+from wazo_chatd.database.queries.async_.connector_inbound import (
+    AsyncConnectorInboundDAO,
+)
+
+from .helpers.async_ import run_async
+from .helpers.base import TOKEN_TENANT_UUID, DBIntegrationTest, use_asset
+
+LEASE = timedelta(minutes=5)
+
+
+@use_asset('database')
+class TestConnectorInbound(DBIntegrationTest):
+    def setUp(self):
+        super().setUp()
+        for external_id in ('SM1', 'SM2', 'SM3'):
+            self._dao.connector_inbound.add(
+                str(TOKEN_TENANT_UUID),
+                'twilio',
+                'status',
+                {'external_id': external_id, 'status': 'sent', 'backend': 'twilio'},
+            )
+        self._session.commit()
+
+    def tearDown(self):
+        self._session.query(ConnectorInbound).delete()
+        self._session.commit()
+        super().tearDown()
+
+    def test_count_stops_at_limit(self):
+        assert self._dao.connector_inbound.count(limit=10) == 3
+        assert self._dao.connector_inbound.count(limit=2) == 2
+
+    @run_async
+    async def test_claim_skips_claimed_events(self):
+        dao = AsyncConnectorInboundDAO()
+
+        first = await dao.claim(2, LEASE)
+        second = await dao.claim(2, LEASE)
+
+        assert [payload['external_id'] for _, _, payload in first] == ['SM1', 'SM2']
+        assert [payload['external_id'] for _, _, payload in second] == ['SM3']
+        assert {kind for _, kind, _ in first + second} == {'status'}
+
+    @run_async
+    async def test_released_events_claimable_again(self):
+        dao = AsyncConnectorInboundDAO()
+        claimed = await dao.claim(3, LEASE)
+
+        await dao.release([claimed[0][0]])
+        await dao.delete([claimed[1][0]])
+
+        assert [id_ for id_, _, _ in await dao.claim(3, LEASE)] == [claimed[0][0]]
+
+    @run_async
+    async def test_expired_claims_claimable_again(self):
+        dao = AsyncConnectorInboundDAO()
+        await dao.claim(3, timedelta(seconds=-1))
+
+        assert len(await dao.claim(3, LEASE)) == 3
@@ -87,6 +87,17 @@ class TestEndpoint(DBIntegrationTest):
 
         self._dao.endpoint.delete_all()
 
+    @fixtures.db.endpoint()
+    @fixtures.db.endpoint()
+    def test_delete_by_names(self, endpoint_1, endpoint_2):
+        self._dao.endpoint.delete_by_names([endpoint_1.name])
+
+        self._session.expire_all()
+        result = self._dao.endpoint.find_by(name=endpoint_1.name)
+        assert_that(result, equal_to(None))
+        result = self._dao.endpoint.find_by(name=endpoint_2.name)
+        assert_that(result, equal_to(endpoint_2))
+
     @fixtures.db.endpoint()
     @fixtures.db.endpoint()
     def test_delete_all(self, endpoint_1, endpoint_2):
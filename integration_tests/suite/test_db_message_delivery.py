@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 import pytest
+from sqlalchemy import select
 
 from wazo_chatd.database.delivery import DeliveryStatus
 from wazo_chatd.database.models import MessageDelivery, MessageMeta, Room, RoomMessage
@@ -139,12 +140,55 @@ class TestFindTenantByExternalId(DBIntegrationTest):
 
 
 @use_asset('database')
-class TestAsyncGetMessageMetaByExternalId(DBIntegrationTest):
+class TestAsyncGetDeliveriesByExternalIds(DBIntegrationTest):
     @fixtures.db.room(
         messages=[
             {
-                'content': 'looked up',
+                'content': 'first',
                 'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {
+                        'recipient_identity': '+15559876',
+                        'external_id': 'SM_FIRST',
+                        'statuses': ['pending'],
+                    }
+                ],
+            },
+            {
+                'content': 'second',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {
+                        'recipient_identity': '+15559876',
+                        'external_id': 'SM_SECOND',
+                        'statuses': ['pending', 'accepted'],
+                    }
+                ],
+            },
+        ]
+    )
+    @run_async
+    async def test_returns_deliveries_and_eager_loads_message(self, room):
+        dao = AsyncRoomDAO()
+        deliveries = await dao.get_deliveries_by_external_ids(
+            'twilio', ['SM_FIRST', 'SM_SECOND', 'SM_MISSING']
+        )
+
+        by_external_id = {delivery.external_id: delivery for delivery in deliveries}
+        assert set(by_external_id) == {'SM_FIRST', 'SM_SECOND'}
+        second = by_external_id['SM_SECOND']
+        assert second.meta.message.content == 'second'
+        assert second.meta.message.room.uuid == room.uuid
+        assert [record.status for record in second.records] == [
+            'pending',
+            'accepted',
+        ]
+
+    @fixtures.db.room(
+        messages=[
+            {
+                'content': 'other backend',
+                'meta': {'type_': 'sms', 'backend': 'vonage'},
                 'deliveries': [
                     {
                         'recipient_identity': '+15559876',
@@ -156,20 +200,80 @@ class TestAsyncGetMessageMetaByExternalId(DBIntegrationTest):
         ]
     )
     @run_async
-    async def test_returns_meta_and_eager_loads_deliveries(self, room):
+    async def test_filters_on_backend(self, room):
         dao = AsyncRoomDAO()
-        meta = await dao.get_message_meta_by_external_id('SM_FETCH', 'twilio')
+        assert await dao.get_deliveries_by_external_ids('twilio', ['SM_FETCH']) == []
+
+    @run_async
+    async def test_returns_empty_without_external_ids(self):
+        dao = AsyncRoomDAO()
+        assert await dao.get_deliveries_by_external_ids('twilio', []) == []
 
-        assert meta is not None
-        assert meta.backend == 'twilio'
-        assert len(meta.deliveries) == 1
-        assert meta.deliveries[0].external_id == 'SM_FETCH'
 
-    @fixtures.db.room(messages=[{'content': 'no meta'}])
+@use_asset('database')
+class TestAsyncGetMessageDeliveries(DBIntegrationTest):
+    @fixtures.db.room(
+        messages=[
+            {
+                'content': 'first',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {'recipient_identity': '+15559876', 'statuses': ['pending']}
+                ],
+            },
+            {
+                'content': 'second',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {'recipient_identity': '+15559877', 'statuses': ['pending']}
+                ],
+            },
+        ]
+    )
     @run_async
-    async def test_returns_none_when_external_id_not_found(self, room):
+    async def test_claims_all_requested_deliveries(self, room):
+        ids = sorted(message.meta.deliveries[0].id for message in room.messages)
         dao = AsyncRoomDAO()
-        assert await dao.get_message_meta_by_external_id('SM_MISSING', 'twilio') is None
+
+        deliveries = await dao.get_message_deliveries(
+            [str(id_) for id_ in reversed(ids)] + ['0'], skip_locked=True
+        )
+
+        assert [delivery.id for delivery in deliveries] == ids
+        assert {delivery.meta.message.content for delivery in deliveries} == {
+            'first',
+            'second',
+        }
+
+    @fixtures.db.room(
+        messages=[
+            {
+                'content': 'pending',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {'recipient_identity': '+15559876', 'statuses': ['pending']}
+                ],
+            },
+            {
+                'content': 'accepted',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {
+                        'recipient_identity': '+15559877',
+                        'statuses': ['pending', 'accepted'],
+                    }
+                ],
+            },
+        ]
+    )
+    @run_async
+    async def test_claim_skips_deliveries_already_sent(self, room):
+        ids = [message.meta.deliveries[0].id for message in room.messages]
+        dao = AsyncRoomDAO()
+
+        deliveries = await dao.get_message_deliveries(ids, skip_locked=True)
+
+        assert [delivery.meta.message.content for delivery in deliveries] == ['pending']
 
 
 @use_asset('database')
@@ -218,7 +322,39 @@ class TestAsyncListPendingExternalIds(DBIntegrationTest):
             tenant_uuid=str(room.tenant_uuid), backend='twilio'
         )
 
-        assert result == ['SM_PENDING']
+        assert [external_id for _, external_id in result] == ['SM_PENDING']
+
+    @fixtures.db.room(
+        messages=[
+            {
+                'content': f'pending {index}',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
+                'deliveries': [
+                    {
+                        'recipient_identity': '+15559876',
+                        'external_id': f'SM_PAGE_{index}',
+                        'statuses': ['accepted'],
+                    }
+                ],
+            }
+            for index in range(3)
+        ]
+    )
+    @run_async
+    async def test_pages_after_cursor(self, room):
+        dao = AsyncRoomDAO()
+        tenant_uuid = str(room.tenant_uuid)
+
+        first = await dao.list_pending_external_ids(tenant_uuid, 'twilio', limit=2)
+        second = await dao.list_pending_external_ids(
+            tenant_uuid, 'twilio', limit=2, after=first[-1][0]
+        )
+
+        assert [external_id for _, external_id in first + second] == [
+            'SM_PAGE_0',
+            'SM_PAGE_1',
+            'SM_PAGE_2',
+        ]
 
 
 @use_asset('database')
@@ -247,188 +383,148 @@ class TestAsyncAddDeliveryRecord(DBIntegrationTest):
         assert record.status == DeliveryStatus.ACCEPTED.value
         assert record.reason == 'ok'
 
-
-@use_asset('database')
-class TestAsyncFindMatchingSignature(DBIntegrationTest):
     @fixtures.db.room(
         messages=[
             {
-                'content': 'echo me',
-                'meta': {
-                    'type_': 'sms',
-                    'backend': 'twilio',
-                    'extra': {'message_signature': 'sig-abc'},
-                },
+                'content': 'tracked',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
                 'deliveries': [
-                    {'recipient_identity': '+15559876', 'statuses': ['accepted']}
+                    {'recipient_identity': '+15559876', 'statuses': ['pending']}
                 ],
             }
         ]
     )
     @run_async
-    async def test_returns_meta_when_signature_matches_within_window(self, room):
+    async def test_current_status_follows_latest_record(self, room):
+        delivery = room.messages[0].meta.deliveries[0]
+        assert delivery.current_status == DeliveryStatus.PENDING.value
         dao = AsyncRoomDAO()
-        meta = await dao.find_matching_signature(str(room.uuid), 'sig-abc')
-        assert meta is not None
-        assert meta.message_uuid == room.messages[0].uuid
 
+        record = await dao.add_delivery_record(delivery, DeliveryStatus.SENT)
+
+        result = await dao.session.execute(
+            select(
+                MessageDelivery.current_status, MessageDelivery.status_updated_at
+            ).where(MessageDelivery.id == delivery.id)
+        )
+        assert result.one() == (DeliveryStatus.SENT.value, record.timestamp)
+
+
+@use_asset('database')
+class TestAsyncAddDeliveryRecords(DBIntegrationTest):
     @fixtures.db.room(
         messages=[
             {
-                'content': 'no match',
-                'meta': {
-                    'type_': 'sms',
-                    'backend': 'twilio',
-                    'extra': {'message_signature': 'sig-abc'},
-                },
+                'content': f'tracked {index}',
+                'meta': {'type_': 'sms', 'backend': 'twilio'},
                 'deliveries': [
                     {'recipient_identity': '+15559876', 'statuses': ['accepted']}
                 ],
             }
+            for index in range(2)
         ]
     )
     @run_async
-    async def test_returns_none_when_signature_outside_window(self, room):
+    async def test_records_and_current_status_updated(self, room):
+        first, second = (message.meta.deliveries[0] for message in room.messages)
         dao = AsyncRoomDAO()
-        assert (
-            await dao.find_matching_signature(
-                str(room.uuid), 'sig-abc', window_seconds=0
-            )
-            is None
+
+        records = await dao.add_delivery_records(
+            [
+                (first.id, DeliveryStatus.DELIVERED, None),
+                (second.id, DeliveryStatus.FAILED, '30003'),
+            ]
         )
 
-    @fixtures.db.room(
-        messages=[
-            {
-                'content': 'in room A',
-                'meta': {
-                    'type_': 'sms',
-                    'backend': 'twilio',
-                    'extra': {'message_signature': 'sig-abc'},
-                },
-                'deliveries': [
-                    {'recipient_identity': '+15559876', 'statuses': ['accepted']}
-                ],
-            }
+        assert [(r.delivery_id, r.status, r.reason) for r in records] == [
+            (first.id, DeliveryStatus.DELIVERED.value, None),
+            (second.id, DeliveryStatus.FAILED.value, '30003'),
         ]
-    )
-    @fixtures.db.room()
+        result = await dao.session.execute(
+            select(MessageDelivery.id, MessageDelivery.current_status)
+            .where(MessageDelivery.id.in_([first.id, second.id]))
+            .order_by(MessageDelivery.id)
+        )
+        assert result.all() == [
+            (first.id, DeliveryStatus.DELIVERED.value),
+            (second.id, DeliveryStatus.FAILED.value),
+        ]
+
     @run_async
-    async def test_returns_none_for_different_room(self, room_a, room_b):
+    async def test_nothing_to_add(self):
         dao = AsyncRoomDAO()
-        assert await dao.find_matching_signature(str(room_b.uuid), 'sig-abc') is None
+        assert await dao.add_delivery_records([]) == []
 
 
 @use_asset('database')
-class TestAsyncCheckDuplicateIdempotencyKey(DBIntegrationTest):
+class TestAsyncFindMatchingSignature(DBIntegrationTest):
     @fixtures.db.room(
         messages=[
             {
-                'content': 'with key',
+                'content': 'echo me',
                 'meta': {
                     'type_': 'sms',
                     'backend': 'twilio',
-                    'extra': {'inbound_idempotency_key': 'idem-123'},
+                    'extra': {'message_signature': 'sig-abc'},
                 },
                 'deliveries': [
-                    {'recipient_identity': '+15559876', 'statuses': ['delivered']}
+                    {'recipient_identity': '+15559876', 'statuses': ['accepted']}
                 ],
             }
         ]
     )
-    @fixtures.db.user_identity(backend='twilio', type_='sms', identity='+15559876')
-    @run_async
-    async def test_returns_true_when_key_present(self, room, identity):
-        dao = AsyncRoomDAO()
-        assert (
-            await dao.check_duplicate_idempotency_key(
-                'idem-123',
-                recipient='+15559876',
-                backend='twilio',
-                message_type='sms',
-                window_seconds=3600,
-            )
-            is True
-        )
-
-    @fixtures.db.room(messages=[{'content': 'no key'}])
-    @fixtures.db.user_identity(backend='twilio', type_='sms', identity='+15559876')
     @run_async
-    async def test_returns_false_when_key_absent(self, room, identity):
+    async def test_returns_meta_when_signature_matches_within_window(self, room):
         dao = AsyncRoomDAO()
-        assert (
-            await dao.check_duplicate_idempotency_key(
-                'idem-missing',
-                recipient='+15559876',
-                backend='twilio',
-                message_type='sms',
-                window_seconds=3600,
-            )
-            is False
-        )
+        meta = await dao.find_matching_signature(str(room.uuid), 'sig-abc')
+        assert meta is not None
+        assert meta.message_uuid == room.messages[0].uuid
 
     @fixtures.db.room(
         messages=[
             {
-                'content': 'twilio key',
+                'content': 'no match',
                 'meta': {
                     'type_': 'sms',
                     'backend': 'twilio',
-                    'extra': {'inbound_idempotency_key': 'cross-backend'},
+                    'extra': {'message_signature': 'sig-abc'},
                 },
                 'deliveries': [
-                    {'recipient_identity': '+15559876', 'statuses': ['delivered']}
+                    {'recipient_identity': '+15559876', 'statuses': ['accepted']}
                 ],
             }
         ]
     )
-    @fixtures.db.user_identity(backend='other', type_='sms', identity='+15559876')
     @run_async
-    async def test_returns_false_for_different_backend(self, room, identity):
+    async def test_returns_none_when_signature_outside_window(self, room):
         dao = AsyncRoomDAO()
         assert (
-            await dao.check_duplicate_idempotency_key(
-                'cross-backend',
-                recipient='+15559876',
-                backend='other',
-                message_type='sms',
-                window_seconds=3600,
+            await dao.find_matching_signature(
+                str(room.uuid), 'sig-abc', window_seconds=0
             )
-            is False
+            is None
         )
 
     @fixtures.db.room(
         messages=[
             {
-                'content': 'sms key',
+                'content': 'in room A',
                 'meta': {
                     'type_': 'sms',
                     'backend': 'twilio',
-                    'extra': {'inbound_idempotency_key': 'multi-type'},
+                    'extra': {'message_signature': 'sig-abc'},
                 },
                 'deliveries': [
-                    {'recipient_identity': '+15559876', 'statuses': ['delivered']}
+                    {'recipient_identity': '+15559876', 'statuses': ['accepted']}
                 ],
             }
         ]
     )
-    @fixtures.db.user_identity(backend='twilio', type_='whatsapp', identity='+15559876')
-    @fixtures.db.user_identity(backend='twilio', type_='sms', identity='+15559876')
+    @fixtures.db.room()
     @run_async
-    async def test_returns_true_with_matching_message_type(
-        self, room, sms_identity, whatsapp_identity
-    ):
+    async def test_returns_none_for_different_room(self, room_a, room_b):
         dao = AsyncRoomDAO()
-        assert (
-            await dao.check_duplicate_idempotency_key(
-                'multi-type',
-                recipient='+15559876',
-                backend='twilio',
-                message_type='sms',
-                window_seconds=3600,
-            )
-            is True
-        )
+        assert await dao.find_matching_signature(str(room_b.uuid), 'sig-abc') is None
 
 
 @use_asset('database')
@@ -479,8 +575,11 @@ class TestAsyncGetRecoverableDeliveries(DBIntegrationTest):
         dao = AsyncRoomDAO()
         recoverable = await dao.get_recoverable_deliveries()
 
-        statuses = sorted(status for _, status in recoverable)
+        statuses = sorted(status for _, status, _ in recoverable)
         assert statuses == ['pending', 'retrying']
+        assert {tenant_uuid for _, _, tenant_uuid in recoverable} == {
+            str(room.tenant_uuid)
+        }
 
 
 @use_asset('database')
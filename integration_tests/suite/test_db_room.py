@@ -3,6 +3,7 @@
 
 import datetime
 import uuid
+from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
 from hamcrest import (
@@ -17,6 +18,7 @@ from hamcrest import (
     is_not,
     none,
 )
+from sqlalchemy import event
 from sqlalchemy.inspection import inspect
 from wazo_test_helpers.hamcrest.raises import raises
 
@@ -26,7 +28,7 @@ if TYPE_CHECKING:
     from sqlalchemy_stubs import InstanceState
 
 from wazo_chatd.database.models import Room, RoomMessage, RoomUser
-from wazo_chatd.exceptions import UnknownRoomException
+from wazo_chatd.exceptions import UnknownMessageException, UnknownRoomException
 
 from .helpers import fixtures
 from .helpers.base import TOKEN_SUBTENANT_UUID as TENANT_2
@@ -90,6 +92,23 @@ class TestRoom(DBIntegrationTest):
         result = self._dao.room.list_([room_1.tenant_uuid], user_uuids=user_uuids)
         assert_that(result, contains_inanyorder(room_2, room_3))
 
+    @fixtures.db.room(users=[{'uuid': USER_UUID_1}, {'uuid': USER_UUID_2}])
+    @fixtures.db.room(users=[{'uuid': USER_UUID_1}, {'uuid': USER_UUID_2}, {'uuid': USER_UUID_3}])  # fmt: skip
+    @fixtures.db.room(
+        tenant_uuid=TENANT_2, users=[{'uuid': USER_UUID_1}, {'uuid': USER_UUID_2}]
+    )
+    def test_list_by_exact_user_uuids(self, room_1, _, __):
+        user_uuids = [str(USER_UUID_2), str(USER_UUID_1).upper()]
+        result = self._dao.room.list_(
+            [room_1.tenant_uuid], user_uuids=user_uuids, exact_user_uuids=True
+        )
+        assert_that(result, contains_inanyorder(room_1))
+
+        result = self._dao.room.list_(
+            [room_1.tenant_uuid], user_uuids=[USER_UUID_1], exact_user_uuids=True
+        )
+        assert_that(result, empty())
+
     @fixtures.db.room(tenant_uuid=TENANT_1)
     @fixtures.db.room(tenant_uuid=TENANT_2)
     def test_count(self, room_1, room_2):
@@ -184,6 +203,40 @@ class TestRoom(DBIntegrationTest):
 
         assert_that(messages, contains_exactly(message_1))
 
+    @fixtures.db.room(
+        messages=[{'content': 'oldest'}, {'content': 'older'}, {'content': 'newer'}]
+    )
+    def test_list_messages_before_after(self, room):
+        message_3, message_2, message_1 = room.messages
+
+        messages = self._dao.room.list_messages(room, before=message_3.uuid)
+        assert_that(messages, contains_exactly(message_2, message_1))
+
+        messages = self._dao.room.list_messages(room, before=message_2.uuid, limit=1)
+        assert_that(messages, contains_exactly(message_1))
+
+        messages = self._dao.room.list_messages(
+            room, after=message_1.uuid, direction='asc'
+        )
+        assert_that(messages, contains_exactly(message_2, message_3))
+
+        assert_that(
+            calling(self._dao.room.list_messages).with_args(room, before=UNKNOWN_UUID),
+            raises(UnknownMessageException),
+        )
+
+    @fixtures.db.room(messages=[{'content': 'listed'}])
+    @fixtures.db.room(messages=[{'content': 'other room'}])
+    def test_list_messages_cursor_from_another_room(self, room, other_room):
+        (other_message,) = other_room.messages
+
+        assert_that(
+            calling(self._dao.room.list_messages).with_args(
+                room, after=other_message.uuid
+            ),
+            raises(UnknownMessageException),
+        )
+
     @fixtures.db.room(messages=[{'content': 'older'}, {'content': 'newer'}])
     def test_count_messages(self, room):
         count = self._dao.room.count_messages(room)
@@ -254,6 +307,23 @@ class TestRoom(DBIntegrationTest):
 
         assert_that(messages, contains_exactly(message_1))
 
+    @fixtures.db.room(
+        users=[{'uuid': USER_UUID_1, 'tenant_uuid': UUID}],
+        messages=[{'content': 'older'}],
+    )
+    @fixtures.db.room(
+        users=[{'uuid': USER_UUID_1, 'tenant_uuid': UUID}],
+        messages=[{'content': 'newer'}],
+    )
+    def test_list_user_messages_before(self, room_1, room_2):
+        message_1, message_2 = room_1.messages[0], room_2.messages[0]
+
+        messages = self._dao.room.list_user_messages(
+            UUID, USER_UUID_1, before=message_2.uuid
+        )
+
+        assert_that(messages, contains_exactly(message_1))
+
     @fixtures.db.room(
         users=[{'uuid': USER_UUID_1, 'tenant_uuid': UUID}],
         messages=[{'content': 'hidden'}, {'content': 'found'}],
@@ -448,6 +518,82 @@ class TestRoom(DBIntegrationTest):
         assert_that(count, equal_to(1))
 
 
+@use_asset('database')
+class TestRoomAddMemberMessage(DBIntegrationTest):
+    @contextmanager
+    def count_statements(self):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self._session.get_bind()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+    @fixtures.db.room(users=[{'uuid': USER_UUID_1}])
+    def test_add_member_message(self, room):
+        message = RoomMessage(
+            content='hello', user_uuid=USER_UUID_1, tenant_uuid=UUID, wazo_uuid=UUID
+        )
+
+        with self.count_statements() as statements:
+            result = self._dao.room.add_member_message(room, message)
+
+        assert_that(len(statements), equal_to(1))
+        assert_that(
+            result,
+            has_properties(
+                uuid=instance_of(uuid.UUID),
+                room_uuid=room.uuid,
+                room=room,
+                meta=none(),
+                created_at=is_not(none()),
+            ),
+        )
+        self._session.expire_all()
+        assert_that(room.messages, contains_exactly(has_properties(uuid=result.uuid)))
+        assert_that(room.messages[0].content, equal_to('hello'))
+
+    @fixtures.db.room(users=[{'uuid': USER_UUID_1}])
+    def test_add_member_message_from_non_member(self, room):
+        message = RoomMessage(user_uuid=USER_UUID_2, tenant_uuid=UUID, wazo_uuid=UUID)
+
+        assert_that(
+            calling(self._dao.room.add_member_message).with_args(room, message),
+            raises(UnknownRoomException),
+        )
+        self._session.expire_all()
+        assert_that(room.messages, empty())
+
+    @fixtures.db.room(
+        users=[{'uuid': USER_UUID_1}],
+        messages=[{'content': f'message {i}'} for i in range(500)],
+    )
+    def test_add_member_message_statements(self, room):
+        iterations = 50
+
+        def count(add):
+            with self.count_statements() as statements:
+                for _ in range(iterations):
+                    # As a new request: the room messages are not loaded
+                    self._session.expire(room, ['messages'])
+                    message = RoomMessage(
+                        user_uuid=USER_UUID_1, tenant_uuid=UUID, wazo_uuid=UUID
+                    )
+                    add(room, message)
+            return len(statements) / iterations
+
+        append_statements = count(self._dao.room.add_message)
+        insert_statements = count(self._dao.room.add_member_message)
+
+        assert_that(insert_statements, equal_to(1))
+        assert append_statements > insert_statements
+
+
 @use_asset('database')
 class TestRoomRelationships(DBIntegrationTest):
     @fixtures.db.room()
@@ -1,4 +1,4 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import datetime
@@ -12,6 +12,7 @@ from hamcrest import (
     contains_exactly,
     empty,
     equal_to,
+    has_entries,
     has_items,
     has_properties,
     is_not,
@@ -122,6 +123,49 @@ class TestUser(DBIntegrationTest):
         result = self._dao.user.list_(tenant_uuids=None, uuids=[UNKNOWN_UUID])
         assert_that(result, empty())
 
+    @fixtures.db.user()
+    @fixtures.db.user()
+    def test_bump_presence_revisions(self, user_1, user_2):
+        revisions = self._dao.user.bump_presence_revisions([user_1.uuid])
+
+        self._session.expire_all()
+        assert_that(revisions, equal_to({str(user_1.uuid): user_1.presence_revision}))
+        assert_that(user_1.presence_revision > user_2.presence_revision)
+
+        revisions = self._dao.user.bump_presence_revisions()
+
+        self._session.expire_all()
+        assert_that(
+            revisions,
+            has_entries(
+                {
+                    str(user_1.uuid): user_1.presence_revision,
+                    str(user_2.uuid): user_2.presence_revision,
+                }
+            ),
+        )
+
+    @fixtures.db.user(tenant_uuid=TENANT_1)
+    @fixtures.db.user(tenant_uuid=TENANT_1)
+    @fixtures.db.user(tenant_uuid=TENANT_2)
+    def test_list_presences_page_since(self, user_1, user_2, user_3):
+        self._dao.user.bump_presence_revisions([user_2.uuid])
+        self._session.expire_all()
+
+        result = self._dao.user.list_presences_page(
+            [TENANT_1], since=user_1.presence_revision
+        )
+
+        assert_that(
+            result,
+            contains_exactly(contains_exactly(user_2), 2, 1, user_2.presence_revision),
+        )
+
+        result = self._dao.user.list_presences_page(
+            [TENANT_1], since=user_2.presence_revision
+        )
+        assert_that(result, contains_exactly(empty(), 2, 0, user_2.presence_revision))
+
     @fixtures.db.user(tenant_uuid=TENANT_1)
     @fixtures.db.user(tenant_uuid=TENANT_2)
     def test_count(self, user_1, user_2):
@@ -8,9 +8,11 @@ import uuid
 import pytest
 
 from wazo_chatd.database.models import UserIdentity
+from wazo_chatd.database.queries.async_.user_identity import AsyncUserIdentityDAO
 from wazo_chatd.exceptions import UnknownUserIdentityException
 
 from .helpers import fixtures
+from .helpers.async_ import run_async
 from .helpers.base import TOKEN_SUBTENANT_UUID as TENANT_2
 from .helpers.base import TOKEN_TENANT_UUID as TENANT_1
 from .helpers.base import DBIntegrationTest, use_asset
@@ -461,3 +463,25 @@ class TestUserIdentityListPagination(DBIntegrationTest):
             )
             == 1
         )
+
+
+@use_asset('database')
+class TestAsyncResolveIdentities(DBIntegrationTest):
+    @fixtures.db.user(uuid=USER_UUID_1, tenant_uuid=TENANT_1)
+    @fixtures.db.user_identity(
+        user_uuid=USER_UUID_1,
+        tenant_uuid=TENANT_1,
+        backend='sms_backend',
+        type_='sms',
+        identity='+15551111111',
+    )
+    @run_async
+    async def test_resolve_identities(self, user, identity):
+        dao = AsyncUserIdentityDAO()
+
+        resolved = await dao.resolve_identities(['+15551111111', '+15559999999'])
+
+        assert set(resolved) == {'+15551111111'}
+        assert resolved['+15551111111'].uuid == identity.uuid
+        assert resolved['+15551111111'].user_uuid == USER_UUID_1
+        assert resolved['+15551111111'].tenant_uuid == TENANT_1
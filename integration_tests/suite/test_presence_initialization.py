@@ -498,80 +498,98 @@ class TestAsteriskFullyBooted(InitIntegrationTest):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        PresenceInitOkWaitStrategy().wait(cls)
-        cls.auth.clear_requests()
-
-    def test_fullybooted_event_received(self):
-        user_created_uuid = uuid.uuid4()
-        self.confd.set_users(
+        cls.user_uuid = uuid.uuid4()
+        cls.endpoint_name = 'PJSIP/resync'
+        cls.confd.set_users(
             {
-                'uuid': str(user_created_uuid),
+                'uuid': str(cls.user_uuid),
                 'tenant_uuid': str(TOKEN_TENANT_UUID),
-                'lines': [],
-                'services': {'dnd': {'enabled': True}},
+                'lines': [
+                    {
+                        'id': random.randint(1, 1000000),
+                        'name': 'resync',
+                        'protocol': 'sip',
+                    }
+                ],
+                'services': {'dnd': {'enabled': False}},
             },
         )
+        cls.amid.set_devicestatelist(
+            {
+                "Event": "DeviceStateChange",
+                "Device": cls.endpoint_name,
+                "State": "NOT_INUSE",
+            },
+        )
+        cls.amid.set_coreshowchannels()
+        cls.restart_chatd_service()
+        PresenceInitOkWaitStrategy().wait(cls)
 
-        self.bus.send_fullybooted_event()
-
-        def db_updated():
-            users = self._dao.user.list_(tenant_uuids=None)
-            assert_that(
-                users, contains_inanyorder(has_properties(uuid=user_created_uuid))
-            )
-
-        until.assert_(db_updated, tries=10)
+    def setUp(self):
+        super().setUp()
+        self.auth.clear_requests()
 
-    def test_multiple_fullybooted_events_do_not_impact(self):
-        user_created_uuid = uuid.uuid4()
-        self.confd.set_users(
+    def test_fullybooted_only_resyncs_devices_and_channels(self):
+        self.amid.set_devicestatelist(
             {
-                'uuid': str(user_created_uuid),
-                'tenant_uuid': str(TOKEN_TENANT_UUID),
-                'lines': [],
-                'services': {'dnd': {'enabled': True}},
+                "Event": "DeviceStateChange",
+                "Device": self.endpoint_name,
+                "State": "INUSE",
+            },
+        )
+        self.amid.set_coreshowchannels(
+            {
+                "Event": "CoreShowChannel",
+                "Channel": f'{self.endpoint_name}-0001',
+                "ChannelStateDesc": "Ringing",
+                "ChanVariable": {},
             },
         )
 
         self.bus.send_fullybooted_event()
-        self.bus.send_fullybooted_event()  # ignored
-        self.bus.send_fullybooted_event()  # ignored
 
-        def db_updated():
-            users = self._dao.user.list_(tenant_uuids=None)
+        def resynced():
+            presence = self.chatd.user_presences.get(str(self.user_uuid))
+            assert_that(presence, has_entries(line_state='ringing'))
+
+        until.assert_(resynced, tries=10)
+
+        requests = self.auth.list_requests()['requests']
+        assert_that(requests, not_(has_items(has_entries(path='/0.1/tenants'))))
+
+        def channel_persisted():
+            self._session.expire_all()
+            channels = self._session.query(models.Channel).all()
             assert_that(
-                users, contains_inanyorder(has_properties(uuid=user_created_uuid))
+                channels,
+                contains_inanyorder(
+                    has_properties(name=f'{self.endpoint_name}-0001', state='ringing')
+                ),
             )
 
-        until.assert_(db_updated, tries=10)
+        until.assert_(channel_persisted, tries=10)
 
-    def test_fullybooted_can_handle_events(self):
-        user_created_uuid = uuid.uuid4()
-        self.confd.set_users(
+    def test_multiple_fullybooted_events_do_not_impact(self):
+        self.amid.set_devicestatelist(
             {
-                'uuid': str(user_created_uuid),
-                'tenant_uuid': str(TOKEN_TENANT_UUID),
-                'lines': [],
-                'services': {'dnd': {'enabled': True}},
+                "Event": "DeviceStateChange",
+                "Device": self.endpoint_name,
+                "State": "UNAVAILABLE",
             },
-            delay=3,
         )
+        self.amid.set_coreshowchannels()
 
+        self.bus.send_fullybooted_event()
+        self.bus.send_fullybooted_event()
         self.bus.send_fullybooted_event()
 
-        created_tenant_uuid = uuid.uuid4()
-        dropped_user_uuid = uuid.uuid4()
-        with self.ensure_being_in_fetching_users_stage():
-            self.bus.send_tenant_created_event(created_tenant_uuid)
-            self.bus.send_user_created_event(dropped_user_uuid, TOKEN_TENANT_UUID)
-
-        PresenceInitOkWaitStrategy().wait(self)
+        def resynced():
+            presence = self.chatd.user_presences.get(str(self.user_uuid))
+            assert_that(presence, has_entries(line_state='unavailable'))
 
-        self._session.expire_all()
-        tenants = self._dao.tenant.list_()
-        assert_that(tenants, has_items(has_properties(uuid=created_tenant_uuid)))
-        users = self._dao.user.list_(tenant_uuids=None)
-        assert_that(users, not_(has_items(has_properties(uuid=dropped_user_uuid))))
+        until.assert_(resynced, tries=10)
+        status = self.chatd.status.get()
+        assert_that(status['presence_initialization'], has_entries(status='ok'))
 
 
 @use_asset('initialization')
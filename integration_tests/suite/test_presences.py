@@ -10,6 +10,7 @@ from hamcrest import (
     contains_inanyorder,
     empty,
     equal_to,
+    greater_than,
     has_entries,
     has_properties,
     is_not,
@@ -43,7 +44,7 @@ class TestPresence(APIIntegrationTest):
         assert_that(
             presences,
             has_entries(
-                items=contains_exactly(
+                items=contains_inanyorder(
                     has_entries(
                         uuid=str(user_1.uuid),
                         tenant_uuid=str(user_1.tenant_uuid),
@@ -91,7 +92,7 @@ class TestPresence(APIIntegrationTest):
         assert_that(
             presences,
             has_entries(
-                items=contains_exactly(
+                items=contains_inanyorder(
                     has_entries(uuid=str(user_1.uuid)),
                     has_entries(uuid=str(user_2.uuid)),
                 ),
@@ -110,7 +111,7 @@ class TestPresence(APIIntegrationTest):
         assert_that(
             presences,
             has_entries(
-                items=contains_exactly(
+                items=contains_inanyorder(
                     has_entries(uuid=str(user_1.uuid)),
                     has_entries(uuid=str(user_2.uuid)),
                 ),
@@ -119,6 +120,64 @@ class TestPresence(APIIntegrationTest):
             ),
         )
 
+    @fixtures.db.user()
+    @fixtures.db.user()
+    @fixtures.db.user()
+    def test_list_paginated(self, *users):
+        user_uuids = sorted(str(user.uuid) for user in users)
+
+        presences = self.chatd.user_presences.list(limit=1, offset=1)
+        assert_that(
+            presences,
+            has_entries(
+                items=contains_exactly(has_entries(uuid=user_uuids[1])),
+                total=equal_to(3),
+                filtered=equal_to(3),
+            ),
+        )
+
+        presences = self.chatd.user_presences.list(user_uuids=user_uuids[1:], offset=1)
+        assert_that(
+            presences,
+            has_entries(
+                items=contains_exactly(has_entries(uuid=user_uuids[2])),
+                total=equal_to(3),
+                filtered=equal_to(2),
+            ),
+        )
+
+        presences = self.chatd.user_presences.list(offset=3)
+        assert_that(
+            presences,
+            has_entries(items=empty(), total=equal_to(3), filtered=equal_to(3)),
+        )
+
+    @fixtures.db.user()
+    @fixtures.db.user()
+    def test_list_since(self, user_1, user_2):
+        cursor = self.chatd.user_presences.list()['cursor']
+
+        presences = self.chatd.user_presences.list(since=cursor)
+        assert_that(
+            presences,
+            has_entries(items=empty(), filtered=equal_to(0), cursor=equal_to(cursor)),
+        )
+
+        self.chatd.user_presences.update({'uuid': str(user_2.uuid), 'state': 'away'})
+
+        presences = self.chatd.user_presences.list(since=cursor)
+        assert_that(
+            presences,
+            has_entries(
+                items=contains_exactly(
+                    has_entries(uuid=str(user_2.uuid), state='away')
+                ),
+                total=equal_to(2),
+                filtered=equal_to(1),
+                cursor=greater_than(cursor),
+            ),
+        )
+
     @fixtures.db.user()
     def test_list_unknown_user_uuids(self, user_1):
         presences = self.chatd.user_presences.list(user_uuids=[str(UNKNOWN_UUID)])
@@ -224,6 +224,19 @@ class TestUserRoom(APIIntegrationTest):
             ),
         )
 
+    @fixtures.http.room(users=[USER_1])
+    def test_create_in_non_participant_room(self, other_room):
+        with self.user_token(USER_2['uuid']):
+            assert_that(
+                calling(self.chatd.rooms.create_message_from_user).with_args(
+                    other_room['uuid'], {'content': 'intruder'}
+                ),
+                raises(
+                    ChatdError,
+                    has_properties(status_code=404, error_id='unknown-room'),
+                ),
+            )
+
     @fixtures.http.room()
     def test_that_empty_body_for_post_rooms_message_returns_400(self, room):
         self.assert_empty_body_returns_400(
@@ -1,10 +1,26 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import logging
+import queue
+import threading
+import time
+
 from wazo_bus.consumer import BusConsumer as BaseConsumer
 from wazo_bus.publisher import BusPublisher as BasePublisher
 from xivo.status import Status
 
+from .plugin_helpers.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Seconds between queuing a fan-out and publishing its last event
+FANOUT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+# Fan-outs queued when the publisher thread picks up a batch
+FANOUT_DEPTH_BUCKETS = (1, 10, 100, 1000, 10000)
+
+_STOP = object()
+
 
 class BusConsumer(BaseConsumer):
     @classmethod
@@ -31,3 +47,115 @@ class BusPublisher(BasePublisher):
     @classmethod
     def from_config(cls, service_uuid, bus_config):
         return cls(name='wazo-chatd', service_uuid=service_uuid, **bus_config)
+
+
+class FanoutPublisher:
+    """Publish the events of one payload to many users from a dedicated thread.
+
+    A fan-out is a payload built once and the users to notify: the caller
+    only queues it, and the publisher thread builds the per-user events and
+    hands each to the bus, taking up to ``batch_size`` fan-outs at a time.
+    Fan-outs are published in order. When ``max_pending`` fan-outs are
+    already queued, the caller waits up to ``overflow_timeout`` seconds for
+    room, then publishes itself: its events may then overtake queued ones.
+    Until the thread is started, the caller publishes.
+    """
+
+    def __init__(self, bus, max_pending=10000, batch_size=100, overflow_timeout=1):
+        self._bus = bus
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._overflow_timeout = overflow_timeout
+        self._batch_size = max(1, batch_size)
+        self._running = threading.Event()
+        self._thread = None
+        self._published = 0
+        self._failed = 0
+        self._overflowed = 0
+        self._latency = Histogram(FANOUT_LATENCY_BUCKETS)
+        self._depth = Histogram(FANOUT_DEPTH_BUCKETS)
+
+    def fan_out(self, make_event, user_uuids):
+        """Publish ``make_event(user_uuid)`` for each user, from the thread."""
+        if not self.submit(make_event, user_uuids):
+            self.publish(make_event, user_uuids)
+
+    def submit(self, make_event, user_uuids):
+        """Queue a fan-out; False when the caller must publish it."""
+        if not self._running.is_set():
+            return False
+        try:
+            self._queue.put(
+                (time.monotonic(), make_event, list(user_uuids)),
+                timeout=self._overflow_timeout,
+            )
+        except queue.Full:
+            self._overflowed += 1
+            logger.warning('Fan-out publisher queue full, publishing from caller')
+            return False
+        return True
+
+    def publish(self, make_event, user_uuids):
+        for user_uuid in user_uuids:
+            try:
+                self._bus.publish(make_event(user_uuid))
+            except Exception:
+                self._failed += 1
+                logger.exception('Failed to publish event to user "%s"', user_uuid)
+            else:
+                self._published += 1
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name='fanout_publisher')
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread:
+            self._queue.put(_STOP)
+            logger.debug('joining fan-out publisher thread...')
+            self._thread.join()
+        # Fan-outs queued while stopping
+        while batch := self._take_batch(block=False):
+            self._publish_batch(batch)
+
+    def provide_status(self, status):
+        alive = self._thread is not None and self._thread.is_alive()
+        status['fanout_publisher'] = {
+            'status': Status.ok if alive else Status.fail,
+            'pending': self._queue.qsize(),
+            'published': self._published,
+            'failed': self._failed,
+            'overflowed': self._overflowed,
+            'queue_depth': self._depth.snapshot(),
+            'publish_latency': self._latency.snapshot(),
+        }
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(block=True)
+            self._depth.observe(len(batch) + self._queue.qsize())
+            if not self._publish_batch(batch):
+                return
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get())
+            while len(batch) < self._batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _publish_batch(self, batch):
+        running = True
+        for item in batch:
+            if item is _STOP:
+                running = False
+                continue
+            queued_at, make_event, user_uuids = item
+            self.publish(make_event, user_uuids)
+            self._latency.observe(time.monotonic() - queued_at)
+        return running
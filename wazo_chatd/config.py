@@ -76,7 +76,23 @@ _DEFAULT_CONFIG = {
     'connectors': {},
     'delivery': {
         'max_concurrent_tasks': 100,
+        'tenant_max_concurrent_tasks': 25,
+        'tenant_weights': {},
+        'batch_size': 100,
+        'batch_window': 0.05,
+        'send_rate_max_wait': 5,
+        'inbound_high_water_mark': 10000,
+        'inbound_retry_after': 30,
+        'inbound_claim_timeout': 300,
+        'shard_count': 1,
+        'resolution_cache_size': 10000,
+        'resolution_cache_ttl': 300,
+        'dedup_filter_capacity': 100000,
+        'worker_threads': 32,
         'backend_cache_ttl': 300,
+        'backend_cache_refresh_ahead': 0.2,
+        'backend_cache_max_stale': 3600,
+        'backend_fetch_concurrency': 20,
         'poll_interval_min': 5,
         'poll_interval_max': 60,
         'poll_tau_speedup': 5,
@@ -84,10 +100,27 @@ _DEFAULT_CONFIG = {
         'poll_jitter_ratio': 0.1,
         'poll_rate_limit_floor': 30,
         'poll_rate_limit_window': 300,
+        'track_outbound_batch_size': 100,
+        'listener_loops': 4,
+        'listener_lag_interval': 1,
+        'listener_lag_threshold': 0.5,
+        'listener_lag_cooldown': 300,
+    },
+    'fanout_publisher': {
+        'max_pending': 10000,
+        'batch_size': 100,
+        'overflow_timeout': 1,
     },
     'initialization': {
         'enabled': True,
         'token_expiration': 600,
+        'replay_max_size': 10000,
+        'replay_batch_size': 500,
+    },
+    'presences': {
+        'flush_interval': 1,
+        'publish_window': 0.1,
+        'publish_max_pending': 10000,
     },
     'teams_presence': {'microsoft_graph_url': 'https://graph.microsoft.com/v1.0'},
 }
@@ -15,7 +15,7 @@ from xivo.token_renewer import TokenRenewer
 
 from . import auth
 from .asyncio_ import CoreAsyncio
-from .bus import BusConsumer, BusPublisher
+from .bus import BusConsumer, BusPublisher, FanoutPublisher
 from .database.helpers import init_db
 from .database.queries import DAO
 from .http_server import CoreRestApi, api, app
@@ -49,7 +49,14 @@ class Controller:
         self.aio = CoreAsyncio()
         self.bus_consumer = BusConsumer.from_config(config['bus'])
         self.bus_publisher = BusPublisher.from_config(config['uuid'], config['bus'])
+        self.fanout_publisher = FanoutPublisher(
+            self.bus_publisher,
+            config['fanout_publisher']['max_pending'],
+            config['fanout_publisher']['batch_size'],
+            config['fanout_publisher']['overflow_timeout'],
+        )
         self.thread_manager = ThreadManager()
+        self.thread_manager.manage(self.fanout_publisher)
         self.hooks = Hooks()
         auth_client = AuthClient(**config['auth'])
         self.token_renewer = TokenRenewer(auth_client)
@@ -71,6 +78,7 @@ class Controller:
                 'dao': dao,
                 'bus_consumer': self.bus_consumer,
                 'bus_publisher': self.bus_publisher,
+                'fanout_publisher': self.fanout_publisher,
                 'status_aggregator': self.status_aggregator,
                 'thread_manager': self.thread_manager,
                 'token_changed_subscribe': self.token_renewer.subscribe_to_token_change,
@@ -83,6 +91,7 @@ class Controller:
         logger.info('wazo-chatd starting...')
         self.status_aggregator.add_provider(self.bus_consumer.provide_status)
         self.status_aggregator.add_provider(auth.provide_status)
+        self.status_aggregator.add_provider(self.fanout_publisher.provide_status)
         signal.signal(signal.SIGTERM, partial(_signal_handler, self))
         signal.signal(signal.SIGINT, partial(_signal_handler, self))
 
@@ -27,3 +27,16 @@ class DeliveryStatus(str, Enum):
     FAILED = 'failed'
     RETRYING = 'retrying'
     DEAD_LETTER = 'dead_letter'
+
+
+# No more status tracking with the backend after these
+TRACKING_DONE_STATUSES = (
+    DeliveryStatus.DELIVERED.value,
+    DeliveryStatus.FAILED.value,
+    DeliveryStatus.DEAD_LETTER.value,
+)
+# Sent again by the executor after a restart
+RECOVERABLE_STATUSES = (
+    DeliveryStatus.PENDING.value,
+    DeliveryStatus.RETRYING.value,
+)
@@ -2,11 +2,13 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 from __future__ import annotations
 
+import threading
 from collections.abc import Iterator, Sequence
 from contextlib import contextmanager
 from typing import TYPE_CHECKING, Any, TypeVar
 
 from sqlalchemy import column, create_engine, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Query
 from sqlalchemy.orm import Session as SASession
 from sqlalchemy.orm import scoped_session, sessionmaker
@@ -19,6 +21,7 @@ if TYPE_CHECKING:
 
 
 Session = scoped_session(sessionmaker())
+_shared_scope = threading.local()
 
 BULK_BATCH_SIZE = 1000
 
@@ -41,6 +44,12 @@ def init_db(db_uri, echo=False, pool_size=16, max_overflow=10):
 
 @contextmanager
 def session_scope():
+    shared_session = getattr(_shared_scope, 'session', None)
+    if shared_session is not None:
+        # Part of a shared_session_scope(), which commits or rolls back
+        yield shared_session
+        return
+
     session = Session()
     try:
         yield session
@@ -52,6 +61,17 @@ def session_scope():
         Session.remove()
 
 
+@contextmanager
+def shared_session_scope() -> Iterator[SASession]:
+    """Run nested session_scope() of this thread in a single transaction."""
+    with session_scope() as session:
+        _shared_scope.session = session
+        try:
+            yield session
+        finally:
+            _shared_scope.session = None
+
+
 def bulk_insert(session: SASession, instances: Sequence[Any]) -> None:
     for chunk in _chunked(instances, BULK_BATCH_SIZE):
         session.bulk_save_objects(chunk)
@@ -84,6 +104,27 @@ def bulk_update(
     session.flush()
 
 
+def bulk_upsert(
+    session: SASession,
+    model: type[Any],
+    columns: Sequence[str],
+    rows: Sequence[tuple[Any, ...]],
+    key_columns: Sequence[str],
+) -> None:
+    for chunk in _chunked(rows, BULK_BATCH_SIZE):
+        query = insert(model).values([dict(zip(columns, row)) for row in chunk])
+        query = query.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={
+                name: query.excluded[name]
+                for name in columns
+                if name not in key_columns
+            },
+        )
+        session.execute(query)
+    session.flush()
+
+
 def bulk_delete(
     session: SASession, model: type[Any], in_target: Any, items: Sequence[Any]
 ) -> None:
@@ -3,20 +3,26 @@
 
 from __future__ import annotations
 
+import hashlib
+from collections.abc import Iterable
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
+from uuid import UUID
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     CheckConstraint,
     Column,
     DateTime,
     ForeignKey,
     Integer,
+    Sequence,
     SmallInteger,
     String,
     Text,
-    select,
+    event,
+    or_,
     text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
@@ -33,6 +39,8 @@ if TYPE_CHECKING:
 
 Base: type[DeclarativeMeta] = declarative_base()
 
+PRESENCE_REVISION_SEQUENCE = Sequence('chatd_user_presence_revision_seq')
+
 
 @generic_repr
 class Tenant(Base):  # type: ignore[misc, valid-type]
@@ -44,7 +52,14 @@ class Tenant(Base):  # type: ignore[misc, valid-type]
 @generic_repr
 class User(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_user'
-    __table_args__ = (Index('chatd_user__idx__tenant_uuid', 'tenant_uuid'),)
+    __table_args__ = (
+        Index('chatd_user__idx__tenant_uuid', 'tenant_uuid'),
+        Index(
+            'chatd_user__idx__tenant_uuid_presence_revision',
+            'tenant_uuid',
+            'presence_revision',
+        ),
+    )
 
     uuid = Column(UUIDType(), primary_key=True)
     tenant_uuid: UUIDType = Column(
@@ -63,6 +78,12 @@ class User(Base):  # type: ignore[misc, valid-type]
     status = Column(Text())
     do_not_disturb = Column(Boolean(), nullable=False, server_default='false')
     last_activity = Column(DateTime(timezone=True))
+    presence_revision = Column(
+        BigInteger(),
+        PRESENCE_REVISION_SEQUENCE,
+        server_default=PRESENCE_REVISION_SEQUENCE.next_value(),
+        nullable=False,
+    )
 
     tenant: RelationshipProperty[Tenant] = relationship('Tenant')
     sessions: RelationshipProperty[Session] = relationship(
@@ -192,7 +213,13 @@ class Channel(Base):  # type: ignore[misc, valid-type]
 @generic_repr
 class Room(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_room'
-    __table_args__ = (Index('chatd_room__idx__tenant_uuid', 'tenant_uuid'),)
+    __table_args__ = (
+        Index(
+            'chatd_room__idx__tenant_uuid_participants_hash',
+            'tenant_uuid',
+            'participants_hash',
+        ),
+    )
 
     uuid = Column(
         UUIDType(), server_default=text('uuid_generate_v4()'), primary_key=True
@@ -203,6 +230,8 @@ class Room(Base):  # type: ignore[misc, valid-type]
         ForeignKey('chatd_tenant.uuid', ondelete='CASCADE'),
         nullable=False,
     )
+    # Set on insert, see room_participants_hash()
+    participants_hash = Column(String(64), nullable=False)
 
     users: RelationshipProperty[RoomUser] = relationship(
         'RoomUser',
@@ -217,10 +246,27 @@ class Room(Base):  # type: ignore[misc, valid-type]
     )
 
 
+def room_participants_hash(user_uuids: Iterable[UUID | str]) -> str:
+    """Identify a set of room users, to find a room by its exact members.
+
+    Must match the backfill of the add_room_participants_hash migration.
+    """
+    members = sorted({str(UUID(str(user_uuid))) for user_uuid in user_uuids})
+    return hashlib.sha256(','.join(members).encode()).hexdigest()
+
+
+@event.listens_for(Room, 'before_insert')
+def _set_room_participants_hash(mapper, connection, room: Room) -> None:
+    room.participants_hash = room_participants_hash(user.uuid for user in room.users)
+
+
 @generic_repr
 class RoomUser(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_room_user'
-    __table_args__ = (Index('chatd_room_user__idx__identity', 'identity'),)
+    __table_args__ = (
+        Index('chatd_room_user__idx__identity', 'identity'),
+        Index('chatd_room_user__idx__uuid_room_uuid', 'uuid', 'room_uuid'),
+    )
 
     room_uuid: UUIDType = Column(
         UUIDType(),
@@ -239,7 +285,19 @@ class RoomUser(Base):  # type: ignore[misc, valid-type]
 @generic_repr
 class RoomMessage(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_room_message'
-    __table_args__ = (Index('chatd_room_message__idx__room_uuid', 'room_uuid'),)
+    __table_args__ = (
+        Index(
+            'chatd_room_message__idx__room_uuid_created_at_uuid',
+            'room_uuid',
+            text('created_at DESC'),
+            text('uuid DESC'),
+        ),
+        Index(
+            'chatd_room_message__idx__content_trgm',
+            text('chatd_unaccent(content) gin_trgm_ops'),
+            postgresql_using='gin',
+        ),
+    )
 
     uuid = Column(
         UUIDType(), server_default=text('uuid_generate_v4()'), primary_key=True
@@ -312,9 +370,9 @@ class MessageMeta(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_message_meta'
     __table_args__ = (
         Index(
-            'chatd_message_meta__idx__extra',
-            'extra',
-            postgresql_using='gin',
+            'chatd_message_meta__idx__message_signature',
+            'message_signature',
+            postgresql_where=text('message_signature IS NOT NULL'),
         ),
     )
 
@@ -331,6 +389,8 @@ class MessageMeta(Base):  # type: ignore[misc, valid-type]
     extra = Column(
         JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb")
     )
+    # Copied from extra on insert, see _set_message_signature()
+    message_signature = Column(String, nullable=True)
 
     sender_identity: RelationshipProperty[UserIdentity | None] = relationship(
         'UserIdentity', uselist=False, viewonly=True
@@ -355,6 +415,11 @@ class MessageMeta(Base):  # type: ignore[misc, valid-type]
         return str(self.deliveries[0].type_) if self.deliveries else None
 
 
+@event.listens_for(MessageMeta, 'before_insert')
+def _set_message_signature(mapper, connection, meta: MessageMeta) -> None:
+    meta.message_signature = (meta.extra or {}).get('message_signature')
+
+
 @generic_repr
 class MessageDelivery(Base):  # type: ignore[misc, valid-type]
     __tablename__ = 'chatd_message_delivery'
@@ -371,6 +436,21 @@ class MessageDelivery(Base):  # type: ignore[misc, valid-type]
             unique=True,
             postgresql_where=text('external_id IS NOT NULL'),
         ),
+        # Predicates written as in the add_message_delivery_current_status
+        # migration, from TRACKING_DONE_STATUSES and RECOVERABLE_STATUSES
+        Index(
+            'chatd_message_delivery__idx__tracking',
+            'backend',
+            postgresql_where=text(
+                'external_id IS NOT NULL AND current_status NOT IN '
+                "('delivered', 'failed', 'dead_letter')"
+            ),
+        ),
+        Index(
+            'chatd_message_delivery__idx__recoverable',
+            'current_status',
+            postgresql_where=text("current_status IN ('pending', 'retrying')"),
+        ),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -384,6 +464,9 @@ class MessageDelivery(Base):  # type: ignore[misc, valid-type]
     type_ = Column('type', String, nullable=False)
     external_id = Column(String, nullable=True)
     retry_count = Column(SmallInteger, nullable=False, default=0, server_default='0')
+    # Latest record, maintained when a record is inserted (see status)
+    current_status = Column(String, nullable=True)
+    status_updated_at = Column(DateTime(timezone=True), nullable=True)
 
     meta: RelationshipProperty[MessageMeta] = relationship(
         'MessageMeta',
@@ -404,14 +487,7 @@ class MessageDelivery(Base):  # type: ignore[misc, valid-type]
 
     @status.expression  # type: ignore[no-redef]
     def status(cls):
-        return (
-            select(DeliveryRecord.status)
-            .where(DeliveryRecord.delivery_id == cls.id)
-            .order_by(DeliveryRecord.timestamp.desc(), DeliveryRecord.id.desc())
-            .limit(1)
-            .correlate_except(DeliveryRecord)
-            .scalar_subquery()
-        )
+        return cls.current_status
 
     @hybrid_property
     def updated_at(self) -> datetime | None:
@@ -419,14 +495,7 @@ class MessageDelivery(Base):  # type: ignore[misc, valid-type]
 
     @updated_at.expression  # type: ignore[no-redef]
     def updated_at(cls):
-        return (
-            select(DeliveryRecord.timestamp)
-            .where(DeliveryRecord.delivery_id == cls.id)
-            .order_by(DeliveryRecord.timestamp.desc(), DeliveryRecord.id.desc())
-            .limit(1)
-            .correlate_except(DeliveryRecord)
-            .scalar_subquery()
-        )
+        return cls.status_updated_at
 
 
 @generic_repr
@@ -454,3 +523,64 @@ class DeliveryRecord(Base):  # type: ignore[misc, valid-type]
         back_populates='records',
         uselist=False,
     )
+
+
+@event.listens_for(DeliveryRecord, 'after_insert')
+def _update_delivery_status(mapper, connection, record: DeliveryRecord) -> None:
+    # Same transaction as the record; an older record never overwrites a newer one
+    deliveries = MessageDelivery.__table__
+    connection.execute(
+        deliveries.update()
+        .where(deliveries.c.id == record.delivery_id)
+        .where(
+            or_(
+                deliveries.c.status_updated_at.is_(None),
+                deliveries.c.status_updated_at <= record.timestamp,
+            )
+        )
+        .values(current_status=record.status, status_updated_at=record.timestamp)
+    )
+
+
+@generic_repr
+class ConnectorInbound(Base):  # type: ignore[misc, valid-type]
+    """Webhook event staged until the delivery runner has processed it."""
+
+    __tablename__ = 'chatd_connector_inbound'
+    __table_args__ = (
+        CheckConstraint(
+            "kind in ('message', 'status')",
+            name='chatd_connector_inbound_kind_check',
+        ),
+        Index('chatd_connector_inbound__idx__claimed_until', 'claimed_until'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    tenant_uuid = Column(UUIDType(), nullable=False)
+    backend = Column(String, nullable=False)
+    kind = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        server_default=text("(now() at time zone 'utc')"),
+        nullable=False,
+    )
+    # Set while a runner processes the event; claimable again once past
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+
+
+class ConnectorDedup(Base):  # type: ignore[misc, valid-type]
+    """Inbound idempotency key, rejected again until it expires."""
+
+    __tablename__ = 'chatd_connector_dedup'
+    __table_args__ = (Index('chatd_connector_dedup__idx__expires_at', 'expires_at'),)
+
+    tenant_uuid = Column(
+        UUIDType(),
+        ForeignKey('chatd_tenant.uuid', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    backend = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
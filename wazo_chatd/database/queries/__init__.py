@@ -5,6 +5,7 @@ from __future__ import annotations
 
 from ..helpers import Session
 from .channel import ChannelDAO
+from .connector_inbound import ConnectorInboundDAO
 from .endpoint import EndpointDAO
 from .line import LineDAO
 from .refresh_token import RefreshTokenDAO
@@ -17,6 +18,7 @@ from .user_identity import UserIdentityDAO
 
 class DAO:
     channel: ChannelDAO
+    connector_inbound: ConnectorInboundDAO
     endpoint: EndpointDAO
     line: LineDAO
     refresh_token: RefreshTokenDAO
@@ -27,6 +29,7 @@ class DAO:
     user_identity: UserIdentityDAO
     _daos = {
         'channel': ChannelDAO,
+        'connector_inbound': ConnectorInboundDAO,
         'endpoint': EndpointDAO,
         'line': LineDAO,
         'refresh_token': RefreshTokenDAO,
@@ -3,14 +3,20 @@
 
 from __future__ import annotations
 
+from .connector_dedup import AsyncConnectorDedupDAO
+from .connector_inbound import AsyncConnectorInboundDAO
 from .room import AsyncRoomDAO
 from .user_identity import AsyncUserIdentityDAO
 
 
 class AsyncDAO:
+    connector_dedup: AsyncConnectorDedupDAO
+    connector_inbound: AsyncConnectorInboundDAO
     room: AsyncRoomDAO
     user_identity: AsyncUserIdentityDAO
 
     def __init__(self) -> None:
+        self.connector_dedup = AsyncConnectorDedupDAO()
+        self.connector_inbound = AsyncConnectorInboundDAO()
         self.room = AsyncRoomDAO()
         self.user_identity = AsyncUserIdentityDAO()
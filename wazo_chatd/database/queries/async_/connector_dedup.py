@@ -0,0 +1,67 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from wazo_chatd.database.async_helpers import get_async_session
+from wazo_chatd.database.models import ConnectorDedup
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncConnectorDedupDAO:
+    @property
+    def session(self) -> AsyncSession:
+        return get_async_session()
+
+    async def exists(self, tenant_uuid: str, backend: str, key: str) -> bool:
+        stmt = select(ConnectorDedup.key).where(
+            ConnectorDedup.tenant_uuid == tenant_uuid,
+            ConnectorDedup.backend == backend,
+            ConnectorDedup.key == key,
+            ConnectorDedup.expires_at > func.now(),
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def claim(
+        self, tenant_uuid: str, backend: str, key: str, ttl: timedelta
+    ) -> bool:
+        """Record ``key`` for ``ttl``; False if it is already recorded.
+
+        An expired key is claimed again. Concurrent claims of the same key
+        are serialized by the primary key: only one of them succeeds.
+        """
+        stmt = insert(ConnectorDedup).values(
+            tenant_uuid=tenant_uuid,
+            backend=backend,
+            key=key,
+            expires_at=func.now() + ttl,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                ConnectorDedup.tenant_uuid,
+                ConnectorDedup.backend,
+                ConnectorDedup.key,
+            ],
+            set_={'expires_at': stmt.excluded.expires_at},
+            where=ConnectorDedup.expires_at <= func.now(),
+        ).returning(ConnectorDedup.key)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def purge_expired(self) -> int:
+        stmt = (
+            delete(ConnectorDedup)
+            .where(ConnectorDedup.expires_at <= func.now())
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        return result.rowcount
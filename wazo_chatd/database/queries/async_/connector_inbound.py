@@ -0,0 +1,72 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from collections.abc import Collection
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import delete, func, or_, select, update
+
+from wazo_chatd.database.async_helpers import get_async_session
+from wazo_chatd.database.models import ConnectorInbound
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncConnectorInboundDAO:
+    @property
+    def session(self) -> AsyncSession:
+        return get_async_session()
+
+    async def claim(
+        self, limit: int, lease: timedelta
+    ) -> list[tuple[int, str, dict[str, Any]]]:
+        """Claim the oldest unclaimed events for ``lease``.
+
+        Events whose lease expired (runner crashed or stopped) are
+        claimable again. Returns ``(id, kind, payload)`` ordered by id.
+        """
+        now = func.now()
+        claimable = (
+            select(ConnectorInbound.id)
+            .where(
+                or_(
+                    ConnectorInbound.claimed_until.is_(None),
+                    ConnectorInbound.claimed_until < now,
+                )
+            )
+            .order_by(ConnectorInbound.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(ConnectorInbound)
+            .where(ConnectorInbound.id.in_(claimable.scalar_subquery()))
+            .values(claimed_until=now + lease)
+            .returning(
+                ConnectorInbound.id, ConnectorInbound.kind, ConnectorInbound.payload
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(stmt)
+        return sorted((row.id, row.kind, row.payload) for row in result.all())
+
+    async def delete(self, event_ids: Collection[int]) -> None:
+        stmt = (
+            delete(ConnectorInbound)
+            .where(ConnectorInbound.id.in_(event_ids))
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    async def release(self, event_ids: Collection[int]) -> None:
+        stmt = (
+            update(ConnectorInbound)
+            .where(ConnectorInbound.id.in_(event_ids))
+            .values(claimed_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
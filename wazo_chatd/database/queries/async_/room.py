@@ -3,14 +3,19 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
+from collections.abc import Collection, Sequence
+from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import and_, exc, func, select
+from sqlalchemy import exc, func, insert, or_, select
 from sqlalchemy.orm import joinedload, selectinload
 
 from wazo_chatd.database.async_helpers import get_async_session
-from wazo_chatd.database.delivery import DeliveryStatus
+from wazo_chatd.database.delivery import (
+    RECOVERABLE_STATUSES,
+    TRACKING_DONE_STATUSES,
+    DeliveryStatus,
+)
 from wazo_chatd.database.models import (
     DeliveryRecord,
     MessageDelivery,
@@ -18,7 +23,7 @@ from wazo_chatd.database.models import (
     Room,
     RoomMessage,
     RoomUser,
-    UserIdentity,
+    room_participants_hash,
 )
 from wazo_chatd.exceptions import DuplicateExternalIdException
 
@@ -38,43 +43,33 @@ class AsyncRoomDAO:
         tenant_uuid: str,
         backend: str,
         limit: int = 100,
-    ) -> list[str]:
-        terminal = (
-            DeliveryStatus.DELIVERED.value,
-            DeliveryStatus.FAILED.value,
-            DeliveryStatus.DEAD_LETTER.value,
-        )
-        latest_record = (
-            select(
-                DeliveryRecord.delivery_id,
-                func.max(DeliveryRecord.id).label('max_id'),
-            )
-            .group_by(DeliveryRecord.delivery_id)
-            .subquery()
-        )
-
+        after: int | None = None,
+    ) -> list[tuple[int, str]]:
+        """Deliveries still tracked, as ``(id, external_id)`` by id after ``after``."""
         stmt = (
-            select(MessageDelivery.external_id)
-            .join(MessageMeta, MessageMeta.message_uuid == MessageDelivery.message_uuid)
-            .join(RoomMessage, MessageMeta.message_uuid == RoomMessage.uuid)
-            .join(latest_record, MessageDelivery.id == latest_record.c.delivery_id)
-            .join(DeliveryRecord, DeliveryRecord.id == latest_record.c.max_id)
+            select(MessageDelivery.id, MessageDelivery.external_id)
+            .join(RoomMessage, MessageDelivery.message_uuid == RoomMessage.uuid)
             .where(RoomMessage.tenant_uuid == tenant_uuid)
             .where(MessageDelivery.backend == backend)
             .where(MessageDelivery.external_id.isnot(None))
-            .where(DeliveryRecord.status.notin_(terminal))
-            .order_by(RoomMessage.created_at)
+            .where(MessageDelivery.current_status.notin_(TRACKING_DONE_STATUSES))
+            .order_by(MessageDelivery.id)
             .limit(limit)
         )
+        if after is not None:
+            stmt = stmt.where(MessageDelivery.id > after)
         result = await self.session.execute(stmt)
-        return list(result.scalars().all())
+        return [(id_, external_id) for id_, external_id in result.all()]
 
-    async def get_message_delivery(
+    async def get_message_deliveries(
         self,
-        delivery_id: int | str,
+        delivery_ids: Collection[int | str],
         *,
         skip_locked: bool = False,
-    ) -> MessageDelivery | None:
+    ) -> list[MessageDelivery]:
+        if not delivery_ids:
+            return []
+
         stmt = (
             select(MessageDelivery)
             .options(
@@ -86,12 +81,17 @@ class AsyncRoomDAO:
                     .joinedload(Room.users),
                 ),
             )
-            .where(MessageDelivery.id == int(delivery_id))
+            .where(MessageDelivery.id.in_([int(id_) for id_ in delivery_ids]))
+            .order_by(MessageDelivery.id)
         )
         if skip_locked:
-            stmt = stmt.with_for_update(skip_locked=True, of=MessageDelivery)
+            # Claiming for dispatch: a delivery handed over between instances
+            # may already have been sent by its previous owner
+            stmt = stmt.where(
+                MessageDelivery.current_status.in_(RECOVERABLE_STATUSES)
+            ).with_for_update(skip_locked=True, of=MessageDelivery)
         result = await self.session.execute(stmt)
-        return result.unique().scalar_one_or_none()
+        return list(result.unique().scalars().all())
 
     async def get_message_meta(self, message_uuid: str) -> MessageMeta | None:
         stmt = (
@@ -110,31 +110,31 @@ class AsyncRoomDAO:
         result = await self.session.execute(stmt)
         return result.unique().scalar_one_or_none()
 
-    async def get_message_meta_by_external_id(
-        self, external_id: str, backend: str
-    ) -> MessageMeta | None:
+    async def get_deliveries_by_external_ids(
+        self, backend: str, external_ids: Collection[str]
+    ) -> list[MessageDelivery]:
+        if not external_ids:
+            return []
+
         stmt = (
-            select(MessageMeta)
-            .join(
-                MessageDelivery,
-                MessageDelivery.message_uuid == MessageMeta.message_uuid,
-            )
+            select(MessageDelivery)
             .options(
-                selectinload(MessageMeta.deliveries).selectinload(
-                    MessageDelivery.records
+                joinedload(MessageDelivery.meta).options(
+                    selectinload(MessageMeta.deliveries).selectinload(
+                        MessageDelivery.records
+                    ),
+                    joinedload(MessageMeta.message)
+                    .joinedload(RoomMessage.room)
+                    .selectinload(Room.users),
                 ),
-                selectinload(MessageMeta.message)
-                .selectinload(RoomMessage.room)
-                .selectinload(Room.users),
             )
             .where(
-                MessageDelivery.external_id == external_id,
                 MessageDelivery.backend == backend,
+                MessageDelivery.external_id.in_(list(external_ids)),
             )
-            .limit(1)
         )
         result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        return list(result.unique().scalars().all())
 
     async def add_delivery_record(
         self,
@@ -151,6 +151,61 @@ class AsyncRoomDAO:
         await self.session.flush()
         return record
 
+    async def add_delivery_records(
+        self, records: Sequence[tuple[int, DeliveryStatus, str | None]]
+    ) -> list[DeliveryRecord]:
+        """Insert ``(delivery_id, status, reason)`` records in one statement.
+
+        The records bypass the unit of work, so the ``after_insert`` event
+        does not update the deliveries: it is done here, once per status.
+        The returned records are not attached to the session.
+        """
+        if not records:
+            return []
+
+        timestamp = datetime.now(timezone.utc)
+        stmt = (
+            insert(DeliveryRecord)
+            .values(
+                [
+                    {
+                        'delivery_id': delivery_id,
+                        'status': status.value,
+                        'reason': reason,
+                        'timestamp': timestamp,
+                    }
+                    for delivery_id, status, reason in records
+                ]
+            )
+            .returning(
+                DeliveryRecord.id,
+                DeliveryRecord.delivery_id,
+                DeliveryRecord.status,
+                DeliveryRecord.reason,
+                DeliveryRecord.timestamp,
+            )
+        )
+        result = await self.session.execute(stmt)
+        created = [DeliveryRecord(**row._asdict()) for row in result.all()]
+
+        by_status: dict[str, list[int]] = {}
+        for delivery_id, status, _ in records:
+            by_status.setdefault(status.value, []).append(delivery_id)
+        deliveries = MessageDelivery.__table__
+        for status_value, delivery_ids in by_status.items():
+            await self.session.execute(
+                deliveries.update()
+                .where(deliveries.c.id.in_(delivery_ids))
+                .where(
+                    or_(
+                        deliveries.c.status_updated_at.is_(None),
+                        deliveries.c.status_updated_at <= timestamp,
+                    )
+                )
+                .values(current_status=status_value, status_updated_at=timestamp)
+            )
+        return created
+
     async def add_message(self, room: Room, message: RoomMessage) -> RoomMessage:
         message.room_uuid = room.uuid
         self.session.add(message)
@@ -213,11 +268,7 @@ class AsyncRoomDAO:
                 .selectinload(Room.users),
             )
             .where(RoomMessage.room_uuid == room_uuid)
-            .where(
-                MessageMeta.extra.op('@>', is_comparison=True)(
-                    {'message_signature': signature}
-                )
-            )
+            .where(MessageMeta.message_signature == signature)
             .where(RoomMessage.created_at > cutoff)
             .order_by(RoomMessage.created_at.desc())
             .limit(1)
@@ -225,72 +276,21 @@ class AsyncRoomDAO:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def check_duplicate_idempotency_key(
-        self,
-        idempotency_key: str,
-        *,
-        recipient: str,
-        backend: str,
-        message_type: str,
-        window_seconds: int,
-    ) -> bool:
-        cutoff = func.now() - timedelta(seconds=window_seconds)
-        tenant_subq = (
-            select(UserIdentity.tenant_uuid)
-            .where(
-                UserIdentity.identity == recipient,
-                UserIdentity.backend == backend,
-                UserIdentity.type_ == message_type,
-            )
-            .scalar_subquery()
-        )
-        stmt = (
-            select(MessageMeta.message_uuid)
-            .join(RoomMessage, MessageMeta.message_uuid == RoomMessage.uuid)
-            .join(
-                MessageDelivery,
-                MessageDelivery.message_uuid == MessageMeta.message_uuid,
-            )
-            .where(
-                RoomMessage.tenant_uuid == tenant_subq,
-                MessageDelivery.backend == backend,
-                RoomMessage.created_at >= cutoff,
-                MessageMeta.extra.op('@>', is_comparison=True)(
-                    {'inbound_idempotency_key': idempotency_key}
-                ),
-            )
-            .limit(1)
-        )
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none() is not None
-
     async def find_room(
         self,
         tenant_uuid: str,
         participants: list[RoomUser],
     ) -> Room | None:
-        participant_uuids = [p.uuid for p in participants]
-        n = len(participant_uuids)
-
-        exact_match = (
-            select(RoomUser.room_uuid)
-            .group_by(RoomUser.room_uuid)
-            .having(
-                and_(
-                    func.count() == n,
-                    func.count(func.nullif(RoomUser.uuid.in_(participant_uuids), False))
-                    == n,
-                )
-            )
-        ).subquery()
-
+        participants_hash = room_participants_hash(p.uuid for p in participants)
         stmt = (
             select(Room)
             .options(selectinload(Room.users))
             .where(
                 Room.tenant_uuid == tenant_uuid,
-                Room.uuid.in_(select(exact_match.c.room_uuid)),
+                Room.participants_hash == participants_hash,
             )
+            .order_by(Room.uuid)
+            .limit(1)
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
@@ -307,29 +307,16 @@ class AsyncRoomDAO:
 
     async def get_recoverable_deliveries(
         self,
-    ) -> list[tuple[MessageDelivery, str]]:
-        latest_record = (
+    ) -> list[tuple[MessageDelivery, str, str]]:
+        stmt = (
             select(
-                DeliveryRecord.delivery_id,
-                func.max(DeliveryRecord.id).label('max_id'),
+                MessageDelivery,
+                MessageDelivery.current_status,
+                RoomMessage.tenant_uuid,
             )
-            .group_by(DeliveryRecord.delivery_id)
-            .subquery()
-        )
-
-        stmt = (
-            select(MessageDelivery, DeliveryRecord.status)
-            .join(latest_record, MessageDelivery.id == latest_record.c.delivery_id)
-            .join(DeliveryRecord, DeliveryRecord.id == latest_record.c.max_id)
+            .join(RoomMessage, MessageDelivery.message_uuid == RoomMessage.uuid)
             .options(selectinload(MessageDelivery.records))
-            .where(
-                DeliveryRecord.status.in_(
-                    [
-                        DeliveryStatus.PENDING.value,
-                        DeliveryStatus.RETRYING.value,
-                    ]
-                )
-            )
+            .where(MessageDelivery.current_status.in_(RECOVERABLE_STATUSES))
         )
         result = await self.session.execute(stmt)
-        return [(row[0], row[1]) for row in result.all()]
+        return [(row[0], row[1], str(row[2])) for row in result.all()]
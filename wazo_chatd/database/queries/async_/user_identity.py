@@ -10,7 +10,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from wazo_chatd.database.async_helpers import get_async_session
-from wazo_chatd.database.models import User, UserIdentity
+from wazo_chatd.database.models import UserIdentity
 
 if TYPE_CHECKING:
     from sqlalchemy.ext.asyncio import AsyncSession
@@ -37,20 +37,16 @@ class AsyncUserIdentityDAO:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def resolve_users_by_identities(
+    async def resolve_identities(
         self,
         identities: list[str],
         backend: str | None = None,
-    ) -> dict[str, User]:
-        stmt = (
-            select(UserIdentity)
-            .options(selectinload(UserIdentity.user))
-            .where(UserIdentity.identity.in_(identities))
-        )
+    ) -> dict[str, UserIdentity]:
+        stmt = select(UserIdentity).where(UserIdentity.identity.in_(identities))
         if backend:
             stmt = stmt.where(UserIdentity.backend == backend)
         result = await self.session.execute(stmt)
-        return {str(record.identity): record.user for record in result.scalars().all()}
+        return {str(record.identity): record for record in result.scalars().all()}
 
     async def list_tenant_backends(self) -> list[tuple[str, str]]:
         stmt = select(UserIdentity.tenant_uuid, UserIdentity.backend).distinct()
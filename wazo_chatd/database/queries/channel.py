@@ -1,8 +1,10 @@
 # Copyright 2020-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from ..helpers import bulk_insert
-from ..models import Channel
+from collections.abc import Sequence
+
+from ..helpers import bulk_delete, bulk_insert, bulk_upsert
+from ..models import Channel, Line
 
 
 class ChannelDAO:
@@ -24,6 +26,9 @@ class ChannelDAO:
 
         return query.first()
 
+    def list_(self) -> list[Channel]:
+        return self.session.query(Channel).all()
+
     def update(self, channel):
         self.session.add(channel)
         self.session.flush()
@@ -31,6 +36,26 @@ class ChannelDAO:
     def create_all(self, channels: list[Channel]) -> None:
         bulk_insert(self.session, channels)
 
+    def upsert_all(self, channels: Sequence[tuple[str, str, int]]) -> None:
+        if not channels:
+            return
+
+        # Skip channels whose line was removed since they were recorded
+        line_ids = {line_id for _, _, line_id in channels}
+        existing_line_ids = {
+            id_ for (id_,) in self.session.query(Line.id).filter(Line.id.in_(line_ids))
+        }
+        bulk_upsert(
+            self.session,
+            Channel,
+            columns=['name', 'state', 'line_id'],
+            rows=[channel for channel in channels if channel[2] in existing_line_ids],
+            key_columns=['name'],
+        )
+
+    def delete_by_names(self, names: Sequence[str]) -> None:
+        bulk_delete(self.session, Channel, Channel.name, names)
+
     def delete_all(self):
         self.session.query(Channel).delete()
         self.session.flush()
@@ -0,0 +1,41 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from wazo_chatd.database.models import ConnectorInbound
+
+
+class ConnectorInboundDAO:
+    def __init__(self, session):  # type: ignore[no-untyped-def]
+        self._session = session
+
+    @property
+    def session(self) -> Session:
+        return self._session()
+
+    def add(
+        self, tenant_uuid: str, backend: str, kind: str, payload: dict[str, Any]
+    ) -> None:
+        self.session.add(
+            ConnectorInbound(
+                tenant_uuid=tenant_uuid,
+                backend=backend,
+                kind=kind,
+                payload=payload,
+            )
+        )
+        self.session.flush()
+        self.session.execute(text("SELECT pg_notify('connector_inbound', '')"))
+
+    def count(self, *, limit: int) -> int:
+        """Count staged events, stopping at ``limit``."""
+        staged = select(ConnectorInbound.id).limit(limit).subquery()
+        return self.session.execute(
+            select(func.count()).select_from(staged)
+        ).scalar_one()
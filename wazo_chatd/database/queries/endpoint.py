@@ -1,8 +1,10 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from collections.abc import Collection, Sequence
+
 from ...exceptions import UnknownEndpointException
-from ..helpers import bulk_insert
+from ..helpers import bulk_delete, bulk_insert, bulk_upsert
 from ..models import Endpoint
 
 
@@ -22,8 +24,14 @@ class EndpointDAO:
     def create_all(self, endpoints: list[Endpoint]) -> None:
         bulk_insert(self.session, endpoints)
 
-    def list_names(self) -> set[str]:
-        return {name for (name,) in self.session.query(Endpoint.name).all()}
+    def list_(self) -> list[Endpoint]:
+        return self.session.query(Endpoint).all()
+
+    def list_names(self, names: Collection[str] | None = None) -> set[str]:
+        query = self.session.query(Endpoint.name)
+        if names is not None:
+            query = query.filter(Endpoint.name.in_(names))
+        return {name for (name,) in query.all()}
 
     def find_by(self, **kwargs):
         return self._find_by(**kwargs)
@@ -52,6 +60,18 @@ class EndpointDAO:
         self.session.add(endpoint)
         self.session.flush()
 
+    def upsert_all(self, endpoints: Sequence[tuple[str, str]]) -> None:
+        bulk_upsert(
+            self.session,
+            Endpoint,
+            columns=['name', 'state'],
+            rows=endpoints,
+            key_columns=['name'],
+        )
+
+    def delete_by_names(self, names: Sequence[str]) -> None:
+        bulk_delete(self.session, Endpoint, Endpoint.name, names)
+
     def delete_all(self):
         self.session.query(Endpoint).delete()
         self.session.flush()
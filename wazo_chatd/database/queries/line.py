@@ -1,7 +1,7 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from typing import Any
 
 from sqlalchemy import Integer, Text
@@ -42,8 +42,14 @@ class LineDAO:
 
         return query.first()
 
-    def list_(self):
-        return self.session.query(Line).options(joinedload(Line.user)).all()
+    def list_(self, ids: Collection[int] | None = None) -> list[Line]:
+        query = self.session.query(Line).options(joinedload(Line.user))
+        if ids is not None:
+            query = query.filter(Line.id.in_(ids))
+        return query.all()
+
+    def list_ids(self) -> set[int]:
+        return {id_ for (id_,) in self.session.query(Line.id).all()}
 
     def update(self, line):
         self.session.add(line)
@@ -1,7 +1,7 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from typing import Any
 
 from sqlalchemy import Boolean, Text, tuple_
@@ -40,12 +40,15 @@ class RefreshTokenDAO:
 
         return query.first()
 
-    def list_(self):
-        return (
-            self.session.query(RefreshToken)
-            .options(joinedload(RefreshToken.user))
-            .all()
-        )
+    def list_(self, user_uuids: Collection[str] | None = None) -> list[RefreshToken]:
+        query = self.session.query(RefreshToken).options(joinedload(RefreshToken.user))
+        if user_uuids is not None:
+            query = query.filter(RefreshToken.user_uuid.in_(user_uuids))
+        return query.all()
+
+    def list_keys(self) -> set[tuple[str, str]]:
+        query = self.session.query(RefreshToken.client_id, RefreshToken.user_uuid)
+        return {(client_id, str(user_uuid)) for client_id, user_uuid in query.all()}
 
     def update(self, refresh_token):
         self.session.add(refresh_token)
@@ -1,17 +1,19 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from datetime import datetime, timezone
 from uuid import UUID, uuid4
 
-from sqlalchemy import and_, distinct, or_, select, text
-from sqlalchemy.dialects.postgresql import array_agg
-from sqlalchemy.orm import Query, aliased
+from sqlalchemy import distinct, func, insert, literal, or_, select, text, tuple_
+from sqlalchemy.orm import Query, aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql.functions import ReturnTypeFromArgs
+from sqlalchemy_utils import UUIDType
 
 from wazo_chatd.database.delivery import DeliveryStatus
 from wazo_chatd.database.helpers import get_query_main_entity
 
-from ...exceptions import UnknownRoomException
+from ...exceptions import UnknownMessageException, UnknownRoomException
 from ..models import (
     DeliveryRecord,
     MessageDelivery,
@@ -19,10 +21,12 @@ from ..models import (
     Room,
     RoomMessage,
     RoomUser,
+    room_participants_hash,
 )
 
 
-class unaccent(ReturnTypeFromArgs):
+class chatd_unaccent(ReturnTypeFromArgs):
+    # Immutable unaccent(), indexed by chatd_room_message__idx__content_trgm
     inherit_cache = True
 
 
@@ -40,8 +44,10 @@ class RoomDAO:
         return room
 
     def get(self, tenant_uuids, room_uuid):
-        query = self.session.query(Room).filter(
-            Room.tenant_uuid.in_(tenant_uuids), Room.uuid == room_uuid
+        query = (
+            self.session.query(Room)
+            .options(joinedload(Room.users))
+            .filter(Room.tenant_uuid.in_(tenant_uuids), Room.uuid == room_uuid)
         )
         room = query.first()
         if not room:
@@ -56,22 +62,20 @@ class RoomDAO:
 
     def _list_query(self, tenant_uuids=None, user_uuids=None, exact_user_uuids=False):
         query = self.session.query(Room)
-        if user_uuids:
-            matcher = array_agg(distinct(RoomUser.uuid)).contains(user_uuids)
-            if exact_user_uuids:
-                matcher = and_(
-                    matcher,
-                    array_agg(distinct(RoomUser.uuid)).contained_by(  # type: ignore[attr-defined]
-                        user_uuids
-                    ),
-                )
-
+        if user_uuids and exact_user_uuids:
+            query = query.filter(
+                Room.participants_hash == room_participants_hash(user_uuids)
+            )
+        elif user_uuids:
+            # Only reads the memberships of the requested users
+            user_uuids = set(user_uuids)
             sub_query = (
-                self.session.query(RoomUser.room_uuid)
+                select(RoomUser.room_uuid)
+                .where(RoomUser.uuid.in_(user_uuids))
                 .group_by(RoomUser.room_uuid)
-                .having(matcher)
-            ).subquery()
-            query = query.filter(Room.uuid.in_(sub_query.select()))
+                .having(func.count(distinct(RoomUser.uuid)) == len(user_uuids))
+            )
+            query = query.filter(Room.uuid.in_(sub_query))
 
         if tenant_uuids is None:
             return query
@@ -86,6 +90,50 @@ class RoomDAO:
         self.session.flush()
         return message
 
+    def add_member_message(self, room, message):
+        """Insert a message in one statement, if its sender is a room member.
+
+        Unlike add_message, the room messages are never loaded and the
+        message is not added to the session: its generated columns are
+        set from the insert.
+        """
+        table = RoomMessage.__table__
+        values = {
+            'room_uuid': room.uuid,
+            'content': message.content,
+            'alias': message.alias,
+            'user_uuid': message.user_uuid,
+            'tenant_uuid': message.tenant_uuid,
+            'wazo_uuid': message.wazo_uuid,
+            'created_at': datetime.now(timezone.utc),
+        }
+        is_member = (
+            select(RoomUser.uuid)
+            .where(
+                RoomUser.room_uuid == room.uuid,
+                RoomUser.uuid == message.user_uuid,
+            )
+            .exists()
+        )
+        rows = select(
+            *(literal(value, table.c[name].type) for name, value in values.items())
+        ).where(is_member)
+        stmt = (
+            insert(table)
+            .from_select(list(values), rows, include_defaults=False)
+            .returning(table.c.uuid)
+        )
+        message_uuid = self.session.execute(stmt).scalar()
+        if message_uuid is None:
+            raise UnknownRoomException(room.uuid)
+
+        for name, value in values.items():
+            setattr(message, name, value)
+        message.uuid = message_uuid
+        set_committed_value(message, 'room', room)
+        set_committed_value(message, 'meta', None)
+        return message
+
     def find_tenant_by_external_id(self, external_id: str, backend: str) -> str | None:
         stmt = (
             select(RoomMessage.tenant_uuid)
@@ -140,7 +188,11 @@ class RoomDAO:
         self.session.add(message)
         self.session.flush()
 
-        payload = ','.join(str(d.id) for d in deliveries)
+        # The tenant and backend let the delivery runner queue deliveries per
+        # tenant and keep only those of the shards it owns
+        payload = f'{message.tenant_uuid}:{backend}:' + ','.join(
+            str(d.id) for d in deliveries
+        )
         self.session.execute(
             text("SELECT pg_notify('connector_delivery', :payload)"),
             {'payload': payload},
@@ -150,8 +202,9 @@ class RoomDAO:
         query = self._build_messages_query(room.uuid)
         if viewer_uuid:
             query = self._filter_visible_messages(query, viewer_uuid)
+        cursors = self._resolve_cursors(query, **filter_parameters)
         query = self._list_filter(query, **filter_parameters)
-        query = self._paginate(query, **filter_parameters)
+        query = self._paginate(query, **{**filter_parameters, **cursors})
         return query.all()
 
     def count_messages(self, room, viewer_uuid=None, **filter_parameters):
@@ -169,8 +222,9 @@ class RoomDAO:
     def list_user_messages(self, tenant_uuid, user_uuid, **filter_parameters):
         query = self._build_user_messages_query(tenant_uuid, user_uuid)
         query = self._filter_visible_messages(query, user_uuid)
+        cursors = self._resolve_cursors(query, **filter_parameters)
         query = self._list_filter(query, **filter_parameters)
-        query = self._paginate(query, **filter_parameters)
+        query = self._paginate(query, **{**filter_parameters, **cursors})
         return query.all()
 
     def count_user_messages(self, tenant_uuid, user_uuid, **filter_parameters):
@@ -209,11 +263,23 @@ class RoomDAO:
         offset=None,
         order='created_at',
         direction='desc',
+        before=None,
+        after=None,
         **ignored,
     ):
-        order_column = getattr(get_query_main_entity(query), order)
-        order_column = order_column.asc() if direction == 'asc' else order_column.desc()
-        query = query.order_by(order_column)
+        entity = get_query_main_entity(query)
+        order_columns = (getattr(entity, order), entity.uuid)
+        if direction == 'asc':
+            query = query.order_by(*(column.asc() for column in order_columns))
+        else:
+            query = query.order_by(*(column.desc() for column in order_columns))
+
+        # Keyset pagination: messages are ordered by (created_at, uuid)
+        position = tuple_(entity.created_at, entity.uuid)
+        if before is not None:
+            query = query.filter(position < before)
+        if after is not None:
+            query = query.filter(position > after)
 
         if limit is not None:
             query = query.limit(limit)
@@ -222,6 +288,28 @@ class RoomDAO:
 
         return query
 
+    def _resolve_cursors(self, query, before=None, after=None, **ignored):
+        """Position of the ``before``/``after`` messages among the listed ones."""
+        cursors = {}
+        for name, message_uuid in (('before', before), ('after', after)):
+            if message_uuid is not None:
+                cursors[name] = self._message_position(query, message_uuid)
+        return cursors
+
+    @staticmethod
+    def _message_position(query, message_uuid):
+        created_at = (
+            query.filter(RoomMessage.uuid == message_uuid)
+            .with_entities(RoomMessage.created_at)
+            .scalar()
+        )
+        if created_at is None:
+            raise UnknownMessageException(message_uuid)
+        return tuple_(
+            literal(created_at, RoomMessage.created_at.type),
+            literal(message_uuid, UUIDType()),
+        )
+
     def _list_filter(
         self,
         query: Query,
@@ -248,7 +336,7 @@ class RoomDAO:
             words = [word for word in search.split(' ') if word]
             pattern = f'%{"%".join(words)}%'
             query = query.filter(
-                unaccent(get_query_main_entity(query).content).ilike(pattern)
+                chatd_unaccent(get_query_main_entity(query).content).ilike(pattern)
             )
 
         if from_date is not None:
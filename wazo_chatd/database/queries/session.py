@@ -1,7 +1,7 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from collections.abc import Sequence
+from collections.abc import Collection, Sequence
 from typing import Any
 
 from sqlalchemy import Boolean
@@ -38,8 +38,14 @@ class SessionDAO:
 
         return query.first()
 
-    def list_(self):
-        return self.session.query(Session).options(joinedload(Session.user)).all()
+    def list_(self, uuids: Collection[str] | None = None) -> list[Session]:
+        query = self.session.query(Session).options(joinedload(Session.user))
+        if uuids is not None:
+            query = query.filter(Session.uuid.in_(uuids))
+        return query.all()
+
+    def list_uuids(self) -> set[str]:
+        return {str(uuid) for (uuid,) in self.session.query(Session.uuid).all()}
 
     def update(self, session):
         self.session.add(session)
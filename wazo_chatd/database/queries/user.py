@@ -1,15 +1,23 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from collections.abc import Iterable, Sequence
+from collections.abc import Collection, Iterable, Sequence
 from uuid import UUID
 
-from sqlalchemy import Boolean, text
+from sqlalchemy import Boolean, func, text, update
+from sqlalchemy.orm import Query, selectinload
 from sqlalchemy_utils import UUIDType
 
 from ...exceptions import UnknownUserException
 from ..helpers import bulk_delete, bulk_insert, bulk_update
-from ..models import User
+from ..models import PRESENCE_REVISION_SEQUENCE, Line, User
+
+_PRESENCE_LOAD_OPTIONS = (
+    selectinload(User.lines).selectinload(Line.channels),
+    selectinload(User.lines).joinedload(Line.endpoint),
+    selectinload(User.sessions),
+    selectinload(User.refresh_tokens),
+)
 
 
 class UserDAO:
@@ -50,20 +58,114 @@ class UserDAO:
         )
         return query.all()
 
+    def list_presences(self, tenant_uuids, uuids=None):
+        query = self._get_users_query(tenant_uuids, uuids=uuids).options(
+            *_PRESENCE_LOAD_OPTIONS
+        )
+        return query.all()
+
+    def list_presences_page(
+        self,
+        tenant_uuids: Collection[str] | None,
+        uuids: Collection[str] | None = None,
+        since: int | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[list[User], int, int, int]:
+        """Page of presences with the total and filtered counts in one query.
+
+        ``since`` only keeps users whose presence revision is greater.
+        Relationships needed to compute the presences are loaded for the
+        whole page at once. Returns the users, total and filtered counts,
+        and the cursor (highest presence revision of the tenants).
+        """
+        tenant_users = (
+            self._get_users_query(tenant_uuids)
+            .with_entities(
+                User.uuid,
+                func.count().over().label('total'),
+                func.max(User.presence_revision).over().label('cursor'),
+            )
+            .subquery()
+        )
+        query = (
+            self.session.query(
+                User,
+                tenant_users.c.total,
+                tenant_users.c.cursor,
+                func.count().over().label('filtered'),
+            )
+            .join(tenant_users, tenant_users.c.uuid == User.uuid)
+            .options(*_PRESENCE_LOAD_OPTIONS)
+            .order_by(User.uuid)
+        )
+        query = self._filter_presences(query, uuids, since)
+        if limit is not None:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+
+        rows = query.all()
+        if rows:
+            first = rows[0]
+            users = [row.User for row in rows]
+            return users, first.total, first.filtered, first.cursor
+
+        # Counts and cursor are unknown when the page is empty
+        total, cursor = (
+            self._get_users_query(tenant_uuids)
+            .with_entities(func.count(), func.max(User.presence_revision))
+            .one()
+        )
+        filtered = total
+        if uuids or since is not None:
+            filtered = self._filter_presences(
+                self._get_users_query(tenant_uuids), uuids, since
+            ).count()
+        return [], total, filtered, cursor or 0
+
+    def bump_presence_revisions(
+        self, uuids: Collection[str] | None = None
+    ) -> dict[str, int]:
+        """Give the users (all of them by default) a new presence revision.
+
+        Returns the new revision of each user.
+        """
+        if uuids is not None and not uuids:
+            return {}
+
+        query = update(User).values(
+            presence_revision=PRESENCE_REVISION_SEQUENCE.next_value()
+        )
+        if uuids is not None:
+            query = query.where(User.uuid.in_(uuids))
+        query = query.returning(User.uuid, User.presence_revision)
+        query = query.execution_options(synchronize_session=False)
+        rows = self.session.execute(query)
+        return {str(uuid): revision for uuid, revision in rows}
+
     def count(self, tenant_uuids, **filter_parameters):
         return self._get_users_query(tenant_uuids, **filter_parameters).count()
 
-    def list_uuids(self) -> set[str]:
-        return {str(uuid) for (uuid,) in self.session.query(User.uuid).all()}
+    def list_uuids(self, uuids: Collection[str] | None = None) -> set[str]:
+        query = self.session.query(User.uuid)
+        if uuids is not None:
+            query = query.filter(User.uuid.in_(uuids))
+        return {str(uuid) for (uuid,) in query.all()}
 
-    def list_uuids_with_tenant_uuids(self) -> list[tuple[UUID, UUID]]:
-        return self.session.query(User.uuid, User.tenant_uuid).all()
+    def list_uuids_with_tenant_uuids(
+        self, uuids: Collection[str] | None = None
+    ) -> list[tuple[UUID, UUID]]:
+        query = self.session.query(User.uuid, User.tenant_uuid)
+        if uuids is not None:
+            query = query.filter(User.uuid.in_(uuids))
+        return query.all()
 
-    def list_dnd(self) -> dict[str, bool]:
-        return {
-            str(uuid): dnd
-            for uuid, dnd in self.session.query(User.uuid, User.do_not_disturb).all()
-        }
+    def list_dnd(self, uuids: Collection[str] | None = None) -> dict[str, bool]:
+        query = self.session.query(User.uuid, User.do_not_disturb)
+        if uuids is not None:
+            query = query.filter(User.uuid.in_(uuids))
+        return {str(uuid): dnd for uuid, dnd in query.all()}
 
     def delete(self, user):
         self.session.delete(user)
@@ -95,6 +197,16 @@ class UserDAO:
 
         return query.filter(User.tenant_uuid.in_(tenant_uuids))
 
+    @staticmethod
+    def _filter_presences(
+        query: Query, uuids: Collection[str] | None, since: int | None
+    ) -> Query:
+        if uuids:
+            query = query.filter(User.uuid.in_(uuids))
+        if since is not None:
+            query = query.filter(User.presence_revision > since)
+        return query
+
     def add_session(self, user, session):
         if session in user.sessions:
             return
@@ -0,0 +1,56 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import hashlib
+import unittest
+from uuid import UUID
+
+from ..delivery import RECOVERABLE_STATUSES, TRACKING_DONE_STATUSES
+from ..models import MessageDelivery, room_participants_hash
+
+USER_UUID_1 = UUID('00000000-0000-4000-8000-00000000000a')
+USER_UUID_2 = UUID('00000000-0000-4000-8000-00000000000b')
+
+
+class TestRoomParticipantsHash(unittest.TestCase):
+    def test_same_members_same_hash(self) -> None:
+        expected = room_participants_hash([USER_UUID_1, USER_UUID_2])
+
+        assert room_participants_hash([USER_UUID_2, USER_UUID_1]) == expected
+        assert room_participants_hash([str(USER_UUID_2).upper(), USER_UUID_1]) == (
+            expected
+        )
+        assert room_participants_hash([USER_UUID_1, USER_UUID_2, USER_UUID_1]) == (
+            expected
+        )
+
+    def test_canonical_form(self) -> None:
+        members = f'{USER_UUID_1},{USER_UUID_2}'
+        expected = hashlib.sha256(members.encode()).hexdigest()
+
+        assert room_participants_hash([USER_UUID_2, USER_UUID_1]) == expected
+
+    def test_different_members_different_hash(self) -> None:
+        assert room_participants_hash([USER_UUID_1]) != room_participants_hash(
+            [USER_UUID_1, USER_UUID_2]
+        )
+
+
+class TestMessageDeliveryIndexes(unittest.TestCase):
+    def _predicate(self, name: str) -> str:
+        (index,) = (
+            index for index in MessageDelivery.__table__.indexes if index.name == name
+        )
+        return str(index.dialect_options['postgresql']['where'])
+
+    def test_predicates_match_statuses(self) -> None:
+        def in_list(statuses: tuple[str, ...]) -> str:
+            return '(' + ', '.join(f"'{status}'" for status in statuses) + ')'
+
+        assert self._predicate('chatd_message_delivery__idx__tracking') == (
+            'external_id IS NOT NULL AND current_status NOT IN '
+            + in_list(TRACKING_DONE_STATUSES)
+        )
+        assert self._predicate('chatd_message_delivery__idx__recoverable') == (
+            'current_status IN ' + in_list(RECOVERABLE_STATUSES)
+        )
@@ -53,6 +53,13 @@ class UnknownRoomException(APIException):
         super().__init__(404, msg, 'unknown-room', details, 'rooms')
 
 
+class UnknownMessageException(APIException):
+    def __init__(self, message_uuid):
+        msg = f'No such message: "{message_uuid}"'
+        details = {'uuid': str(message_uuid)}
+        super().__init__(404, msg, 'unknown-message', details, 'messages')
+
+
 class UnknownUserIdentityException(APIException):
     def __init__(self, identity_uuid: str) -> None:
         msg = f'No such user identity: "{identity_uuid}"'
@@ -70,6 +77,18 @@ class DuplicateIdentityException(APIException):
         super().__init__(409, msg, 'duplicate-identity', details, 'identities')
 
 
+class DuplicateIdempotencyKeyException(Exception):
+    """An inbound message with the same idempotency key was recently stored."""
+
+    def __init__(self, idempotency_key: str, backend: str) -> None:
+        super().__init__(
+            f'Inbound message already stored for idempotency key '
+            f'{idempotency_key!r} backend {backend!r}'
+        )
+        self.idempotency_key = idempotency_key
+        self.backend = backend
+
+
 class DuplicateExternalIdException(Exception):
     """A MessageMeta with the same (external_id, backend) already exists."""
 
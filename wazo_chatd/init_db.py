@@ -1,4 +1,4 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import argparse
@@ -76,4 +76,4 @@ def main():
     conn = psycopg2.connect(args.chatd_db_uri)
     with conn:
         with conn.cursor() as cursor:
-            db_helper.create_db_extensions(cursor, ['uuid-ossp', 'unaccent'])
+            db_helper.create_db_extensions(cursor, ['uuid-ossp', 'unaccent', 'pg_trgm'])
@@ -0,0 +1,53 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Set membership with no false negatives and few false positives.
+
+    Sized for ``capacity`` keys at ``error_rate`` false positives. Keys
+    are kept in two generations: once the current one holds ``capacity``
+    keys it replaces the previous one, so the oldest keys are eventually
+    forgotten and the false positive rate stays bounded.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self._bits = max(
+            8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self._hashes = max(1, round(self._bits / self.capacity * math.log(2)))
+        self._current = bytearray((self._bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return self._has(self._current, positions) or self._has(
+            self._previous, positions
+        )
+
+    def add(self, key: str) -> None:
+        if self._count >= self.capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+        for position in self._positions(key):
+            self._current[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self._bits for i in range(self._hashes)]
+
+    @staticmethod
+    def _has(bits: bytearray, positions: list[int]) -> bool:
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
@@ -15,7 +15,7 @@ from flask_restful import Api
 from xivo.status import StatusAggregator
 
 from wazo_chatd.asyncio_ import CoreAsyncio
-from wazo_chatd.bus import BusConsumer, BusPublisher
+from wazo_chatd.bus import BusConsumer, BusPublisher, FanoutPublisher
 from wazo_chatd.database.queries import DAO
 from wazo_chatd.plugin_helpers.hooks import Hooks
 from wazo_chatd.thread_manager import ThreadManager
@@ -30,6 +30,7 @@ class PluginDependencies(TypedDict):
     dao: DAO
     bus_consumer: BusConsumer
     bus_publisher: BusPublisher
+    fanout_publisher: FanoutPublisher
     status_aggregator: StatusAggregator
     thread_manager: ThreadManager
     token_changed_subscribe: Callable[[Callable[..., None]], None]
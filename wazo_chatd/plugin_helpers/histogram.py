@@ -0,0 +1,46 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Sequence
+from typing import Any
+
+
+class Histogram:
+    """Thread-safe counts of observed values, by bucket.
+
+    A value is counted in the first bucket whose upper bound is greater
+    than or equal to it, or in ``+Inf`` when above every bound. Counts are
+    per bucket, not cumulative.
+    """
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self._bounds = sorted(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            count, total, maximum = self.count, self.sum, self.max
+        labels = [f'{bound:g}' for bound in self._bounds] + ['+Inf']
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'max': round(maximum, 6),
+            'buckets': dict(zip(labels, counts)),
+        }
@@ -0,0 +1,155 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass, field
+
+
+@dataclass(eq=False)
+class _Waiter:
+    future: asyncio.Future[None]
+    cost: int
+    tenant_uuid: str | None = None
+
+
+@dataclass
+class _TenantQueue:
+    waiters: collections.deque[_Waiter] = field(default_factory=collections.deque)
+    deficit: float = 0.0
+    queued: int = 0
+    running: int = 0
+
+
+class FairScheduler:
+    """Concurrency slots shared fairly between tenants.
+
+    Priority slots are granted before any tenant slot. Tenant slots wait
+    in one queue per tenant, served by deficit round robin: each turn
+    credits a tenant ``quantum * weight`` and a slot costs the number of
+    items it processes. A tenant never holds more than
+    ``tenant_max_tasks`` slots at once.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_tasks: int,
+        *,
+        tenant_max_tasks: int | None = None,
+        quantum: int = 1,
+        weights: Mapping[str, float] | None = None,
+    ) -> None:
+        self._max_tasks = max_tasks
+        self._tenant_max_tasks = tenant_max_tasks or max_tasks
+        self._quantum = quantum
+        self._weights = {
+            tenant_uuid: float(weight)
+            for tenant_uuid, weight in (weights or {}).items()
+            if float(weight) > 0
+        }
+        self._running = 0
+        self._priority: collections.deque[_Waiter] = collections.deque()
+        self._tenants: dict[str, _TenantQueue] = {}
+        self._round: collections.deque[str] = collections.deque()
+
+    @contextlib.asynccontextmanager
+    async def slot(
+        self, tenant_uuid: str | None = None, *, cost: int = 1
+    ) -> AsyncIterator[None]:
+        """Hold a slot; without ``tenant_uuid`` the slot has priority."""
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost, tenant_uuid)
+        if tenant_uuid is None:
+            self._priority.append(waiter)
+        else:
+            if tenant_uuid not in self._tenants:
+                self._tenants[tenant_uuid] = _TenantQueue()
+            tenant = self._tenants[tenant_uuid]
+            if not tenant.waiters:
+                self._round.append(tenant_uuid)
+            tenant.waiters.append(waiter)
+            tenant.queued += cost
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(tenant_uuid)
+            else:
+                self._discard(waiter)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(tenant_uuid)
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        """Items queued and slots running per tenant; safe from any thread."""
+        return {
+            tenant_uuid: {'queued': tenant.queued, 'running': tenant.running}
+            for tenant_uuid, tenant in list(self._tenants.items())
+        }
+
+    def _dispatch(self) -> None:
+        while self._running < self._max_tasks:
+            if self._priority:
+                waiter = self._priority.popleft()
+            elif (waiter := self._next_tenant_waiter()) is None:
+                return
+            self._running += 1
+            waiter.future.set_result(None)
+
+    def _next_tenant_waiter(self) -> _Waiter | None:
+        eligible = sum(
+            1
+            for tenant_uuid in self._round
+            if self._tenants[tenant_uuid].running < self._tenant_max_tasks
+        )
+        if not eligible:
+            return None
+
+        while True:
+            tenant_uuid = self._round[0]
+            tenant = self._tenants[tenant_uuid]
+            if tenant.running < self._tenant_max_tasks:
+                if tenant.deficit >= tenant.waiters[0].cost:
+                    waiter = tenant.waiters.popleft()
+                    tenant.queued -= waiter.cost
+                    tenant.deficit -= waiter.cost
+                    tenant.running += 1
+                    if not tenant.waiters:
+                        self._round.popleft()
+                        tenant.deficit = 0.0
+                    return waiter
+                tenant.deficit += self._quantum * self._weights.get(tenant_uuid, 1.0)
+            self._round.rotate(-1)
+
+    def _release(self, tenant_uuid: str | None) -> None:
+        self._running -= 1
+        if tenant_uuid is not None:
+            tenant = self._tenants[tenant_uuid]
+            tenant.running -= 1
+            if not tenant.running and not tenant.waiters:
+                del self._tenants[tenant_uuid]
+        self._dispatch()
+
+    def _discard(self, waiter: _Waiter) -> None:
+        if waiter.tenant_uuid is None:
+            self._priority.remove(waiter)
+            return
+
+        tenant = self._tenants[waiter.tenant_uuid]
+        tenant.waiters.remove(waiter)
+        tenant.queued -= waiter.cost
+        if not tenant.waiters:
+            self._round.remove(waiter.tenant_uuid)
+            tenant.deficit = 0.0
+            if not tenant.running:
+                del self._tenants[waiter.tenant_uuid]
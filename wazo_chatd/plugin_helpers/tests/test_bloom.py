@@ -0,0 +1,46 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import unittest
+
+from wazo_chatd.plugin_helpers.bloom import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_added_keys_always_found(self) -> None:
+        bloom = BloomFilter(1000)
+        keys = [f'tenant:sms:key-{i}' for i in range(1000)]
+
+        for key in keys:
+            bloom.add(key)
+
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate_bounded(self) -> None:
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f'tenant:sms:key-{i}')
+
+        false_positives = sum(f'tenant:sms:other-{i}' in bloom for i in range(10000))
+
+        assert false_positives / 10000 < 0.02
+
+    def test_previous_generation_still_found(self) -> None:
+        bloom = BloomFilter(100)
+        for i in range(150):
+            bloom.add(f'key-{i}')
+
+        assert 'key-0' in bloom
+        assert 'key-149' in bloom
+
+    def test_oldest_generation_forgotten(self) -> None:
+        bloom = BloomFilter(100)
+        for i in range(300):
+            bloom.add(f'key-{i}')
+
+        forgotten = sum(f'key-{i}' in bloom for i in range(100))
+
+        assert forgotten < 10
+        assert all(f'key-{i}' in bloom for i in range(200, 300))
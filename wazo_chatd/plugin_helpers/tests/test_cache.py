@@ -0,0 +1,71 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import unittest
+
+from wazo_chatd.plugin_helpers.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        self.cache: LRUCache[str, int] = LRUCache(2, 10.0, clock=self.clock)
+
+    def test_least_recently_used_evicted(self) -> None:
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+
+        self.cache.put('c', 3)
+
+        assert self.cache.get('a') == 1
+        assert self.cache.get('b') is None
+        assert self.cache.get('c') == 3
+        assert self.cache.snapshot()['evictions'] == 1
+
+    def test_expired_entry_is_a_miss(self) -> None:
+        self.cache.put('a', 1)
+
+        self.clock.now = 10.0
+
+        assert self.cache.get('a') is None
+        assert len(self.cache) == 0
+
+    def test_load_started_before_invalidation_not_stored(self) -> None:
+        generation = self.cache.generation
+
+        self.cache.invalidate('a')
+        self.cache.put('a', 1, generation=generation)
+
+        assert self.cache.get('a') is None
+
+    def test_invalidate_where(self) -> None:
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+
+        self.cache.invalidate_where(lambda _, value: value == 2)
+
+        assert self.cache.get('a') == 1
+        assert self.cache.get('b') is None
+
+    def test_snapshot_reports_hit_rate(self) -> None:
+        self.cache.put('a', 1)
+        self.cache.get('a')
+        self.cache.get('a')
+        self.cache.get('b')
+
+        snapshot = self.cache.snapshot()
+
+        assert snapshot['hits'] == 2
+        assert snapshot['misses'] == 1
+        assert snapshot['hit_rate'] == 0.667
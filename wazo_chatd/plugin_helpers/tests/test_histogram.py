@@ -0,0 +1,42 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import unittest
+
+from wazo_chatd.plugin_helpers.histogram import Histogram
+
+
+class TestHistogram(unittest.TestCase):
+    def test_values_counted_in_first_bucket_above(self) -> None:
+        histogram = Histogram([0.01, 0.1, 1])
+
+        for value in (0.005, 0.01, 0.05, 2, 3):
+            histogram.observe(value)
+
+        assert histogram.snapshot()['buckets'] == {
+            '0.01': 2,
+            '0.1': 1,
+            '1': 0,
+            '+Inf': 2,
+        }
+
+    def test_snapshot_totals(self) -> None:
+        histogram = Histogram([1, 10])
+
+        histogram.observe(0.5)
+        histogram.observe(4)
+
+        snapshot = histogram.snapshot()
+        assert snapshot['count'] == 2
+        assert snapshot['sum'] == 4.5
+        assert snapshot['max'] == 4
+
+    def test_empty(self) -> None:
+        assert Histogram([1]).snapshot() == {
+            'count': 0,
+            'sum': 0.0,
+            'max': 0.0,
+            'buckets': {'1': 0, '+Inf': 0},
+        }
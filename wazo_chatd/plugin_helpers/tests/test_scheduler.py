@@ -0,0 +1,138 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from wazo_chatd.plugin_helpers.scheduler import FairScheduler
+
+
+class TestFairScheduler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.order: list[str] = []
+        self.gate = asyncio.Event()
+
+    async def _hold(self, scheduler: FairScheduler) -> None:
+        async with scheduler.slot():
+            await self.gate.wait()
+
+    async def _job(
+        self,
+        scheduler: FairScheduler,
+        name: str,
+        tenant_uuid: str | None = None,
+        cost: int = 1,
+    ) -> None:
+        async with scheduler.slot(tenant_uuid, cost=cost):
+            self.order.append(name)
+            await asyncio.sleep(0)
+
+    async def _run_queued(self, scheduler: FairScheduler, *jobs: tuple) -> None:
+        holder = asyncio.create_task(self._hold(scheduler))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(self._job(scheduler, *job)) for job in jobs]
+        await asyncio.sleep(0)
+        self.gate.set()
+        await asyncio.gather(holder, *tasks)
+
+    async def test_tenants_served_in_turn(self) -> None:
+        scheduler = FairScheduler(1)
+
+        await self._run_queued(
+            scheduler,
+            ('a1', 'tenant-a'),
+            ('a2', 'tenant-a'),
+            ('a3', 'tenant-a'),
+            ('b1', 'tenant-b'),
+            ('b2', 'tenant-b'),
+        )
+
+        assert self.order == ['a1', 'b1', 'a2', 'b2', 'a3']
+
+    async def test_priority_served_before_tenants(self) -> None:
+        scheduler = FairScheduler(1)
+
+        await self._run_queued(
+            scheduler,
+            ('a1', 'tenant-a'),
+            ('inbound', None),
+        )
+
+        assert self.order == ['inbound', 'a1']
+
+    async def test_cost_charged_against_tenant_turns(self) -> None:
+        scheduler = FairScheduler(1, quantum=2)
+
+        await self._run_queued(
+            scheduler,
+            ('a-batch', 'tenant-a', 4),
+            ('a-next', 'tenant-a', 2),
+            ('b1', 'tenant-b', 1),
+            ('b2', 'tenant-b', 1),
+            ('b3', 'tenant-b', 1),
+        )
+
+        assert self.order == ['b1', 'b2', 'a-batch', 'b3', 'a-next']
+
+    async def test_weights_favour_tenant(self) -> None:
+        scheduler = FairScheduler(1, weights={'tenant-a': 2})
+
+        await self._run_queued(
+            scheduler,
+            ('a1', 'tenant-a'),
+            ('a2', 'tenant-a'),
+            ('a3', 'tenant-a'),
+            ('b1', 'tenant-b'),
+            ('b2', 'tenant-b'),
+        )
+
+        assert self.order == ['a1', 'a2', 'b1', 'a3', 'b2']
+
+    async def test_tenant_capped_below_max_tasks(self) -> None:
+        scheduler = FairScheduler(4, tenant_max_tasks=2)
+        started = asyncio.Event()
+        running: list[str] = []
+
+        async def job(name: str, tenant_uuid: str) -> None:
+            async with scheduler.slot(tenant_uuid):
+                running.append(name)
+                started.set()
+                await self.gate.wait()
+
+        tasks = [
+            asyncio.create_task(job(name, tenant_uuid))
+            for name, tenant_uuid in (
+                ('a1', 'tenant-a'),
+                ('a2', 'tenant-a'),
+                ('a3', 'tenant-a'),
+                ('b1', 'tenant-b'),
+            )
+        ]
+        await started.wait()
+        await asyncio.sleep(0)
+
+        assert sorted(running) == ['a1', 'a2', 'b1']
+        assert scheduler.snapshot()['tenant-a'] == {'queued': 1, 'running': 2}
+
+        self.gate.set()
+        await asyncio.gather(*tasks)
+
+        assert scheduler.snapshot() == {}
+
+    async def test_cancelled_waiter_leaves_queue(self) -> None:
+        scheduler = FairScheduler(1)
+        holder = asyncio.create_task(self._hold(scheduler))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(self._job(scheduler, 'a1', 'tenant-a'))
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+        assert scheduler.snapshot() == {}
+        self.gate.set()
+        await holder
+        await self._job(scheduler, 'b1', 'tenant-b')
+        assert self.order == ['b1']
@@ -23,6 +23,10 @@ class BusEventHandler:
             ('auth_external_auth_added', self.on_external_auth_changed),
             ('auth_external_auth_updated', self.on_external_auth_changed),
             ('auth_external_auth_deleted', self.on_external_auth_changed),
+            ('chatd_user_identity_created', self.on_user_identity_changed),
+            ('chatd_user_identity_updated', self.on_user_identity_changed),
+            ('chatd_user_identity_deleted', self.on_user_identity_changed),
+            ('chatd_user_room_created', self.on_room_created),
         )
         for event, handler in events:
             self.bus.subscribe(event, handler)
@@ -36,3 +40,13 @@ class BusEventHandler:
             backend,
         )
         self.router.invalidate_backend_cache(tenant_uuid, backend)
+
+    def on_user_identity_changed(self, payload: dict) -> None:
+        self.router.invalidate_identity(payload['uuid'], payload['identity'])
+
+    def on_room_created(self, payload: dict) -> None:
+        self.router.invalidate_room(
+            payload['uuid'],
+            payload['tenant_uuid'],
+            [user['uuid'] for user in payload['users']],
+        )
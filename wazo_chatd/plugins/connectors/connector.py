@@ -4,7 +4,7 @@
 from __future__ import annotations
 
 from collections.abc import Callable, Iterable, Mapping, Sequence
-from typing import Any, ClassVar, Protocol
+from typing import TYPE_CHECKING, Any, ClassVar, Protocol, runtime_checkable
 
 from wazo_chatd.database.delivery import DeliveryStatus
 from wazo_chatd.plugins.connectors.types import (
@@ -17,6 +17,9 @@ from wazo_chatd.plugins.connectors.types import (
     TransportData,
 )
 
+if TYPE_CHECKING:
+    from wazo_chatd.plugins.connectors.exceptions import ConnectorSendError
+
 
 class Connector(Protocol):
     """Technology-agnostic protocol for messaging backends.
@@ -99,13 +102,16 @@ class Connector(Protocol):
                 via ``PUT /external/{backend}/config``).
             connector_config: System-level configuration from
                 ``/etc/wazo-chatd/conf.d/`` (polling interval, inbound
-                mode, network settings).
+                mode, network settings). ``http_client`` holds the
+                :class:`ConnectorHttpClient` shared by every instance of
+                the backend: pooled, kept-alive async HTTP connections
+                limited by the backend's ``http_*`` settings.
 
         Lifecycle contract: one instance per (tenant_uuid, backend),
         reconstructed whenever provider_config changes (credential
         rotation, TTL expiry). Do not put process-global state in
-        ``__init__``; class-level attributes (e.g. shared HTTP pools)
-        are the right place for cross-tenant resources.
+        ``__init__``; use ``connector_config['http_client']`` for HTTP
+        and class-level attributes for other cross-tenant resources.
         """
         ...
 
@@ -119,9 +125,10 @@ class Connector(Protocol):
             ConnectorSendError: If the send fails.
 
         May be sync or async.  The :class:`DeliveryExecutor` (async)
-        wraps sync implementations with ``asyncio.to_thread()``.
-        Connectors that use async HTTP clients (httpx, aiohttp) can
-        implement this as a coroutine for better performance.
+        runs sync implementations in the delivery runner's worker
+        threads (``delivery.worker_threads``). Prefer a coroutine
+        using ``connector_config['http_client']``: it holds no thread
+        while waiting on the backend.
 
         Idempotency (optional):
             ``message.metadata`` may contain ``idempotency_key``
@@ -281,3 +288,31 @@ class Connector(Protocol):
         logged server-side.
         """
         raise NotImplementedError
+
+
+@runtime_checkable
+class BatchConnector(Protocol):
+    """Optional capability of a :class:`Connector` with a bulk send API.
+
+    The executor groups outbound deliveries per (tenant_uuid, backend)
+    and hands a group holding more than one message to
+    :meth:`send_batch` when the connector implements it; otherwise
+    :meth:`Connector.send` is called once per message.
+    """
+
+    def send_batch(
+        self, messages: Sequence[OutboundMessage]
+    ) -> Sequence[str | ConnectorSendError]:
+        """Send several messages through the backend's bulk API.
+
+        Returns:
+            One result per message, in the same order: the external
+            message ID, or the :class:`ConnectorSendError` (e.g.
+            :class:`ConnectorRateLimited`) for a message that failed.
+
+        Raises:
+            ConnectorSendError: If the whole batch fails.
+
+        May be sync or async, like :meth:`Connector.send`.
+        """
+        ...
@@ -32,6 +32,14 @@ class ConnectorTransientError(ConnectorError):
     the connector instance hasn't been populated yet at startup."""
 
 
+class ConnectorBackpressureError(ConnectorTransientError):
+    """Inbound staging is above its high-water mark; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, *, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class NoCommonConnectorException(APIException):
     def __init__(self) -> None:
         super().__init__(
@@ -175,6 +183,17 @@ class WebhookTransientException(APIException):
         )
 
 
+class WebhookBackpressureException(APIException):
+    def __init__(self) -> None:
+        super().__init__(
+            503,
+            'Too many inbound events waiting to be processed',
+            'webhook-backpressure',
+            {},
+            'connectors',
+        )
+
+
 class UnreachableParticipantException(APIException):
     def __init__(self, participant: str, connector_type: str = '') -> None:
         detail = f'participant {participant!r}'
@@ -5,10 +5,13 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from collections.abc import Awaitable
+from collections.abc import Awaitable, Collection, Sequence
+from dataclasses import dataclass
+from datetime import timedelta
 from typing import TypeVar
 
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
 
 from wazo_chatd.database.async_helpers import get_async_session
 from wazo_chatd.database.delivery import DeliveryStatus
@@ -19,22 +22,36 @@ from wazo_chatd.database.models import (
     Room,
     RoomMessage,
     RoomUser,
-    User,
 )
 from wazo_chatd.database.queries.async_ import AsyncDAO
-from wazo_chatd.exceptions import DuplicateExternalIdException
+from wazo_chatd.exceptions import (
+    DuplicateExternalIdException,
+    DuplicateIdempotencyKeyException,
+)
 from wazo_chatd.plugin_helpers.async_lock import KeyedLock
+from wazo_chatd.plugin_helpers.bloom import BloomFilter
 from wazo_chatd.plugin_helpers.dependencies import ConfigDict
 from wazo_chatd.plugin_helpers.tenant import make_uuid5
-from wazo_chatd.plugins.connectors.connector import Connector
+from wazo_chatd.plugins.connectors.connector import BatchConnector, Connector
 from wazo_chatd.plugins.connectors.exceptions import (
     AuthServiceUnavailableException,
     ConnectorRateLimited,
     ConnectorSendError,
 )
-from wazo_chatd.plugins.connectors.helpers import generate_message_signature
+from wazo_chatd.plugins.connectors.helpers import (
+    call_connector,
+    generate_message_signature,
+)
 from wazo_chatd.plugins.connectors.notifier import AsyncNotifier
+from wazo_chatd.plugins.connectors.ratelimit import RateKey, RateLimiter
 from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
+from wazo_chatd.plugins.connectors.resolution import (
+    UNRESOLVED,
+    ResolutionCache,
+    ResolvedIdentity,
+    room_key,
+)
+from wazo_chatd.plugins.connectors.staging import decode_event
 from wazo_chatd.plugins.connectors.store import ConnectorStore
 from wazo_chatd.plugins.connectors.types import (
     InboundMessage,
@@ -50,6 +67,7 @@ OUTBOUND_MAX_RETRIES: int = len(OUTBOUND_RETRY_DELAYS)
 INBOUND_MAX_RETRIES: int = len(INBOUND_RETRY_DELAYS)
 ECHO_WINDOW_SECONDS: int = 60
 INBOUND_DEDUP_WINDOW_SECONDS: int = 7 * 24 * 3600
+DEFAULT_DEDUP_FILTER_CAPACITY: int = 100000
 MAX_RETRY_AFTER: float = 3600.0
 
 T = TypeVar('T')
@@ -60,6 +78,23 @@ def _compute_outbound_retry_delay(retry_count: int) -> float:
     return float(OUTBOUND_RETRY_DELAYS[idx])
 
 
+@dataclass(frozen=True)
+class _PendingSend:
+    key: tuple[str, str]
+    rate_key: RateKey
+    delivery: MessageDelivery
+    connector: Connector
+    outbound: OutboundMessage
+
+
+@dataclass(frozen=True)
+class _Deferred:
+    delay: float
+
+
+_SendResult = str | BaseException | _Deferred
+
+
 async def _db_persist_or_delay(
     awaitable: Awaitable[T],
     *,
@@ -94,36 +129,121 @@ class DeliveryExecutor:
         registry: ConnectorRegistry,
         notifier: AsyncNotifier,
         store: ConnectorStore,
+        resolution: ResolutionCache | None = None,
     ) -> None:
         self._wazo_uuid: str = str(config.get('uuid', ''))
         self._registry = registry
         self._notifier = notifier
         self._store = store
+        self._resolution = resolution or ResolutionCache()
         self._dao = AsyncDAO()
         self._room_creation_lock = KeyedLock()
-
-    async def route_outbound_delivery(self, delivery_id: str) -> float | None:
-        delivery = await self._dao.room.get_message_delivery(
-            delivery_id, skip_locked=True
+        self._rate_limiter = RateLimiter(config.get('connectors') or {})
+        delivery_config = config.get('delivery') or {}
+        self._send_max_wait = float(delivery_config.get('send_rate_max_wait', 5))
+        # Idempotency keys stored by this instance: a key not in the filter
+        # needs no lookup, the key's primary key still rejects duplicates
+        # stored by other instances or before a restart
+        self._dedup_filter = BloomFilter(
+            int(
+                delivery_config.get(
+                    'dedup_filter_capacity', DEFAULT_DEDUP_FILTER_CAPACITY
+                )
+            )
         )
-        if delivery is None:
+        self._dedup_counts = {
+            'checked': 0,
+            'lookups_skipped': 0,
+            'false_positives': 0,
+            'duplicates': 0,
+        }
+
+    def rate_limits(self) -> dict[str, dict[str, float]]:
+        return self._rate_limiter.snapshot()
+
+    def dedup_stats(self) -> dict[str, float]:
+        counts = dict(self._dedup_counts)
+        looked_up = counts['checked'] - counts['lookups_skipped']
+        negatives = counts['checked'] - counts['duplicates']
+        return {
+            **counts,
+            'lookups': looked_up,
+            'false_positive_rate': (
+                round(counts['false_positives'] / negatives, 4) if negatives else 0.0
+            ),
+        }
+
+    async def route_outbound_deliveries(
+        self, delivery_ids: Sequence[str]
+    ) -> dict[str, float]:
+        """Claim and send a batch of deliveries with a single locking query.
+
+        Deliveries already claimed by another worker, or no longer pending
+        or retrying, are skipped. Returns
+        the retry delay of each delivery that must be retried.
+        """
+        deliveries = await self._dao.room.get_message_deliveries(
+            delivery_ids, skip_locked=True
+        )
+        if (skipped := len(delivery_ids) - len(deliveries)) > 0:
             logger.debug(
-                'Delivery %s unavailable (already in flight or removed), skipping',
-                delivery_id,
+                '%d delivery(ies) unavailable (in flight, already sent or '
+                'removed), skipping',
+                skipped,
             )
-            return None
-
+        return await self._dispatch_outbound(deliveries)
+
+    async def _dispatch_outbound(
+        self, deliveries: Sequence[MessageDelivery]
+    ) -> dict[str, float]:
+        retry_delays: dict[str, float] = {}
+        groups: dict[tuple[str, str], list[_PendingSend]] = {}
+        for delivery in deliveries:
+            prepared = await self._prepare_outbound(delivery)
+            if isinstance(prepared, _PendingSend):
+                groups.setdefault(prepared.key, []).append(prepared)
+            elif prepared is not None:
+                retry_delays[str(delivery.id)] = prepared
+
+        # Sends do not touch the session: every group goes out concurrently,
+        # then the outcomes are persisted one at a time
+        results = await asyncio.gather(
+            *(self._send_group(group) for group in groups.values())
+        )
+        session = get_async_session()
+        for group, group_results in zip(groups.values(), results):
+            for pending, result in zip(group, group_results):
+                delivery_id = str(pending.delivery.id)
+                # Each outcome gets its own savepoint: a row that fails to
+                # persist must not roll back the records of messages already sent
+                try:
+                    async with session.begin_nested():
+                        delay = await self._record_send_outcome(pending, result)
+                except SQLAlchemyError:
+                    logger.exception(
+                        'Failed to record the send outcome of delivery %s',
+                        delivery_id,
+                    )
+                    continue
+                if delay is not None:
+                    retry_delays[delivery_id] = delay
+
+        return retry_delays
+
+    async def _prepare_outbound(
+        self, delivery: MessageDelivery
+    ) -> _PendingSend | float | None:
         meta = delivery.meta
         if not meta.message or not meta.message.room:
             logger.warning(
-                'Delivery %s lost its message or room before dispatch', delivery_id
+                'Delivery %s lost its message or room before dispatch', delivery.id
             )
             return None
 
         if (sender_record := meta.sender_identity) is None:
             logger.error(
                 'Delivery %s has no resolved sender_identity, dead-lettering',
-                delivery_id,
+                delivery.id,
             )
             await self._persist_status(
                 delivery,
@@ -157,25 +277,90 @@ class DeliveryExecutor:
             recipient_identity=str(delivery.recipient_identity),
             metadata={'idempotency_key': str(message.uuid)},
         )
+        rate_key = self._rate_limiter.key(
+            tenant_uuid, backend, outbound.sender_identity
+        )
+        return _PendingSend(
+            (tenant_uuid, backend), rate_key, delivery, connector, outbound
+        )
 
-        try:
-            external_id = await self._send(connector, outbound)
-        except ConnectorRateLimited as exc:
-            return await self._record_send_failure(
-                delivery, str(exc), retry_after=exc.retry_after
+    async def _send_group(self, group: list[_PendingSend]) -> list[_SendResult]:
+        results: list[_SendResult | None] = []
+        waits: list[float] = []
+        for pending in group:
+            wait = self._rate_limiter.reserve(
+                pending.rate_key, max_wait=self._send_max_wait
             )
-        except ConnectorSendError as exc:
-            return await self._record_send_failure(delivery, str(exc))
-        except Exception as exc:
-            logger.exception(
-                'Unexpected error sending message %s via %s',
-                meta.message_uuid,
-                backend,
-            )
-            return await self._record_send_failure(delivery, str(exc))
+            results.append(_Deferred(wait) if wait > self._send_max_wait else None)
+            waits.append(wait)
+
+        ready = [i for i, result in enumerate(results) if result is None]
+        connector = group[0].connector
+        if len(ready) > 1 and isinstance(connector, BatchConnector):
+            if wait := max(waits[i] for i in ready):
+                await asyncio.sleep(wait)
+            waits = [0.0] * len(group)
+            for i in ready:
+                if blocked := self._rate_limiter.blocked_for(group[i].rate_key):
+                    results[i] = _Deferred(blocked)
+            ready = [i for i, result in enumerate(results) if result is None]
+
+            messages = [group[i].outbound for i in ready]
+            if messages:
+                batch = await self._send_batch(connector, messages)
+                for i, result in zip(ready, batch):
+                    results[i] = result
+                ready = []
+
+        sent = await asyncio.gather(
+            *(self._send_paced(group[i], waits[i]) for i in ready),
+            return_exceptions=True,
+        )
+        for i, result in zip(ready, sent):
+            results[i] = result
+        return [result for result in results if result is not None]
+
+    async def _send_paced(self, pending: _PendingSend, wait: float) -> _SendResult:
+        if wait > 0:
+            await asyncio.sleep(wait)
+            # The backend may have rate-limited another send meanwhile
+            if blocked := self._rate_limiter.blocked_for(pending.rate_key):
+                return _Deferred(blocked)
+        return await self._send(pending.connector, pending.outbound)
+
+    async def _record_send_outcome(
+        self, pending: _PendingSend, result: _SendResult
+    ) -> float | None:
+        delivery = pending.delivery
+        match result:
+            case _Deferred(delay=delay):
+                logger.debug(
+                    'Delivery %s held back by the %s rate limit for %.1fs',
+                    delivery.id,
+                    pending.key[1],
+                    delay,
+                )
+                return delay
+            case ConnectorRateLimited():
+                self._rate_limiter.block(
+                    pending.rate_key, min(result.retry_after, MAX_RETRY_AFTER)
+                )
+                return await self._record_send_failure(
+                    delivery, str(result), retry_after=result.retry_after
+                )
+            case ConnectorSendError():
+                return await self._record_send_failure(delivery, str(result))
+            case BaseException():
+                logger.error(
+                    'Unexpected error sending message %s via %s',
+                    pending.outbound.message_uuid,
+                    pending.key[1],
+                    exc_info=result,
+                )
+                return await self._record_send_failure(delivery, str(result))
 
         await self._persist_status(
-            delivery, DeliveryStatus.ACCEPTED, external_id=external_id
+            delivery, DeliveryStatus.ACCEPTED, external_id=str(result)
         )
         return None
 
@@ -184,18 +369,25 @@ class DeliveryExecutor:
     ) -> float | None:
         raw_key = inbound.metadata.get('idempotency_key')
         idempotency_key: str | None = str(raw_key) if raw_key else None
+        sender_identity = self._normalize_sender(inbound)
+
+        resolved = await self._resolve_identities([inbound.recipient, sender_identity])
+        if not (recipient_user := resolved.get(inbound.recipient)):
+            logger.warning(
+                'No wazo user found for recipient %s (backend=%s), dropping',
+                inbound.recipient,
+                inbound.backend,
+            )
+            return None
+
         if attempt == 0 and await self._is_duplicate_idempotency(
-            idempotency_key, inbound
+            idempotency_key, recipient_user.tenant_uuid, inbound.backend
         ):
             return None
 
-        sender_identity = self._normalize_sender(inbound)
-
-        if (
-            resolution := await self._resolve_inbound_room(inbound, sender_identity)
-        ) is None:
-            return None
-        room, sender_participant, sender_user = resolution
+        room, sender_participant, sender_user = await self._resolve_inbound_room(
+            recipient_user, resolved.get(sender_identity), sender_identity
+        )
 
         matching_outbound = await self._find_matching_outbound(
             room, sender_user, sender_identity, inbound.body
@@ -216,7 +408,9 @@ class DeliveryExecutor:
 
         try:
             delay = await _db_persist_or_delay(
-                self._dao.room.add_message(room, message),
+                self._add_inbound_message(
+                    room, message, inbound.backend, idempotency_key
+                ),
                 attempt=attempt,
                 description=f'inbound from {inbound.sender}',
             )
@@ -227,6 +421,10 @@ class DeliveryExecutor:
                 inbound.external_id,
             )
             return None
+        except DuplicateIdempotencyKeyException:
+            self._dedup_counts['duplicates'] += 1
+            logger.info('Duplicate inbound message skipped (key=%s)', idempotency_key)
+            return None
 
         if delay is not None:
             return delay
@@ -239,87 +437,106 @@ class DeliveryExecutor:
         )
         return None
 
-    async def route_status_update(
-        self, update: StatusUpdate, *, attempt: int = 0
+    async def route_status_updates(
+        self,
+        backend: str,
+        updates: Sequence[StatusUpdate],
+        *,
+        attempt: int = 0,
     ) -> float | None:
+        """Record the status updates of a backend, the last one per external_id."""
         try:
-            backend_cls = self._registry.get_backend(update.backend)
+            backend_cls = self._registry.get_backend(backend)
         except KeyError:
             logger.warning(
-                'No connector for backend %r, dropping status update',
-                update.backend,
+                'No connector for backend %r, dropping %d status update(s)',
+                backend,
+                len(updates),
             )
             return None
 
         status_map = getattr(backend_cls, 'status_map', {})
-        if (mapped_status := status_map.get(update.status)) is None:
-            logger.debug(
-                'Ignoring unmapped backend status %r for %s',
-                update.status,
-                update.external_id,
-            )
+        latest: dict[str, tuple[DeliveryStatus, str | None]] = {}
+        for update in updates:
+            if (mapped_status := status_map.get(update.status)) is None:
+                logger.debug(
+                    'Ignoring unmapped backend status %r for %s',
+                    update.status,
+                    update.external_id,
+                )
+                continue
+            latest[update.external_id] = (mapped_status, update.error_code or None)
+        if not latest:
             return None
 
-        meta = await self._dao.room.get_message_meta_by_external_id(
-            update.external_id, update.backend
+        changes: list[tuple[MessageDelivery, DeliveryStatus, str | None]] = []
+        deliveries = await self._dao.room.get_deliveries_by_external_ids(
+            backend, list(latest)
         )
-        if not meta:
+        for delivery in deliveries:
+            latest_status, reason = latest.pop(str(delivery.external_id))
+            if delivery.current_status == DeliveryStatus.DELIVERED.value:
+                logger.debug(
+                    'Delivery %s already delivered, ignoring status %s',
+                    delivery.id,
+                    latest_status.value,
+                )
+                continue
+            changes.append((delivery, latest_status, reason))
+        if latest:
             logger.warning(
-                'No MessageMeta found for external_id %s, dropping status update',
-                update.external_id,
+                'No MessageDelivery found for external_id(s) %s, '
+                'dropping status update(s)',
+                ', '.join(sorted(latest)),
             )
+        if not changes:
             return None
 
-        delivery = next(
-            (d for d in meta.deliveries if d.external_id == update.external_id),
-            None,
-        )
-        if delivery is None:
-            logger.warning(
-                'No MessageDelivery for external_id %s, dropping status update',
-                update.external_id,
-            )
-            return None
+        records: list[DeliveryRecord] = []
 
-        if delivery.status == DeliveryStatus.DELIVERED.value:
-            logger.debug(
-                'Delivery %s already delivered, ignoring status %s',
-                delivery.id,
-                update.status,
+        async def _persist() -> None:
+            records.extend(
+                await self._dao.room.add_delivery_records(
+                    [(int(d.id), status, reason) for d, status, reason in changes]
+                )
             )
-            return None
 
         delay = await _db_persist_or_delay(
-            self._persist_status(
-                delivery, mapped_status, reason=update.error_code or None
-            ),
+            _persist(),
             attempt=attempt,
-            description=f'status update for {update.external_id}',
+            description=f'{len(changes)} status update(s) of {backend}',
         )
         if delay is not None:
             return delay
 
-        logger.info(
-            'Status update: %s → %s (message=%s, external_id=%s)',
-            update.status,
-            mapped_status.value,
-            meta.message_uuid,
-            update.external_id,
-        )
+        by_delivery = {record.delivery_id: record for record in records}
+        updated: list[tuple[MessageDelivery, DeliveryRecord]] = []
+        for delivery, _, _ in changes:
+            record = by_delivery[delivery.id]
+            # The record is not in the session: keep it out of the unit of work
+            set_committed_value(delivery, 'records', [*delivery.records, record])
+            updated.append((delivery, record))
+        await self._notifier.delivery_statuses_updated(updated)
+
+        logger.info('Recorded %d status update(s) of %s', len(updated), backend)
         return None
 
-    async def recover_pending_deliveries(self) -> list[tuple[str, float]]:
+    async def recover_pending_deliveries(
+        self,
+    ) -> list[tuple[str, str, str, float]]:
         deliveries = await self._dao.room.get_recoverable_deliveries()
         if not deliveries:
             return []
 
-        recoverable: list[tuple[str, float]] = []
-        for delivery, status in deliveries:
+        recoverable: list[tuple[str, str, str, float]] = []
+        for delivery, status, tenant_uuid in deliveries:
             if status == DeliveryStatus.RETRYING.value:
                 delay = _compute_outbound_retry_delay(int(delivery.retry_count))
             else:
                 delay = 0.0
-            recoverable.append((str(delivery.id), delay))
+            recoverable.append(
+                (str(delivery.id), tenant_uuid, str(delivery.backend), delay)
+            )
 
         logger.info('Recovery: %d delivery(ies) to re-enqueue', len(recoverable))
         return recoverable
@@ -328,9 +545,46 @@ class DeliveryExecutor:
         return await self._dao.room.get_message_meta(message_uuid)
 
     async def list_pending_external_ids(
-        self, tenant_uuid: str, backend: str
-    ) -> list[str]:
-        return await self._dao.room.list_pending_external_ids(tenant_uuid, backend)
+        self,
+        tenant_uuid: str,
+        backend: str,
+        *,
+        limit: int,
+        after: int | None = None,
+    ) -> tuple[list[str], int | None]:
+        """Return a page of tracked external_ids and the cursor of the next one.
+
+        The cursor is None once the last page is returned, to start over.
+        """
+        rows = await self._dao.room.list_pending_external_ids(
+            tenant_uuid, backend, limit=limit, after=after
+        )
+        cursor = rows[-1][0] if len(rows) >= limit else None
+        return [external_id for _, external_id in rows], cursor
+
+    async def claim_staged_events(
+        self, limit: int, lease: timedelta
+    ) -> list[tuple[int, InboundMessage | StatusUpdate]]:
+        claimed = await self._dao.connector_inbound.claim(limit, lease)
+
+        events: list[tuple[int, InboundMessage | StatusUpdate]] = []
+        malformed: list[int] = []
+        for event_id, kind, payload in claimed:
+            try:
+                events.append((event_id, decode_event(kind, payload)))
+            except (TypeError, ValueError, KeyError):
+                logger.exception('Dropping malformed staged event %s', event_id)
+                malformed.append(event_id)
+
+        if malformed:
+            await self._dao.connector_inbound.delete(malformed)
+        return events
+
+    async def ack_staged_events(self, event_ids: Collection[int]) -> None:
+        await self._dao.connector_inbound.delete(event_ids)
+
+    async def release_staged_events(self, event_ids: Collection[int]) -> None:
+        await self._dao.connector_inbound.release(event_ids)
 
     async def _record_send_failure(
         self,
@@ -356,24 +610,52 @@ class DeliveryExecutor:
 
         return _compute_outbound_retry_delay(int(delivery.retry_count))
 
+    async def purge_dedup_keys(self) -> int:
+        return await self._dao.connector_dedup.purge_expired()
+
     async def _is_duplicate_idempotency(
         self,
         idempotency_key: str | None,
-        inbound: InboundMessage,
+        tenant_uuid: str,
+        backend: str,
     ) -> bool:
         if idempotency_key is None:
             return False
 
-        if is_duplicate := await self._dao.room.check_duplicate_idempotency_key(
-            idempotency_key,
-            recipient=inbound.recipient,
-            backend=inbound.backend,
-            message_type=inbound.message_type,
-            window_seconds=INBOUND_DEDUP_WINDOW_SECONDS,
+        self._dedup_counts['checked'] += 1
+        if f'{tenant_uuid}:{backend}:{idempotency_key}' not in self._dedup_filter:
+            self._dedup_counts['lookups_skipped'] += 1
+            return False
+
+        if not await self._dao.connector_dedup.exists(
+            tenant_uuid, backend, idempotency_key
         ):
-            logger.info('Duplicate inbound message skipped (key=%s)', idempotency_key)
+            self._dedup_counts['false_positives'] += 1
+            return False
+
+        self._dedup_counts['duplicates'] += 1
+        logger.info('Duplicate inbound message skipped (key=%s)', idempotency_key)
+        return True
 
-        return is_duplicate
+    async def _add_inbound_message(
+        self,
+        room: Room,
+        message: RoomMessage,
+        backend: str,
+        idempotency_key: str | None,
+    ) -> None:
+        if idempotency_key is not None:
+            tenant_uuid = str(message.tenant_uuid)
+            self._dedup_filter.add(f'{tenant_uuid}:{backend}:{idempotency_key}')
+            if not await self._dao.connector_dedup.claim(
+                tenant_uuid,
+                backend,
+                idempotency_key,
+                timedelta(seconds=INBOUND_DEDUP_WINDOW_SECONDS),
+            ):
+                raise DuplicateIdempotencyKeyException(idempotency_key, backend)
+
+        await self._dao.room.add_message(room, message)
 
     def _normalize_sender(self, inbound: InboundMessage) -> str:
         try:
@@ -382,24 +664,42 @@ class DeliveryExecutor:
         except (KeyError, ValueError, TypeError):
             return inbound.sender
 
-    async def _resolve_inbound_room(
-        self, inbound: InboundMessage, sender_identity: str
-    ) -> tuple[Room, RoomUser, User | None] | None:
-        resolved = await self._dao.user_identity.resolve_users_by_identities(
-            [inbound.recipient, sender_identity]
-        )
-
-        if not (recipient_user := resolved.get(inbound.recipient)):
-            logger.warning(
-                'No wazo user found for recipient %s (backend=%s), dropping',
-                inbound.recipient,
-                inbound.backend,
-            )
-            return None
+    async def _resolve_identities(
+        self, identities: list[str]
+    ) -> dict[str, ResolvedIdentity]:
+        cache = self._resolution.identities
+        resolved: dict[str, ResolvedIdentity] = {}
+        missing: list[str] = []
+        for identity in identities:
+            if (cached := cache.get(identity)) is None:
+                missing.append(identity)
+            elif cached is not UNRESOLVED:
+                resolved[identity] = cached
+
+        if missing:
+            generation = cache.generation
+            records = await self._dao.user_identity.resolve_identities(missing)
+            for identity in missing:
+                if (record := records.get(identity)) is None:
+                    cache.put(identity, UNRESOLVED, generation=generation)
+                    continue
+                resolved[identity] = ResolvedIdentity(
+                    uuid=str(record.uuid),
+                    user_uuid=str(record.user_uuid),
+                    tenant_uuid=str(record.tenant_uuid),
+                )
+                cache.put(identity, resolved[identity], generation=generation)
+
+        return resolved
 
+    async def _resolve_inbound_room(
+        self,
+        recipient_user: ResolvedIdentity,
+        sender_user: ResolvedIdentity | None,
+        sender_identity: str,
+    ) -> tuple[Room, RoomUser, ResolvedIdentity | None]:
         tenant_uuid = str(recipient_user.tenant_uuid)
 
-        sender_user = resolved.get(sender_identity)
         if sender_user and str(sender_user.tenant_uuid) != tenant_uuid:
             logger.info(
                 'Sender %s resolves to a user in tenant %s but recipient is in %s; '
@@ -412,7 +712,7 @@ class DeliveryExecutor:
 
         sender_participant = RoomUser(
             uuid=(
-                sender_user.uuid
+                sender_user.user_uuid
                 if sender_user
                 else make_uuid5(tenant_uuid, sender_identity)
             ),
@@ -422,7 +722,7 @@ class DeliveryExecutor:
         )
 
         recipient_participant = RoomUser(
-            uuid=recipient_user.uuid,
+            uuid=recipient_user.user_uuid,
             tenant_uuid=tenant_uuid,
             wazo_uuid=self._wazo_uuid,
         )
@@ -435,11 +735,20 @@ class DeliveryExecutor:
     async def _get_or_create_room(
         self, tenant_uuid: str, participants: list[RoomUser]
     ) -> Room:
-        lock_key = (tenant_uuid, tuple(sorted(str(p.uuid) for p in participants)))
-        async with self._room_creation_lock.acquire(lock_key):
+        key = room_key(tenant_uuid, (p.uuid for p in participants))
+        if room_uuid := self._resolution.rooms.get(key):
+            # The room's members are the participants: no need to load it
+            return Room(uuid=room_uuid, tenant_uuid=tenant_uuid, users=participants)
+
+        async with self._room_creation_lock.acquire(key):
+            generation = self._resolution.rooms.generation
             existing = await self._dao.room.find_room(tenant_uuid, participants)
             if existing is not None:
+                self._resolution.rooms.put(
+                    key, str(existing.uuid), generation=generation
+                )
                 return existing
+            # Not cached until found again: the creation may still roll back
             room = await self._dao.room.create_room(tenant_uuid, participants)
         await self._notifier.room_created(room)
         return room
@@ -447,7 +756,7 @@ class DeliveryExecutor:
     async def _find_matching_outbound(
         self,
         room: Room,
-        sender_user: User | None,
+        sender_user: ResolvedIdentity | None,
         sender_identity: str,
         body: str,
     ) -> MessageMeta | None:
@@ -537,13 +846,29 @@ class DeliveryExecutor:
         if connector := self._store.peek(backend, tenant_uuid):
             return connector
 
-        return await asyncio.to_thread(self._store.get, backend, tenant_uuid)
+        return await self._store.aget(backend, tenant_uuid)
 
     async def _send(
         self,
         connector: Connector,
         outbound: OutboundMessage,
     ) -> str:
-        if asyncio.iscoroutinefunction(connector.send):
-            return await connector.send(outbound)  # type: ignore[misc]
-        return await asyncio.to_thread(connector.send, outbound)
+        return await call_connector(connector.send, outbound)
+
+    async def _send_batch(
+        self,
+        connector: BatchConnector,
+        messages: list[OutboundMessage],
+    ) -> list[_SendResult]:
+        try:
+            results = await call_connector(connector.send_batch, messages)
+        except Exception as exc:
+            return [exc] * len(messages)
+
+        if len(results) != len(messages):
+            error = ConnectorSendError(
+                f'send_batch returned {len(results)} result(s) '
+                f'for {len(messages)} message(s)'
+            )
+            return [error] * len(messages)
+        return list(results)
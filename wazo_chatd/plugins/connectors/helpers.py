@@ -3,10 +3,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import itertools
 import random
-from typing import get_args
+from typing import Any, get_args
 
 from wazo_chatd.plugins.connectors.types import TransportMode
 
@@ -29,6 +30,13 @@ def apply_jitter(
     return value * (1.0 + sample)
 
 
+async def call_connector(fn: Any, *args: Any) -> Any:
+    """Call a connector method: awaited if a coroutine, else in a worker thread."""
+    if asyncio.iscoroutinefunction(fn):
+        return await fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
 def exponential_backoff() -> itertools.chain[int]:
     return itertools.chain([1, 2, 4, 8, 16, 32], itertools.repeat(32))
 
@@ -4,10 +4,11 @@
 from __future__ import annotations
 
 import logging
+import math
 from collections.abc import Mapping
 from typing import TYPE_CHECKING, Any
 
-from flask import Response, request
+from flask import Response, after_this_request, request
 from xivo.auth_verifier import required_acl
 from xivo.tenant_flask_helpers import token
 
@@ -16,8 +17,10 @@ from wazo_chatd.http import AuthResource, ErrorCatchingResource
 from wazo_chatd.plugin_helpers.http import build_public_url, update_model_instance
 from wazo_chatd.plugin_helpers.tenant import get_tenant_uuids
 from wazo_chatd.plugins.connectors.exceptions import (
+    ConnectorBackpressureError,
     ConnectorParseError,
     ConnectorTransientError,
+    WebhookBackpressureException,
     WebhookParseException,
     WebhookTransientException,
 )
@@ -59,6 +62,10 @@ class ConnectorWebhookResource(ErrorCatchingResource):
         except ConnectorParseError:
             logger.info('No connector matched webhook (backend=%s)', backend)
             raise WebhookParseException() from None
+        except ConnectorBackpressureError as exc:
+            logger.warning('Webhook refused (backend=%s): %s', backend, exc)
+            self._set_retry_after(exc.retry_after)
+            raise WebhookBackpressureException() from None
         except ConnectorTransientError as exc:
             logger.warning(
                 'Webhook deferred (backend=%s): %s — backend should retry',
@@ -69,6 +76,13 @@ class ConnectorWebhookResource(ErrorCatchingResource):
 
         return '', 204
 
+    @staticmethod
+    def _set_retry_after(seconds: float) -> None:
+        @after_this_request
+        def add_retry_after(response: Response) -> Response:
+            response.headers['Retry-After'] = str(math.ceil(seconds))
+            return response
+
     def _build_webhook_data(self) -> WebhookData:
         body: Mapping[str, Any]
         if request.is_json:
@@ -5,7 +5,9 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import TYPE_CHECKING, cast
+from collections.abc import Callable, Sequence
+from functools import partial
+from typing import cast
 
 from wazo_bus.resources.chatd.events import (
     MessageDeliveryStatusEvent,
@@ -18,6 +20,7 @@ from wazo_bus.resources.chatd.events import (
 from wazo_bus.resources.chatd.types import DeliveryStatusDict, MessageDict
 from wazo_bus.resources.common.event import ServiceEvent
 
+from wazo_chatd.bus import BusPublisher, FanoutPublisher
 from wazo_chatd.database.delivery import DeliveryStatus
 from wazo_chatd.database.models import (
     DeliveryRecord,
@@ -29,11 +32,10 @@ from wazo_chatd.database.models import (
 from wazo_chatd.plugins.connectors.schemas import user_identity_schema
 from wazo_chatd.plugins.rooms.schemas import MessageSchema, RoomSchema
 
-if TYPE_CHECKING:
-    from wazo_chatd.bus import BusPublisher
-
 logger = logging.getLogger(__name__)
 
+_FanOut = tuple[Callable[[str], ServiceEvent], list[str]]
+
 
 class UserIdentityNotifier:
     def __init__(self, bus_publisher: BusPublisher) -> None:
@@ -62,30 +64,57 @@ class UserIdentityNotifier:
 
 
 class AsyncNotifier:
-    def __init__(self, bus_publisher: BusPublisher) -> None:
+    """Publish room and message events through the fan-out publisher.
+
+    Every event goes through the same ordered publisher, so the delivery
+    status and delivered events of a message cannot overtake its
+    ``chatd_user_room_message_created`` event.
+    """
+
+    def __init__(
+        self,
+        bus_publisher: BusPublisher,
+        fanout_publisher: FanoutPublisher | None = None,
+    ) -> None:
         self._bus = bus_publisher
+        self._fanout = fanout_publisher or FanoutPublisher(bus_publisher)
 
     async def room_created(self, room: Room) -> None:
-        room_data = RoomSchema().dump(room)
-        for user in room.users:
-            event = UserRoomCreatedEvent(
-                room_data, str(room.tenant_uuid), str(user.uuid)
-            )
-            await self._publish(event)
+        make_event = partial(
+            UserRoomCreatedEvent, RoomSchema().dump(room), str(room.tenant_uuid)
+        )
+        await self._fan_out([(make_event, [str(user.uuid) for user in room.users])])
 
     async def message_created(self, room: Room, message: RoomMessage) -> None:
-        message_data = self._build_message_payload(message)
-        for user in room.users:
-            event = UserRoomMessageCreatedEvent(
-                message_data, room.uuid, room.tenant_uuid, user.uuid
-            )
-            await self._publish(event)
+        make_event = partial(
+            UserRoomMessageCreatedEvent,
+            self._build_message_payload(message),
+            room.uuid,
+            room.tenant_uuid,
+        )
+        await self._fan_out([(make_event, [user.uuid for user in room.users])])
 
     async def delivery_status_updated(
         self,
         delivery: MessageDelivery,
         record: DeliveryRecord,
     ) -> None:
+        await self._fan_out(self._delivery_status_fan_outs(delivery, record))
+
+    async def delivery_statuses_updated(
+        self, changes: Sequence[tuple[MessageDelivery, DeliveryRecord]]
+    ) -> None:
+        await self._fan_out(
+            [
+                fan_out
+                for delivery, record in changes
+                for fan_out in self._delivery_status_fan_outs(delivery, record)
+            ]
+        )
+
+    def _delivery_status_fan_outs(
+        self, delivery: MessageDelivery, record: DeliveryRecord
+    ) -> list[_FanOut]:
         meta = delivery.meta
         room = meta.message.room
         delivery_data: DeliveryStatusDict = {
@@ -95,39 +124,55 @@ class AsyncNotifier:
             'timestamp': record.timestamp.isoformat(),
             'backend': str(delivery.backend),
         }
-        event = MessageDeliveryStatusEvent(
-            delivery_data=delivery_data,
-            room_uuid=str(room.uuid),
-            message_uuid=str(meta.message_uuid),
-            tenant_uuid=str(room.tenant_uuid),
-            user_uuid=str(meta.message.user_uuid),
-        )
-        await self._publish(event)
 
+        def make_event(user_uuid: str) -> ServiceEvent:
+            return MessageDeliveryStatusEvent(
+                delivery_data=delivery_data,
+                room_uuid=str(room.uuid),
+                message_uuid=str(meta.message_uuid),
+                tenant_uuid=str(room.tenant_uuid),
+                user_uuid=user_uuid,
+            )
+
+        fan_outs: list[_FanOut] = [(make_event, [str(meta.message.user_uuid)])]
         if record.status == DeliveryStatus.DELIVERED.value:
-            await self._notify_message_delivered(meta.message, room)
+            if delivered := self._message_delivered_fan_out(meta.message, room):
+                fan_outs.append(delivered)
+        return fan_outs
 
     @staticmethod
     def _build_message_payload(message: RoomMessage) -> MessageDict:
         return cast(MessageDict, MessageSchema().dump(message))
 
-    async def _notify_message_delivered(self, message: RoomMessage, room: Room) -> None:
+    def _message_delivered_fan_out(
+        self, message: RoomMessage, room: Room
+    ) -> _FanOut | None:
         sender_uuid = str(message.user_uuid)
         recipients = [
-            u for u in room.users if not u.identity and str(u.uuid) != sender_uuid
+            u.uuid for u in room.users if not u.identity and str(u.uuid) != sender_uuid
         ]
         if not recipients:
-            return
+            return None
 
-        message_data = self._build_message_payload(message)
-        for user in recipients:
-            event = UserRoomMessageCreatedEvent(
-                message_data, room.uuid, room.tenant_uuid, user.uuid
-            )
-            await self._publish(event)
-
-    async def _publish(self, event: ServiceEvent) -> None:
-        try:
-            await asyncio.to_thread(self._bus.publish, event)
-        except Exception:
-            logger.exception('Failed to publish bus event %s', event.name)
+        make_event = partial(
+            UserRoomMessageCreatedEvent,
+            self._build_message_payload(message),
+            room.uuid,
+            room.tenant_uuid,
+        )
+        return make_event, recipients
+
+    async def _fan_out(self, fan_outs: Sequence[_FanOut]) -> None:
+        """Queue the fan-outs in order.
+
+        Once the publisher refuses one (not started, or full), the caller
+        publishes it and the ones after it, so they keep their order.
+        """
+        for i, (make_event, user_uuids) in enumerate(fan_outs):
+            if not self._fanout.submit(make_event, user_uuids):
+                await asyncio.to_thread(self._publish, fan_outs[i:])
+                return
+
+    def _publish(self, fan_outs: Sequence[_FanOut]) -> None:
+        for make_event, user_uuids in fan_outs:
+            self._fanout.publish(make_event, user_uuids)
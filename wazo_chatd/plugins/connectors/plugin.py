@@ -33,6 +33,7 @@ class Plugin:
         dao = dependencies['dao']
         bus_consumer = dependencies['bus_consumer']
         bus_publisher = dependencies['bus_publisher']
+        fanout_publisher = dependencies['fanout_publisher']
         hooks = dependencies['hooks']
         status_aggregator = dependencies['status_aggregator']
         thread_manager = dependencies['thread_manager']
@@ -48,7 +49,14 @@ class Plugin:
         notifier = UserIdentityNotifier(bus_publisher)
         service = ConnectorService(dao, registry, notifier, auth_client)
 
-        router = ConnectorRouter(config, registry, service, auth_client, dao)
+        router = ConnectorRouter(
+            config,
+            registry,
+            service,
+            auth_client,
+            dao,
+            fanout_publisher=fanout_publisher,
+        )
         thread_manager.manage(router)
         next_token_changed_subscribe(router.on_auth_available)
         status_aggregator.add_provider(router.provide_status)
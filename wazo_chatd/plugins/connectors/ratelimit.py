@@ -0,0 +1,129 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+RateKey = tuple[str, ...]
+
+
+@dataclass
+class TokenBucket:
+    """Token bucket pacing the sends of one connector key.
+
+    ``rate`` tokens are added every second, up to ``burst``. A ``rate`` of
+    ``0`` does not limit sends, only :meth:`block` does. Tokens may be
+    reserved ahead of time: the count is negative while senders wait.
+    """
+
+    rate: float = 0.0
+    burst: float = 1.0
+    clock: Callable[[], float] = field(default=time.monotonic)
+    tokens: float = field(init=False, default=0.0)
+    blocked_until: float = field(init=False, default=0.0)
+    _updated: float = field(init=False, default=0.0)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.burst
+        self._updated = self.clock()
+
+    def available(self) -> float:
+        return self._tokens_at(self.clock())
+
+    def blocked_for(self) -> float:
+        return max(0.0, self.blocked_until - self.clock())
+
+    def reserve(self, *, max_wait: float) -> float:
+        """Return how long to wait for a token, reserving it if within max_wait."""
+        now = self._refill()
+        wait = max(0.0, self.blocked_until - now)
+        if self.rate > 0:
+            wait += max(0.0, 1.0 - self.tokens) / self.rate
+        if wait <= max_wait and self.rate > 0:
+            self.tokens -= 1.0
+        return wait
+
+    def block(self, duration: float) -> None:
+        """Hold every send for ``duration`` seconds, e.g. a backend retry-after."""
+        now = self._refill()
+        self.blocked_until = max(self.blocked_until, now + duration)
+        self.tokens = min(self.tokens, 1.0)
+
+    def _tokens_at(self, now: float) -> float:
+        start = max(self._updated, self.blocked_until)
+        if self.rate <= 0 or now <= start:
+            return self.tokens
+        return min(self.burst, self.tokens + (now - start) * self.rate)
+
+    def _refill(self) -> float:
+        now = self.clock()
+        self.tokens = self._tokens_at(now)
+        self._updated = now
+        return now
+
+
+class RateLimiter:
+    """Outbound send buckets, configured per backend in ``connectors``.
+
+    ``send_rate`` (messages per second) and ``send_burst`` apply to each
+    tenant of the backend, or to each sender identity when
+    ``send_rate_per_sender`` is true. Backends without a ``send_rate`` are
+    only held back by :meth:`block`.
+    """
+
+    def __init__(
+        self,
+        connectors_config: Mapping[str, Mapping[str, Any] | None],
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._limits: dict[str, tuple[float, float]] = {}
+        self._per_sender: set[str] = set()
+        for backend, config in connectors_config.items():
+            config = config or {}
+            if rate := float(config.get('send_rate') or 0):
+                burst = float(config.get('send_burst') or max(rate, 1.0))
+                self._limits[backend] = (rate, burst)
+            if config.get('send_rate_per_sender'):
+                self._per_sender.add(backend)
+        self._buckets: dict[RateKey, TokenBucket] = {}
+
+    def key(self, tenant_uuid: str, backend: str, sender_identity: str) -> RateKey:
+        if backend in self._per_sender:
+            return (tenant_uuid, backend, sender_identity)
+        return (tenant_uuid, backend)
+
+    def reserve(self, key: RateKey, *, max_wait: float) -> float:
+        if (bucket := self._bucket(key, create=key[1] in self._limits)) is None:
+            return 0.0
+        return bucket.reserve(max_wait=max_wait)
+
+    def block(self, key: RateKey, duration: float) -> None:
+        if bucket := self._bucket(key, create=True):
+            bucket.block(duration)
+
+    def blocked_for(self, key: RateKey) -> float:
+        if (bucket := self._bucket(key, create=False)) is None:
+            return 0.0
+        return bucket.blocked_for()
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            '/'.join(key): {
+                'tokens': round(bucket.available(), 2),
+                'burst': bucket.burst,
+                'blocked_for': round(bucket.blocked_for(), 2),
+            }
+            for key, bucket in list(self._buckets.items())
+        }
+
+    def _bucket(self, key: RateKey, *, create: bool) -> TokenBucket | None:
+        if (bucket := self._buckets.get(key)) is None and create:
+            rate, burst = self._limits.get(key[1], (0.0, 1.0))
+            bucket = self._buckets[key] = TokenBucket(rate, burst, clock=self._clock)
+        return bucket
@@ -0,0 +1,66 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from uuid import UUID
+
+from wazo_chatd.plugin_helpers.cache import LRUCache
+
+DEFAULT_CACHE_SIZE: int = 10000
+DEFAULT_CACHE_TTL: float = 300.0
+
+RoomKey = tuple[str, tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class ResolvedIdentity:
+    uuid: str
+    user_uuid: str
+    tenant_uuid: str
+
+
+# Cached for identities bound to no user, e.g. most inbound senders
+UNRESOLVED = ResolvedIdentity(uuid='', user_uuid='', tenant_uuid='')
+
+
+def room_key(tenant_uuid: str, user_uuids: Iterable[UUID | str]) -> RoomKey:
+    return (str(tenant_uuid), tuple(sorted({str(uuid) for uuid in user_uuids})))
+
+
+class ResolutionCache:
+    """Identities and rooms resolved by inbound messages.
+
+    Identities are cached by identity, rooms by tenant and exact set of
+    participants. Entries are dropped on the user identity and room events
+    published on the bus, by any chatd instance; the TTL bounds staleness
+    when an event is missed.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        self.identities: LRUCache[str, ResolvedIdentity] = LRUCache(maxsize, ttl)
+        self.rooms: LRUCache[RoomKey, str] = LRUCache(maxsize, ttl)
+
+    def forget_identity(self, identity_uuid: str, identity: str) -> None:
+        # An updated identity is only found by uuid: its old value is unknown
+        self.identities.invalidate(identity)
+        self.identities.invalidate_where(lambda _, value: value.uuid == identity_uuid)
+
+    def forget_room(
+        self, room_uuid: str, tenant_uuid: str, user_uuids: Iterable[str]
+    ) -> None:
+        key = room_key(tenant_uuid, user_uuids)
+        if self.rooms.get(key) != room_uuid:
+            self.rooms.invalidate(key)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            'identities': self.identities.snapshot(),
+            'rooms': self.rooms.snapshot(),
+        }
@@ -24,13 +24,20 @@ from wazo_chatd.plugins.connectors.exceptions import (
     UnknownBackendException,
 )
 from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
+from wazo_chatd.plugins.connectors.resolution import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_CACHE_TTL,
+    ResolutionCache,
+)
 from wazo_chatd.plugins.connectors.runner import (
     DeliveryRunner,
-    ListenerRunner,
+    ListenerPool,
     NullRunner,
 )
 from wazo_chatd.plugins.connectors.services import ConnectorService
+from wazo_chatd.plugins.connectors.staging import InboundStaging
 from wazo_chatd.plugins.connectors.store import ConnectorStore
+from wazo_chatd.plugins.connectors.transport import HttpTransport
 from wazo_chatd.plugins.connectors.types import (
     InboundMessage,
     StatusUpdate,
@@ -40,6 +47,7 @@ from wazo_chatd.plugins.connectors.types import (
 if TYPE_CHECKING:
     from wazo_auth_client import Client as AuthClient
 
+    from wazo_chatd.bus import FanoutPublisher
     from wazo_chatd.database.models import Room
     from wazo_chatd.database.queries import DAO
 
@@ -48,7 +56,7 @@ logger = logging.getLogger(__name__)
 
 class ConnectorRouter:
     _delivery_runner: DeliveryRunner | NullRunner
-    _listener_runner: ListenerRunner | NullRunner
+    _listener_runner: ListenerPool | NullRunner
 
     def __init__(
         self,
@@ -57,27 +65,60 @@ class ConnectorRouter:
         service: ConnectorService,
         auth_client: AuthClient,
         dao: DAO,
+        fanout_publisher: FanoutPublisher | None = None,
     ) -> None:
         self._registry = registry
         self._service = service
         self._dao = dao
         self._connectors_config = config.get('connectors') or {}
         delivery_config = config.get('delivery') or {}
+        self._transport = HttpTransport(self._connectors_config)
         self._store = ConnectorStore(
             auth_client,
             registry,
             cache_ttl=float(delivery_config.get('backend_cache_ttl', 300)),
             connectors_config=self._connectors_config,
+            transport=self._transport,
+            refresh_ahead=float(
+                delivery_config.get('backend_cache_refresh_ahead', 0.2)
+            ),
+            max_stale=float(delivery_config.get('backend_cache_max_stale', 3600)),
+            fetch_concurrency=int(delivery_config.get('backend_fetch_concurrency', 20)),
+        )
+        self._staging = InboundStaging(
+            dao,
+            high_water_mark=int(delivery_config.get('inbound_high_water_mark', 10000)),
+            retry_after=float(delivery_config.get('inbound_retry_after', 30)),
+        )
+        self._resolution = ResolutionCache(
+            maxsize=int(
+                delivery_config.get('resolution_cache_size', DEFAULT_CACHE_SIZE)
+            ),
+            ttl=float(delivery_config.get('resolution_cache_ttl', DEFAULT_CACHE_TTL)),
         )
         if not registry.available_backends():
             logger.info('No connector backends registered; skipping runner startup')
             self._delivery_runner = self._listener_runner = NullRunner()
             return
 
-        self._delivery_runner = DeliveryRunner(config, registry, self._store)
-        self._listener_runner = ListenerRunner(
-            config, registry, self._store, self._delivery_runner.enqueue_message
+        self._delivery_runner = DeliveryRunner(
+            config,
+            registry,
+            self._store,
+            resolution=self._resolution,
+            transport=self._transport,
+            fanout_publisher=fanout_publisher,
+        )
+        self._listener_runner = ListenerPool(
+            config,
+            registry,
+            self._store,
+            self._delivery_runner.enqueue_message,
+            shards=self._delivery_runner.shards,
+            transport=self._transport,
         )
+        self._delivery_runner.shards.add_listener(self._listener_runner.resync)
+        self._store.add_listener(self._on_instances_changed)
 
     def on_auth_available(self, _token: str) -> None:
         if self._store.is_populated:
@@ -194,6 +235,14 @@ class ConnectorRouter:
         self._delivery_runner.resync_pollers()
         self._listener_runner.resync()
 
+    def invalidate_identity(self, identity_uuid: str, identity: str) -> None:
+        self._resolution.forget_identity(identity_uuid, identity)
+
+    def invalidate_room(
+        self, room_uuid: str, tenant_uuid: str, user_uuids: list[str]
+    ) -> None:
+        self._resolution.forget_room(room_uuid, tenant_uuid, user_uuids)
+
     def validate_tenant_backend(self, tenant_uuid: str, backend: str) -> None:
         self._store.get(backend, tenant_uuid)
 
@@ -211,13 +260,19 @@ class ConnectorRouter:
         self._delivery_runner.resync_pollers()
         self._listener_runner.resync()
 
+    def _on_instances_changed(self) -> None:
+        self._delivery_runner.resync_pollers()
+        self._listener_runner.resync()
+
     def start(self) -> None:
+        self._store.start()
         self._delivery_runner.start()
         self._listener_runner.start()
 
     def stop(self) -> None:
         self._listener_runner.shutdown()
         self._delivery_runner.shutdown()
+        self._store.stop()
 
     def validate_room_creation(self, room: Room) -> None:
         self._service.validate_room_reachability(room)
@@ -246,9 +301,16 @@ class ConnectorRouter:
             'status': Status.ok if both_running else Status.fail,
             'backends_registered': len(self._registry.available_backends()),
             'in_flight': delivery.in_flight_count,
+            'rate_limits': delivery.rate_limits,
+            'tenants': delivery.tenant_queues,
+            'shards': delivery.shard_status,
+            'resolution_cache': self._resolution.snapshot(),
+            'inbound_dedup': delivery.dedup_stats,
             'delivery_restart_count': delivery.restart_count,
             'listener_restart_count': listener.restart_count,
+            'listener_loops': listener.loop_status,
             'instances': len(self._store),
+            'instance_cache': self._store.stats,
         }
 
     def resolve_room_participants(self, body: dict, tenant_uuid: str) -> None:
@@ -319,7 +381,7 @@ class ConnectorRouter:
             if not valid:
                 raise ConnectorAuthException()
 
-        self._delivery_runner.enqueue_message(result)
+        self._staging.append(tenant_uuid, result)
 
     def _resolve_tenant(
         self, event: InboundMessage | StatusUpdate, backend: str
@@ -7,40 +7,77 @@ import abc
 import asyncio
 import concurrent.futures
 import functools
+import itertools
 import logging
 import random
 import threading
 from collections.abc import Callable, Coroutine, Iterable
+from dataclasses import dataclass, field
+from datetime import timedelta
 from time import monotonic
 from types import TracebackType
-from typing import Any, ClassVar
+from typing import TYPE_CHECKING, Any, ClassVar
 
 import asyncpg
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
 
-from wazo_chatd.bus import BusPublisher
+from wazo_chatd.bus import BusPublisher, FanoutPublisher
 from wazo_chatd.database.async_helpers import (
     async_session_scope,
     build_asyncpg_connect_args,
     init_async_db,
 )
 from wazo_chatd.plugin_helpers.dependencies import ConfigDict
+from wazo_chatd.plugin_helpers.histogram import Histogram
 from wazo_chatd.plugin_helpers.queue import AsyncQueue, QueueFull
+from wazo_chatd.plugin_helpers.scheduler import FairScheduler
 from wazo_chatd.plugins.connectors.cadence import PollerCadence
 from wazo_chatd.plugins.connectors.connector import Connector
 from wazo_chatd.plugins.connectors.exceptions import ConnectorRateLimited
 from wazo_chatd.plugins.connectors.executor import MAX_RETRY_AFTER, DeliveryExecutor
-from wazo_chatd.plugins.connectors.helpers import apply_jitter, exponential_backoff
+from wazo_chatd.plugins.connectors.helpers import (
+    apply_jitter,
+    call_connector,
+    exponential_backoff,
+)
 from wazo_chatd.plugins.connectors.notifier import AsyncNotifier
 from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
+from wazo_chatd.plugins.connectors.resolution import ResolutionCache
+from wazo_chatd.plugins.connectors.sharding import (
+    HashRing,
+    ShardCoordinator,
+    ShardOwnership,
+)
 from wazo_chatd.plugins.connectors.store import CacheKey, ConnectorStore
 from wazo_chatd.plugins.connectors.types import InboundMessage, StatusUpdate
 
+if TYPE_CHECKING:
+    from wazo_chatd.plugins.connectors.transport import HttpTransport
+
 logger = logging.getLogger(__name__)
 
 LISTEN_PING_INTERVAL: float = 30.0
 LISTEN_PING_TIMEOUT: float = 10.0
+STAGED_POLL_INTERVAL: float = 30.0
+DEDUP_PURGE_INTERVAL: float = 3600.0
+DEFAULT_WORKER_THREADS: int = 32
+DEFAULT_TRACK_BATCH_SIZE: int = 100
+DEFAULT_LISTENER_LOOPS: int = 4
+DEFAULT_LAG_INTERVAL: float = 1.0
+DEFAULT_LAG_THRESHOLD: float = 0.5
+DEFAULT_LAG_COOLDOWN: float = 300.0
+# Consecutive samples above the threshold before a loop is considered lagging
+LAG_SAMPLES: int = 3
+# Seconds a listener loop was late to run a scheduled callback
+LAG_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+@dataclass
+class _PendingStatus:
+    update: StatusUpdate
+    attempt: int = 0
+    staged_ids: list[int] = field(default_factory=list)
 
 
 async def _cancel_and_gather(tasks: Iterable[asyncio.Task[None]]) -> None:
@@ -76,10 +113,14 @@ class Runner(abc.ABC):
     start_timeout: ClassVar[float] = 10.0
     shutdown_timeout: ClassVar[float] = 30.0
 
-    def __init__(self) -> None:
+    def __init__(
+        self, *, worker_threads: int | None = None, name: str | None = None
+    ) -> None:
+        self.name = name or self.thread_name
+        self._worker_threads = worker_threads
         self._loop: asyncio.AbstractEventLoop | None = None
         self._thread = threading.Thread(
-            target=self._thread_target, name=self.thread_name, daemon=True
+            target=self._thread_target, name=self.name, daemon=True
         )
         self._ready = threading.Event()
         self._closing: concurrent.futures.Future[None] = concurrent.futures.Future()
@@ -111,7 +152,7 @@ class Runner(abc.ABC):
                 asyncio.run(self._entrypoint())
                 return
             except Exception:
-                logger.exception('%s crashed, restarting', self.thread_name)
+                logger.exception('%s crashed, restarting', self.name)
             finally:
                 self._loop = None
 
@@ -120,6 +161,15 @@ class Runner(abc.ABC):
 
     async def _entrypoint(self) -> None:
         self._loop = asyncio.get_running_loop()
+        if self._worker_threads:
+            # Runs the blocking calls of the loop, e.g. sync connector methods;
+            # shut down by asyncio.run() with the loop
+            self._loop.set_default_executor(
+                concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._worker_threads,
+                    thread_name_prefix=f'{self.name}-worker',
+                )
+            )
         self._ready.set()
         run_task: asyncio.Task[None] = asyncio.create_task(self._run())
         closing = _observe_future(self._closing, self._loop)
@@ -144,21 +194,21 @@ class Runner(abc.ABC):
         if self._thread.is_alive() or self._thread.ident is not None:
             raise RuntimeError(f'{type(self).__name__} already started')
 
-        logger.info('Starting %s', self.thread_name)
+        logger.info('Starting %s', self.name)
         self._thread.start()
         if not self._ready.wait(timeout=self.start_timeout):
             raise RuntimeError(
                 f'{type(self).__name__} failed to start within '
                 f'{self.start_timeout}s'
             )
-        logger.info('Started %s', self.thread_name)
+        logger.info('Started %s', self.name)
 
     def shutdown(self) -> None:
-        logger.info('Stopping %s', self.thread_name)
+        logger.info('Stopping %s', self.name)
         if not self._closing.done():
             self._closing.set_result(None)
         self._thread.join(timeout=self.shutdown_timeout)
-        logger.info('Stopped %s', self.thread_name)
+        logger.info('Stopped %s', self.name)
 
     def __enter__(self) -> Runner:
         self.start()
@@ -181,7 +231,7 @@ class Runner(abc.ABC):
         self._restart_count += 1
         logger.warning(
             'Restarting %s in %ds (attempt #%d)',
-            self.thread_name,
+            self.name,
             delay,
             self._restart_count,
         )
@@ -215,12 +265,31 @@ class DeliveryRunner(Runner):
         config: ConfigDict,
         registry: ConnectorRegistry,
         store: ConnectorStore,
+        resolution: ResolutionCache | None = None,
+        transport: HttpTransport | None = None,
+        fanout_publisher: FanoutPublisher | None = None,
     ) -> None:
-        super().__init__()
+        super().__init__(
+            worker_threads=int(
+                config['delivery'].get('worker_threads', DEFAULT_WORKER_THREADS)
+            )
+        )
         self._config = config
         self._registry = registry
         self._store = store
+        self._transport = transport
         self._max_tasks = int(config['delivery']['max_concurrent_tasks'])
+        self._tenant_max_tasks = int(
+            config['delivery'].get('tenant_max_concurrent_tasks') or self._max_tasks
+        )
+        self._tenant_weights = dict(config['delivery'].get('tenant_weights') or {})
+        self._batch_size = max(1, int(config['delivery'].get('batch_size', 100)))
+        self._batch_window = float(config['delivery'].get('batch_window', 0.05))
+        self._staged_lease = timedelta(
+            seconds=float(config['delivery'].get('inbound_claim_timeout', 300))
+        )
+        self._shards = ShardOwnership(int(config['delivery'].get('shard_count', 1)))
+        self._shard_coordinator = ShardCoordinator(self._shards)
         self._poll_min = float(config['delivery'].get('poll_interval_min', 5))
         self._poll_max = float(config['delivery'].get('poll_interval_max', 60))
         self._tau_speedup = float(config['delivery'].get('poll_tau_speedup', 5))
@@ -232,6 +301,14 @@ class DeliveryRunner(Runner):
         self._rate_limit_window = float(
             config['delivery'].get('poll_rate_limit_window', 300)
         )
+        self._track_batch_size = max(
+            1,
+            int(
+                config['delivery'].get(
+                    'track_outbound_batch_size', DEFAULT_TRACK_BATCH_SIZE
+                )
+            ),
+        )
 
         self._db_uri = str(config.get('db_uri', ''))
         engine, session_factory = init_async_db(self._db_uri)
@@ -245,29 +322,64 @@ class DeliveryRunner(Runner):
         self._executor = DeliveryExecutor(
             config=config,
             registry=registry,
-            notifier=AsyncNotifier(bus_publisher),
+            notifier=AsyncNotifier(bus_publisher, fanout_publisher),
             store=store,
+            resolution=resolution,
         )
 
         self._tasks: dict[tuple[str, ...], asyncio.Task[None]] = {}
-        self._semaphore: asyncio.Semaphore | None = None
+        self._scheduler: FairScheduler | None = None
         self._outbound_notify_task: asyncio.Task[None] | None = None
         self._pollers: dict[CacheKey, asyncio.Task[None]] = {}
+        self._polled: dict[CacheKey, Connector] = {}
         self._queue: AsyncQueue[InboundMessage | StatusUpdate] = AsyncQueue()
         self._dispatch_task: asyncio.Task[None] | None = None
+        self._staged_task: asyncio.Task[None] | None = None
+        self._dedup_purge_task: asyncio.Task[None] | None = None
+        self._staged_wakeup = asyncio.Event()
+        self._staged_pending: set[int] = set()
+        self._staged_done: list[int] = []
         self._scheduled_timers: set[asyncio.TimerHandle] = set()
         self._scheduled_outbound_timers: dict[str, asyncio.TimerHandle] = {}
+        self._outbound_batches: dict[tuple[str, str], dict[str, None]] = {}
+        self._outbound_batch_timer: asyncio.TimerHandle | None = None
+        self._status_batches: dict[str, dict[str, _PendingStatus]] = {}
+        self._status_batch_timer: asyncio.TimerHandle | None = None
+        self._status_batch_ids = itertools.count()
+        self._tracking_cursors: dict[CacheKey, int] = {}
 
     @property
-    def semaphore(self) -> asyncio.Semaphore:
-        if self._semaphore is None:
+    def scheduler(self) -> FairScheduler:
+        if self._scheduler is None:
             raise RuntimeError('DeliveryRunner has not been started')
-        return self._semaphore
+        return self._scheduler
+
+    @property
+    def shards(self) -> ShardOwnership:
+        return self._shards
+
+    @property
+    def shard_status(self) -> dict[str, object]:
+        return self._shards.snapshot()
 
     @property
     def in_flight_count(self) -> int:
         return len(self._tasks)
 
+    @property
+    def rate_limits(self) -> dict[str, dict[str, float]]:
+        return self._executor.rate_limits()
+
+    @property
+    def dedup_stats(self) -> dict[str, float]:
+        return self._executor.dedup_stats()
+
+    @property
+    def tenant_queues(self) -> dict[str, dict[str, int]]:
+        if self._scheduler is None:
+            return {}
+        return self._scheduler.snapshot()
+
     def enqueue_message(self, message: InboundMessage | StatusUpdate) -> None:
         try:
             self._queue.append(message)
@@ -287,12 +399,28 @@ class DeliveryRunner(Runner):
     def _reset_loop_state(self) -> None:
         self._tasks = {}
         self._pollers = {}
+        self._polled = {}
         self._scheduled_timers = set()
         self._scheduled_outbound_timers = {}
+        self._outbound_batches = {}
+        self._outbound_batch_timer = None
+        self._status_batches = {}
+        self._status_batch_timer = None
+        self._tracking_cursors = {}
         self._queue.reset()
-        self._semaphore = asyncio.Semaphore(self._max_tasks)
+        self._scheduler = FairScheduler(
+            self._max_tasks,
+            tenant_max_tasks=self._tenant_max_tasks,
+            quantum=self._batch_size,
+            weights=self._tenant_weights,
+        )
         self._outbound_notify_task = None
         self._dispatch_task = None
+        self._staged_task = None
+        self._dedup_purge_task = None
+        self._staged_wakeup = asyncio.Event()
+        self._staged_pending = set()
+        self._staged_done = []
 
     async def _run(self) -> None:
         self._reset_loop_state()
@@ -301,13 +429,20 @@ class DeliveryRunner(Runner):
         except Exception:
             logger.exception(
                 '%s starting in degraded state: connector store populate failed',
-                self.thread_name,
+                self.name,
             )
 
         self._outbound_notify_task = asyncio.create_task(self._listen_for_deliveries())
         self._dispatch_task = asyncio.create_task(self._dispatch())
+        self._staged_task = asyncio.create_task(self._drain_staged())
+        self._dedup_purge_task = asyncio.create_task(self._purge_dedup_keys())
         self._synchronize_pollers()
-        critical_tasks = (self._outbound_notify_task, self._dispatch_task)
+        critical_tasks = (
+            self._outbound_notify_task,
+            self._dispatch_task,
+            self._staged_task,
+            self._dedup_purge_task,
+        )
 
         try:
             done, _ = await asyncio.wait(
@@ -325,11 +460,16 @@ class DeliveryRunner(Runner):
         await _cancel_and_gather(critical_tasks)
         await _cancel_and_gather(self._pollers.values())
         self._pollers.clear()
+        self._polled.clear()
 
         for handle in self._scheduled_timers:
             handle.cancel()
 
         self._scheduled_timers.clear()
+        # Deliveries still waiting for their batch are picked up by recovery
+        self._outbound_batches.clear()
+        # Staged status updates are released below, polled ones polled again
+        self._status_batches.clear()
 
         if self._tasks:
             logger.info(
@@ -338,6 +478,9 @@ class DeliveryRunner(Runner):
             await asyncio.gather(*self._tasks.values(), return_exceptions=True)
 
         self._tasks.clear()
+        await self._settle_staged()
+        if self._transport is not None:
+            await self._transport.aclose()
 
         if self.is_closing and self._engine:
             await self._engine.dispose()
@@ -355,13 +498,21 @@ class DeliveryRunner(Runner):
                     await connection.add_listener(
                         'connector_delivery', self._on_delivery_notify
                     )
+                    await connection.add_listener(
+                        'connector_inbound', self._on_inbound_notify
+                    )
                     logger.info('Listening for connector_delivery notifications')
                     backoff = exponential_backoff()
 
                     # Run recovery after LISTEN is registered so any NOTIFY
                     # fired during the outage (or startup) is picked up
                     # either by the live listener or this catch-up scan.
-                    await self._recover()
+                    if self._shards.enabled:
+                        await self._shard_coordinator.join(connection)
+                        await self._rebalance_shards(connection)
+                    else:
+                        await self._recover()
+                    self._staged_wakeup.set()
 
                     await self._monitor_listen_connection(connection)
                 except Exception:
@@ -371,6 +522,8 @@ class DeliveryRunner(Runner):
                     )
                     await asyncio.sleep(delay)
                 finally:
+                    # Shard locks belong to this connection's session
+                    self._shard_coordinator.reset()
                     if connection and not connection.is_closed():
                         try:
                             await connection.close()
@@ -395,6 +548,14 @@ class DeliveryRunner(Runner):
                 if closing_task in done:
                     return
 
+                if self._shards.enabled:
+                    # Also pings the connection
+                    await asyncio.wait_for(
+                        self._rebalance_shards(connection),
+                        timeout=LISTEN_PING_TIMEOUT,
+                    )
+                    continue
+
                 await asyncio.wait_for(
                     connection.execute('SELECT 1'),
                     timeout=LISTEN_PING_TIMEOUT,
@@ -420,9 +581,39 @@ class DeliveryRunner(Runner):
         _channel: str,
         payload: str,
     ) -> None:
-        for delivery_id in payload.split(','):
+        head, _, delivery_ids = payload.rpartition(':')
+        tenant_uuid, _, backend = head.partition(':')
+        if not self._shards.owns(tenant_uuid, backend):
+            return
+
+        for delivery_id in delivery_ids.split(','):
             if delivery_id:
-                self._schedule_outbound_delivery(delivery_id)
+                self._schedule_outbound_delivery(tenant_uuid, backend, delivery_id)
+
+    def _on_inbound_notify(
+        self,
+        _connection: asyncpg.Connection,
+        _pid: int,
+        _channel: str,
+        _payload: str,
+    ) -> None:
+        self._staged_wakeup.set()
+
+    async def _rebalance_shards(self, connection: asyncpg.Connection) -> None:
+        gained, lost = await self._shard_coordinator.rebalance(connection)
+        if not gained and not lost:
+            return
+
+        logger.info(
+            'Shards rebalanced: gained %s, lost %s, owning %s',
+            sorted(gained),
+            sorted(lost),
+            sorted(self._shards.owned),
+        )
+        self._synchronize_pollers()
+        if gained:
+            # Deliveries of a gained shard were notified to its previous owner
+            await self._recover()
 
     async def _recover(self) -> None:
         try:
@@ -432,30 +623,69 @@ class DeliveryRunner(Runner):
             logger.exception('Recovery scan failed, continuing without recovery')
             return
 
-        for delivery_id, delay in recoverable:
+        for delivery_id, tenant_uuid, backend, delay in recoverable:
+            if not self._shards.owns(tenant_uuid, backend):
+                continue
             if delay > 0:
                 logger.info(
                     'Recovery: re-enqueuing delivery %s with %.0fs delay',
                     delivery_id,
                     delay,
                 )
-                self._schedule_outbound_delivery_later(delay, delivery_id)
+                self._schedule_outbound_delivery_later(
+                    delay, tenant_uuid, backend, delivery_id
+                )
             else:
                 logger.info(
                     'Recovery: re-enqueuing delivery %s immediately', delivery_id
                 )
-                self._schedule_outbound_delivery(delivery_id)
+                self._schedule_outbound_delivery(tenant_uuid, backend, delivery_id)
 
-    def _schedule_outbound_delivery(self, delivery_id: str) -> None:
-        if (key := ('outbound_delivery', delivery_id)) in self._tasks:
+    def _schedule_outbound_delivery(
+        self, tenant_uuid: str, backend: str, delivery_id: str
+    ) -> None:
+        if ('outbound_delivery', delivery_id) in self._tasks:
             return
 
-        task = self.loop.create_task(self._process_outbound_delivery(delivery_id))
-        self._tasks[key] = task
+        batch = self._outbound_batches.setdefault((tenant_uuid, backend), {})
+        batch[delivery_id] = None
+        if len(batch) >= self._batch_size:
+            self._start_outbound_batch(tenant_uuid, backend, list(batch))
+            del self._outbound_batches[(tenant_uuid, backend)]
+        elif self._outbound_batch_timer is None:
+            self._outbound_batch_timer = self.loop.call_later(
+                self._batch_window, self._flush_outbound_batches
+            )
+            self._scheduled_timers.add(self._outbound_batch_timer)
+
+    def _flush_outbound_batches(self) -> None:
+        if (timer := self._outbound_batch_timer) is not None:
+            self._scheduled_timers.discard(timer)
+            self._outbound_batch_timer = None
+
+        batches, self._outbound_batches = self._outbound_batches, {}
+        for (tenant_uuid, backend), batch in batches.items():
+            self._start_outbound_batch(tenant_uuid, backend, list(batch))
+
+    def _start_outbound_batch(
+        self, tenant_uuid: str, backend: str, delivery_ids: list[str]
+    ) -> None:
+        task = self.loop.create_task(
+            self._process_outbound_batch(tenant_uuid, backend, delivery_ids)
+        )
         task.add_done_callback(self._mark_healthy)
-        task.add_done_callback(lambda _t: self._tasks.pop(key, None))
+        for delivery_id in delivery_ids:
+            key = ('outbound_delivery', delivery_id)
+            self._tasks[key] = task
+            task.add_done_callback(functools.partial(self._release_task, key))
 
-    def _schedule_outbound_delivery_later(self, delay: float, delivery_id: str) -> None:
+    def _release_task(self, key: tuple[str, ...], task: asyncio.Task[None]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def _schedule_outbound_delivery_later(
+        self, delay: float, tenant_uuid: str, backend: str, delivery_id: str
+    ) -> None:
         if (existing := self._scheduled_outbound_timers.get(delivery_id)) is not None:
             existing.cancel()
             self._scheduled_timers.discard(existing)
@@ -463,77 +693,239 @@ class DeliveryRunner(Runner):
         def callback() -> None:
             self._scheduled_timers.discard(handle)
             self._scheduled_outbound_timers.pop(delivery_id, None)
-            self._schedule_outbound_delivery(delivery_id)
+            # The shard may have moved; its new owner recovered the delivery
+            if self._shards.owns(tenant_uuid, backend):
+                self._schedule_outbound_delivery(tenant_uuid, backend, delivery_id)
 
         handle = self.loop.call_later(delay, callback)
         self._scheduled_timers.add(handle)
         self._scheduled_outbound_timers[delivery_id] = handle
 
-    async def _process_outbound_delivery(self, delivery_id: str) -> None:
-        async with self.semaphore:
-            retry_delay: float | None = None
+    async def _process_outbound_batch(
+        self, tenant_uuid: str, backend: str, delivery_ids: list[str]
+    ) -> None:
+        async with self.scheduler.slot(tenant_uuid, cost=len(delivery_ids)):
             try:
                 async with async_session_scope(self._session_factory):
-                    retry_delay = await self._executor.route_outbound_delivery(
-                        delivery_id
+                    retry_delays = await self._executor.route_outbound_deliveries(
+                        delivery_ids
                     )
             except (StaleDataError, IntegrityError):
                 logger.warning(
-                    'Delivery %s was deleted before dispatch, skipping', delivery_id
+                    'Deliveries %s were deleted before dispatch, skipping',
+                    ', '.join(delivery_ids),
                 )
                 return
             except Exception:
-                logger.exception('Failed to process outbound delivery %s', delivery_id)
+                logger.exception(
+                    'Failed to process outbound deliveries %s', ', '.join(delivery_ids)
+                )
                 return
 
-            if retry_delay is not None:
-                self._schedule_outbound_delivery_later(retry_delay, delivery_id)
+            for delivery_id, retry_delay in retry_delays.items():
+                self._schedule_outbound_delivery_later(
+                    retry_delay, tenant_uuid, backend, delivery_id
+                )
 
     async def _dispatch(self) -> None:
         async for message in self._queue:
             self._schedule_inbound(message)
 
+    async def _drain_staged(self) -> None:
+        while True:
+            self._staged_wakeup.clear()
+            try:
+                claimed = await self._claim_staged()
+            except Exception:
+                logger.exception('Failed to claim staged inbound events')
+                claimed = 0
+
+            if claimed and len(self._staged_pending) < self._batch_size:
+                continue
+            try:
+                await asyncio.wait_for(
+                    self._staged_wakeup.wait(), timeout=STAGED_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _purge_dedup_keys(self) -> None:
+        while True:
+            try:
+                async with async_session_scope(self._session_factory):
+                    purged = await self._executor.purge_dedup_keys()
+            except Exception:
+                logger.exception('Failed to purge expired inbound idempotency keys')
+            else:
+                if purged:
+                    logger.debug('Purged %d expired inbound idempotency keys', purged)
+            await asyncio.sleep(DEDUP_PURGE_INTERVAL)
+
+    async def _claim_staged(self) -> int:
+        done, self._staged_done = self._staged_done, []
+        limit = self._batch_size - len(self._staged_pending)
+        try:
+            async with async_session_scope(self._session_factory):
+                if done:
+                    await self._executor.ack_staged_events(done)
+                events: list[tuple[int, InboundMessage | StatusUpdate]] = []
+                if limit > 0:
+                    events = await self._executor.claim_staged_events(
+                        limit, self._staged_lease
+                    )
+        except Exception:
+            self._staged_done[:0] = done
+            raise
+
+        for event_id, event in events:
+            self._staged_pending.add(event_id)
+            self._schedule_inbound(event, staged_id=event_id)
+        return len(events)
+
+    def _complete_staged(self, staged_id: int | None) -> None:
+        if staged_id is None:
+            return
+        self._staged_pending.discard(staged_id)
+        self._staged_done.append(staged_id)
+        self._staged_wakeup.set()
+
+    async def _settle_staged(self) -> None:
+        # Events interrupted by the shutdown are claimable again right away
+        done, self._staged_done = self._staged_done, []
+        pending, self._staged_pending = self._staged_pending, set()
+        if not done and not pending:
+            return
+
+        try:
+            async with async_session_scope(self._session_factory):
+                if done:
+                    await self._executor.ack_staged_events(done)
+                if pending:
+                    await self._executor.release_staged_events(pending)
+        except Exception:
+            logger.exception('Failed to settle staged inbound events')
+
     def _schedule_inbound(
         self,
         message: InboundMessage | StatusUpdate,
         *,
         attempt: int = 0,
+        staged_id: int | None = None,
     ) -> None:
         key: tuple[str, ...]
         match message:
             case InboundMessage() as m:
                 key = ('inbound', m.backend, m.external_id, str(attempt))
                 if key in self._tasks:
+                    self._complete_staged(staged_id)
                     return
                 coro = self._executor.route_inbound(message, attempt=attempt)
 
             case StatusUpdate() as m:
-                key = ('status', m.backend, m.external_id, m.status, str(attempt))
-                if key in self._tasks:
-                    return
-                coro = self._executor.route_status_update(message, attempt=attempt)
+                self._schedule_status_update(
+                    _PendingStatus(
+                        m, attempt, [staged_id] if staged_id is not None else []
+                    )
+                )
+                return
 
             case _:
                 logger.warning(
                     'Unknown message type in delivery queue: %s',
                     type(message).__name__,
                 )
+                self._complete_staged(staged_id)
                 return
 
-        task = self.loop.create_task(self._process(coro, message, attempt))
+        task = self.loop.create_task(
+            self._process(coro, message, attempt, staged_id=staged_id)
+        )
         self._tasks[key] = task
         task.add_done_callback(self._mark_healthy)
         task.add_done_callback(lambda _t: self._tasks.pop(key, None))
 
+    def _schedule_status_update(self, pending: _PendingStatus) -> None:
+        backend, external_id = pending.update.backend, pending.update.external_id
+        batch = self._status_batches.setdefault(backend, {})
+        # Only the last status of a message is recorded
+        if (replaced := batch.pop(external_id, None)) is not None:
+            pending.attempt = max(pending.attempt, replaced.attempt)
+            pending.staged_ids[:0] = replaced.staged_ids
+        batch[external_id] = pending
+
+        if len(batch) >= self._batch_size:
+            del self._status_batches[backend]
+            self._start_status_batch(backend, list(batch.values()))
+        elif self._status_batch_timer is None:
+            self._status_batch_timer = self.loop.call_later(
+                self._batch_window, self._flush_status_batches
+            )
+            self._scheduled_timers.add(self._status_batch_timer)
+
+    def _flush_status_batches(self) -> None:
+        if (timer := self._status_batch_timer) is not None:
+            self._scheduled_timers.discard(timer)
+            self._status_batch_timer = None
+
+        batches, self._status_batches = self._status_batches, {}
+        for backend, batch in batches.items():
+            self._start_status_batch(backend, list(batch.values()))
+
+    def _start_status_batch(self, backend: str, batch: list[_PendingStatus]) -> None:
+        batch_id = str(next(self._status_batch_ids))
+        task = self.loop.create_task(self._process_status_batch(backend, batch))
+        task.add_done_callback(self._mark_healthy)
+        for pending in batch:
+            key = ('status', backend, pending.update.external_id, batch_id)
+            self._tasks[key] = task
+            task.add_done_callback(functools.partial(self._release_task, key))
+
+    async def _process_status_batch(
+        self, backend: str, batch: list[_PendingStatus]
+    ) -> None:
+        attempt = max(pending.attempt for pending in batch)
+        async with self.scheduler.slot(cost=len(batch)):
+            try:
+                async with async_session_scope(self._session_factory):
+                    retry_delay = await self._executor.route_status_updates(
+                        backend,
+                        [pending.update for pending in batch],
+                        attempt=attempt,
+                    )
+            except Exception:
+                logger.exception(
+                    'Failed to process %d status update(s) of %s', len(batch), backend
+                )
+                retry_delay = None
+
+        for pending in batch:
+            if retry_delay is None:
+                for staged_id in pending.staged_ids:
+                    self._complete_staged(staged_id)
+                continue
+            pending.attempt = attempt + 1
+            self._schedule_status_update_later(retry_delay, pending)
+
+    def _schedule_status_update_later(
+        self, delay: float, pending: _PendingStatus
+    ) -> None:
+        def callback() -> None:
+            self._scheduled_timers.discard(handle)
+            self._schedule_status_update(pending)
+
+        handle = self.loop.call_later(delay, callback)
+        self._scheduled_timers.add(handle)
+
     def _schedule_inbound_later(
         self,
         delay: float,
         message: InboundMessage | StatusUpdate,
         attempt: int,
+        staged_id: int | None = None,
     ) -> None:
         def callback() -> None:
             self._scheduled_timers.discard(handle)
-            self._schedule_inbound(message, attempt=attempt)
+            self._schedule_inbound(message, attempt=attempt, staged_id=staged_id)
 
         handle = self.loop.call_later(delay, callback)
         self._scheduled_timers.add(handle)
@@ -543,18 +935,22 @@ class DeliveryRunner(Runner):
         coro: Coroutine[Any, Any, float | None],
         message: InboundMessage | StatusUpdate,
         attempt: int,
+        *,
+        staged_id: int | None = None,
     ) -> None:
-        async with self.semaphore:
+        async with self.scheduler.slot():
             logger.debug('Processing %s', message)
             try:
                 async with async_session_scope(self._session_factory):
                     retry_delay = await coro
             except Exception:
                 logger.exception('Failed to process %s', message)
-                return
+                retry_delay = None
 
         if retry_delay is not None:
-            self._schedule_inbound_later(retry_delay, message, attempt + 1)
+            self._schedule_inbound_later(retry_delay, message, attempt + 1, staged_id)
+        else:
+            self._complete_staged(staged_id)
 
     def _synchronize_pollers(self) -> None:
         for key in list(self._pollers):
@@ -570,25 +966,33 @@ class DeliveryRunner(Runner):
                     exc_info=exc,
                 )
             del self._pollers[key]
+            self._polled.pop(key, None)
 
         desired: dict[CacheKey, Connector] = {
             key: instance
             for key, instance in self._store.items()
             if self._registry.transport_mode(instance.backend) == 'poll'
+            and self._shards.owns(*key)
         }
 
         running = set(self._pollers)
         wanted = set(desired)
+        rebuilt = {
+            key for key in running & wanted if self._polled[key] is not desired[key]
+        }
 
-        for key in running - wanted:
+        for key in (running - wanted) | rebuilt:
             self._stop_poller(key)
 
-        for key in wanted - running:
+        for key in (wanted - running) | rebuilt:
+            self._polled[key] = desired[key]
             self._pollers[key] = self.loop.create_task(
                 self._run_poller(key, desired[key])
             )
 
     def _stop_poller(self, key: CacheKey) -> None:
+        self._tracking_cursors.pop(key, None)
+        self._polled.pop(key, None)
         task = self._pollers.pop(key, None)
         if task and not task.done():
             task.cancel()
@@ -637,7 +1041,7 @@ class DeliveryRunner(Runner):
 
     async def _scan_inbound(self, instance: Connector, key: CacheKey) -> bool:
         try:
-            messages = await self._invoke_poll_method(instance.scan_inbound)
+            messages = await call_connector(instance.scan_inbound)
         except ConnectorRateLimited:
             raise
         except Exception:
@@ -650,28 +1054,33 @@ class DeliveryRunner(Runner):
     async def _track_outbound(
         self, instance: Connector, tenant_uuid: str, backend: str
     ) -> bool:
+        key = (tenant_uuid, backend)
+        updates: list[StatusUpdate] = []
         try:
             async with async_session_scope(self._session_factory):
-                pending = await self._executor.list_pending_external_ids(
-                    tenant_uuid, backend
+                pending, cursor = await self._executor.list_pending_external_ids(
+                    tenant_uuid,
+                    backend,
+                    limit=self._track_batch_size,
+                    after=self._tracking_cursors.get(key),
                 )
-            if not pending:
-                return False
-            updates = await self._invoke_poll_method(instance.track_outbound, pending)
+            if pending:
+                updates = await call_connector(instance.track_outbound, pending)
         except ConnectorRateLimited:
             raise
         except Exception:
-            logger.exception('track_outbound failed for %s', (tenant_uuid, backend))
+            logger.exception('track_outbound failed for %s', key)
             return False
+
+        # The next poll tracks the next page, or starts over after the last one
+        if cursor is None:
+            self._tracking_cursors.pop(key, None)
+        else:
+            self._tracking_cursors[key] = cursor
         for update in updates:
             self.enqueue_message(update)
         return bool(updates)
 
-    async def _invoke_poll_method(self, fn: Any, *args: Any) -> Any:
-        if asyncio.iscoroutinefunction(fn):
-            return await fn(*args)
-        return await asyncio.to_thread(fn, *args)
-
     def _mark_healthy(self, task: asyncio.Task[None]) -> None:
         if not task.cancelled() and task.exception() is None:
             self._healthy.set()
@@ -686,35 +1095,80 @@ class ListenerRunner(Runner):
         registry: ConnectorRegistry,
         store: ConnectorStore,
         on_message: Callable[[InboundMessage | StatusUpdate], None],
+        shards: ShardOwnership | None = None,
+        transport: HttpTransport | None = None,
+        *,
+        index: int = 0,
+        assigned: Callable[[CacheKey], bool] | None = None,
+        on_lag: Callable[[int, float], None] | None = None,
+        lag_interval: float = DEFAULT_LAG_INTERVAL,
     ) -> None:
-        super().__init__()
+        super().__init__(name=f'{self.thread_name}-{index}')
+        self.index = index
         self._config = config
         self._registry = registry
         self._store = store
+        self._transport = transport
         self._on_message = on_message
+        self._shards = shards or ShardOwnership()
+        self._assigned = assigned
+        self._on_lag = on_lag
+        self._lag_interval = lag_interval
         self._listeners: dict[CacheKey, asyncio.Task[None]] = {}
+        self._listened: dict[CacheKey, Connector] = {}
+        self._lag = 0.0
+        self._lag_histogram = Histogram(LAG_BUCKETS)
+
+    @property
+    def listener_count(self) -> int:
+        return len(self._listeners)
+
+    @property
+    def lag(self) -> float:
+        return self._lag
+
+    @property
+    def lag_histogram(self) -> dict[str, Any]:
+        return self._lag_histogram.snapshot()
 
     async def _run(self) -> None:
+        lag_task = asyncio.create_task(self._monitor_lag())
         try:
             await self._store.wait_populated()
         except Exception:
             logger.exception(
                 '%s starting in degraded state: connector store populate failed',
-                self.thread_name,
+                self.name,
             )
         self._reconcile(self._build_desired())
 
         try:
             await self._wait_closing()
         finally:
-            await _cancel_and_gather(self._listeners.values())
+            await _cancel_and_gather([lag_task, *self._listeners.values()])
             self._listeners.clear()
+            self._listened.clear()
+            if self._transport is not None:
+                await self._transport.aclose()
+
+    async def _monitor_lag(self) -> None:
+        """Measure how late the loop runs a callback scheduled on time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._lag_interval
+            await asyncio.sleep(self._lag_interval)
+            self._lag = max(0.0, loop.time() - expected)
+            self._lag_histogram.observe(self._lag)
+            if self._on_lag is not None:
+                self._on_lag(self.index, self._lag)
 
     def _build_desired(self) -> dict[CacheKey, Connector]:
         return {
             key: instance
             for key, instance in self._store.items()
             if self._registry.transport_mode(instance.backend) == 'listen'
+            and self._shards.owns(*key)
+            and (self._assigned is None or self._assigned(key))
         }
 
     def resync(self) -> None:
@@ -737,19 +1191,25 @@ class ListenerRunner(Runner):
                     exc_info=exc,
                 )
             del self._listeners[key]
+            self._listened.pop(key, None)
 
         running = set(self._listeners)
         wanted = set(desired)
+        rebuilt = {
+            key for key in running & wanted if self._listened[key] is not desired[key]
+        }
 
-        for key in running - wanted:
+        for key in (running - wanted) | rebuilt:
             task = self._listeners.pop(key)
+            self._listened.pop(key, None)
             if not task.done():
                 task.cancel()
 
-        for key in wanted - running:
+        for key in (wanted - running) | rebuilt:
             task = self.loop.create_task(desired[key].listen(self._on_message))
             task.add_done_callback(functools.partial(self._on_listener_done, key))
             self._listeners[key] = task
+            self._listened[key] = desired[key]
 
     def _on_listener_done(self, key: CacheKey, task: asyncio.Task[None]) -> None:
         if task.cancelled():
@@ -759,10 +1219,152 @@ class ListenerRunner(Runner):
             logger.error('Listener for %s crashed: %s', key, exc, exc_info=exc)
 
 
+class ListenerPool:
+    """Listener runners spread over ``delivery.listener_loops`` event loops.
+
+    Each loop runs in its own thread, so a slow listener only delays the
+    listeners of its loop. Instances are assigned to loops by consistent
+    hashing of their key. A loop late by more than
+    ``delivery.listener_lag_threshold`` seconds for :data:`LAG_SAMPLES`
+    samples in a row is taken out of the ring, moving its instances to the
+    other loops; it is put back once on time again, no sooner than
+    ``delivery.listener_lag_cooldown`` seconds later. The last loop in the
+    ring is never taken out.
+    """
+
+    def __init__(
+        self,
+        config: ConfigDict,
+        registry: ConnectorRegistry,
+        store: ConnectorStore,
+        on_message: Callable[[InboundMessage | StatusUpdate], None],
+        shards: ShardOwnership | None = None,
+        transport: HttpTransport | None = None,
+        *,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        delivery_config = config.get('delivery') or {}
+        count = max(
+            1, int(delivery_config.get('listener_loops', DEFAULT_LISTENER_LOOPS))
+        )
+        self._lag_threshold = float(
+            delivery_config.get('listener_lag_threshold', DEFAULT_LAG_THRESHOLD)
+        )
+        self._lag_cooldown = float(
+            delivery_config.get('listener_lag_cooldown', DEFAULT_LAG_COOLDOWN)
+        )
+        lag_interval = float(
+            delivery_config.get('listener_lag_interval', DEFAULT_LAG_INTERVAL)
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ring = HashRing(range(count))
+        self._slow_samples = [0] * count
+        # Loops taken out of the ring, with the time they were taken out
+        self._lagging: dict[int, float] = {}
+        self._runners = [
+            ListenerRunner(
+                config,
+                registry,
+                store,
+                on_message,
+                shards=shards,
+                transport=transport,
+                index=index,
+                assigned=functools.partial(self._is_assigned, index),
+                on_lag=self._on_lag,
+                lag_interval=lag_interval,
+            )
+            for index in range(count)
+        ]
+
+    @property
+    def runners(self) -> list[ListenerRunner]:
+        return list(self._runners)
+
+    @property
+    def is_running(self) -> bool:
+        return all(runner.is_running for runner in self._runners)
+
+    @property
+    def restart_count(self) -> int:
+        return sum(runner.restart_count for runner in self._runners)
+
+    @property
+    def loop_status(self) -> list[dict[str, object]]:
+        return [
+            {
+                'index': runner.index,
+                'running': runner.is_running,
+                'listeners': runner.listener_count,
+                'lag': round(runner.lag, 6),
+                'lagging': runner.index in self._lagging,
+                'restart_count': runner.restart_count,
+                'lag_histogram': runner.lag_histogram,
+            }
+            for runner in self._runners
+        ]
+
+    def start(self) -> None:
+        for runner in self._runners:
+            runner.start()
+
+    def shutdown(self) -> None:
+        for runner in self._runners:
+            runner.shutdown()
+
+    def resync(self) -> None:
+        for runner in self._runners:
+            runner.resync()
+
+    def _is_assigned(self, index: int, key: CacheKey) -> bool:
+        return self._ring.get(':'.join(key)) == index
+
+    def _on_lag(self, index: int, lag: float) -> None:
+        with self._lock:
+            if lag > self._lag_threshold:
+                self._slow_samples[index] += 1
+            else:
+                self._slow_samples[index] = 0
+            if not self._update_lagging(index, lag):
+                return
+            self._ring = HashRing(
+                i for i in range(len(self._runners)) if i not in self._lagging
+            )
+        self.resync()
+
+    def _update_lagging(self, index: int, lag: float) -> bool:
+        now = self._clock()
+        if index in self._lagging:
+            cooled_down = now - self._lagging[index] >= self._lag_cooldown
+            if self._slow_samples[index] or not cooled_down:
+                return False
+            del self._lagging[index]
+            logger.info('Listener loop %d back on time, reassigning listeners', index)
+            return True
+
+        if self._slow_samples[index] < LAG_SAMPLES:
+            return False
+        if len(self._lagging) >= len(self._runners) - 1:
+            return False
+        self._lagging[index] = now
+        logger.warning(
+            'Listener loop %d is %.3fs late, moving its listeners to other loops',
+            index,
+            lag,
+        )
+        return True
+
+
 class NullRunner:
     is_running = True
     in_flight_count = 0
     restart_count = 0
+    rate_limits: dict[str, dict[str, float]] = {}
+    tenant_queues: dict[str, dict[str, int]] = {}
+    dedup_stats: dict[str, float] = {}
+    shard_status: dict[str, object] = {}
+    loop_status: list[dict[str, object]] = []
 
     def start(self) -> None:
         pass
@@ -0,0 +1,202 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import random
+import threading
+import zlib
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock keys: (SHARD_LOCK_CLASS, 0) is held shared by every member,
+# (SHARD_LOCK_CLASS, shard + 1) exclusively by the owner of the shard
+SHARD_LOCK_CLASS: int = 0x63686174
+
+_MEMBERS_QUERY = """
+SELECT count(DISTINCT pid) FROM pg_locks
+WHERE locktype = 'advisory'
+  AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+  AND classid = $1 AND objid = 0 AND objsubid = 2 AND granted
+"""
+_HELD_SHARDS_QUERY = """
+SELECT objid::int - 1 FROM pg_locks
+WHERE locktype = 'advisory'
+  AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+  AND classid = $1 AND objid > 0 AND objsubid = 2 AND granted
+"""
+
+
+def shard_of(tenant_uuid: str, backend: str, shard_count: int) -> int:
+    """Stable shard of a ``(tenant_uuid, backend)`` pair, same on every node."""
+    return zlib.crc32(f'{tenant_uuid}:{backend}'.encode()) % shard_count
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little'
+    )
+
+
+class HashRing:
+    """Consistent hashing of keys over members, with virtual nodes.
+
+    Taking a member out only moves the keys it held, spread over the
+    remaining members; every other key stays on its member.
+    """
+
+    def __init__(self, members: Iterable[int], replicas: int = 64) -> None:
+        points = sorted(
+            (_ring_hash(f'{member}-{replica}'), member)
+            for member in set(members)
+            for replica in range(replicas)
+        )
+        if not points:
+            raise ValueError('A hash ring needs at least one member')
+        self._hashes = [point for point, _ in points]
+        self._members = [member for _, member in points]
+
+    @property
+    def members(self) -> frozenset[int]:
+        return frozenset(self._members)
+
+    def get(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._hashes)
+        return self._members[index]
+
+
+class ShardOwnership:
+    """Shards of ``(tenant_uuid, backend)`` pairs owned by this instance.
+
+    With a ``shard_count`` of ``1`` sharding is disabled and every pair is
+    owned. Otherwise nothing is owned until a :class:`ShardCoordinator`
+    claims shards. Reads are safe from any thread; listeners are called
+    from the thread updating the ownership.
+    """
+
+    def __init__(self, shard_count: int = 1) -> None:
+        self.shard_count = max(1, shard_count)
+        self._owned: frozenset[int] = (
+            frozenset() if self.enabled else frozenset(range(self.shard_count))
+        )
+        self._members = 0 if self.enabled else 1
+        self._listeners: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.shard_count > 1
+
+    @property
+    def owned(self) -> frozenset[int]:
+        return self._owned
+
+    def owns(self, tenant_uuid: str, backend: str) -> bool:
+        if not self.enabled:
+            return True
+        return shard_of(tenant_uuid, backend, self.shard_count) in self._owned
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._listeners.append(callback)
+
+    def update(self, owned: Iterable[int], members: int) -> None:
+        owned = frozenset(owned)
+        changed = owned != self._owned
+        self._owned, self._members = owned, members
+        if not changed:
+            return
+
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception('Shard ownership listener %r failed', callback)
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            'count': self.shard_count,
+            'members': self._members,
+            'owned': sorted(self._owned),
+        }
+
+
+class ShardCoordinator:
+    """Claim shards with session advisory locks held on one connection.
+
+    Each member holds the shared membership lock and aims for an equal
+    share of the shards: members above their share release shards, members
+    below it take free ones. Locks go away with the connection, so the
+    shards of a member that left are taken over on the next rebalance.
+    """
+
+    def __init__(
+        self,
+        ownership: ShardOwnership,
+        *,
+        random_generator: random.Random | None = None,
+    ) -> None:
+        self._ownership = ownership
+        # Members start looking for free shards at different places
+        self._offset = (random_generator or random).randrange(ownership.shard_count)
+
+    async def join(self, connection: asyncpg.Connection) -> None:
+        await connection.execute(
+            'SELECT pg_advisory_lock_shared($1, 0)', SHARD_LOCK_CLASS
+        )
+
+    async def rebalance(
+        self, connection: asyncpg.Connection
+    ) -> tuple[set[int], set[int]]:
+        """Release or claim shards toward this member's share.
+
+        Returns the shards gained and the shards lost.
+        """
+        shard_count = self._ownership.shard_count
+        members = max(1, await connection.fetchval(_MEMBERS_QUERY, SHARD_LOCK_CLASS))
+        share = -(-shard_count // members)
+        owned = set(self._ownership.owned)
+
+        lost: set[int] = set()
+        for shard in sorted(owned, reverse=True)[: max(0, len(owned) - share)]:
+            await connection.execute(
+                'SELECT pg_advisory_unlock($1, $2)', SHARD_LOCK_CLASS, shard + 1
+            )
+            lost.add(shard)
+        owned -= lost
+
+        gained: set[int] = set()
+        if len(owned) < share:
+            held = {
+                row[0]
+                for row in await connection.fetch(_HELD_SHARDS_QUERY, SHARD_LOCK_CLASS)
+            }
+            for step in range(shard_count):
+                if len(owned) >= share:
+                    break
+                shard = (self._offset + step) % shard_count
+                if shard in held:
+                    continue
+                if await connection.fetchval(
+                    'SELECT pg_try_advisory_lock($1, $2)', SHARD_LOCK_CLASS, shard + 1
+                ):
+                    owned.add(shard)
+                    gained.add(shard)
+
+        self._ownership.update(owned, members)
+        return gained, lost
+
+    def reset(self) -> None:
+        """Forget every shard; called once the connection holding them is gone."""
+        if self._ownership.enabled:
+            self._ownership.update((), 0)
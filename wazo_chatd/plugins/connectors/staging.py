@@ -0,0 +1,118 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+from collections.abc import Callable
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from wazo_chatd.database.helpers import session_scope
+from wazo_chatd.plugins.connectors.exceptions import (
+    ConnectorBackpressureError,
+    ConnectorTransientError,
+)
+from wazo_chatd.plugins.connectors.types import InboundMessage, StatusUpdate
+
+if TYPE_CHECKING:
+    from wazo_chatd.database.queries import DAO
+
+logger = logging.getLogger(__name__)
+
+DEPTH_REFRESH_INTERVAL: float = 1.0
+
+
+def encode_event(event: InboundMessage | StatusUpdate) -> tuple[str, dict[str, Any]]:
+    payload = dataclasses.asdict(event)
+    match event:
+        case InboundMessage():
+            payload['group_participants'] = list(event.group_participants)
+            return 'message', payload
+        case StatusUpdate():
+            return 'status', payload
+        case _:
+            raise TypeError(f'Unexpected event type: {type(event).__name__}')
+
+
+def decode_event(kind: str, payload: dict[str, Any]) -> InboundMessage | StatusUpdate:
+    match kind:
+        case 'message':
+            return InboundMessage(
+                **{
+                    **payload,
+                    'group_participants': tuple(payload['group_participants']),
+                }
+            )
+        case 'status':
+            return StatusUpdate(**payload)
+        case _:
+            raise ValueError(f'Unexpected staged event kind: {kind!r}')
+
+
+class InboundStaging:
+    """Durable hand-off of webhook events to the delivery runner.
+
+    :meth:`append` commits the event before the webhook is acknowledged,
+    so an accepted event survives a full runner queue or a restart. Once
+    ``high_water_mark`` events are waiting, webhooks are refused with
+    :class:`ConnectorBackpressureError` until the runner catches up.
+    """
+
+    def __init__(
+        self,
+        dao: DAO,
+        *,
+        high_water_mark: int,
+        retry_after: float,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._dao = dao
+        self._high_water_mark = high_water_mark
+        self._retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._depth_checked_at: float | None = None
+
+    def append(self, tenant_uuid: str, event: InboundMessage | StatusUpdate) -> None:
+        if self._depth_estimate() >= self._high_water_mark:
+            raise ConnectorBackpressureError(
+                f'{self._high_water_mark} inbound events already staged',
+                retry_after=self._retry_after,
+            )
+
+        kind, payload = encode_event(event)
+        try:
+            with session_scope():
+                self._dao.connector_inbound.add(
+                    tenant_uuid, event.backend, kind, payload
+                )
+        except SQLAlchemyError as exc:
+            raise ConnectorTransientError(f'Failed to stage {event}') from exc
+
+        with self._lock:
+            self._depth += 1
+
+    def _depth_estimate(self) -> int:
+        # Counted at most once per interval; appends in between are added
+        with self._lock:
+            now = self._clock()
+            checked_at = self._depth_checked_at
+            if checked_at is not None and now - checked_at < DEPTH_REFRESH_INTERVAL:
+                return self._depth
+            self._depth_checked_at = now
+
+        try:
+            with session_scope():
+                depth = self._dao.connector_inbound.count(limit=self._high_water_mark)
+        except SQLAlchemyError as exc:
+            raise ConnectorTransientError('Failed to count staged events') from exc
+
+        with self._lock:
+            self._depth = depth
+        return depth
@@ -5,11 +5,14 @@ from __future__ import annotations
 
 import asyncio
 import concurrent.futures
+import functools
+import hashlib
+import json
 import logging
 import random
 import threading
 import time
-from collections.abc import Iterable, Iterator
+from collections.abc import Callable, Iterable, Iterator
 from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Any
 
@@ -26,35 +29,80 @@ from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
 if TYPE_CHECKING:
     from wazo_auth_client import Client as AuthClient
 
+    from wazo_chatd.plugins.connectors.transport import HttpTransport
+
 CacheKey = tuple[str, str]
 
 DEFAULT_CACHE_TTL: float = 300.0
-POPULATE_CONCURRENCY: int = 20
+DEFAULT_REFRESH_AHEAD: float = 0.2
+DEFAULT_MAX_STALE: float = 3600.0
+DEFAULT_FETCH_CONCURRENCY: int = 20
 POPULATE_FETCH_TIMEOUT: float = 30.0
+REFRESH_POLL_INTERVAL: float = 5.0
+REFRESH_RETRY_INTERVAL: float = 30.0
 TTL_JITTER: float = 0.2
 
 logger = logging.getLogger(__name__)
 
 
+def _config_hash(provider_config: dict[str, Any]) -> str:
+    encoded = json.dumps(provider_config, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
 class ConnectorStore:
+    """Connector instances by ``(tenant_uuid, backend)``, built from wazo-auth.
+
+    Instances expire after a jittered ``cache_ttl``. Once started, the store
+    refreshes them in the background during the last ``refresh_ahead`` share
+    of their lifetime, so readers keep being served without waiting for
+    wazo-auth. An instance is only rebuilt when its provider config changed.
+    While wazo-auth is unavailable, expired instances keep being served, up
+    to ``max_stale`` seconds after expiry, and their refresh is retried every
+    :data:`REFRESH_RETRY_INTERVAL` seconds.
+
+    Instances are fetched on a pool of ``fetch_concurrency`` threads, kept
+    for the lifetime of the store. Concurrent fetches of an instance, from
+    threads or event loops, share a single request to wazo-auth.
+    """
+
     def __init__(
         self,
         auth_client: AuthClient,
         registry: ConnectorRegistry,
         cache_ttl: float = DEFAULT_CACHE_TTL,
         connectors_config: dict[str, Any] | None = None,
+        transport: HttpTransport | None = None,
+        *,
+        refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+        max_stale: float = DEFAULT_MAX_STALE,
+        fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
     ) -> None:
         self._auth_client = auth_client
         self._registry = registry
         self._cache_ttl = cache_ttl
+        self._refresh_ahead = min(max(refresh_ahead, 0.0), 1.0)
+        self._max_stale = max_stale
         self._connectors_config = connectors_config or {}
+        self._transport = transport
         self._cache: dict[CacheKey, Connector] = {}
         self._expires_at: dict[CacheKey, float] = {}
+        self._refresh_at: dict[CacheKey, float] = {}
+        self._config_hashes: dict[CacheKey, str] = {}
         self._cache_epoch: dict[CacheKey, int] = {}
         self._populated: concurrent.futures.Future[None] = concurrent.futures.Future()
         self._populate_lock = threading.Lock()
         self._pending_fetches: dict[CacheKey, concurrent.futures.Future[Connector]] = {}
         self._fetch_lock = threading.Lock()
+        self._fetch_pool = ThreadPoolExecutor(
+            max_workers=max(1, fetch_concurrency),
+            thread_name_prefix='connector-store-fetch',
+        )
+        self._refreshing: set[CacheKey] = set()
+        self._refresher: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._listeners: list[Callable[[], None]] = []
+        self._refreshed = self._rebuilt = self._refresh_failed = 0
 
     def __len__(self) -> int:
         return len(self._cache)
@@ -71,6 +119,47 @@ class ConnectorStore:
             return False
         return self._populated.exception() is None
 
+    @property
+    def stats(self) -> dict[str, int]:
+        now = time.monotonic()
+        with self._fetch_lock:
+            stale = sum(1 for at in self._expires_at.values() if at < now)
+            return {
+                'size': len(self._cache),
+                'stale': stale,
+                'fetching': len(self._pending_fetches),
+                'refreshed': self._refreshed,
+                'rebuilt': self._rebuilt,
+                'refresh_failed': self._refresh_failed,
+            }
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` when a refresh rebuilt or dropped an instance."""
+        with self._fetch_lock:
+            self._listeners.append(callback)
+
+    def start(self) -> None:
+        if self._refresher is not None:
+            return
+        self._stopped.clear()
+        self._refresher = threading.Thread(
+            target=self._run_refresher,
+            daemon=True,
+            name='connector-store-refresher',
+        )
+        self._refresher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+        with self._fetch_lock:
+            pending = list(self._pending_fetches.values())
+        for future in pending:
+            future.cancel()
+
     def peek(self, backend: str, tenant_uuid: str) -> Connector | None:
         return self._cache.get((tenant_uuid, backend))
 
@@ -126,105 +215,247 @@ class ConnectorStore:
         self._fetch_batch(set(pairs))
 
     def _fetch_batch(self, pairs: set[tuple[str, str]]) -> None:
-        # At scale, consider direct async httpx (bypasses the
-        # wazo_auth_client sync pool) — trades off wire-format coupling.
         if not pairs:
             return
 
-        pool = ThreadPoolExecutor(
-            max_workers=POPULATE_CONCURRENCY,
-            thread_name_prefix='connector-store-populate',
+        futures = {
+            self._start_fetch(backend, tenant_uuid)[0]: (tenant_uuid, backend)
+            for tenant_uuid, backend in pairs
+        }
+        done, not_done = concurrent.futures.wait(
+            futures, timeout=POPULATE_FETCH_TIMEOUT
         )
-        try:
-            futures = {
-                pool.submit(self.find, backend, tenant_uuid): (tenant_uuid, backend)
-                for tenant_uuid, backend in pairs
-            }
-            _, not_done = concurrent.futures.wait(
-                futures, timeout=POPULATE_FETCH_TIMEOUT
-            )
-            for future in not_done:
+        for future in done:
+            if not future.cancelled() and (exc := future.exception()) is not None:
                 tenant_uuid, backend = futures[future]
-                logger.warning(
-                    'Populate timed out after %.0fs for backend %r tenant %s',
-                    POPULATE_FETCH_TIMEOUT,
-                    backend,
-                    tenant_uuid,
-                )
-        finally:
-            pool.shutdown(wait=False, cancel_futures=True)
+                self._log_fetch_error(backend, tenant_uuid, exc)
+        for future in not_done:
+            tenant_uuid, backend = futures[future]
+            logger.warning(
+                'Populate timed out after %.0fs for backend %r tenant %s',
+                POPULATE_FETCH_TIMEOUT,
+                backend,
+                tenant_uuid,
+            )
 
     def drop(self, backend: str, tenant_uuid: str) -> None:
         key = (tenant_uuid, backend)
         with self._fetch_lock:
-            self._cache.pop(key, None)
-            self._expires_at.pop(key, None)
+            self._forget(key)
             if key in self._pending_fetches:
                 self._cache_epoch[key] = self._cache_epoch.get(key, 0) + 1
 
     def get(self, backend: str, tenant_uuid: str) -> Connector:
         if (cached := self._get_cached(backend, tenant_uuid)) is not None:
             return cached
-        return self._fetch(backend, tenant_uuid)
+        future, is_leader = self._start_fetch(backend, tenant_uuid, inline=True)
+        if is_leader:
+            self._run_fetch(future, backend, tenant_uuid)
+        return future.result()
+
+    async def aget(self, backend: str, tenant_uuid: str) -> Connector:
+        """Like :meth:`get`, without blocking the event loop."""
+        if (cached := self._get_cached(backend, tenant_uuid)) is not None:
+            return cached
+        future, _ = self._start_fetch(backend, tenant_uuid)
+        # Shielded, so a cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(asyncio.wrap_future(future))
 
     def find(self, backend: str, tenant_uuid: str) -> Connector | None:
         try:
             return self.get(backend, tenant_uuid)
-        except UnknownBackendException:
-            logger.warning(
-                'Unknown backend %r referenced for tenant %s', backend, tenant_uuid
-            )
-        except BackendNotConfiguredException:
-            logger.debug(
-                'No auth config for backend %r tenant %s', backend, tenant_uuid
-            )
-        except AuthServiceUnavailableException:
-            logger.error(
-                'Failed to fetch auth config for backend %r tenant %s',
-                backend,
-                tenant_uuid,
-            )
-        except Exception:
-            logger.exception(
-                'Failed to instantiate backend %r for tenant %s', backend, tenant_uuid
-            )
+        except Exception as e:
+            self._log_fetch_error(backend, tenant_uuid, e)
         return None
 
     async def refresh(self, backend: str, tenant_uuid: str) -> Connector | None:
-        return await asyncio.to_thread(self.find, backend, tenant_uuid)
+        try:
+            return await self.aget(backend, tenant_uuid)
+        except Exception as e:
+            self._log_fetch_error(backend, tenant_uuid, e)
+        return None
+
+    def _log_fetch_error(
+        self, backend: str, tenant_uuid: str, exc: BaseException
+    ) -> None:
+        match exc:
+            case UnknownBackendException():
+                logger.warning(
+                    'Unknown backend %r referenced for tenant %s', backend, tenant_uuid
+                )
+            case BackendNotConfiguredException():
+                logger.debug(
+                    'No auth config for backend %r tenant %s', backend, tenant_uuid
+                )
+            case AuthServiceUnavailableException():
+                logger.error(
+                    'Failed to fetch auth config for backend %r tenant %s',
+                    backend,
+                    tenant_uuid,
+                )
+            case _:
+                logger.error(
+                    'Failed to instantiate backend %r for tenant %s',
+                    backend,
+                    tenant_uuid,
+                    exc_info=exc,
+                )
+
+    def _run_refresher(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                timeout = self._refresh_due()
+            except Exception:
+                logger.exception('Failed to schedule connector refreshes')
+                timeout = REFRESH_POLL_INTERVAL
+            self._stopped.wait(timeout)
+
+    def _refresh_due(self) -> float:
+        """Submit the refresh of due instances.
+
+        Returns the number of seconds until the next refresh is due.
+        """
+        now = time.monotonic()
+        with self._fetch_lock:
+            due = [
+                key
+                for key, at in self._refresh_at.items()
+                if at <= now and key not in self._refreshing
+            ]
+            self._refreshing.update(due)
+            upcoming = [at - now for at in self._refresh_at.values() if at > now]
+
+        for key in due:
+            tenant_uuid, backend = key
+            previous = self._cache.get(key)
+            future, _ = self._start_fetch(backend, tenant_uuid, refresh=True)
+            future.add_done_callback(
+                functools.partial(self._on_refreshed, key, previous)
+            )
+
+        return min([REFRESH_POLL_INTERVAL, *upcoming])
+
+    def _on_refreshed(
+        self,
+        key: CacheKey,
+        previous: Connector | None,
+        future: concurrent.futures.Future[Connector],
+    ) -> None:
+        tenant_uuid, backend = key
+        changed = False
+        match None if future.cancelled() else future.exception():
+            case UnknownBackendException() | BackendNotConfiguredException():
+                logger.info(
+                    'Connector %r no longer configured for tenant %s',
+                    backend,
+                    tenant_uuid,
+                )
+                self.drop(backend, tenant_uuid)
+                changed = previous is not None
+            case Exception() as exc:
+                logger.warning(
+                    'Failed to refresh connector %r for tenant %s, '
+                    'serving the current instance: %s',
+                    backend,
+                    tenant_uuid,
+                    exc,
+                )
+                with self._fetch_lock:
+                    self._refresh_failed += 1
+                    if key in self._refresh_at:
+                        self._refresh_at[key] = time.monotonic() + min(
+                            REFRESH_RETRY_INTERVAL, self._cache_ttl
+                        )
+            case None if not future.cancelled():
+                changed = future.result() is not previous
+                with self._fetch_lock:
+                    self._refreshed += 1
+                    if changed:
+                        self._rebuilt += 1
+
+        with self._fetch_lock:
+            self._refreshing.discard(key)
+        if changed:
+            self._notify_listeners()
+
+    def _notify_listeners(self) -> None:
+        with self._fetch_lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback()
+            except Exception:
+                logger.exception('Connector store listener %r failed', callback)
+
+    def _forget(self, key: CacheKey) -> None:
+        self._cache.pop(key, None)
+        self._expires_at.pop(key, None)
+        self._refresh_at.pop(key, None)
+        self._config_hashes.pop(key, None)
 
     def _get_cached(self, backend: str, tenant_uuid: str) -> Connector | None:
         key = (tenant_uuid, backend)
-        if time.monotonic() > self._expires_at.get(key, 0.0):
+        expires_at = self._expires_at.get(key, 0.0) + self._max_stale
+        if time.monotonic() > expires_at:
             return None
         return self._cache.get(key)
 
-    def _fetch(self, backend: str, tenant_uuid: str) -> Connector:
+    def _start_fetch(
+        self,
+        backend: str,
+        tenant_uuid: str,
+        *,
+        inline: bool = False,
+        refresh: bool = False,
+    ) -> tuple[concurrent.futures.Future[Connector], bool]:
+        """Join the pending fetch of an instance, or start a new one.
+
+        A new fetch runs on the fetch pool, or is left for the caller to run
+        with :meth:`_run_fetch` when ``inline``. Unless ``refresh``, a cached
+        instance is returned as a completed fetch. Returns the fetch and
+        whether it was started by this call.
+        """
         key = (tenant_uuid, backend)
-        is_leader = False
-
         with self._fetch_lock:
-            if (cached := self._get_cached(backend, tenant_uuid)) is not None:
-                return cached
+            cached = None if refresh else self._get_cached(backend, tenant_uuid)
+            if cached is not None:
+                done: concurrent.futures.Future[Connector] = concurrent.futures.Future()
+                done.set_result(cached)
+                return done, False
+
+            if (pending := self._pending_fetches.get(key)) is not None:
+                return pending, False
 
-            if (future := self._pending_fetches.get(key)) is None:
-                future = concurrent.futures.Future()
-                self._pending_fetches[key] = future
-                is_leader = True
+            future = self._pending_fetches[key] = concurrent.futures.Future()
 
-        if not is_leader:
-            return future.result()
+        future.add_done_callback(functools.partial(self._end_fetch, key))
+        if not inline:
+            try:
+                self._fetch_pool.submit(self._run_fetch, future, backend, tenant_uuid)
+            except RuntimeError as e:
+                # Fetch pool shut down with the store
+                future.set_exception(e)
+        return future, True
 
+    def _run_fetch(
+        self,
+        future: concurrent.futures.Future[Connector],
+        backend: str,
+        tenant_uuid: str,
+    ) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
         try:
-            instance = self._do_fetch(backend, tenant_uuid)
-            future.set_result(instance)
-            return instance
+            future.set_result(self._do_fetch(backend, tenant_uuid))
         except BaseException as exc:
             future.set_exception(exc)
-            raise
-        finally:
-            with self._fetch_lock:
-                self._pending_fetches.pop(key, None)
+
+    def _end_fetch(
+        self, key: CacheKey, future: concurrent.futures.Future[Connector]
+    ) -> None:
+        with self._fetch_lock:
+            if self._pending_fetches.get(key) is future:
+                del self._pending_fetches[key]
                 self._cache_epoch.pop(key, None)
 
     def _do_fetch(self, backend: str, tenant_uuid: str) -> Connector:
@@ -244,10 +475,9 @@ class ConnectorStore:
                     )
                 )
             except HTTPError as e:
-                with self._fetch_lock:
-                    self._cache.pop(key, None)
-                    self._expires_at.pop(key, None)
                 if getattr(e.response, 'status_code', None) == 404:
+                    with self._fetch_lock:
+                        self._forget(key)
                     raise BackendNotConfiguredException(backend, tenant_uuid)
                 raise AuthServiceUnavailableException()
             except RequestException:
@@ -255,18 +485,36 @@ class ConnectorStore:
         else:
             provider_config = {}
 
-        backend_cls = self._registry.get_backend(backend)
-        connector_config = self._connectors_config.get(backend, {})
-        instance = backend_cls(tenant_uuid, provider_config, connector_config)
+        config_hash = _config_hash(provider_config)
+        with self._fetch_lock:
+            instance = self._cache.get(key)
+            if self._config_hashes.get(key) != config_hash:
+                instance = None
+
+        unchanged = instance is not None
+        if instance is None:
+            backend_cls = self._registry.get_backend(backend)
+            connector_config = dict(self._connectors_config.get(backend) or {})
+            if self._transport is not None:
+                connector_config['http_client'] = self._transport.client(backend)
+            instance = backend_cls(tenant_uuid, provider_config, connector_config)
 
         with self._fetch_lock:
             cached = self._cache_epoch.get(key, 0) == epoch_before
             if cached:
+                now = time.monotonic()
                 jitter = random.uniform(1.0 - TTL_JITTER, 1.0 + TTL_JITTER)
+                lifetime = self._cache_ttl * jitter
                 self._cache[key] = instance
-                self._expires_at[key] = time.monotonic() + self._cache_ttl * jitter
+                self._config_hashes[key] = config_hash
+                self._expires_at[key] = now + lifetime
+                self._refresh_at[key] = now + lifetime * (1.0 - self._refresh_ahead)
 
-        if cached:
+        if cached and unchanged:
+            logger.debug(
+                'Connector config of %r unchanged for tenant %s', backend, tenant_uuid
+            )
+        elif cached:
             logger.info(
                 'Loaded connector instance %r for tenant %s', backend, tenant_uuid
             )
@@ -37,4 +37,38 @@ class TestBusEventHandler(unittest.TestCase):
             'auth_external_auth_added': handler.on_external_auth_changed,
             'auth_external_auth_updated': handler.on_external_auth_changed,
             'auth_external_auth_deleted': handler.on_external_auth_changed,
+            'chatd_user_identity_created': handler.on_user_identity_changed,
+            'chatd_user_identity_updated': handler.on_user_identity_changed,
+            'chatd_user_identity_deleted': handler.on_user_identity_changed,
+            'chatd_user_room_created': handler.on_room_created,
         }
+
+    def test_on_user_identity_changed_invalidates_resolution(self) -> None:
+        router = Mock()
+        handler = BusEventHandler(Mock(), router)
+        payload = {
+            'uuid': 'identity-uuid',
+            'backend': 'sms_backend',
+            'type': 'sms',
+            'identity': '+15551234',
+        }
+
+        handler.on_user_identity_changed(payload)
+
+        router.invalidate_identity.assert_called_once_with('identity-uuid', '+15551234')
+
+    def test_on_room_created_invalidates_room(self) -> None:
+        router = Mock()
+        handler = BusEventHandler(Mock(), router)
+        payload = {
+            'uuid': 'room-uuid',
+            'tenant_uuid': 'tenant-uuid',
+            'name': None,
+            'users': [{'uuid': 'user-1'}, {'uuid': 'user-2'}],
+        }
+
+        handler.on_room_created(payload)
+
+        router.invalidate_room.assert_called_once_with(
+            'room-uuid', 'tenant-uuid', ['user-1', 'user-2']
+        )
@@ -6,18 +6,27 @@ from __future__ import annotations
 import time
 import unittest
 from collections.abc import Callable, Mapping
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Any, ClassVar
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 
 from wazo_chatd.database.async_helpers import _current_session
 from wazo_chatd.database.delivery import DeliveryStatus
-from wazo_chatd.database.models import DeliveryRecord
+from wazo_chatd.database.models import (
+    DeliveryRecord,
+    MessageDelivery,
+    MessageMeta,
+    Room,
+    RoomMessage,
+)
 from wazo_chatd.exceptions import DuplicateExternalIdException
 from wazo_chatd.plugin_helpers.tenant import make_uuid5
+from wazo_chatd.plugins.connectors.connector import BatchConnector, Connector
 from wazo_chatd.plugins.connectors.exceptions import (
     ConnectorRateLimited,
     ConnectorSendError,
@@ -29,6 +38,7 @@ from wazo_chatd.plugins.connectors.executor import (
     DeliveryExecutor,
 )
 from wazo_chatd.plugins.connectors.helpers import generate_message_signature
+from wazo_chatd.plugins.connectors.ratelimit import RateLimiter
 from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
 from wazo_chatd.plugins.connectors.store import ConnectorStore
 from wazo_chatd.plugins.connectors.types import (
@@ -53,6 +63,17 @@ def _mock_add_delivery_record() -> AsyncMock:
     return AsyncMock(side_effect=_side_effect)
 
 
+def _mock_session() -> AsyncMock:
+    @asynccontextmanager
+    async def _savepoint():
+        yield
+
+    session = AsyncMock()
+    session.add = Mock()
+    session.begin_nested = Mock(side_effect=_savepoint)
+    return session
+
+
 def _make_outbound(message_uuid: str = 'delivery-1') -> OutboundMessage:
     return OutboundMessage(
         room_uuid='room-uuid',
@@ -66,6 +87,13 @@ def _make_outbound(message_uuid: str = 'delivery-1') -> OutboundMessage:
     )
 
 
+async def _route_outbound(
+    executor: DeliveryExecutor, delivery_id: str = '1'
+) -> float | None:
+    retry_delays = await executor.route_outbound_deliveries([delivery_id])
+    return retry_delays.get(delivery_id)
+
+
 class _FakeConnector:
     backend: ClassVar[str] = 'sms_backend'
     supported_types: ClassVar[tuple[str, ...]] = ('sms',)
@@ -106,7 +134,7 @@ class _FakeConnector:
 
 
 class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
-    """Covers the send + record-outcome path of route_outbound_delivery.
+    """Covers the send + record-outcome path of route_outbound_deliveries.
 
     Tests build a fully-resolved meta (with recipient identity already
     known) so they exercise the connector dispatch + retry decision in
@@ -114,8 +142,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
     """
 
     def setUp(self) -> None:
-        self.session = AsyncMock()
-        self.session.add = Mock()
+        self.session = _mock_session()
         self.token = _current_session.set(self.session)
 
         self.registry = Mock()
@@ -161,20 +188,20 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         self.meta.extra = {}
         self.meta.deliveries = [self.delivery]
         self.delivery.meta = self.meta
-        self.executor._dao.room.get_message_delivery = AsyncMock(
-            return_value=self.delivery
+        self.executor._dao.room.get_message_deliveries = AsyncMock(
+            return_value=[self.delivery]
         )
 
     def tearDown(self) -> None:
         _current_session.reset(self.token)
 
     async def test_success_writes_external_id(self) -> None:
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         assert self.delivery.external_id == 'ext-msg-id-123'
 
     async def test_success_writes_accepted_only(self) -> None:
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         dao_mock = self.executor._dao.room.add_delivery_record
         statuses = [call.args[1].value for call in dao_mock.call_args_list]
@@ -183,7 +210,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
     async def test_failure_increments_retry(self) -> None:
         self.connector.send_side_effect = ConnectorSendError('timeout')
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         assert self.delivery.retry_count == 1
 
@@ -191,7 +218,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         self.connector.send_side_effect = ConnectorSendError('timeout')
         self.delivery.retry_count = OUTBOUND_MAX_RETRIES
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         dao_mock = self.executor._dao.room.add_delivery_record
         statuses = [call.args[1].value for call in dao_mock.call_args_list]
@@ -201,7 +228,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         self.connector.send_side_effect = ConnectorSendError('timeout')
         self.delivery.retry_count = OUTBOUND_MAX_RETRIES - 1
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result == float(OUTBOUND_RETRY_DELAYS[-1])
         dao_mock = self.executor._dao.room.add_delivery_record
@@ -210,14 +237,14 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         assert DeliveryStatus.DEAD_LETTER.value not in statuses
 
     async def test_publishes_status_event(self) -> None:
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         self.notifier.delivery_status_updated.assert_awaited_once()
 
     async def test_unexpected_error_treated_as_failure(self) -> None:
         self.connector.send_side_effect = RuntimeError('SDK crashed')
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         assert self.delivery.retry_count == 1
         dao_mock = self.executor._dao.room.add_delivery_record
@@ -225,14 +252,14 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         assert DeliveryStatus.RETRYING.value in statuses
 
     async def test_success_returns_no_retry(self) -> None:
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result is None
 
     async def test_retrying_returns_next_retry_delay(self) -> None:
         self.connector.send_side_effect = ConnectorSendError('timeout')
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result == pytest.approx(30.0)
 
@@ -241,7 +268,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
             'rate limited', retry_after=42.0
         )
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result == pytest.approx(42.0)
 
@@ -250,7 +277,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
             'rate limited', retry_after=999_999.0
         )
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result == pytest.approx(3600.0)
 
@@ -259,8 +286,22 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
             'rate limited', retry_after=10.0
         )
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
+
+        assert self.delivery.retry_count == 1
+
+    async def test_rate_limited_holds_back_next_send_without_retry(self) -> None:
+        self.connector.send_side_effect = ConnectorRateLimited(
+            'rate limited', retry_after=42.0
+        )
+        await _route_outbound(self.executor)
+        self.connector.send_side_effect = None
+        self.connector.last_sent = None
+
+        result = await _route_outbound(self.executor)
 
+        assert result == pytest.approx(42.0, abs=1.0)
+        assert self.connector.last_sent is None
         assert self.delivery.retry_count == 1
 
     async def test_rate_limited_writes_retrying_status(self) -> None:
@@ -268,7 +309,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
             'rate limited', retry_after=10.0
         )
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         dao_mock = self.executor._dao.room.add_delivery_record
         statuses = [call.args[1].value for call in dao_mock.call_args_list]
@@ -278,14 +319,14 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
         self.connector.send_side_effect = ConnectorSendError('timeout')
         self.delivery.retry_count = OUTBOUND_MAX_RETRIES
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result is None
 
     async def test_missing_sender_identity_dead_letters_delivery(self) -> None:
         self.meta.sender_identity = None
 
-        result = await self.executor.route_outbound_delivery('1')
+        result = await _route_outbound(self.executor)
 
         assert result is None
         dao_mock = self.executor._dao.room.add_delivery_record
@@ -295,8 +336,7 @@ class TestDeliveryExecutorOutboundSend(unittest.IsolatedAsyncioTestCase):
 
 class TestDeliveryExecutorRouteOutbound(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
-        self.session = AsyncMock()
-        self.session.add = Mock()
+        self.session = _mock_session()
         self.token = _current_session.set(self.session)
 
         self.registry = Mock()
@@ -349,15 +389,202 @@ class TestDeliveryExecutorRouteOutbound(unittest.IsolatedAsyncioTestCase):
         meta.extra = {}
         meta.deliveries = [delivery]
         delivery.meta = meta
-        self.executor._dao.room.get_message_delivery = AsyncMock(return_value=delivery)
+        self.executor._dao.room.get_message_deliveries = AsyncMock(
+            return_value=[delivery]
+        )
 
-        await self.executor.route_outbound_delivery('1')
+        await _route_outbound(self.executor)
 
         sent = self.connector.last_sent
         assert sent is not None
         assert sent.recipient_identity == '+15559876'
 
 
+class _FakeBatchConnector(_FakeConnector):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: list[list[OutboundMessage]] = []
+        self.batch_results: list[str | ConnectorSendError] | None = None
+        self.batch_side_effect: Exception | None = None
+
+    def send_batch(
+        self, messages: list[OutboundMessage]
+    ) -> list[str | ConnectorSendError]:
+        self.batches.append(list(messages))
+        if self.batch_side_effect:
+            raise self.batch_side_effect
+        if self.batch_results is not None:
+            return self.batch_results
+        return [f'ext-{message.message_uuid}' for message in messages]
+
+
+def _make_outbound_delivery(delivery_id: int, tenant_uuid: str = 'tenant-uuid') -> Mock:
+    sender_record = Mock(
+        identity='+15551234',
+        tenant_uuid=tenant_uuid,
+        backend='sms_backend',
+        type_='sms',
+    )
+    message = Mock(uuid=f'msg-{delivery_id}', user_uuid='sender-uuid', content='hello')
+    message.room = Mock(uuid='room-uuid')
+
+    delivery = Mock(
+        id=delivery_id,
+        recipient_identity='+15559876',
+        external_id=None,
+        retry_count=0,
+        records=[],
+        status=DeliveryStatus.PENDING.value,
+    )
+    delivery.meta = Mock(
+        message_uuid=f'msg-{delivery_id}',
+        sender_identity=sender_record,
+        message=message,
+    )
+    return delivery
+
+
+class TestDeliveryExecutorOutboundBatch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.session = _mock_session()
+        self.token = _current_session.set(self.session)
+
+        self.store = ConnectorStore(Mock(), ConnectorRegistry())
+        self.executor = DeliveryExecutor(
+            config={'uuid': 'test-wazo-uuid'},
+            registry=Mock(),
+            notifier=AsyncMock(),
+            store=self.store,
+        )
+        self.connector = _FakeBatchConnector()
+        self._add_connector('tenant-uuid', self.connector)
+        self.executor._dao.room.add_delivery_record = _mock_add_delivery_record()
+        self.deliveries = [_make_outbound_delivery(1), _make_outbound_delivery(2)]
+        self.executor._dao.room.get_message_deliveries = AsyncMock(
+            return_value=self.deliveries
+        )
+
+    def tearDown(self) -> None:
+        _current_session.reset(self.token)
+
+    def _add_connector(self, tenant_uuid: str, connector: _FakeConnector) -> None:
+        key = (tenant_uuid, 'sms_backend')
+        self.store._cache[key] = connector  # type: ignore[assignment]
+        self.store._expires_at[key] = time.monotonic() + 300.0
+
+    async def test_claims_all_deliveries_in_one_query(self) -> None:
+        await self.executor.route_outbound_deliveries(['1', '2'])
+
+        self.executor._dao.room.get_message_deliveries.assert_awaited_once_with(
+            ['1', '2'], skip_locked=True
+        )
+
+    async def test_group_sent_through_send_batch(self) -> None:
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert result == {}
+        sent = [[m.message_uuid for m in batch] for batch in self.connector.batches]
+        assert sent == [['msg-1', 'msg-2']]
+        assert self.connector.last_sent is None
+        assert [d.external_id for d in self.deliveries] == ['ext-msg-1', 'ext-msg-2']
+
+    async def test_send_batch_failure_retries_only_failed_message(self) -> None:
+        self.connector.batch_results = [
+            'ext-1',
+            ConnectorRateLimited('rate limited', retry_after=42.0),
+        ]
+
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert result == {'2': pytest.approx(42.0)}
+        assert self.deliveries[0].external_id == 'ext-1'
+        assert self.deliveries[1].retry_count == 1
+
+    async def test_send_batch_exception_fails_whole_group(self) -> None:
+        self.connector.batch_side_effect = ConnectorSendError('unavailable')
+
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert set(result) == {'1', '2'}
+        assert [d.retry_count for d in self.deliveries] == [1, 1]
+
+    async def test_outcome_failing_to_persist_keeps_other_outcomes(self) -> None:
+        record_delivery = self.executor._dao.room.add_delivery_record
+
+        async def _add_delivery_record(delivery, status, reason=None):
+            if delivery.id == 1:
+                raise StaleDataError('delivery removed')
+            return await record_delivery(delivery, status, reason=reason)
+
+        self.executor._dao.room.add_delivery_record = AsyncMock(
+            side_effect=_add_delivery_record
+        )
+
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert result == {}
+        assert self.session.begin_nested.call_count == 2
+        assert self.deliveries[0].records == []
+        assert [r.status for r in self.deliveries[1].records] == [
+            DeliveryStatus.ACCEPTED.value
+        ]
+
+    async def test_connector_subclassing_protocol_uses_send(self) -> None:
+        class _ProtocolConnector(_FakeConnector, Connector):
+            pass
+
+        connector = _ProtocolConnector()
+        self._add_connector('tenant-uuid', connector)
+        assert not isinstance(connector, BatchConnector)
+        assert isinstance(self.connector, BatchConnector)
+
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert result == {}
+        assert connector.last_sent is not None
+        assert [d.external_id for d in self.deliveries] == [
+            'ext-msg-id-123',
+            'ext-msg-id-123',
+        ]
+
+    async def test_connector_without_send_batch_uses_send(self) -> None:
+        connector = _FakeConnector()
+        self._add_connector('tenant-uuid', connector)
+
+        await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert connector.last_sent is not None
+        assert [d.external_id for d in self.deliveries] == [
+            'ext-msg-id-123',
+            'ext-msg-id-123',
+        ]
+
+    async def test_sends_beyond_rate_are_deferred(self) -> None:
+        self.executor._rate_limiter = RateLimiter(
+            {'sms_backend': {'send_rate': 1, 'send_burst': 1}}
+        )
+        self.executor._send_max_wait = 0.0
+
+        result = await self.executor.route_outbound_deliveries(['1', '2'])
+
+        assert result == {'2': pytest.approx(1.0, abs=0.1)}
+        assert self.connector.batches == []
+        assert self.deliveries[0].external_id == 'ext-msg-id-123'
+        assert self.deliveries[1].external_id is None
+        assert self.deliveries[1].retry_count == 0
+
+    async def test_deliveries_grouped_per_tenant(self) -> None:
+        other_connector = _FakeBatchConnector()
+        self._add_connector('other-tenant', other_connector)
+        self.deliveries.append(_make_outbound_delivery(3, tenant_uuid='other-tenant'))
+
+        await self.executor.route_outbound_deliveries(['1', '2', '3'])
+
+        assert len(self.connector.batches) == 1
+        assert other_connector.batches == []
+        assert self.deliveries[2].external_id == 'ext-msg-id-123'
+
+
 def _make_inbound(
     idempotency_key: str | None = None,
 ) -> InboundMessage:
@@ -377,8 +604,7 @@ def _make_inbound(
 
 class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
-        self.session = AsyncMock()
-        self.session.add = Mock()
+        self.session = _mock_session()
         self.token = _current_session.set(self.session)
 
         self.registry = Mock()
@@ -395,7 +621,7 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         _current_session.reset(self.token)
 
     def _stub_inbound(self, resolved: dict[str, Mock], room: Mock) -> None:
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value=resolved
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -403,65 +629,99 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.executor._dao.room.find_matching_signature = AsyncMock(return_value=None)
         self.executor._dao.room.add_message = AsyncMock()
 
+    def _stub_dedup(self, *, exists: bool = False, claimed: bool = True) -> None:
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
+        room.users = [Mock(uuid='wazo-user-uuid')]
+        self._stub_inbound({'+15551234': recipient}, room)
+        self.executor._dao.connector_dedup.exists = AsyncMock(return_value=exists)
+        self.executor._dao.connector_dedup.claim = AsyncMock(return_value=claimed)
+
     async def test_route_inbound_dedup_skips_duplicate(self) -> None:
         inbound = _make_inbound(idempotency_key='existing-key')
-
-        self.executor._dao.room.check_duplicate_idempotency_key = AsyncMock(
-            return_value=True
-        )
+        self._stub_dedup(exists=True)
+        self.executor._dedup_filter.add('tenant-uuid:sms_backend:existing-key')
 
         await self.executor.route_inbound(inbound)
 
-        self.session.add.assert_not_called()
+        self.executor._dao.room.add_message.assert_not_awaited()
+        assert self.executor.dedup_stats()['duplicates'] == 1
 
-    async def test_route_inbound_dedup_scoped_to_recipient_and_backend(self) -> None:
+    async def test_route_inbound_dedup_scoped_to_tenant_and_backend(self) -> None:
         inbound = _make_inbound(idempotency_key='existing-key')
+        self._stub_dedup(exists=True)
+        self.executor._dedup_filter.add('tenant-uuid:sms_backend:existing-key')
 
-        self.executor._dao.room.check_duplicate_idempotency_key = AsyncMock(
-            return_value=True
+        await self.executor.route_inbound(inbound)
+
+        self.executor._dao.connector_dedup.exists.assert_awaited_once_with(
+            'tenant-uuid', 'sms_backend', 'existing-key'
         )
 
+    async def test_route_inbound_dedup_unseen_key_skips_lookup(self) -> None:
+        inbound = _make_inbound(idempotency_key='new-key')
+        self._stub_dedup()
+
         await self.executor.route_inbound(inbound)
 
-        self.executor._dao.room.check_duplicate_idempotency_key.assert_awaited_once()
-        call = self.executor._dao.room.check_duplicate_idempotency_key.call_args
-        assert call.args[0] == 'existing-key'
-        assert call.kwargs['recipient'] == inbound.recipient
-        assert call.kwargs['backend'] == 'sms_backend'
-        assert call.kwargs['message_type'] == inbound.message_type
-        assert call.kwargs['window_seconds'] > 0
+        self.executor._dao.connector_dedup.exists.assert_not_awaited()
+        claim = self.executor._dao.connector_dedup.claim
+        claim.assert_awaited_once()
+        assert claim.call_args.args[:3] == ('tenant-uuid', 'sms_backend', 'new-key')
+        assert claim.call_args.args[3] > timedelta(0)
+        self.executor._dao.room.add_message.assert_awaited_once()
+        assert 'tenant-uuid:sms_backend:new-key' in self.executor._dedup_filter
+        assert self.executor.dedup_stats()['lookups_skipped'] == 1
+
+    async def test_route_inbound_dedup_filter_false_positive_is_counted(self) -> None:
+        inbound = _make_inbound(idempotency_key='new-key')
+        self._stub_dedup(exists=False)
+        self.executor._dedup_filter.add('tenant-uuid:sms_backend:new-key')
+
+        await self.executor.route_inbound(inbound)
+
+        self.executor._dao.room.add_message.assert_awaited_once()
+        stats = self.executor.dedup_stats()
+        assert stats['false_positives'] == 1
+        assert stats['false_positive_rate'] == 1.0
+
+    async def test_route_inbound_dedup_claim_conflict_drops_message(self) -> None:
+        inbound = _make_inbound(idempotency_key='racing-key')
+        self._stub_dedup(claimed=False)
+
+        await self.executor.route_inbound(inbound)
+
+        self.executor._dao.room.add_message.assert_not_awaited()
+        self.notifier.message_created.assert_not_awaited()
+        assert self.executor.dedup_stats()['duplicates'] == 1
 
     async def test_route_inbound_no_dedup_key_skips_dedup_check(self) -> None:
         inbound = _make_inbound()
-
-        self.executor._dao.room.check_duplicate_idempotency_key = AsyncMock()
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
-            return_value={}
-        )
+        self._stub_dedup()
 
         await self.executor.route_inbound(inbound)
 
-        self.executor._dao.room.check_duplicate_idempotency_key.assert_not_awaited()
+        self.executor._dao.connector_dedup.exists.assert_not_awaited()
+        self.executor._dao.connector_dedup.claim.assert_not_awaited()
+        self.executor._dao.room.add_message.assert_awaited_once()
 
     async def test_route_inbound_unknown_recipient_logs_and_returns(self) -> None:
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
-            return_value={}
-        )
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(return_value={})
 
         await self.executor.route_inbound(inbound)
 
         self.session.add.assert_not_called()
 
     async def test_route_inbound_creates_message_and_meta(self) -> None:
-        recipient = Mock(uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='wazo-user-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -476,13 +736,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         assert message.meta.backend == 'sms_backend'
 
     async def test_route_inbound_publishes_message_event(self) -> None:
-        recipient = Mock(uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='wazo-user-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -496,13 +756,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
     async def test_route_inbound_publishes_room_created_event_for_new_room(
         self,
     ) -> None:
-        recipient = Mock(uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='wazo-user-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=None)
@@ -516,13 +776,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
     async def test_route_inbound_does_not_publish_room_created_for_existing_room(
         self,
     ) -> None:
-        recipient = Mock(uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='wazo-user-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -535,7 +795,7 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.executor._dao.room.create_room.assert_not_awaited()
 
     async def test_route_inbound_concurrent_serializes_room_creation(self) -> None:
-        recipient = Mock(uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='wazo-user-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='wazo-user-uuid')]
 
@@ -544,7 +804,7 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         async def fake_find(*_a: object, **_kw: object) -> Mock | None:
             return find_results.pop(0)
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(side_effect=fake_find)
@@ -562,8 +822,8 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.notifier.room_created.assert_awaited_once_with(room)
 
     async def test_route_inbound_resolves_sender_to_wazo_user(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
-        sender = Mock(uuid='sender-wazo-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        sender = Mock(user_uuid='sender-wazo-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid'), Mock(uuid='sender-wazo-uuid')]
 
@@ -578,8 +838,8 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         assert sender_participant.identity is None
 
     async def test_route_inbound_cross_tenant_sender_stays_external(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
-        sender = Mock(uuid='sender-wazo-uuid', tenant_uuid='other-tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        sender = Mock(user_uuid='sender-wazo-uuid', tenant_uuid='other-tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
@@ -596,7 +856,7 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.executor._dao.room.find_matching_signature.assert_not_awaited()
 
     async def test_route_inbound_unresolved_sender_stays_external(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
@@ -608,15 +868,59 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         sender_participant = [p for p in participants if p.identity is not None][0]
         assert sender_participant.identity == '+15559876'
 
+    async def test_route_inbound_resolution_cached(self) -> None:
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
+        room.users = [Mock(uuid='recipient-uuid')]
+        self._stub_inbound({'+15551234': recipient}, room)
+
+        await self.executor.route_inbound(_make_inbound())
+        await self.executor.route_inbound(_make_inbound())
+
+        resolve = self.executor._dao.user_identity.resolve_identities
+        resolve.assert_awaited_once()
+        self.executor._dao.room.find_room.assert_awaited_once()
+        assert self.executor._dao.room.add_message.await_count == 2
+        cached_room = self.executor._dao.room.add_message.call_args[0][0]
+        assert cached_room.uuid == 'room-uuid'
+
+    async def test_route_inbound_resolves_again_after_identity_change(self) -> None:
+        recipient = Mock(
+            uuid='identity-uuid', user_uuid='recipient-uuid', tenant_uuid='tenant-uuid'
+        )
+        room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
+        room.users = [Mock(uuid='recipient-uuid')]
+        self._stub_inbound({'+15551234': recipient}, room)
+
+        await self.executor.route_inbound(_make_inbound())
+        self.executor._resolution.forget_identity('identity-uuid', '+15550000')
+        await self.executor.route_inbound(_make_inbound())
+
+        resolve = self.executor._dao.user_identity.resolve_identities
+        assert resolve.await_count == 2
+        assert resolve.call_args.args[0] == ['+15551234']
+
+    async def test_route_inbound_new_room_not_cached(self) -> None:
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
+        room.users = [Mock(uuid='recipient-uuid')]
+        self._stub_inbound({'+15551234': recipient}, room)
+        self.executor._dao.room.find_room = AsyncMock(return_value=None)
+        self.executor._dao.room.create_room = AsyncMock(return_value=room)
+
+        await self.executor.route_inbound(_make_inbound())
+
+        assert len(self.executor._resolution.rooms) == 0
+
     async def test_route_inbound_echo_dropped(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
-        sender = Mock(uuid='sender-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        sender = Mock(user_uuid='sender-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid'), Mock(uuid='sender-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient, '+15559876': sender}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -649,8 +953,8 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.notifier.delivery_status_updated.assert_awaited_once()
 
     async def test_route_inbound_no_echo_creates_message(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
-        sender = Mock(uuid='sender-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        sender = Mock(user_uuid='sender-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid'), Mock(uuid='sender-uuid')]
 
@@ -663,13 +967,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
     async def test_route_inbound_returns_retry_delay_on_transient_failure(
         self,
     ) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -684,13 +988,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.notifier.message_created.assert_not_awaited()
 
     async def test_route_inbound_raises_after_attempts_exhausted(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -705,13 +1009,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
             )
 
     async def test_route_inbound_duplicate_external_id_dropped(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -728,13 +1032,13 @@ class TestDeliveryExecutorRouteInbound(unittest.IsolatedAsyncioTestCase):
         self.notifier.message_created.assert_not_awaited()
 
     async def test_route_inbound_external_sender_skips_dedup(self) -> None:
-        recipient = Mock(uuid='recipient-uuid', tenant_uuid='tenant-uuid')
+        recipient = Mock(user_uuid='recipient-uuid', tenant_uuid='tenant-uuid')
         room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
         room.users = [Mock(uuid='recipient-uuid')]
 
         inbound = _make_inbound()
 
-        self.executor._dao.user_identity.resolve_users_by_identities = AsyncMock(
+        self.executor._dao.user_identity.resolve_identities = AsyncMock(
             return_value={'+15551234': recipient}
         )
         self.executor._dao.room.find_room = AsyncMock(return_value=room)
@@ -806,102 +1110,161 @@ def _make_status_update(
     )
 
 
-class TestDeliveryExecutorRouteStatusUpdate(unittest.IsolatedAsyncioTestCase):
+def _make_tracked_delivery(
+    external_id: str = 'ext-123', current_status: str = 'accepted'
+) -> MessageDelivery:
+    room = Room(uuid='room-uuid', tenant_uuid='tenant-uuid')
+    message = RoomMessage(uuid='msg-uuid', user_uuid='user-1', room=room)
+    meta = MessageMeta(message_uuid='msg-uuid', message=message)
+    return MessageDelivery(
+        id=len(external_id),
+        recipient_identity='+15559876',
+        backend='test',
+        external_id=external_id,
+        current_status=current_status,
+        meta=meta,
+    )
+
+
+class TestDeliveryExecutorRouteStatusUpdates(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.session = AsyncMock()
-        self.session.add = Mock()
         self.token = _current_session.set(self.session)
 
         self.registry = Mock()
-        self.store = ConnectorStore(Mock(), ConnectorRegistry())
         self.notifier = AsyncMock()
         self.executor = DeliveryExecutor(
             config={'uuid': 'test-wazo-uuid'},
             registry=self.registry,
             notifier=self.notifier,
-            store=self.store,
+            store=ConnectorStore(Mock(), ConnectorRegistry()),
+        )
+        self.executor._dao.room.add_delivery_records = AsyncMock(
+            side_effect=self._add_records
         )
-        self.executor._dao.room.add_delivery_record = _mock_add_delivery_record()
 
     def tearDown(self) -> None:
         _current_session.reset(self.token)
 
+    @staticmethod
+    async def _add_records(records: list) -> list[DeliveryRecord]:
+        return [
+            DeliveryRecord(
+                delivery_id=delivery_id,
+                status=status.value,
+                reason=reason,
+                timestamp=FIXED_NOW,
+            )
+            for delivery_id, status, reason in records
+        ]
+
     def _register_connector(self, status_map: dict) -> None:
         backend_cls = Mock()
         backend_cls.status_map = status_map
         self.registry.get_backend.return_value = backend_cls
 
-    def _mock_meta(self) -> Mock:
-        delivery = Mock(
-            id=1,
-            recipient_identity='+15559876',
-            external_id='ext-123',
-            retry_count=0,
-            records=[],
-            status='accepted',
+    def _stub_deliveries(self, *deliveries: MessageDelivery) -> None:
+        self.executor._dao.room.get_deliveries_by_external_ids = AsyncMock(
+            return_value=list(deliveries)
         )
-        meta = Mock()
-        meta.message_uuid = 'msg-uuid'
-        meta.message = Mock()
-        meta.message.room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
-        meta.message.room.users = [Mock(uuid='user-1')]
-        meta.deliveries = [delivery]
-        delivery.meta = meta
-        self.executor._dao.room.get_message_meta_by_external_id = AsyncMock(
-            return_value=meta
-        )
-        return meta
 
-    async def test_creates_delivery_record(self) -> None:
+    async def _route(self, *updates: StatusUpdate) -> float | None:
+        return await self.executor.route_status_updates('test', updates)
+
+    async def test_creates_delivery_records_in_one_call(self) -> None:
         self._register_connector({'delivered': DeliveryStatus.DELIVERED})
-        self._mock_meta()
+        first, second = _make_tracked_delivery('SM1'), _make_tracked_delivery('SM22')
+        self._stub_deliveries(first, second)
 
-        await self.executor.route_status_update(_make_status_update())
+        await self._route(
+            _make_status_update('SM1'), _make_status_update('SM22', backend='test')
+        )
 
-        status = self.executor._dao.room.add_delivery_record.call_args.args[1]
-        assert status.value == 'delivered'
+        self.executor._dao.room.add_delivery_records.assert_awaited_once_with(
+            [
+                (first.id, DeliveryStatus.DELIVERED, None),
+                (second.id, DeliveryStatus.DELIVERED, None),
+            ]
+        )
+        lookup = self.executor._dao.room.get_deliveries_by_external_ids
+        lookup.assert_awaited_once()
+        assert set(lookup.call_args.args[1]) == {'SM1', 'SM22'}
+
+    async def test_last_status_of_external_id_wins(self) -> None:
+        self._register_connector(
+            {'sent': DeliveryStatus.SENT, 'failed': DeliveryStatus.FAILED}
+        )
+        delivery = _make_tracked_delivery()
+        self._stub_deliveries(delivery)
+
+        await self._route(
+            _make_status_update(status='sent'),
+            _make_status_update(status='failed', error_code='30003'),
+        )
+
+        self.executor._dao.room.add_delivery_records.assert_awaited_once_with(
+            [(delivery.id, DeliveryStatus.FAILED, '30003')]
+        )
 
     async def test_ignores_unmapped_status(self) -> None:
         self._register_connector({'delivered': DeliveryStatus.DELIVERED})
+        self._stub_deliveries()
 
-        await self.executor.route_status_update(_make_status_update(status='queued'))
+        await self._route(_make_status_update(status='queued'))
 
-        self.executor._dao.room.add_delivery_record.assert_not_awaited()
+        self.executor._dao.room.get_deliveries_by_external_ids.assert_not_awaited()
+        self.executor._dao.room.add_delivery_records.assert_not_awaited()
 
     async def test_drops_when_no_connector(self) -> None:
         self.registry.get_backend.side_effect = KeyError('test')
-        await self.executor.route_status_update(_make_status_update())
 
-        self.executor._dao.room.add_delivery_record.assert_not_awaited()
+        await self._route(_make_status_update())
+
+        self.executor._dao.room.add_delivery_records.assert_not_awaited()
 
-    async def test_drops_when_no_meta(self) -> None:
+    async def test_drops_unknown_external_id(self) -> None:
         self._register_connector({'delivered': DeliveryStatus.DELIVERED})
-        self.executor._dao.room.get_message_meta_by_external_id = AsyncMock(
-            return_value=None
-        )
+        self._stub_deliveries()
 
-        await self.executor.route_status_update(_make_status_update())
+        await self._route(_make_status_update())
 
-        self.executor._dao.room.add_delivery_record.assert_not_awaited()
+        self.executor._dao.room.add_delivery_records.assert_not_awaited()
+        self.notifier.delivery_statuses_updated.assert_not_awaited()
 
-    async def test_passes_error_code_as_reason(self) -> None:
-        self._register_connector({'failed': DeliveryStatus.FAILED})
-        self._mock_meta()
+    async def test_ignores_already_delivered(self) -> None:
+        self._register_connector({'sent': DeliveryStatus.SENT})
+        self._stub_deliveries(_make_tracked_delivery(current_status='delivered'))
 
-        await self.executor.route_status_update(
-            _make_status_update(status='failed', error_code='30003')
-        )
+        await self._route(_make_status_update(status='sent'))
 
-        call = self.executor._dao.room.add_delivery_record.call_args
-        assert call.kwargs.get('reason') == '30003'
+        self.executor._dao.room.add_delivery_records.assert_not_awaited()
 
-    async def test_publishes_notification(self) -> None:
+    async def test_publishes_notifications_in_one_batch(self) -> None:
         self._register_connector({'delivered': DeliveryStatus.DELIVERED})
-        self._mock_meta()
+        first, second = _make_tracked_delivery('SM1'), _make_tracked_delivery('SM22')
+        self._stub_deliveries(first, second)
 
-        await self.executor.route_status_update(_make_status_update())
+        await self._route(_make_status_update('SM1'), _make_status_update('SM22'))
 
-        self.notifier.delivery_status_updated.assert_awaited_once()
+        self.notifier.delivery_statuses_updated.assert_awaited_once()
+        changes = self.notifier.delivery_statuses_updated.call_args.args[0]
+        assert [(d, r.status) for d, r in changes] == [
+            (first, 'delivered'),
+            (second, 'delivered'),
+        ]
+        assert first.records[-1] is changes[0][1]
+
+    async def test_retries_when_persist_fails(self) -> None:
+        self._register_connector({'delivered': DeliveryStatus.DELIVERED})
+        self._stub_deliveries(_make_tracked_delivery())
+        self.executor._dao.room.add_delivery_records.side_effect = OperationalError(
+            'INSERT', {}, BaseException('DB down')
+        )
+
+        delay = await self._route(_make_status_update())
+
+        assert delay == float(INBOUND_RETRY_DELAYS[0])
+        self.notifier.delivery_statuses_updated.assert_not_awaited()
 
 
 class TestDeliveryExecutorRecovery(unittest.IsolatedAsyncioTestCase):
@@ -921,6 +1284,7 @@ class TestDeliveryExecutorRecovery(unittest.IsolatedAsyncioTestCase):
     def _make_delivery(self, retry_count: int = 0, delivery_id: int = 1) -> Mock:
         return Mock(
             id=delivery_id,
+            backend='sms',
             recipient_identity='test:+1555',
             external_id=None,
             retry_count=retry_count,
@@ -937,27 +1301,45 @@ class TestDeliveryExecutorRecovery(unittest.IsolatedAsyncioTestCase):
     async def test_pending_delivery_recovered_immediately(self) -> None:
         delivery = self._make_delivery(delivery_id=42)
         self.executor._dao.room.get_recoverable_deliveries = AsyncMock(
-            return_value=[(delivery, 'pending')]
+            return_value=[(delivery, 'pending', 'tenant-uuid')]
         )
 
         result = await self.executor.recover_pending_deliveries()
 
         assert len(result) == 1
-        delivery_id, delay = result[0]
+        delivery_id, tenant_uuid, backend, delay = result[0]
         assert delivery_id == '42'
+        assert tenant_uuid == 'tenant-uuid'
+        assert backend == 'sms'
         assert delay == pytest.approx(0.0)
 
     async def test_retrying_delivery_recovered_with_delay(self) -> None:
         self.executor._dao.room.get_recoverable_deliveries = AsyncMock(
-            return_value=[(self._make_delivery(retry_count=1), 'retrying')]
+            return_value=[
+                (self._make_delivery(retry_count=1), 'retrying', 'tenant-uuid')
+            ]
         )
 
         result = await self.executor.recover_pending_deliveries()
 
         assert len(result) == 1
-        _, delay = result[0]
+        _, _, _, delay = result[0]
         assert delay == pytest.approx(30.0)
 
+    async def test_claimed_staged_events_decoded(self) -> None:
+        payload = {'external_id': 'SM1', 'status': 'sent', 'backend': 'sms'}
+        self.executor._dao.connector_inbound.claim = AsyncMock(
+            return_value=[(1, 'status', payload), (2, 'unknown', {})]
+        )
+        self.executor._dao.connector_inbound.delete = AsyncMock()
+
+        events = await self.executor.claim_staged_events(10, timedelta(minutes=5))
+
+        assert events == [
+            (1, StatusUpdate(external_id='SM1', status='sent', backend='sms'))
+        ]
+        self.executor._dao.connector_inbound.delete.assert_awaited_once_with([2])
+
 
 class TestConnectorRateLimitedException(unittest.TestCase):
     def test_carries_retry_after(self) -> None:
@@ -7,10 +7,12 @@ import json
 import unittest
 from unittest.mock import Mock
 
-from flask import Flask
+from flask import Flask, Response
 
 from wazo_chatd.plugins.connectors.exceptions import (
+    ConnectorBackpressureError,
     ConnectorParseError,
+    WebhookBackpressureException,
     WebhookParseException,
 )
 from wazo_chatd.plugins.connectors.http import (
@@ -93,6 +95,24 @@ class TestConnectorWebhookResource(unittest.TestCase):
 
         assert ctx.exception.status_code == 400
 
+    def test_post_under_backpressure_returns_503_with_retry_after(self) -> None:
+        self.router.dispatch_webhook.side_effect = ConnectorBackpressureError(
+            'staging full', retry_after=12.5
+        )
+
+        with self.app.test_request_context(
+            '/connectors/incoming/sms_backend',
+            method='POST',
+            data='{}',
+            content_type='application/json',
+        ):
+            with self.assertRaises(WebhookBackpressureException) as ctx:
+                self.resource.post(backend='sms_backend')
+            response = self.app.process_response(Response())
+
+        assert ctx.exception.status_code == 503
+        assert response.headers['Retry-After'] == '13'
+
     def test_headers_passed_in_webhook_data(self) -> None:
         self.router.dispatch_webhook.return_value = None
 
@@ -149,6 +149,23 @@ class TestAsyncNotifierMessageCreated(unittest.IsolatedAsyncioTestCase):
         assert delivery['backend'] == 'sms_backend'
         assert 'status' not in delivery
 
+    async def test_queues_fan_out_once(self) -> None:
+        fanout = Mock()
+        fanout.submit.return_value = True
+        notifier = AsyncNotifier(self.bus, fanout)
+        room = Mock()
+        room.uuid = 'room-uuid'
+        room.tenant_uuid = 'tenant-uuid'
+        room.users = [Mock(uuid='user-1'), Mock(uuid='user-2')]
+
+        await notifier.message_created(room, self._make_message())
+
+        self.bus.publish.assert_not_called()
+        fanout.publish.assert_not_called()
+        make_event, user_uuids = fanout.submit.call_args.args
+        assert user_uuids == ['user-1', 'user-2']
+        assert make_event('user-2').user_uuid == 'user-2'
+
 
 class TestAsyncNotifierDeliveryStatusUpdated(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
@@ -263,3 +280,42 @@ class TestAsyncNotifierDeliveryStatusUpdated(unittest.IsolatedAsyncioTestCase):
         delivery, record = self._make_delivery_and_record()
 
         await self.notifier.delivery_status_updated(delivery, record)
+
+    async def test_status_and_delivered_events_queued_in_order(self) -> None:
+        fanout = Mock()
+        fanout.submit.return_value = True
+        notifier = AsyncNotifier(self.bus, fanout)
+        sender = Mock(uuid='sender-uuid', identity=None)
+        recipient = Mock(uuid='recipient-uuid', identity=None)
+        delivery, record = self._make_delivery_and_record(
+            status='delivered',
+            sender_uuid='sender-uuid',
+            room_users=[sender, recipient],
+        )
+
+        await notifier.delivery_status_updated(delivery, record)
+
+        self.bus.publish.assert_not_called()
+        events = [
+            make_event(user_uuid)
+            for make_event, user_uuids in (c.args for c in fanout.submit.call_args_list)
+            for user_uuid in user_uuids
+        ]
+        assert [(e.name, e.user_uuid) for e in events] == [
+            ('chatd_message_delivery_status', 'sender-uuid'),
+            ('chatd_user_room_message_created', 'recipient-uuid'),
+        ]
+
+    async def test_fan_outs_after_refused_one_published_by_caller(self) -> None:
+        fanout = Mock()
+        fanout.submit.side_effect = [True, False, True]
+        notifier = AsyncNotifier(self.bus, fanout)
+        changes = [
+            self._make_delivery_and_record(sender_uuid=f'user-{i}') for i in range(3)
+        ]
+
+        await notifier.delivery_statuses_updated(changes)
+
+        assert fanout.submit.call_count == 2
+        published = [c.args[1] for c in fanout.publish.call_args_list]
+        assert published == [['user-1'], ['user-2']]
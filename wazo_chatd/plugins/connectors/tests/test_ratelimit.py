@@ -0,0 +1,129 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import pytest
+
+from wazo_chatd.plugins.connectors.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_burst_available_right_away(self) -> None:
+        bucket = TokenBucket(rate=2.0, burst=3.0, clock=FakeClock())
+
+        waits = [bucket.reserve(max_wait=10.0) for _ in range(3)]
+
+        assert waits == [0.0, 0.0, 0.0]
+
+    def test_reservations_are_paced_by_rate(self) -> None:
+        bucket = TokenBucket(rate=2.0, burst=1.0, clock=FakeClock())
+
+        waits = [bucket.reserve(max_wait=10.0) for _ in range(3)]
+
+        assert waits == pytest.approx([0.0, 0.5, 1.0])
+
+    def test_no_reservation_beyond_max_wait(self) -> None:
+        bucket = TokenBucket(rate=1.0, burst=1.0, clock=FakeClock())
+        bucket.reserve(max_wait=0.0)
+
+        assert bucket.reserve(max_wait=0.5) == pytest.approx(1.0)
+        assert bucket.available() == pytest.approx(0.0)
+
+    def test_tokens_refill_up_to_burst(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, burst=2.0, clock=clock)
+        bucket.reserve(max_wait=0.0)
+        bucket.reserve(max_wait=0.0)
+
+        clock.advance(10.0)
+
+        assert bucket.available() == pytest.approx(2.0)
+
+    def test_block_holds_sends_then_refills(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, burst=5.0, clock=clock)
+
+        bucket.block(30.0)
+
+        assert bucket.blocked_for() == pytest.approx(30.0)
+        assert bucket.reserve(max_wait=60.0) == pytest.approx(30.0)
+        assert bucket.reserve(max_wait=60.0) == pytest.approx(31.0)
+
+        clock.advance(40.0)
+
+        assert bucket.blocked_for() == 0.0
+        assert bucket.available() == pytest.approx(5.0)
+
+    def test_unlimited_bucket_only_held_by_block(self) -> None:
+        bucket = TokenBucket(clock=FakeClock())
+
+        assert [bucket.reserve(max_wait=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+
+        bucket.block(12.0)
+
+        assert bucket.reserve(max_wait=0.0) == pytest.approx(12.0)
+
+
+class TestRateLimiter:
+    def test_keyed_per_tenant_and_backend(self) -> None:
+        limiter = RateLimiter({'sms': {'send_rate': 1}})
+
+        assert limiter.key('tenant', 'sms', '+15551234') == ('tenant', 'sms')
+
+    def test_keyed_per_sender_when_configured(self) -> None:
+        limiter = RateLimiter({'sms': {'send_rate': 1, 'send_rate_per_sender': True}})
+
+        key = limiter.key('tenant', 'sms', '+15551234')
+
+        assert key == ('tenant', 'sms', '+15551234')
+
+    def test_configured_backend_is_paced(self) -> None:
+        limiter = RateLimiter({'sms': {'send_rate': 2}}, clock=FakeClock())
+        key = limiter.key('tenant', 'sms', '+15551234')
+
+        waits = [limiter.reserve(key, max_wait=10.0) for _ in range(3)]
+
+        assert waits == pytest.approx([0.0, 0.0, 0.5])
+
+    def test_unconfigured_backend_keeps_no_bucket(self) -> None:
+        limiter = RateLimiter({'sms': {'enabled': True}}, clock=FakeClock())
+        key = limiter.key('tenant', 'sms', '+15551234')
+
+        assert limiter.reserve(key, max_wait=0.0) == 0.0
+        assert limiter.snapshot() == {}
+
+    def test_block_applies_to_unconfigured_backend(self) -> None:
+        limiter = RateLimiter({}, clock=FakeClock())
+        key = limiter.key('tenant', 'sms', '+15551234')
+
+        limiter.block(key, 42.0)
+
+        assert limiter.blocked_for(key) == pytest.approx(42.0)
+        assert limiter.reserve(key, max_wait=0.0) == pytest.approx(42.0)
+
+    def test_snapshot_reports_occupancy(self) -> None:
+        limiter = RateLimiter({'sms': {'send_rate': 1, 'send_burst': 4}})
+        key = limiter.key('tenant', 'sms', '+15551234')
+        limiter.reserve(key, max_wait=0.0)
+
+        snapshot = limiter.snapshot()
+
+        assert snapshot == {
+            'tenant/sms': {
+                'tokens': pytest.approx(3.0, abs=0.1),
+                'burst': 4.0,
+                'blocked_for': 0.0,
+            }
+        }
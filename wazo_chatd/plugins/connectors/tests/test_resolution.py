@@ -0,0 +1,38 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import unittest
+
+from wazo_chatd.plugins.connectors.resolution import (
+    ResolutionCache,
+    ResolvedIdentity,
+    room_key,
+)
+
+
+class TestResolutionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = ResolutionCache()
+
+    def test_updated_identity_forgotten_by_uuid(self) -> None:
+        resolved = ResolvedIdentity('identity-uuid', 'user-uuid', 'tenant-uuid')
+        self.cache.identities.put('+15551234', resolved)
+
+        self.cache.forget_identity('identity-uuid', '+15559999')
+
+        assert self.cache.identities.get('+15551234') is None
+
+    def test_room_key_ignores_participant_order(self) -> None:
+        assert room_key('tenant', ['b', 'a']) == room_key('tenant', ['a', 'b'])
+
+    def test_created_room_replaces_other_cached_room(self) -> None:
+        key = room_key('tenant-uuid', ['user-1', 'user-2'])
+        self.cache.rooms.put(key, 'room-1')
+
+        self.cache.forget_room('room-1', 'tenant-uuid', ['user-2', 'user-1'])
+        assert self.cache.rooms.get(key) == 'room-1'
+
+        self.cache.forget_room('room-2', 'tenant-uuid', ['user-1', 'user-2'])
+        assert self.cache.rooms.get(key) is None
@@ -138,9 +138,9 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
         instance.verify_signature.return_value = True
         self.router._store = Mock()
         self.router._store.find.return_value = instance
-        self.manager = self.router._delivery_runner = Mock()
+        self.staging = self.router._staging = Mock()
 
-    def test_dispatch_enqueues_inbound_message(self) -> None:
+    def test_dispatch_stages_inbound_message(self) -> None:
         self.registry.register_backend(_SmsConnector)  # type: ignore[arg-type]
         data = WebhookData(
             body={'From': '+15559876', 'Body': 'hello', 'MessageSid': 'msg-123'}
@@ -148,8 +148,8 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
 
         self.router.dispatch_webhook(data, backend='sms_backend')
 
-        self.manager.enqueue_message.assert_called_once()
-        result = self.manager.enqueue_message.call_args[0][0]
+        self.staging.append.assert_called_once()
+        result = self.staging.append.call_args[0][1]
         assert isinstance(result, InboundMessage)
         assert result.body == 'hello'
 
@@ -161,7 +161,7 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
 
         self.router.dispatch_webhook(data)
 
-        self.manager.enqueue_message.assert_called_once()
+        self.staging.append.assert_called_once()
 
     def test_dispatch_skips_connector_that_cannot_handle(self) -> None:
         self.registry.register_backend(_EmailConnector)  # type: ignore[arg-type]
@@ -172,8 +172,8 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
 
         self.router.dispatch_webhook(data)
 
-        self.manager.enqueue_message.assert_called_once()
-        result = self.manager.enqueue_message.call_args[0][0]
+        self.staging.append.assert_called_once()
+        result = self.staging.append.call_args[0][1]
         assert result.backend == 'sms_backend'
 
     def test_dispatch_skips_buggy_can_handle_and_tries_next(self) -> None:
@@ -203,8 +203,8 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
 
         self.router.dispatch_webhook(data)
 
-        self.manager.enqueue_message.assert_called_once()
-        result = self.manager.enqueue_message.call_args[0][0]
+        self.staging.append.assert_called_once()
+        result = self.staging.append.call_args[0][1]
         assert result.backend == 'sms_backend'
 
     def test_dispatch_skips_none_events(self) -> None:
@@ -214,7 +214,7 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
         with pytest.raises(ConnectorParseError):
             self.router.dispatch_webhook(data)
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_dispatch_no_backends_raises(self) -> None:
         with pytest.raises(ConnectorParseError):
@@ -229,7 +229,7 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
         with pytest.raises(ConnectorParseError):
             self.router.dispatch_webhook(data, backend='vonage')
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_dispatch_hint_restricts_to_that_backend(self) -> None:
         self.registry.register_backend(_SmsConnector)  # type: ignore[arg-type]
@@ -240,7 +240,7 @@ class TestConnectorRouterDispatchWebhook(unittest.TestCase):
 
         self.router.dispatch_webhook(data, backend='sms_backend')
 
-        result = self.manager.enqueue_message.call_args[0][0]
+        result = self.staging.append.call_args[0][1]
         assert result.backend == 'sms_backend'
 
 
@@ -259,14 +259,14 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         self.router = _build_router(registry=self.registry, dao=self.dao)
         self.router._store = Mock()
         self.router._store.get.return_value = self.instance
-        self.manager = self.router._delivery_runner = Mock()
+        self.staging = self.router._staging = Mock()
 
     def _webhook(self) -> WebhookData:
         return WebhookData(
             body={'From': '+15559876', 'Body': 'hello', 'MessageSid': 'msg-1'}
         )
 
-    def test_valid_signature_resolves_tenant_by_recipient_and_enqueues(self) -> None:
+    def test_valid_signature_resolves_tenant_by_recipient_and_stages(self) -> None:
         data = WebhookData(
             body={
                 'From': '+15559876',
@@ -283,15 +283,16 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         )
         self.router._store.get.assert_called_once_with('sms_backend', 'tenant-uuid')
         self.instance.verify_signature.assert_called_once_with(data)
-        self.manager.enqueue_message.assert_called_once()
+        self.staging.append.assert_called_once()
+        assert self.staging.append.call_args[0][0] == 'tenant-uuid'
 
-    def test_invalid_signature_raises_401_and_skips_enqueue(self) -> None:
+    def test_invalid_signature_raises_401_and_skips_staging(self) -> None:
         self.instance.verify_signature.return_value = False
 
         with pytest.raises(ConnectorAuthException):
             self.router.dispatch_webhook(self._webhook(), backend='sms_backend')
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_unknown_recipient_raises_parse_error(self) -> None:
         self.dao.user_identity.find_tenant_by_identity.return_value = None
@@ -299,7 +300,7 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         with pytest.raises(ConnectorParseError):
             self.router.dispatch_webhook(self._webhook(), backend='sms_backend')
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_unknown_backend_raises_parse_error(self) -> None:
         self.router._store.get.side_effect = BackendNotConfiguredException(
@@ -309,7 +310,7 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         with pytest.raises(ConnectorParseError):
             self.router.dispatch_webhook(self._webhook(), backend='sms_backend')
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_auth_unavailable_raises_transient_error(self) -> None:
         self.router._store.get.side_effect = AuthServiceUnavailableException()
@@ -317,7 +318,7 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         with pytest.raises(ConnectorTransientError):
             self.router.dispatch_webhook(self._webhook(), backend='sms_backend')
 
-        self.manager.enqueue_message.assert_not_called()
+        self.staging.append.assert_not_called()
 
     def test_verifies_signatures_false_skips_check(self) -> None:
         instance = Mock()
@@ -327,7 +328,7 @@ class TestConnectorRouterWebhookVerify(unittest.TestCase):
         self.router.dispatch_webhook(self._webhook(), backend='sms_backend')
 
         instance.verify_signature.assert_not_called()
-        self.manager.enqueue_message.assert_called_once()
+        self.staging.append.assert_called_once()
 
 
 class TestConnectorRouterValidateOutbound(unittest.TestCase):
@@ -592,7 +593,7 @@ class TestConnectorRouterEmptyRegistry(unittest.TestCase):
                 'wazo_chatd.plugins.connectors.router.DeliveryRunner'
             ) as delivery_mock,
             unittest.mock.patch(
-                'wazo_chatd.plugins.connectors.router.ListenerRunner'
+                'wazo_chatd.plugins.connectors.router.ListenerPool'
             ) as listener_mock,
         ):
             router = ConnectorRouter(
@@ -633,7 +634,7 @@ class TestConnectorRouterEmptyRegistry(unittest.TestCase):
                 'wazo_chatd.plugins.connectors.router.DeliveryRunner'
             ) as delivery_mock,
             unittest.mock.patch(
-                'wazo_chatd.plugins.connectors.router.ListenerRunner'
+                'wazo_chatd.plugins.connectors.router.ListenerPool'
             ) as listener_mock,
         ):
             router = ConnectorRouter(
@@ -18,7 +18,14 @@ from wazo_chatd.plugin_helpers.dependencies import ConfigDict
 from wazo_chatd.plugins.connectors import runner as runner_module
 from wazo_chatd.plugins.connectors.exceptions import ConnectorRateLimited
 from wazo_chatd.plugins.connectors.registry import ConnectorRegistry
-from wazo_chatd.plugins.connectors.runner import DeliveryRunner, ListenerRunner, Runner
+from wazo_chatd.plugins.connectors.runner import (
+    LAG_SAMPLES,
+    DeliveryRunner,
+    ListenerPool,
+    ListenerRunner,
+    Runner,
+)
+from wazo_chatd.plugins.connectors.sharding import ShardOwnership, shard_of
 from wazo_chatd.plugins.connectors.types import (
     InboundMessage,
     StatusUpdate,
@@ -243,10 +250,10 @@ class TestDeliveryRunnerScheduleOutboundLater(unittest.IsolatedAsyncioTestCase):
         runner._loop = asyncio.get_running_loop()
         runner._reset_loop_state()
 
-        runner._schedule_outbound_delivery_later(60, 'delivery-1')
+        runner._schedule_outbound_delivery_later(60, 'tenant', 'sms', 'delivery-1')
         first_handle = runner._scheduled_outbound_timers['delivery-1']
 
-        runner._schedule_outbound_delivery_later(120, 'delivery-1')
+        runner._schedule_outbound_delivery_later(120, 'tenant', 'sms', 'delivery-1')
         second_handle = runner._scheduled_outbound_timers['delivery-1']
 
         assert first_handle is not second_handle
@@ -259,8 +266,8 @@ class TestDeliveryRunnerScheduleOutboundLater(unittest.IsolatedAsyncioTestCase):
         runner._loop = asyncio.get_running_loop()
         runner._reset_loop_state()
 
-        runner._schedule_outbound_delivery_later(60, 'delivery-a')
-        runner._schedule_outbound_delivery_later(60, 'delivery-b')
+        runner._schedule_outbound_delivery_later(60, 'tenant', 'sms', 'delivery-a')
+        runner._schedule_outbound_delivery_later(60, 'tenant', 'sms', 'delivery-b')
 
         assert len(runner._scheduled_outbound_timers) == 2
         assert (
@@ -274,12 +281,265 @@ class TestDeliveryRunnerScheduleOutboundLater(unittest.IsolatedAsyncioTestCase):
         runner._reset_loop_state()
         runner._schedule_outbound_delivery = Mock()  # type: ignore[method-assign]
 
-        runner._schedule_outbound_delivery_later(0.01, 'delivery-1')
+        runner._schedule_outbound_delivery_later(0.01, 'tenant', 'sms', 'delivery-1')
         await asyncio.sleep(0.05)
 
         assert 'delivery-1' not in runner._scheduled_outbound_timers
 
 
+class TestDeliveryRunnerOutboundBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        config = _make_config()
+        config['delivery'].update(batch_size=2, batch_window=0.01)
+        with (
+            unittest.mock.patch.object(
+                runner_module,
+                'init_async_db',
+                return_value=(AsyncMock(), _mock_session_factory()),
+            ),
+            unittest.mock.patch.object(runner_module, 'BusPublisher'),
+        ):
+            self.runner = DeliveryRunner(config, Mock(), _mock_store())
+        self.runner._loop = asyncio.get_running_loop()
+        self.runner._reset_loop_state()
+        self.process = AsyncMock()
+        self.runner._process_outbound_batch = self.process  # type: ignore[method-assign]
+
+    def _notify(self, payload: str) -> None:
+        self.runner._on_delivery_notify(Mock(), 0, 'connector_delivery', payload)
+
+    async def test_notify_payload_dispatched_as_one_batch(self) -> None:
+        self._notify('tenant-a:sms:1,2')
+        await asyncio.sleep(0.05)
+
+        self.process.assert_awaited_once_with('tenant-a', 'sms', ['1', '2'])
+
+    async def test_notifications_within_window_are_coalesced(self) -> None:
+        self._notify('tenant-a:sms:1')
+        self._notify('tenant-a:sms:1')
+        self.process.assert_not_called()
+
+        await asyncio.sleep(0.05)
+
+        self.process.assert_awaited_once_with('tenant-a', 'sms', ['1'])
+
+    async def test_full_batch_flushed_without_waiting_window(self) -> None:
+        self._notify('tenant-a:sms:1,2,3')
+        await asyncio.sleep(0)
+
+        self.process.assert_awaited_once_with('tenant-a', 'sms', ['1', '2'])
+
+        await asyncio.sleep(0.05)
+
+        self.process.assert_awaited_with('tenant-a', 'sms', ['3'])
+
+    async def test_batches_are_per_tenant(self) -> None:
+        self._notify('tenant-a:sms:1')
+        self._notify('tenant-b:sms:2')
+        await asyncio.sleep(0.05)
+
+        self.process.assert_has_awaits(
+            [
+                unittest.mock.call('tenant-a', 'sms', ['1']),
+                unittest.mock.call('tenant-b', 'sms', ['2']),
+            ]
+        )
+
+    async def test_batches_are_per_backend(self) -> None:
+        self._notify('tenant-a:sms:1')
+        self._notify('tenant-a:email:2')
+        await asyncio.sleep(0.05)
+
+        self.process.assert_has_awaits(
+            [
+                unittest.mock.call('tenant-a', 'sms', ['1']),
+                unittest.mock.call('tenant-a', 'email', ['2']),
+            ]
+        )
+
+    async def test_deliveries_of_unowned_shard_ignored(self) -> None:
+        self.runner._shards = ShardOwnership(4)
+        self.runner._shards.update({shard_of('tenant-a', 'sms', 4)}, members=2)
+        unowned = next(
+            tenant_uuid
+            for tenant_uuid in (f'tenant-{i}' for i in range(100))
+            if not self.runner._shards.owns(tenant_uuid, 'sms')
+        )
+
+        self._notify('tenant-a:sms:1')
+        self._notify(f'{unowned}:sms:2')
+        await asyncio.sleep(0.05)
+
+        self.process.assert_awaited_once_with('tenant-a', 'sms', ['1'])
+
+    async def test_payload_without_tenant_is_dispatched(self) -> None:
+        self._notify('1')
+        await asyncio.sleep(0.05)
+
+        self.process.assert_awaited_once_with('', '', ['1'])
+
+    async def test_in_flight_delivery_not_batched_again(self) -> None:
+        gate = asyncio.Event()
+
+        async def process(_tenant: str, _backend: str, _ids: list[str]) -> None:
+            await gate.wait()
+
+        self.process.side_effect = process
+        self._notify('tenant-a:sms:1')
+        await asyncio.sleep(0.05)
+
+        self._notify('tenant-a:sms:1')
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.sleep(0.01)
+
+        self.process.assert_awaited_once_with('tenant-a', 'sms', ['1'])
+        assert self.runner.in_flight_count == 0
+
+
+class TestDeliveryRunnerStatusBatch(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        config = _make_config()
+        config['delivery'].update(batch_size=2, batch_window=0.01)
+        with (
+            unittest.mock.patch.object(
+                runner_module,
+                'init_async_db',
+                return_value=(AsyncMock(), _mock_session_factory()),
+            ),
+            unittest.mock.patch.object(runner_module, 'BusPublisher'),
+        ):
+            self.runner = DeliveryRunner(config, Mock(), _mock_store())
+        self.runner._loop = asyncio.get_running_loop()
+        self.runner._reset_loop_state()
+        self.executor = self.runner._executor = Mock()
+        self.executor.route_status_updates = AsyncMock(return_value=None)
+
+    def _update(self, external_id: str, status: str = 'sent') -> StatusUpdate:
+        return StatusUpdate(external_id=external_id, status=status, backend='sms')
+
+    async def test_updates_within_window_routed_together(self) -> None:
+        self.runner._schedule_inbound(self._update('SM1'))
+        self.executor.route_status_updates.assert_not_called()
+
+        await asyncio.sleep(0.05)
+
+        self.executor.route_status_updates.assert_awaited_once_with(
+            'sms', [self._update('SM1')], attempt=0
+        )
+
+    async def test_only_last_status_of_a_message_kept(self) -> None:
+        self.runner._schedule_inbound(self._update('SM1', 'sent'), staged_id=1)
+        self.runner._schedule_inbound(self._update('SM1', 'delivered'), staged_id=2)
+        await asyncio.sleep(0.05)
+
+        self.executor.route_status_updates.assert_awaited_once_with(
+            'sms', [self._update('SM1', 'delivered')], attempt=0
+        )
+        assert self.runner._staged_done == [1, 2]
+
+    async def test_full_batch_routed_without_waiting_window(self) -> None:
+        for external_id in ('SM1', 'SM2', 'SM3'):
+            self.runner._schedule_inbound(self._update(external_id))
+        await asyncio.sleep(0)
+
+        self.executor.route_status_updates.assert_awaited_once_with(
+            'sms', [self._update('SM1'), self._update('SM2')], attempt=0
+        )
+
+    async def test_batch_retried_on_persist_failure(self) -> None:
+        self.executor.route_status_updates.side_effect = [0.05, None]
+
+        self.runner._schedule_inbound(self._update('SM1'), staged_id=1)
+        await asyncio.sleep(0.03)
+        assert self.runner._staged_done == []
+
+        await asyncio.sleep(0.1)
+
+        self.executor.route_status_updates.assert_awaited_with(
+            'sms', [self._update('SM1')], attempt=1
+        )
+        assert self.runner._staged_done == [1]
+        assert self.runner.in_flight_count == 0
+
+
+class TestDeliveryRunnerStagedInbound(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        config = _make_config()
+        config['delivery'].update(batch_size=2)
+        with (
+            unittest.mock.patch.object(
+                runner_module,
+                'init_async_db',
+                return_value=(AsyncMock(), _mock_session_factory()),
+            ),
+            unittest.mock.patch.object(runner_module, 'BusPublisher'),
+        ):
+            self.runner = DeliveryRunner(config, Mock(), _mock_store())
+        self.runner._loop = asyncio.get_running_loop()
+        self.runner._reset_loop_state()
+        self.executor = self.runner._executor = Mock()
+        self.executor.claim_staged_events = AsyncMock(
+            return_value=[(1, _make_inbound())]
+        )
+        self.executor.ack_staged_events = AsyncMock()
+        self.executor.release_staged_events = AsyncMock()
+        self.executor.route_inbound = AsyncMock(return_value=None)
+
+    async def test_processed_event_acked_on_next_claim(self) -> None:
+        await self.runner._claim_staged()
+        await asyncio.sleep(0.01)
+
+        self.executor.route_inbound.assert_awaited_once()
+        assert self.runner._staged_pending == set()
+        assert self.runner._staged_wakeup.is_set()
+
+        self.executor.claim_staged_events.return_value = []
+        await self.runner._claim_staged()
+
+        self.executor.ack_staged_events.assert_awaited_once_with([1])
+
+    async def test_event_stays_claimed_while_retrying(self) -> None:
+        self.executor.route_inbound.return_value = 2.0
+
+        await self.runner._claim_staged()
+        await asyncio.sleep(0.01)
+
+        assert self.runner._staged_pending == {1}
+        assert self.runner._staged_done == []
+
+    async def test_claims_limited_by_events_in_progress(self) -> None:
+        self.runner._staged_pending = {5, 6}
+
+        assert await self.runner._claim_staged() == 0
+
+        self.executor.claim_staged_events.assert_not_called()
+
+    async def test_acks_kept_when_claim_fails(self) -> None:
+        self.runner._staged_done = [3]
+        self.executor.claim_staged_events.side_effect = RuntimeError('db down')
+
+        with pytest.raises(RuntimeError):
+            await self.runner._claim_staged()
+
+        assert self.runner._staged_done == [3]
+
+    async def test_settle_releases_events_in_progress(self) -> None:
+        self.runner._staged_pending = {5}
+        self.runner._staged_done = [3]
+
+        await self.runner._settle_staged()
+
+        self.executor.ack_staged_events.assert_awaited_once_with([3])
+        self.executor.release_staged_events.assert_awaited_once_with({5})
+        assert self.runner._staged_pending == set()
+
+    async def test_inbound_notify_wakes_drain(self) -> None:
+        self.runner._on_inbound_notify(Mock(), 0, 'connector_inbound', '')
+
+        assert self.runner._staged_wakeup.is_set()
+
+
 class TestDeliveryRunnerResetLoopState(unittest.IsolatedAsyncioTestCase):
     def _make_runner(self) -> DeliveryRunner:
         with (
@@ -309,18 +569,20 @@ class TestDeliveryRunnerResetLoopState(unittest.IsolatedAsyncioTestCase):
         assert runner._scheduled_timers == set()
         assert runner._queue is original_queue
         assert len(runner._queue) == 1
-        assert runner._semaphore is not None
+        assert runner._scheduler is not None
         assert runner._outbound_notify_task is None
         assert runner._dispatch_task is None
+        assert runner._staged_task is None
+        assert runner._staged_pending == set()
 
-    async def test_reset_creates_fresh_semaphore(self) -> None:
+    async def test_reset_creates_fresh_scheduler(self) -> None:
         runner = self._make_runner()
 
         runner._reset_loop_state()
-        first = runner._semaphore
+        first = runner._scheduler
 
         runner._reset_loop_state()
-        second = runner._semaphore
+        second = runner._scheduler
 
         assert first is not second
 
@@ -563,8 +825,9 @@ class TestDeliveryRunnerPollCycle(unittest.IsolatedAsyncioTestCase):
             'poll_interval_max': 8,
         }
         loop = DeliveryRunner(config, Mock(), Mock())
+        rows = list(enumerate(pending or [], start=1))
         loop._executor._dao.room = Mock(
-            list_pending_external_ids=AsyncMock(return_value=pending or [])
+            list_pending_external_ids=AsyncMock(return_value=rows)
         )
         loop.enqueue_message = Mock()  # type: ignore[method-assign]
         return loop
@@ -603,6 +866,29 @@ class TestDeliveryRunnerPollCycle(unittest.IsolatedAsyncioTestCase):
         instance.track_outbound.assert_called_once_with(['ext-1', 'ext-2'])
         loop.enqueue_message.assert_any_call(update)
 
+    async def test_track_outbound_resumes_after_last_page(self) -> None:
+        loop = self._make_loop(pending=['ext-1', 'ext-2'])
+        loop._track_batch_size = 2
+        instance = Mock(track_outbound=Mock(return_value=[]))
+        list_pending = loop._executor._dao.room.list_pending_external_ids
+
+        await loop._track_outbound(instance, 'tenant', 'backend')
+        await loop._track_outbound(instance, 'tenant', 'backend')
+
+        assert list_pending.call_args_list[0].kwargs == {'limit': 2, 'after': None}
+        assert list_pending.call_args_list[1].kwargs == {'limit': 2, 'after': 2}
+
+    async def test_track_outbound_starts_over_after_partial_page(self) -> None:
+        loop = self._make_loop(pending=['ext-1'])
+        loop._track_batch_size = 2
+        instance = Mock(track_outbound=Mock(return_value=[]))
+        list_pending = loop._executor._dao.room.list_pending_external_ids
+
+        await loop._track_outbound(instance, 'tenant', 'backend')
+        await loop._track_outbound(instance, 'tenant', 'backend')
+
+        assert list_pending.call_args_list[1].kwargs['after'] is None
+
     async def test_async_scan_inbound_awaited_inline(self) -> None:
         loop = self._make_loop()
         message = _make_inbound()
@@ -868,6 +1154,148 @@ class TestListenerRunnerReconcile(unittest.IsolatedAsyncioTestCase):
         assert task.cancelling() > 0 or task.done()
         assert task.cancelling() > 0 or task.done()
 
+    async def test_restarts_listener_for_rebuilt_instance(self) -> None:
+        runner = self._make_runner()
+        key = ('tenant-a', 'push')
+
+        async def fake_listen(on_message: object) -> None:
+            await asyncio.sleep(3600)
+
+        instance, rebuilt = _mock_instance('push'), _mock_instance('push')
+        instance.listen = rebuilt.listen = fake_listen
+
+        runner._reconcile({key: instance})
+        task = runner._listeners[key]
+        runner._reconcile({key: rebuilt})
+
+        assert task.cancelling() > 0
+        assert runner._listeners[key] is not task
+        assert runner._listened[key] is rebuilt
+        runner._listeners[key].cancel()
+
+
+class TestListenerRunnerAssignment(unittest.IsolatedAsyncioTestCase):
+    async def test_only_assigned_instances_desired(self) -> None:
+        registry = Mock()
+        registry.transport_mode.return_value = 'listen'
+        store = Mock()
+        store.items.return_value = [
+            (('tenant-a', 'push'), _mock_instance('push')),
+            (('tenant-b', 'push'), _mock_instance('push')),
+        ]
+        runner = ListenerRunner(
+            _make_config(),
+            registry,
+            store,
+            Mock(),
+            assigned=lambda key: key[0] == 'tenant-b',
+        )
+
+        assert list(runner._build_desired()) == [('tenant-b', 'push')]
+
+    async def test_monitor_reports_loop_lag(self) -> None:
+        lags: list[float] = []
+        runner = ListenerRunner(
+            _make_config(),
+            Mock(),
+            Mock(),
+            Mock(),
+            index=2,
+            on_lag=lambda index, lag: lags.append(lag),
+            lag_interval=0.01,
+        )
+        task = asyncio.create_task(runner._monitor_lag())
+        await asyncio.sleep(0)
+
+        time.sleep(0.1)  # a listener blocking the loop
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+        assert max(lags) >= 0.05
+        assert runner.lag_histogram['count'] == len(lags)
+
+
+class TestListenerPool(unittest.TestCase):
+    KEYS = [(f'tenant-{i}', 'push') for i in range(200)]
+
+    def setUp(self) -> None:
+        self.now = 0.0
+        config = _make_config()
+        config['delivery'].update(
+            listener_loops=3,
+            listener_lag_threshold=0.5,
+            listener_lag_cooldown=60,
+        )
+        self.pool = ListenerPool(config, Mock(), Mock(), Mock(), clock=lambda: self.now)
+        for runner in self.pool.runners:
+            runner.resync = Mock()
+
+    def _assignments(self) -> dict[tuple[str, str], int]:
+        return {
+            key: runner.index
+            for key in self.KEYS
+            for runner in self.pool.runners
+            if runner._assigned is not None and runner._assigned(key)
+        }
+
+    def _lag(self, index: int, lag: float, samples: int = LAG_SAMPLES) -> None:
+        for _ in range(samples):
+            self.pool._on_lag(index, lag)
+
+    def test_each_key_assigned_to_one_loop(self) -> None:
+        assignments = self._assignments()
+
+        assert set(assignments) == set(self.KEYS)
+        assert set(assignments.values()) == {0, 1, 2}
+
+    def test_lagging_loop_keys_moved_to_other_loops(self) -> None:
+        before = self._assignments()
+
+        self._lag(1, 2.0)
+
+        after = self._assignments()
+        assert 1 not in after.values()
+        for key, index in before.items():
+            if index != 1:
+                assert after[key] == index
+        assert self.pool.loop_status[1]['lagging']
+        for runner in self.pool.runners:
+            runner.resync.assert_called_once()
+
+    def test_short_lag_spike_ignored(self) -> None:
+        self._lag(1, 2.0, samples=LAG_SAMPLES - 1)
+        self.pool._on_lag(1, 0.01)
+        self._lag(1, 2.0, samples=LAG_SAMPLES - 1)
+
+        assert not self.pool.loop_status[1]['lagging']
+
+    def test_last_loop_never_taken_out(self) -> None:
+        self._lag(0, 2.0)
+        self._lag(1, 2.0)
+        self._lag(2, 2.0)
+
+        assert [status['lagging'] for status in self.pool.loop_status] == [
+            True,
+            True,
+            False,
+        ]
+        assert set(self._assignments().values()) == {2}
+
+    def test_loop_back_after_cooldown(self) -> None:
+        before = self._assignments()
+        self._lag(1, 2.0)
+
+        self.now = 30.0
+        self.pool._on_lag(1, 0.01)
+        assert self.pool.loop_status[1]['lagging']
+
+        self.now = 61.0
+        self.pool._on_lag(1, 0.01)
+        assert not self.pool.loop_status[1]['lagging']
+        assert self._assignments() == before
+
 
 class TestDeliveryRunnerSynchronizePollers(unittest.IsolatedAsyncioTestCase):
     async def test_spawns_poller_for_poll_mode_instance(self) -> None:
@@ -917,6 +1345,23 @@ class TestDeliveryRunnerSynchronizePollers(unittest.IsolatedAsyncioTestCase):
         assert key not in loop._pollers
         assert task.cancelling() > 0
 
+    async def test_restarts_poller_for_rebuilt_instance(self) -> None:
+        loop = _build_loop_for_modes({'sms_backend': 'poll'})
+        key = ('tenant-a', 'sms_backend')
+        loop._store.items.return_value = [(key, _mock_instance('sms_backend'))]
+
+        loop._synchronize_pollers()
+        task = loop._pollers[key]
+
+        rebuilt = _mock_instance('sms_backend')
+        loop._store.items.return_value = [(key, rebuilt)]
+        loop._synchronize_pollers()
+
+        assert task.cancelling() > 0
+        assert loop._pollers[key] is not task
+        assert loop._polled[key] is rebuilt
+        loop._pollers[key].cancel()
+
 
 class TestDeliveryRunnerWaitBackoff(unittest.TestCase):
     @unittest.mock.patch('wazo_chatd.plugins.connectors.runner.init_async_db')
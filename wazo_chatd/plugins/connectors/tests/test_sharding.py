@@ -0,0 +1,138 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import random
+import unittest
+from unittest.mock import AsyncMock, Mock
+
+from wazo_chatd.plugins.connectors.sharding import (
+    SHARD_LOCK_CLASS,
+    HashRing,
+    ShardCoordinator,
+    ShardOwnership,
+    shard_of,
+)
+
+
+def _connection(members: int, held: set[int], free: set[int]) -> AsyncMock:
+    async def fetchval(query: str, *args: int) -> int | bool:
+        if 'pg_try_advisory_lock' in query:
+            return args[1] - 1 in free
+        return members
+
+    connection = AsyncMock()
+    connection.fetchval.side_effect = fetchval
+    connection.fetch.return_value = [(shard,) for shard in held]
+    return connection
+
+
+class TestHashRing(unittest.TestCase):
+    def test_keys_spread_over_members(self) -> None:
+        ring = HashRing(range(4))
+
+        counts = [0] * 4
+        for i in range(4000):
+            counts[ring.get(f'tenant-{i}:sms')] += 1
+
+        assert all(600 < count < 1400 for count in counts), counts
+
+    def test_removed_member_only_moves_its_keys(self) -> None:
+        keys = [f'tenant-{i}:sms' for i in range(1000)]
+        before = HashRing(range(4))
+        after = HashRing([0, 1, 3])
+
+        for key in keys:
+            if before.get(key) != 2:
+                assert after.get(key) == before.get(key)
+            else:
+                assert after.get(key) in {0, 1, 3}
+
+    def test_needs_a_member(self) -> None:
+        with self.assertRaises(ValueError):
+            HashRing([])
+
+
+class TestShardOwnership(unittest.TestCase):
+    def test_single_shard_owns_everything(self) -> None:
+        ownership = ShardOwnership()
+
+        assert not ownership.enabled
+        assert ownership.owns('tenant', 'sms')
+
+    def test_nothing_owned_until_shards_claimed(self) -> None:
+        ownership = ShardOwnership(4)
+
+        assert ownership.enabled
+        assert not ownership.owns('tenant', 'sms')
+
+        ownership.update({shard_of('tenant', 'sms', 4)}, members=2)
+
+        assert ownership.owns('tenant', 'sms')
+
+    def test_listeners_called_on_change_only(self) -> None:
+        ownership = ShardOwnership(4)
+        listener = Mock()
+        ownership.add_listener(listener)
+
+        ownership.update({1}, members=2)
+        ownership.update({1}, members=3)
+
+        listener.assert_called_once_with()
+        assert ownership.snapshot() == {'count': 4, 'members': 3, 'owned': [1]}
+
+
+class TestShardCoordinator(unittest.IsolatedAsyncioTestCase):
+    def _coordinator(self, ownership: ShardOwnership) -> ShardCoordinator:
+        return ShardCoordinator(ownership, random_generator=random.Random(0))
+
+    async def test_join_takes_membership_lock(self) -> None:
+        connection = AsyncMock()
+
+        await self._coordinator(ShardOwnership(4)).join(connection)
+
+        connection.execute.assert_awaited_once_with(
+            'SELECT pg_advisory_lock_shared($1, 0)', SHARD_LOCK_CLASS
+        )
+
+    async def test_only_member_claims_every_shard(self) -> None:
+        ownership = ShardOwnership(4)
+        connection = _connection(members=1, held=set(), free={0, 1, 2, 3})
+
+        gained, lost = await self._coordinator(ownership).rebalance(connection)
+
+        assert gained == {0, 1, 2, 3}
+        assert lost == set()
+        assert ownership.owned == {0, 1, 2, 3}
+
+    async def test_shards_held_elsewhere_not_claimed(self) -> None:
+        ownership = ShardOwnership(4)
+        connection = _connection(members=2, held={0, 1}, free={2, 3})
+
+        gained, _ = await self._coordinator(ownership).rebalance(connection)
+
+        assert gained == {2, 3}
+        assert ownership.owned == {2, 3}
+
+    async def test_extra_shards_released_when_member_joins(self) -> None:
+        ownership = ShardOwnership(4)
+        ownership.update({0, 1, 2, 3}, members=1)
+        connection = _connection(members=2, held={0, 1, 2, 3}, free=set())
+
+        gained, lost = await self._coordinator(ownership).rebalance(connection)
+
+        assert gained == set()
+        assert lost == {2, 3}
+        assert ownership.owned == {0, 1}
+        connection.execute.assert_any_await(
+            'SELECT pg_advisory_unlock($1, $2)', SHARD_LOCK_CLASS, 4
+        )
+
+    async def test_reset_forgets_shards(self) -> None:
+        ownership = ShardOwnership(4)
+        ownership.update({0, 1}, members=2)
+
+        self._coordinator(ownership).reset()
+
+        assert ownership.owned == frozenset()
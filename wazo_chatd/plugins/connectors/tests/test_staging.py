@@ -0,0 +1,107 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import contextlib
+import unittest
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from wazo_chatd.plugins.connectors.exceptions import (
+    ConnectorBackpressureError,
+    ConnectorTransientError,
+)
+from wazo_chatd.plugins.connectors.staging import (
+    InboundStaging,
+    decode_event,
+    encode_event,
+)
+from wazo_chatd.plugins.connectors.types import InboundMessage, StatusUpdate
+
+
+def _make_inbound() -> InboundMessage:
+    return InboundMessage(
+        sender='+15559876',
+        recipient='+15551234',
+        body='hello',
+        backend='sms_backend',
+        message_type='sms',
+        external_id='ext-123',
+        metadata={'idempotency_key': 'key-1'},
+        group_participants=('+15550001', '+15550002'),
+    )
+
+
+class TestEventEncoding:
+    def test_inbound_message_round_trip(self) -> None:
+        inbound = _make_inbound()
+
+        kind, payload = encode_event(inbound)
+
+        assert kind == 'message'
+        assert payload['group_participants'] == ['+15550001', '+15550002']
+        assert decode_event(kind, payload) == inbound
+
+    def test_status_update_round_trip(self) -> None:
+        update = StatusUpdate(external_id='ext-1', status='delivered', backend='sms')
+
+        assert decode_event(*encode_event(update)) == update
+
+    def test_unknown_kind_rejected(self) -> None:
+        with pytest.raises(ValueError):
+            decode_event('unknown', {})
+
+
+class TestInboundStaging(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.dao = Mock()
+        self.dao.connector_inbound.count.return_value = 0
+        self.staging = InboundStaging(
+            self.dao, high_water_mark=2, retry_after=30, clock=lambda: self.now
+        )
+        patcher = patch(
+            'wazo_chatd.plugins.connectors.staging.session_scope',
+            contextlib.nullcontext,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_append_stages_event(self) -> None:
+        self.staging.append('tenant-uuid', _make_inbound())
+
+        self.dao.connector_inbound.add.assert_called_once()
+        args = self.dao.connector_inbound.add.call_args[0]
+        assert args[:3] == ('tenant-uuid', 'sms_backend', 'message')
+        assert args[3]['external_id'] == 'ext-123'
+
+    def test_append_refused_above_high_water_mark(self) -> None:
+        self.dao.connector_inbound.count.return_value = 2
+
+        with pytest.raises(ConnectorBackpressureError) as exc_info:
+            self.staging.append('tenant-uuid', _make_inbound())
+
+        assert exc_info.value.retry_after == 30
+        self.dao.connector_inbound.add.assert_not_called()
+
+    def test_depth_counted_once_per_interval(self) -> None:
+        self.staging.append('tenant-uuid', _make_inbound())
+        self.staging.append('tenant-uuid', _make_inbound())
+
+        with pytest.raises(ConnectorBackpressureError):
+            self.staging.append('tenant-uuid', _make_inbound())
+        self.dao.connector_inbound.count.assert_called_once_with(limit=2)
+
+        self.now += 5.0
+        self.staging.append('tenant-uuid', _make_inbound())
+
+        assert self.dao.connector_inbound.count.call_count == 2
+
+    def test_database_error_is_transient(self) -> None:
+        self.dao.connector_inbound.add.side_effect = OperationalError('', {}, None)
+
+        with pytest.raises(ConnectorTransientError):
+            self.staging.append('tenant-uuid', _make_inbound())
@@ -3,10 +3,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import threading
 import unittest
 from concurrent.futures import ThreadPoolExecutor
-from typing import ClassVar
+from contextlib import AbstractContextManager
+from typing import Any, ClassVar
 from unittest.mock import Mock, patch
 
 from requests.exceptions import ConnectionError as RequestsConnectionError
@@ -136,11 +138,29 @@ class TestConnectorStoreRefresh(unittest.IsolatedAsyncioTestCase):
         assert instance is not None
         assert instance.tenant_uuid == TENANT_A  # type: ignore[attr-defined]
 
+    async def test_instance_is_given_shared_http_client(self) -> None:
+        transport = Mock()
+        store = ConnectorStore(
+            Mock(),
+            _build_registry(_NoneScopeConnector),
+            connectors_config={'internal_backend': {'mode': 'poll'}},
+            transport=transport,
+        )
+
+        instance = await store.refresh('internal_backend', TENANT_A)
+
+        assert instance is not None
+        assert instance.connector_config == {  # type: ignore[attr-defined]
+            'mode': 'poll',
+            'http_client': transport.client.return_value,
+        }
+        transport.client.assert_called_once_with('internal_backend')
+
     async def test_refetches_after_ttl_expires(self) -> None:
         auth_client = Mock()
         auth_client.external.get_config.return_value = {'api_key': 'v1'}
         store = ConnectorStore(
-            auth_client, _build_registry(_SmsConnector), cache_ttl=0.0
+            auth_client, _build_registry(_SmsConnector), cache_ttl=0.0, max_stale=0.0
         )
 
         await store.refresh('sms_backend', TENANT_A)
@@ -170,7 +190,7 @@ class TestConnectorStoreRefresh(unittest.IsolatedAsyncioTestCase):
         auth_client = Mock()
         auth_client.external.get_config.return_value = {'api_key': 'secret'}
         store = ConnectorStore(
-            auth_client, _build_registry(_SmsConnector), cache_ttl=0.0
+            auth_client, _build_registry(_SmsConnector), cache_ttl=0.0, max_stale=0.0
         )
 
         await store.refresh('sms_backend', TENANT_A)
@@ -434,7 +454,10 @@ class TestConnectorStoreGet(unittest.TestCase):
             'wazo_chatd.plugins.connectors.store.time.monotonic', return_value=1000.0
         ):
             store = ConnectorStore(
-                auth_client, _build_registry(_SmsConnector), cache_ttl=100.0
+                auth_client,
+                _build_registry(_SmsConnector),
+                cache_ttl=100.0,
+                max_stale=0.0,
             )
             for i in range(50):
                 store.get('sms_backend', f'tenant-{i}')
@@ -469,6 +492,232 @@ class TestConnectorStoreGet(unittest.TestCase):
         assert auth_client.external.get_config.call_count == 2
 
 
+class TestConnectorStoreRefreshAhead(unittest.TestCase):
+    def setUp(self) -> None:
+        self.auth_client = Mock()
+        self.auth_client.external.get_config.return_value = {'api_key': 'secret'}
+        self.listener = Mock()
+
+    def _build_store(self, **kwargs: float) -> ConnectorStore:
+        store = ConnectorStore(
+            self.auth_client,
+            _build_registry(_SmsConnector),
+            cache_ttl=100.0,
+            **kwargs,
+        )
+        store._fetch_pool = Mock(submit=lambda fn, *args: fn(*args))
+        store.add_listener(self.listener)
+        return store
+
+    def _at(self, now: float) -> AbstractContextManager[Any]:
+        return patch(
+            'wazo_chatd.plugins.connectors.store.time.monotonic', return_value=now
+        )
+
+    def test_instance_not_refreshed_before_due(self) -> None:
+        store = self._build_store()
+        with self._at(1000.0):
+            store.get('sms_backend', TENANT_A)
+            next_due = store._refresh_due()
+
+        assert next_due > 0
+        self.auth_client.external.get_config.assert_called_once()
+
+    def test_unchanged_config_keeps_instance(self) -> None:
+        store = self._build_store()
+        with self._at(1000.0):
+            instance = store.get('sms_backend', TENANT_A)
+        with self._at(1000.0 + 97):
+            store._refresh_due()
+
+        assert self.auth_client.external.get_config.call_count == 2
+        assert store.peek('sms_backend', TENANT_A) is instance
+        assert store.stats['refreshed'] == 1
+        assert store.stats['rebuilt'] == 0
+        self.listener.assert_not_called()
+
+    def test_changed_config_rebuilds_instance(self) -> None:
+        store = self._build_store()
+        with self._at(1000.0):
+            instance = store.get('sms_backend', TENANT_A)
+        self.auth_client.external.get_config.return_value = {'api_key': 'rotated'}
+        with self._at(1000.0 + 97):
+            store._refresh_due()
+            rebuilt = store.get('sms_backend', TENANT_A)
+
+        assert rebuilt is not instance
+        assert rebuilt.provider_config == {  # type: ignore[attr-defined]
+            'api_key': 'rotated'
+        }
+        assert store.stats['rebuilt'] == 1
+        self.listener.assert_called_once_with()
+
+    def test_stale_instance_served_while_auth_unavailable(self) -> None:
+        store = self._build_store()
+        with self._at(1000.0):
+            instance = store.get('sms_backend', TENANT_A)
+        self.auth_client.external.get_config.side_effect = RequestsConnectionError()
+        with self._at(1000.0 + 130):
+            store._refresh_due()
+            store._refresh_due()
+            served = store.get('sms_backend', TENANT_A)
+            stats = store.stats
+
+        assert served is instance
+        assert self.auth_client.external.get_config.call_count == 2
+        assert stats['stale'] == 1
+        assert stats['refresh_failed'] == 1
+        self.listener.assert_not_called()
+
+    def test_stale_instance_refetched_on_read_past_max_stale(self) -> None:
+        store = self._build_store(max_stale=10.0)
+        with self._at(1000.0):
+            store.get('sms_backend', TENANT_A)
+        self.auth_client.external.get_config.side_effect = RequestsConnectionError()
+        with self._at(1000.0 + 200), self.assertRaises(AuthServiceUnavailableException):
+            store.get('sms_backend', TENANT_A)
+
+    def test_unconfigured_instance_dropped_on_refresh(self) -> None:
+        store = self._build_store()
+        with self._at(1000.0):
+            store.get('sms_backend', TENANT_A)
+        self.auth_client.external.get_config.side_effect = _not_found()
+        with self._at(1000.0 + 97):
+            store._refresh_due()
+
+        assert store.peek('sms_backend', TENANT_A) is None
+        self.listener.assert_called_once_with()
+
+    def test_started_store_refreshes_in_background(self) -> None:
+        refreshed = threading.Event()
+        calls = []
+
+        def get_config(*_args: object, **_kwargs: object) -> dict:
+            calls.append(None)
+            if len(calls) > 1:
+                refreshed.set()
+            return {'api_key': 'secret'}
+
+        self.auth_client.external.get_config.side_effect = get_config
+        store = ConnectorStore(
+            self.auth_client, _build_registry(_SmsConnector), cache_ttl=0.05
+        )
+        store.get('sms_backend', TENANT_A)
+
+        store.start()
+        try:
+            assert refreshed.wait(timeout=2)
+        finally:
+            store.stop()
+
+
+class TestConnectorStoreAsyncGet(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.fetch_started = threading.Event()
+        self.release = threading.Event()
+        self.auth_client = Mock()
+        self.store = ConnectorStore(self.auth_client, _build_registry(_SmsConnector))
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.store.stop()
+
+    def _slow_get_config(self, *_args: object, **_kwargs: object) -> dict:
+        self.fetch_started.set()
+        self.release.wait(timeout=2)
+        return {'api_key': 'secret'}
+
+    async def test_returns_cached_instance_without_fetching(self) -> None:
+        self.auth_client.external.get_config.return_value = {'api_key': 'secret'}
+        instance = self.store.get('sms_backend', TENANT_A)
+
+        result = await self.store.aget('sms_backend', TENANT_A)
+
+        assert result is instance
+        self.auth_client.external.get_config.assert_called_once()
+
+    async def test_concurrent_aget_dedups_to_single_auth_call(self) -> None:
+        self.auth_client.external.get_config.side_effect = self._slow_get_config
+
+        gathered = asyncio.gather(
+            self.store.aget('sms_backend', TENANT_A),
+            self.store.aget('sms_backend', TENANT_A),
+        )
+        assert await asyncio.to_thread(self.fetch_started.wait, 2)
+        self.release.set()
+        first, second = await gathered
+
+        assert first is second
+        assert self.store.peek('sms_backend', TENANT_A) is first
+        self.auth_client.external.get_config.assert_called_once()
+
+    async def test_cancelled_caller_does_not_cancel_shared_fetch(self) -> None:
+        self.auth_client.external.get_config.side_effect = self._slow_get_config
+
+        cancelled = asyncio.create_task(self.store.aget('sms_backend', TENANT_A))
+        waiting = asyncio.create_task(self.store.aget('sms_backend', TENANT_A))
+        assert await asyncio.to_thread(self.fetch_started.wait, 2)
+        cancelled.cancel()
+        self.release.set()
+
+        assert (await waiting).backend == 'sms_backend'
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+
+    async def test_raises_backend_not_configured_on_404(self) -> None:
+        self.auth_client.external.get_config.side_effect = _not_found()
+
+        with self.assertRaises(BackendNotConfiguredException):
+            await self.store.aget('sms_backend', TENANT_A)
+
+        assert self.store._pending_fetches == {}
+
+
+class TestConnectorStoreFetchPool(unittest.TestCase):
+    def test_batches_share_bounded_fetch_pool(self) -> None:
+        auth_client = Mock()
+        auth_client.external.get_config.return_value = {'api_key': 'secret'}
+        store = ConnectorStore(
+            auth_client, _build_registry(_SmsConnector), fetch_concurrency=2
+        )
+        pool = store._fetch_pool
+        try:
+            store.batch_find((f'tenant-{i}', 'sms_backend') for i in range(10))
+            store.batch_find((f'tenant-{i}', 'sms_backend') for i in range(10, 20))
+        finally:
+            store.stop()
+
+        assert store._fetch_pool is pool
+        assert len(pool._threads) <= 2
+        assert len(store) == 20
+        assert auth_client.external.get_config.call_count == 20
+
+    def test_stop_cancels_queued_fetches(self) -> None:
+        fetch_started = threading.Event()
+        release = threading.Event()
+
+        def slow_get_config(*_args: object, **_kwargs: object) -> dict:
+            fetch_started.set()
+            release.wait(timeout=2)
+            return {'api_key': 'secret'}
+
+        auth_client = Mock()
+        auth_client.external.get_config.side_effect = slow_get_config
+        store = ConnectorStore(
+            auth_client, _build_registry(_SmsConnector), fetch_concurrency=1
+        )
+        running, _ = store._start_fetch('sms_backend', TENANT_A)
+        queued, _ = store._start_fetch('sms_backend', TENANT_B)
+        assert fetch_started.wait(timeout=1)
+
+        store.stop()
+        release.set()
+
+        assert queued.cancelled()
+        assert running.result(timeout=2).backend == 'sms_backend'
+        assert store._pending_fetches == {}
+
+
 class TestConnectorStorePopulate(unittest.IsolatedAsyncioTestCase):
     async def test_wait_populated_resolves_on_success(self) -> None:
         auth_client = Mock()
@@ -0,0 +1,79 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from wazo_chatd.plugins.connectors.transport import (
+    DEFAULT_TIMEOUT,
+    ConnectorHttpClient,
+    HttpTransport,
+)
+
+
+class TestConnectorHttpClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.http = ConnectorHttpClient('sms_backend')
+
+    async def asyncTearDown(self) -> None:
+        await self.http.aclose()
+
+    async def test_client_reused_on_same_loop(self) -> None:
+        assert self.http.client is self.http.client
+
+    async def test_client_recreated_after_close(self) -> None:
+        client = self.http.client
+
+        await self.http.aclose()
+
+        assert client.is_closed
+        assert self.http.client is not client
+
+    async def test_one_client_per_loop(self) -> None:
+        async def _client_of_other_loop():
+            client = self.http.client
+            await self.http.aclose()
+            return client
+
+        other = await asyncio.to_thread(asyncio.run, _client_of_other_loop())
+
+        assert other is not self.http.client
+        assert other.is_closed
+        assert not self.http.client.is_closed
+
+    def test_http2_disabled_without_h2(self) -> None:
+        with patch('wazo_chatd.plugins.connectors.transport.HTTP2_AVAILABLE', False):
+            http = ConnectorHttpClient('sms_backend', http2=True)
+
+        assert http._http2 is False
+
+
+class TestHttpTransport(unittest.TestCase):
+    def test_one_client_per_backend(self) -> None:
+        transport = HttpTransport({})
+
+        assert transport.client('sms_backend') is transport.client('sms_backend')
+        assert transport.client('sms_backend') is not transport.client('other')
+
+    def test_limits_configured_per_backend(self) -> None:
+        transport = HttpTransport(
+            {
+                'sms_backend': {
+                    'http_timeout': 3,
+                    'http_max_connections': 5,
+                    'http_max_keepalive_connections': 2,
+                },
+                'other': None,
+            }
+        )
+
+        limited = transport.client('sms_backend')
+        default = transport.client('other')
+
+        assert limited._timeout.connect == 3.0
+        assert limited._limits.max_connections == 5
+        assert limited._limits.max_keepalive_connections == 2
+        assert default._timeout.connect == DEFAULT_TIMEOUT
@@ -0,0 +1,148 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from collections.abc import Mapping
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT: float = 10.0
+DEFAULT_MAX_CONNECTIONS: int = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+DEFAULT_KEEPALIVE_EXPIRY: float = 30.0
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE: bool = importlib.util.find_spec('h2') is not None
+
+
+class ConnectorHttpClient:
+    """Pooled async HTTP client of one backend.
+
+    Given to connectors as ``connector_config['http_client']``. Connections
+    are pooled per host and kept alive between requests, HTTP/2 is used when
+    available. An :class:`httpx.AsyncClient` is bound to the event loop
+    using it, so one client is kept per loop, closed by :meth:`aclose`.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: bool = True,
+    ) -> None:
+        self.backend = backend
+        self._timeout = httpx.Timeout(timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2 and HTTP2_AVAILABLE
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The client of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = self._clients[loop] = httpx.AsyncClient(
+                    timeout=self._timeout,
+                    limits=self._limits,
+                    http2=self._http2,
+                )
+        return client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('PUT', url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request('DELETE', url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close the client of the running event loop, if any."""
+        with self._lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class HttpTransport:
+    """HTTP clients shared by connector instances, one per backend.
+
+    Configured per backend in ``connectors``: ``http_timeout`` (seconds),
+    ``http_max_connections``, ``http_max_keepalive_connections``,
+    ``http_keepalive_expiry`` (seconds) and ``http2``.
+    """
+
+    def __init__(
+        self, connectors_config: Mapping[str, Mapping[str, Any] | None]
+    ) -> None:
+        self._connectors_config = connectors_config
+        self._clients: dict[str, ConnectorHttpClient] = {}
+        self._lock = threading.Lock()
+
+    def client(self, backend: str) -> ConnectorHttpClient:
+        with self._lock:
+            if (client := self._clients.get(backend)) is None:
+                client = self._clients[backend] = self._build(backend)
+        return client
+
+    async def aclose(self) -> None:
+        """Close the clients used by the running event loop."""
+        with self._lock:
+            clients = list(self._clients.values())
+        results = await asyncio.gather(
+            *(client.aclose() for client in clients), return_exceptions=True
+        )
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.warning(
+                    'Failed to close HTTP client of %r: %s', client.backend, result
+                )
+
+    def _build(self, backend: str) -> ConnectorHttpClient:
+        config = self._connectors_config.get(backend) or {}
+        return ConnectorHttpClient(
+            backend,
+            timeout=float(config.get('http_timeout', DEFAULT_TIMEOUT)),
+            max_connections=int(
+                config.get('http_max_connections', DEFAULT_MAX_CONNECTIONS)
+            ),
+            max_keepalive_connections=int(
+                config.get(
+                    'http_max_keepalive_connections',
+                    DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+                )
+            ),
+            keepalive_expiry=float(
+                config.get('http_keepalive_expiry', DEFAULT_KEEPALIVE_EXPIRY)
+            ),
+            http2=bool(config.get('http2', True)),
+        )
@@ -1,10 +1,10 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
 from functools import partial, wraps
 
-from wazo_chatd.database.helpers import session_scope
+from wazo_chatd.database.helpers import session_scope, shared_session_scope
 from wazo_chatd.database.models import (
     Channel,
     Line,
@@ -22,29 +22,108 @@ from .initiator import (
     extract_endpoint_from_channel,
     extract_endpoint_from_line,
 )
+from .replay import ReplayAction
 
 logger = logging.getLogger(__name__)
 
+RESYNCED_RESOURCES = (Resource.DEVICE, Resource.CHANNEL)
+
+
+def _tenant_key(event):
+    return 'tenant', event['uuid']
+
+
+def _user_key(event):
+    return 'user', event['uuid']
+
+
+def _user_dnd_key(event):
+    return 'user', event['user_uuid']
+
+
+def _session_key(event):
+    return 'session', event['uuid']
+
+
+def _refresh_token_key(event):
+    return 'refresh_token', event['user_uuid'], event['client_id']
+
+
+def _line_key(event):
+    return 'line', event['line']['id']
+
+
+def _endpoint_key(event):
+    return 'endpoint', event['Device']
+
+
+def _channel_key(event):
+    return 'channel', event['Channel']
+
 
 class BusInitiatorHandler:
-    def __init__(self, event_handler, initiator):
+    def __init__(self, event_handler, initiator, replay_log, replay_batch_size):
         self._event_handler = event_handler
         self._initiator = initiator
-        self._callbacks_delayed = []
+        self._replay_log = replay_log
+        self._replay_batch_size = replay_batch_size
+
+    def on_init_start(self):
+        self._replay_log.open()
 
     def on_init_complete(self):
-        logger.debug('Dispatching delayed events: %s', len(self._callbacks_delayed))
-        for callback in self._callbacks_delayed:
-            try:
-                callback()
-            except Exception as e:
-                logger.error(e)
-                continue
+        self._replay_delayed()
+
+    def on_resync_start(self):
+        self._replay_log.open()
+
+    def on_resync_complete(self):
+        self._replay_delayed()
+
+    def _replay_delayed(self):
+        # Replayed events may take a while, more can be delayed meanwhile
+        while callbacks := self._replay_log.drain():
+            self._replay_all(callbacks)
+
+        # Closing makes the next events dispatched directly
+        self._replay_all(self._replay_log.close())
+
+    def _replay_all(self, callbacks):
+        logger.debug('Dispatching delayed events: %s', len(callbacks))
+        for start in range(0, len(callbacks), self._replay_batch_size):
+            self._replay(callbacks[start : start + self._replay_batch_size])
+
+    def _replay(self, callbacks):
+        succeeded = failed = 0
+        try:
+            with shared_session_scope() as session:
+                for callback in callbacks:
+                    savepoint = session.begin_nested()
+                    try:
+                        callback()
+                    except Exception as e:
+                        savepoint.rollback()
+                        failed += 1
+                        logger.error(e)
+                        continue
+
+                    if savepoint.is_active:
+                        savepoint.commit()
+                    succeeded += 1
+        except Exception:
+            logger.exception('Failed to replay %d delayed events', len(callbacks))
+            succeeded, failed = 0, len(callbacks)
+
+        self._replay_log.mark_replayed(succeeded, failed)
 
     @staticmethod
-    def unlock_after_fetched(resource):
+    def unlock_after_fetched(
+        resource, replay_key=None, replay_action=ReplayAction.UPDATE
+    ):
         def wrapper(func):
             func.init_fetched_resource = resource
+            func.init_replay_key = replay_key
+            func.init_replay_action = replay_action
             return func
 
         return wrapper
@@ -52,24 +131,38 @@ class BusInitiatorHandler:
     def handle_init_process(self, func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            is_callback_handled = hasattr(func, 'init_fetched_resource')
-            if self._initiator.in_progress() and is_callback_handled:
-                if self._initiator.has_fetched(func.init_fetched_resource):
-                    callback = partial(func, *args, **kwargs)
-                    self._callbacks_delayed.append(callback)
-                    logger.debug('Delaying event: Initialization in progress')
-                else:
+            resource = getattr(func, 'init_fetched_resource', None)
+            if resource is None:
+                return func(*args, **kwargs)
+
+            if self._initiator.in_progress():
+                if not self._initiator.has_fetched(resource):
                     logger.debug('Dropping event: Initialization in progress')
-                return
+                    return
+                if self._delay(func, args, kwargs):
+                    logger.debug('Delaying event: Initialization in progress')
+                    return
+            elif resource in RESYNCED_RESOURCES and self._initiator.resyncing():
+                if self._delay(func, args, kwargs):
+                    logger.debug('Delaying event: Asterisk resync in progress')
+                    return
 
             return func(*args, **kwargs)
 
         return wrapper
 
+    def _delay(self, func, args, kwargs):
+        key = None
+        if func.init_replay_key:
+            key = func.init_replay_key(*args, **kwargs)
+        callback = partial(func, *args, **kwargs)
+        return self._replay_log.add(key, func.init_replay_action, callback)
+
 
 class BusEventHandler:
-    def __init__(self, dao, notifier, initiator_thread):
+    def __init__(self, dao, engine, notifier, initiator_thread):
         self._dao = dao
+        self._engine = engine
         self._notifier = notifier
         self._initiator_thread = initiator_thread
 
@@ -98,7 +191,11 @@ class BusEventHandler:
         for event, handler in events:
             bus_consumer.subscribe(event, handler)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.USER)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.USER,
+        replay_key=_user_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _user_created(self, event):
         user_uuid = event['uuid']
         tenant_uuid = event['tenant_uuid']
@@ -107,8 +204,14 @@ class BusEventHandler:
             logger.debug('Create user "%s"', user_uuid)
             user = User(uuid=user_uuid, tenant=tenant, state='unavailable')
             self._dao.user.create(user)
-
-    @BusInitiatorHandler.unlock_after_fetched(Resource.USER)
+            if self._engine.is_loaded():
+                self._engine.sync_user(user)
+
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.USER,
+        replay_key=_user_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _user_deleted(self, event):
         user_uuid = event['uuid']
         tenant_uuid = event['tenant_uuid']
@@ -116,8 +219,13 @@ class BusEventHandler:
             user = self._dao.user.get([tenant_uuid], user_uuid)
             logger.debug('Delete user "%s"', user_uuid)
             self._dao.user.delete(user)
+        self._engine.remove_user(user_uuid)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.TENANT)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.TENANT,
+        replay_key=_tenant_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _tenant_created(self, event):
         tenant_uuid = event['uuid']
         with session_scope():
@@ -125,15 +233,24 @@ class BusEventHandler:
             tenant = Tenant(uuid=tenant_uuid)
             self._dao.tenant.create(tenant)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.TENANT)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.TENANT,
+        replay_key=_tenant_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _tenant_deleted(self, event):
         tenant_uuid = event['uuid']
         with session_scope():
             tenant = self._dao.tenant.get(tenant_uuid)
             logger.debug('Delete tenant "%s"', tenant_uuid)
             self._dao.tenant.delete(tenant)
+        self._engine.remove_tenant(tenant_uuid)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.SESSION)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.SESSION,
+        replay_key=_session_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _session_created(self, event):
         mobile = event['mobile']
         session_uuid = event['uuid']
@@ -151,9 +268,13 @@ class BusEventHandler:
             logger.debug('Create session "%s" for user "%s"', session_uuid, user_uuid)
             session = Session(uuid=session_uuid, user_uuid=user_uuid, mobile=mobile)
             self._dao.user.add_session(user, session)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.SESSION)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.SESSION,
+        replay_key=_session_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _session_deleted(self, event):
         session_uuid = event['uuid']
         tenant_uuid = event['tenant_uuid']
@@ -170,9 +291,13 @@ class BusEventHandler:
             session = self._dao.session.get(session_uuid)
             logger.debug('Delete session "%s" for user "%s"', session_uuid, user_uuid)
             self._dao.user.remove_session(user, session)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.REFRESH_TOKEN)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.REFRESH_TOKEN,
+        replay_key=_refresh_token_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _refresh_token_created(self, event):
         mobile = event['mobile']
         tenant_uuid = event['tenant_uuid']
@@ -194,9 +319,13 @@ class BusEventHandler:
                 client_id=client_id, user_uuid=user_uuid, mobile=mobile
             )
             self._dao.user.add_refresh_token(user, refresh_token)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.REFRESH_TOKEN)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.REFRESH_TOKEN,
+        replay_key=_refresh_token_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _refresh_token_deleted(self, event):
         tenant_uuid = event['tenant_uuid']
         user_uuid = event['user_uuid']
@@ -215,9 +344,13 @@ class BusEventHandler:
                 'Delete refresh token "%s" for user "%s"', client_id, user_uuid
             )
             self._dao.user.remove_refresh_token(user, refresh_token)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.USER)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.USER,
+        replay_key=_line_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _user_line_associated(self, event):
         line_id = event['line']['id']
         user_uuid = event['user']['uuid']
@@ -233,16 +366,20 @@ class BusEventHandler:
 
             if not endpoint_name:
                 logger.warning('Line "%s" doesn\'t have name', line_id)
-                self._notifier.updated(user)
+                self._user_updated(user)
                 return
             endpoint = self._dao.endpoint.find_or_create(endpoint_name)
             logger.debug(
                 'Associate line "%s" with endpoint "%s"', line_id, endpoint_name
             )
             self._dao.line.associate_endpoint(line, endpoint)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.USER)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.USER,
+        replay_key=_line_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _user_line_dissociated(self, event):
         line_id = event['line']['id']
         user_uuid = event['user']['uuid']
@@ -252,9 +389,13 @@ class BusEventHandler:
             line = self._dao.line.get(line_id)
             logger.debug('Delete line "%s"', line_id)
             self._dao.user.remove_line(user, line)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.USER)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.USER,
+        replay_key=_user_dnd_key,
+        replay_action=ReplayAction.UPDATE,
+    )
     def _user_dnd_updated(self, event):
         user_uuid = event['user_uuid']
         tenant_uuid = event['tenant_uuid']
@@ -264,9 +405,13 @@ class BusEventHandler:
             logger.debug('Updating DND status of user "%s" to "%s"', user_uuid, enabled)
             user.do_not_disturb = enabled
             self._dao.user.update(user)
-            self._notifier.updated(user)
+            self._user_updated(user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.DEVICE)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.DEVICE,
+        replay_key=_endpoint_key,
+        replay_action=ReplayAction.UPDATE,
+    )
     def _device_state_change(self, event):
         logger.debug('Device state change: %s', event)
         endpoint_name = event['Device']
@@ -277,6 +422,12 @@ class BusEventHandler:
             return
 
         state = DEVICE_STATE_MAP.get(event['State'], 'unavailable')
+        if self._engine.is_loaded():
+            logger.debug('Update endpoint "%s" with state "%s"', endpoint_name, state)
+            if user := self._engine.update_endpoint(endpoint_name, state):
+                self._notifier.updated(user)
+            return
+
         with session_scope():
             endpoint = self._dao.endpoint.find_or_create(endpoint_name)
             if endpoint.state == state:
@@ -289,13 +440,31 @@ class BusEventHandler:
             self._dao.endpoint.update(endpoint)
 
             if endpoint.line:
-                self._notifier.updated(endpoint.line.user)
+                self._user_updated(endpoint.line.user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.CHANNEL)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.CHANNEL,
+        replay_key=_channel_key,
+        replay_action=ReplayAction.CREATE,
+    )
     def _channel_created(self, event):
         channel_name = event['Channel']
         state = CHANNEL_STATE_MAP.get(event['ChannelStateDesc'], 'undefined')
         endpoint_name = extract_endpoint_from_channel(channel_name)
+        if self._engine.is_loaded():
+            user = self._engine.add_channel(channel_name, state, endpoint_name)
+            if not user:
+                logger.debug(
+                    'Unknown line with endpoint "%s" for channel "%s"',
+                    endpoint_name,
+                    channel_name,
+                )
+                return
+
+            logger.debug('Create channel "%s" for user "%s"', channel_name, user.uuid)
+            self._notifier.updated(user)
+            return
+
         with session_scope():
             line = self._dao.line.find_by(endpoint_name=endpoint_name)
             if not line:
@@ -310,11 +479,25 @@ class BusEventHandler:
             logger.debug('Create channel "%s" for line "%s"', channel.name, line.id)
             self._dao.line.add_channel(line, channel)
 
-            self._notifier.updated(channel.line.user)
+            self._user_updated(channel.line.user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.CHANNEL)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.CHANNEL,
+        replay_key=_channel_key,
+        replay_action=ReplayAction.DELETE,
+    )
     def _channel_deleted(self, event):
         channel_name = event['Channel']
+        if self._engine.is_loaded():
+            user = self._engine.remove_channel(channel_name)
+            if not user:
+                logger.debug('Unknown channel "%s"', channel_name)
+                return
+
+            logger.debug('Delete channel "%s"', channel_name)
+            self._notifier.updated(user)
+            return
+
         with session_scope():
             channel = self._dao.channel.find(channel_name)
             if not channel:
@@ -324,43 +507,48 @@ class BusEventHandler:
             logger.debug('Delete channel "%s"', channel_name)
             self._dao.line.remove_channel(channel.line, channel)
 
-            self._notifier.updated(channel.line.user)
+            self._user_updated(channel.line.user)
 
-    @BusInitiatorHandler.unlock_after_fetched(Resource.CHANNEL)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.CHANNEL,
+        replay_key=_channel_key,
+        replay_action=ReplayAction.UPDATE,
+    )
     def _channel_updated(self, event):
         channel_name = event['Channel']
         state = CHANNEL_STATE_MAP.get(event['ChannelStateDesc'], 'undefined')
-        with session_scope():
-            channel = self._dao.channel.find(channel_name)
-            if not channel:
-                logger.debug('Unknown channel "%s"', channel_name)
-                return
-
-            logger.debug('Update channel "%s" with state "%s"', channel_name, state)
-            channel.state = state
-            self._dao.channel.update(channel)
+        self._update_channel_state(channel_name, state)
 
-            self._notifier.updated(channel.line.user)
-
-    @BusInitiatorHandler.unlock_after_fetched(Resource.CHANNEL)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.CHANNEL,
+        replay_key=_channel_key,
+        replay_action=ReplayAction.UPDATE,
+    )
     def _channel_hold(self, event):
         channel_name = event['Channel']
-        with session_scope():
-            channel = self._dao.channel.find(channel_name)
-            if not channel:
-                logger.debug('Unknown channel "%s"', channel_name)
-                return
-
-            logger.debug('Update channel "%s" with state "holding"', channel_name)
-            channel.state = 'holding'
-            self._dao.channel.update(channel)
+        self._update_channel_state(channel_name, 'holding')
 
-            self._notifier.updated(channel.line.user)
-
-    @BusInitiatorHandler.unlock_after_fetched(Resource.CHANNEL)
+    @BusInitiatorHandler.unlock_after_fetched(
+        Resource.CHANNEL,
+        replay_key=_channel_key,
+        replay_action=ReplayAction.UPDATE,
+    )
     def _channel_unhold(self, event):
         channel_name = event['Channel']
         state = CHANNEL_STATE_MAP.get(event['ChannelStateDesc'], 'undefined')
+        self._update_channel_state(channel_name, state)
+
+    def _update_channel_state(self, channel_name, state):
+        if self._engine.is_loaded():
+            user = self._engine.update_channel(channel_name, state)
+            if not user:
+                logger.debug('Unknown channel "%s"', channel_name)
+                return
+
+            logger.debug('Update channel "%s" with state "%s"', channel_name, state)
+            self._notifier.updated(user)
+            return
+
         with session_scope():
             channel = self._dao.channel.find(channel_name)
             if not channel:
@@ -371,9 +559,28 @@ class BusEventHandler:
             channel.state = state
             self._dao.channel.update(channel)
 
-            self._notifier.updated(channel.line.user)
+            self._user_updated(channel.line.user)
 
     def _asterisk_fullybooted(self, event):
-        logger.info('Asterisk boot detected, (re)starting presence initialization')
-        if self._initiator_thread:
+        if not self._initiator_thread:
+            return
+
+        if self._engine.is_loaded():
+            logger.info('Asterisk boot detected, resynchronizing devices and channels')
+            self._initiator_thread.resync()
+        else:
+            logger.info('Asterisk boot detected, (re)starting presence initialization')
             self._initiator_thread.restart()
+
+    def on_asterisk_resync(self, endpoints, channels):
+        users = self._engine.resync(endpoints, channels)
+        logger.debug('Asterisk resynchronization changed %d users', len(users))
+        for user in users:
+            self._notifier.updated(user)
+
+    def _user_updated(self, user):
+        if self._engine.is_loaded():
+            self._notifier.updated(self._engine.sync_user(user))
+        else:
+            self._dao.user.bump_presence_revisions([user.uuid])
+            self._notifier.updated(user)
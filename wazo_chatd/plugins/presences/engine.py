@@ -0,0 +1,559 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import attrgetter
+
+from wazo_chatd.database.helpers import session_scope
+from wazo_chatd.exceptions import UnknownUserException
+
+from .schemas import merge_line_state, merge_user_line_state
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionPresence:
+    uuid: str
+    mobile: bool
+
+
+@dataclass(frozen=True, slots=True)
+class RefreshTokenPresence:
+    client_id: str
+    mobile: bool
+
+
+@dataclass(slots=True)
+class EndpointPresence:
+    name: str
+    state: str = 'unavailable'
+
+
+@dataclass(slots=True)
+class LinePresence:
+    id: int
+    user_uuid: str
+    endpoint: EndpointPresence | None = None
+    channels: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def endpoint_name(self) -> str | None:
+        return self.endpoint.name if self.endpoint else None
+
+    @property
+    def endpoint_state(self) -> str | None:
+        return self.endpoint.state if self.endpoint else None
+
+    @property
+    def channels_state(self) -> list[str]:
+        return list(self.channels.values())
+
+
+@dataclass(slots=True)
+class UserPresence:
+    uuid: str
+    tenant_uuid: str
+    state: str = 'unavailable'
+    status: str | None = None
+    do_not_disturb: bool = False
+    last_activity: datetime | None = None
+    revision: int = 0
+    lines: tuple[LinePresence, ...] = ()
+    sessions: tuple[SessionPresence, ...] = ()
+    refresh_tokens: tuple[RefreshTokenPresence, ...] = ()
+
+
+class PresenceEngine:
+    """In-process presence model, authoritative once loaded.
+
+    AMI driven state (endpoints and channels) is only applied in memory
+    and persisted later by :meth:`flush` (write-behind). Other changes
+    (users, sessions, refresh tokens, lines) are written to the database
+    by their handler first, then mirrored with :meth:`sync_user`.
+
+    Users whose presence changed get a new presence revision when they
+    are flushed. The flush is the only writer of revisions while the
+    engine is loaded, so revisions are committed in increasing order.
+    Presences are fingerprinted when unloading, so that loading only
+    bumps the revision of users changed in the meantime.
+
+    Writers hold ``_lock``. Collections exposed on the presence objects
+    are replaced instead of mutated, so readers (HTTP threads, notifier)
+    can dump them with :class:`UserPresenceSchema` without locking.
+    """
+
+    def __init__(self, dao):
+        self._dao = dao
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._loaded = False
+        self._users: dict[str, UserPresence] = {}
+        self._lines: dict[int, LinePresence] = {}
+        self._lines_by_endpoint: dict[str, LinePresence] = {}
+        self._endpoints: dict[str, EndpointPresence] = {}
+        self._channels: dict[str, LinePresence] = {}
+        self._dirty_endpoints: set[str] = set()
+        self._dirty_channels: set[str] = set()
+        self._dirty_users: set[str] = set()
+        self._fingerprints: dict[str, int] | None = None
+
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        with session_scope():
+            endpoints, users = self._read()
+
+            with self._flush_lock, self._lock:
+                self._clear()
+                self._endpoints = endpoints
+                for user in users:
+                    self._index_user(self._build_user(user))
+
+                # Presences may have changed while the engine was not loaded
+                fingerprints = self._fingerprints or {}
+                changed = [
+                    uuid
+                    for uuid, user in self._users.items()
+                    if fingerprints.get(uuid) != _fingerprint(user)
+                ]
+                revisions = self._dao.user.bump_presence_revisions(changed)
+                for uuid, revision in revisions.items():
+                    self._users[uuid].revision = revision
+                self._fingerprints = None
+                self._loaded = True
+
+        logger.info(
+            'Presence engine loaded: %d users (%d changed), %d lines, %d channels',
+            len(self._users),
+            len(revisions),
+            len(self._lines),
+            len(self._channels),
+        )
+
+    def unload(self) -> None:
+        with self._flush_lock, self._lock:
+            if self._loaded:
+                self._fingerprints = self._fingerprint_users()
+            self._loaded = False
+            self._clear()
+
+        if self._fingerprints is None:
+            # First initialization: presences as last persisted
+            with session_scope():
+                endpoints, users = self._read()
+                with self._lock:
+                    self._endpoints = endpoints
+                    for user in users:
+                        self._index_user(self._build_user(user))
+                    self._fingerprints = self._fingerprint_users()
+                    self._clear()
+        logger.debug('Presence engine unloaded')
+
+    def _read(self) -> tuple[dict[str, EndpointPresence], list]:
+        endpoints = {
+            endpoint.name: EndpointPresence(endpoint.name, endpoint.state)
+            for endpoint in self._dao.endpoint.list_()
+        }
+        return endpoints, self._dao.user.list_presences(tenant_uuids=None)
+
+    def _fingerprint_users(self) -> dict[str, int]:
+        return {uuid: _fingerprint(user) for uuid, user in self._users.items()}
+
+    def _clear(self) -> None:
+        self._users = {}
+        self._lines = {}
+        self._lines_by_endpoint = {}
+        self._endpoints = {}
+        self._channels = {}
+        self._dirty_endpoints = set()
+        self._dirty_channels = set()
+        self._dirty_users = set()
+
+    def get(self, tenant_uuids, user_uuid) -> UserPresence:
+        user = self._users.get(str(user_uuid))
+        if not user or str(user.tenant_uuid) not in _as_strings(tenant_uuids):
+            raise UnknownUserException(user_uuid)
+        return user
+
+    def find(self, user_uuid) -> UserPresence | None:
+        return self._users.get(str(user_uuid))
+
+    def list_(self, tenant_uuids, uuids=None) -> list[UserPresence]:
+        with self._lock:
+            users = list(self._users.values())
+
+        if uuids:
+            user_uuids = _as_strings(uuids)
+            users = [user for user in users if user.uuid in user_uuids]
+
+        if tenant_uuids is None:
+            return users
+
+        tenant_uuids = _as_strings(tenant_uuids)
+        return [user for user in users if user.tenant_uuid in tenant_uuids]
+
+    def list_page(
+        self, tenant_uuids, uuids=None, since=None, limit=None, offset=0
+    ) -> tuple[list[UserPresence], int, int, int]:
+        """Same page, ordering, counts and cursor as ``UserDAO.list_presences_page``."""
+        users = self.list_(tenant_uuids)
+        total = len(users)
+        cursor = max((user.revision for user in users), default=0)
+        if uuids:
+            user_uuids = _as_strings(uuids)
+            users = [user for user in users if user.uuid in user_uuids]
+        if since is not None:
+            users = [user for user in users if user.revision > since]
+
+        users.sort(key=attrgetter('uuid'))
+        end = None if limit is None else offset + limit
+        return users[offset:end], total, len(users), cursor
+
+    def sync_user(self, user) -> UserPresence:
+        """Mirror a database user (and its lines, sessions and tokens).
+
+        Endpoint and channel states are kept from the engine, since the
+        database may lag behind them until the next flush.
+        """
+        with self._lock:
+            presence = self._build_user(user)
+            if previous := self._users.get(presence.uuid):
+                presence.revision = max(presence.revision, previous.revision)
+                self._unindex_user(previous)
+            self._index_user(presence)
+            self._dirty_users.add(presence.uuid)
+            return presence
+
+    def remove_user(self, user_uuid) -> None:
+        with self._lock:
+            user = self._users.pop(str(user_uuid), None)
+            if user:
+                self._unindex_user(user)
+
+    def remove_tenant(self, tenant_uuid) -> None:
+        tenant_uuid = str(tenant_uuid)
+        with self._lock:
+            for user in list(self._users.values()):
+                if user.tenant_uuid == tenant_uuid:
+                    self.remove_user(user.uuid)
+
+    def update_endpoint(self, name, state) -> UserPresence | None:
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if not endpoint:
+                endpoint = self._endpoints[name] = EndpointPresence(name)
+                self._dirty_endpoints.add(name)
+
+            if endpoint.state == state:
+                return None
+
+            endpoint.state = state
+            self._dirty_endpoints.add(name)
+
+            line = self._lines_by_endpoint.get(name)
+            return self._touch(line.user_uuid) if line else None
+
+    def add_channel(self, name, state, endpoint_name) -> UserPresence | None:
+        with self._lock:
+            line = self._lines_by_endpoint.get(endpoint_name)
+            if not line:
+                return None
+
+            previous_line = self._channels.get(name)
+            if previous_line and previous_line is not line:
+                previous_line.channels = _without(previous_line.channels, name)
+
+            line.channels = {**line.channels, name: state}
+            self._channels[name] = line
+            self._dirty_channels.add(name)
+            return self._touch(line.user_uuid)
+
+    def update_channel(self, name, state) -> UserPresence | None:
+        with self._lock:
+            line = self._channels.get(name)
+            if not line:
+                return None
+
+            line.channels = {**line.channels, name: state}
+            self._dirty_channels.add(name)
+            return self._touch(line.user_uuid)
+
+    def remove_channel(self, name) -> UserPresence | None:
+        with self._lock:
+            line = self._channels.pop(name, None)
+            if not line:
+                return None
+
+            line.channels = _without(line.channels, name)
+            self._dirty_channels.add(name)
+            return self._touch(line.user_uuid)
+
+    def resync(
+        self, endpoints: dict[str, str], channels: dict[str, tuple[str, str]]
+    ) -> list[UserPresence]:
+        """Align endpoints and channels with a fresh Asterisk snapshot.
+
+        ``endpoints`` maps device names to states and ``channels`` maps
+        channel names to their state and endpoint name. Endpoints missing
+        from the snapshot become unavailable. Only the differences are
+        applied (and persisted by the next flush). Returns the users whose
+        line state changed.
+        """
+        previous_line_states: dict[str, str] = {}
+
+        def touch(line: LinePresence | None) -> None:
+            if line and line.user_uuid not in previous_line_states:
+                if user := self._users.get(line.user_uuid):
+                    previous_line_states[user.uuid] = _line_state(user)
+
+        with self._lock:
+            if not self._loaded:
+                return []
+
+            for name, state in endpoints.items():
+                if name not in self._endpoints:
+                    self._endpoints[name] = EndpointPresence(name, state)
+                    self._dirty_endpoints.add(name)
+
+            for name, endpoint in self._endpoints.items():
+                state = endpoints.get(name, 'unavailable')
+                if endpoint.state != state:
+                    touch(self._lines_by_endpoint.get(name))
+                    endpoint.state = state
+                    self._dirty_endpoints.add(name)
+
+            for name in self._channels.keys() - channels.keys():
+                line = self._channels.pop(name)
+                touch(line)
+                line.channels = _without(line.channels, name)
+                self._dirty_channels.add(name)
+
+            for name, (state, endpoint_name) in channels.items():
+                line = self._lines_by_endpoint.get(endpoint_name)
+                previous_line = self._channels.get(name)
+                if not line:
+                    continue
+                if previous_line is line and line.channels[name] == state:
+                    continue
+
+                touch(line)
+                if previous_line and previous_line is not line:
+                    touch(previous_line)
+                    previous_line.channels = _without(previous_line.channels, name)
+                line.channels = {**line.channels, name: state}
+                self._channels[name] = line
+                self._dirty_channels.add(name)
+
+            users = [self._users[uuid] for uuid in previous_line_states]
+            changed_users = [
+                user
+                for user in users
+                if _line_state(user) != previous_line_states[user.uuid]
+            ]
+            self._dirty_users.update(user.uuid for user in changed_users)
+            return changed_users
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                endpoint_names, self._dirty_endpoints = self._dirty_endpoints, set()
+                channel_names, self._dirty_channels = self._dirty_channels, set()
+                endpoints = [
+                    (name, self._endpoints[name].state)
+                    for name in endpoint_names
+                    if name in self._endpoints
+                ]
+                channels = [
+                    (name, line.channels[name], line.id)
+                    for name in channel_names
+                    if (line := self._channels.get(name))
+                ]
+                deleted_channels = [
+                    name for name in channel_names if name not in self._channels
+                ]
+                user_uuids, self._dirty_users = self._dirty_users, set()
+
+            if not (endpoints or channels or deleted_channels or user_uuids):
+                return
+
+            try:
+                with session_scope():
+                    self._dao.endpoint.upsert_all(endpoints)
+                    self._dao.channel.delete_by_names(deleted_channels)
+                    self._dao.channel.upsert_all(channels)
+                    revisions = self._dao.user.bump_presence_revisions(list(user_uuids))
+            except Exception:
+                with self._lock:
+                    self._dirty_endpoints |= endpoint_names
+                    self._dirty_channels |= channel_names
+                    self._dirty_users |= user_uuids
+                raise
+
+            with self._lock:
+                for uuid, revision in revisions.items():
+                    if user := self._users.get(uuid):
+                        user.revision = max(user.revision, revision)
+
+        logger.debug(
+            'Presence engine flushed %d endpoints, %d channels (%d deleted), %d users',
+            len(endpoints),
+            len(channels),
+            len(deleted_channels),
+            len(revisions),
+        )
+
+    def _build_user(self, user) -> UserPresence:
+        lines = []
+        for line in user.lines:
+            endpoint = None
+            if line.endpoint_name:
+                endpoint = self._endpoints.get(line.endpoint_name)
+                if not endpoint:
+                    state = line.endpoint_state or 'unavailable'
+                    endpoint = EndpointPresence(line.endpoint_name, state)
+                    self._endpoints[line.endpoint_name] = endpoint
+
+            if known_line := self._lines.get(line.id):
+                channels = known_line.channels
+            else:
+                channels = {channel.name: channel.state for channel in line.channels}
+
+            lines.append(
+                LinePresence(
+                    id=line.id,
+                    user_uuid=str(user.uuid),
+                    endpoint=endpoint,
+                    channels=channels,
+                )
+            )
+
+        return UserPresence(
+            uuid=str(user.uuid),
+            tenant_uuid=str(user.tenant_uuid),
+            state=user.state,
+            status=user.status,
+            do_not_disturb=user.do_not_disturb,
+            last_activity=user.last_activity,
+            revision=user.presence_revision,
+            lines=tuple(lines),
+            sessions=tuple(
+                SessionPresence(str(session.uuid), session.mobile)
+                for session in user.sessions
+            ),
+            refresh_tokens=tuple(
+                RefreshTokenPresence(token.client_id, token.mobile)
+                for token in user.refresh_tokens
+            ),
+        )
+
+    def _touch(self, user_uuid: str) -> UserPresence | None:
+        if user := self._users.get(user_uuid):
+            self._dirty_users.add(user_uuid)
+        return user
+
+    def _index_user(self, user: UserPresence) -> None:
+        for line in user.lines:
+            previous_line = self._lines.get(line.id)
+            if previous_line and previous_line.user_uuid != user.uuid:
+                # Line reassigned to another user
+                self._unindex_line(previous_line)
+                if owner := self._touch(previous_line.user_uuid):
+                    owner.lines = tuple(
+                        owned for owned in owner.lines if owned.id != line.id
+                    )
+
+            self._lines[line.id] = line
+            if line.endpoint:
+                self._lines_by_endpoint[line.endpoint.name] = line
+            for channel_name in line.channels:
+                self._channels[channel_name] = line
+        self._users[user.uuid] = user
+
+    def _unindex_user(self, user: UserPresence) -> None:
+        for line in user.lines:
+            self._unindex_line(line)
+
+    def _unindex_line(self, line: LinePresence) -> None:
+        if self._lines.get(line.id) is line:
+            del self._lines[line.id]
+        if line.endpoint and self._lines_by_endpoint.get(line.endpoint.name) is line:
+            del self._lines_by_endpoint[line.endpoint.name]
+        for channel_name in line.channels:
+            if self._channels.get(channel_name) is line:
+                del self._channels[channel_name]
+
+
+class PresenceFlusher:
+    def __init__(self, engine, interval):
+        self._engine = engine
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='presence_flusher')
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            logger.debug('joining presence flusher thread...')
+            self._thread.join()
+        self._flush()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._flush()
+
+    def _flush(self):
+        try:
+            self._engine.flush()
+        except Exception:
+            logger.exception('Failed to persist presences, will retry')
+
+
+def _as_strings(values) -> set[str]:
+    return {str(value) for value in values}
+
+
+def _line_state(user: UserPresence) -> str:
+    line_states = [
+        merge_line_state(line.channels_state, line.endpoint_state)
+        for line in user.lines
+    ]
+    return merge_user_line_state(line_states)
+
+
+def _fingerprint(user: UserPresence) -> int:
+    lines = tuple(
+        (
+            line.id,
+            line.endpoint_name,
+            line.endpoint_state,
+            frozenset(line.channels.items()),
+        )
+        for line in sorted(user.lines, key=attrgetter('id'))
+    )
+    return hash(
+        (
+            user.tenant_uuid,
+            user.state,
+            user.status,
+            user.do_not_disturb,
+            user.last_activity,
+            lines,
+            frozenset(user.sessions),
+            frozenset(user.refresh_tokens),
+        )
+    )
+
+
+def _without(channels: dict[str, str], name: str) -> dict[str, str]:
+    return {key: value for key, value in channels.items() if key != name}
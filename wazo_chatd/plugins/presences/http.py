@@ -1,4 +1,4 @@
-# Copyright 2019-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from flask import request
@@ -22,13 +22,14 @@ class PresenceListResource(AuthResource):
         parameters = ListRequestSchema().load(request.args)
         tenant_uuids = get_tenant_uuids(parameters.pop('recurse'))
 
-        presences = self._service.list_(tenant_uuids, **parameters)
-        total = self._service.count(tenant_uuids)
-        filtered = self._service.count(tenant_uuids, **parameters)
+        presences, total, filtered, cursor = self._service.list_page(
+            tenant_uuids, **parameters
+        )
         return {
             'items': UserPresenceSchema().dump(presences, many=True),
             'filtered': filtered,
             'total': total,
+            'cursor': cursor,
         }
 
 
@@ -40,7 +41,7 @@ class PresenceItemResource(AuthResource):
     @status_validator.presence_initialization
     def get(self, user_uuid):
         tenant_uuids = get_tenant_uuids(recurse=True)
-        presence = self._service.get(tenant_uuids, user_uuid)
+        presence = self._service.get_presence(tenant_uuids, user_uuid)
         return UserPresenceSchema().dump(presence), 200
 
     @required_acl('chatd.users.{user_uuid}.presences.update')
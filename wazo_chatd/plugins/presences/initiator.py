@@ -2,8 +2,11 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import logging
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum, auto
 from functools import partial
 
@@ -11,7 +14,6 @@ from xivo.status import Status
 
 from wazo_chatd.database.helpers import session_scope
 from wazo_chatd.database.models import (
-    Channel,
     Endpoint,
     Line,
     RefreshToken,
@@ -79,6 +81,36 @@ class MilestoneTracker:
             self._milestones.clear()
 
 
+def extract_device_states(events):
+    endpoints = {}
+    for event in events:
+        if event.get('Event') != 'DeviceStateChange':
+            continue
+
+        endpoint_name = event['Device']
+        if endpoint_name.startswith('Custom:'):
+            continue
+
+        endpoints[endpoint_name] = DEVICE_STATE_MAP.get(event['State'], 'unavailable')
+    return endpoints
+
+
+def extract_channel_states(events):
+    channels = {}
+    for event in events:
+        if event.get('Event') != 'CoreShowChannel':
+            continue
+
+        channel_name = event['Channel']
+        state = CHANNEL_STATE_MAP.get(event['ChannelStateDesc'], 'undefined')
+        if event['ChanVariable'].get('XIVO_ON_HOLD') == '1':
+            state = 'holding'
+
+        endpoint_name = extract_endpoint_from_channel(channel_name)
+        channels[channel_name] = (state, endpoint_name)
+    return channels
+
+
 def extract_endpoint_from_channel(channel_name):
     endpoint_name = '-'.join(channel_name.split('-')[:-1])
     if not endpoint_name:
@@ -116,6 +148,50 @@ def extract_endpoint_from_line(line):
         return _endpoint_name_for_protocol('custom', line['name'])
 
 
+class PagePrefetcher:
+    """Fetch the pages of a resource ahead of their reconciliation.
+
+    At most ``depth`` pages are held at once: the producer blocks until
+    the consumer catches up, so memory does not grow with the resource
+    size. The resource is marked as fetched once its last page arrived.
+    """
+
+    _DONE = object()
+
+    def __init__(self, pages, on_fetched, abort, depth=2):
+        self._pages = pages
+        self._on_fetched = on_fetched
+        self._abort = abort
+        self._queue = queue.Queue(maxsize=depth)
+
+    def run(self):
+        try:
+            for page in self._pages:
+                if not self._put(page):
+                    return
+        except Exception as e:
+            self._put(e)
+            return
+
+        self._on_fetched()
+        self._put(self._DONE)
+
+    def _put(self, item):
+        while not self._abort.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self):
+        while (item := self._queue.get()) is not self._DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
 class Initiator:
     def __init__(self, dao, auth, amid, confd, token_expiration):
         self._dao = dao
@@ -125,13 +201,20 @@ class Initiator:
         self._token_expiration = token_expiration
         self._is_initialized = threading.Event()
         self._in_progress = threading.Event()
+        self._resyncing = threading.Event()
+        self.pre_hooks = []
         self.post_hooks = []
+        self.pre_resync_hooks = []
+        self.resync_hooks = []
+        self.post_resync_hooks = []
         self._milestone_tracker = MilestoneTracker()
+        self._last_run = {}
 
     def provide_status(self, status):
         status['presence_initialization']['status'] = (
             Status.ok if self.is_initialized() else Status.fail
         )
+        status['presence_initialization'].update(self._last_run)
 
     def is_initialized(self):
         return self._is_initialized.is_set()
@@ -139,41 +222,55 @@ class Initiator:
     def in_progress(self):
         return self._in_progress.is_set()
 
-    def _paginate_proxy(self, callback, limit=1000, **list_params):
+    def resyncing(self):
+        return self._resyncing.is_set()
+
+    def _stream_pages(self, callback, limit=1000, **list_params):
         # NOTE: offset-based pagination cannot guarantee complete result set if resource set changes
         callback = partial(callback, recurse=True, limit=limit, **list_params)
-        result = callback(limit=limit, offset=0)
-        total = result['total']
-        items = result['items']
-        offset = len(items)
-        while offset < total:
-            response = callback(offset=offset)
+        response = callback(offset=0)
+        total = response['total']
+        offset = 0
+        while True:
             new_items = response['items']
-            items.extend(new_items)
-            offset += len(new_items)
             if not new_items:
-                logger.warning(
-                    'No new items at offset %d while paginating callback %s',
-                    offset,
-                    str(callback),
-                )
+                if offset < total:
+                    logger.warning(
+                        'No new items at offset %d while paginating callback %s',
+                        offset,
+                        str(callback),
+                    )
                 break
+
+            offset += len(new_items)
+            yield new_items
+            if offset >= total:
+                break
+
+            response = callback(offset=offset)
             if response['total'] != total:
-                new_total = response['total']
                 logger.warning(
                     'reported total changed during pagination for %s; was %d, is now %d; result set might be incorrect',
                     str(callback),
                     total,
-                    new_total,
+                    response['total'],
                 )
 
-        if len(items) != total:
-            logger.warning('Fetched %d items but total was %d', len(items), total)
-        return {'items': items, 'total': total}
+        if offset != total:
+            logger.warning('Fetched %d items but total was %d', offset, total)
 
     def reset_initialized(self):
         self._is_initialized.clear()
 
+    def execute_pre_hooks(self):
+        for hook in self.pre_hooks:
+            logger.debug('Executing pre hook: %s', hook.__name__)
+            try:
+                hook()
+            except Exception as e:
+                logger.error(e)
+                continue
+
     def execute_post_hooks(self):
         for hook in self.post_hooks:
             logger.debug('Executing post hook: %s', hook.__name__)
@@ -183,99 +280,188 @@ class Initiator:
                 logger.error(e)
                 continue
 
+    def execute_pre_resync_hooks(self):
+        for hook in self.pre_resync_hooks:
+            logger.debug('Executing pre resync hook: %s', hook.__name__)
+            try:
+                hook()
+            except Exception as e:
+                logger.error(e)
+                continue
+
+    def execute_post_resync_hooks(self):
+        for hook in self.post_resync_hooks:
+            logger.debug('Executing post resync hook: %s', hook.__name__)
+            try:
+                hook()
+            except Exception as e:
+                logger.error(e)
+                continue
+
     def has_fetched(self, resource):
         return self._milestone_tracker.has_passed(resource, Stage.FETCHED)
 
+    def _mark_fetched(self, resource):
+        logger.debug('Fetching %s done', resource.name.lower())
+        self._milestone_tracker.mark(resource, Stage.FETCHED)
+
+    def _prefetch(self, executor, abort, resource, pages):
+        prefetcher = PagePrefetcher(pages, partial(self._mark_fetched, resource), abort)
+        executor.submit(prefetcher.run)
+        return prefetcher
+
+    def _fetch_ami(self, resource, action):
+        events = self._amid.action(action)
+        self._mark_fetched(resource)
+        return events
+
+    @contextmanager
+    def _timed(self, timings, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            timings[stage] = round(time.monotonic() - start, 3)
+
     def initiate(self):
         start = time.monotonic()
         self._milestone_tracker.reset()
         self._in_progress.set()
+        self.execute_pre_hooks()
 
         token = self._auth.token.new(expiration=self._token_expiration)['token']
         self._auth.set_token(token)
         self._amid.set_token(token)
         self._confd.set_token(token)
 
-        logger.debug('Fetching tenants...')
-        tenants = self._paginate_proxy(self._auth.tenants.list, limit=10000)['items']
-        self._milestone_tracker.mark(Resource.TENANT, Stage.FETCHED)
-
-        logger.debug('Fetching users...')
-        users = self._paginate_proxy(
-            self._confd.users.list, limit=1000, view='line_presence'
-        )['items']
-        self._milestone_tracker.mark(Resource.USER, Stage.FETCHED)
-
-        logger.debug('Fetching sesions...')
-        sessions = self._paginate_proxy(self._auth.sessions.list, limit=10000)['items']
-        self._milestone_tracker.mark(Resource.SESSION, Stage.FETCHED)
-
-        logger.debug('Fetching refresh tokens...')
-        refresh_tokens = self._paginate_proxy(
-            self._auth.refresh_tokens.list,
-            limit=10000,
-        )['items']
-        self._milestone_tracker.mark(Resource.REFRESH_TOKEN, Stage.FETCHED)
-
-        logger.debug('Fetching device states...')
-        endpoint_events = self._amid.action('DeviceStateList')
-        self._milestone_tracker.mark(Resource.DEVICE, Stage.FETCHED)
-
-        logger.debug('Fetching channels...')
-        channel_events = self._amid.action('CoreShowChannels')
-        self._milestone_tracker.mark(Resource.CHANNEL, Stage.FETCHED)
-
-        logger.debug('Fetching data done!')
-
-        self.initiate_endpoints(endpoint_events)
-        self.initiate_tenants(tenants)
-        self.initiate_users(users)
-        self.initiate_sessions(sessions)
-        self.initiate_refresh_tokens(refresh_tokens)
-        self.initiate_channels(channel_events)
+        # Every resource is fetched concurrently, a few pages ahead, while
+        # pages are reconciled in dependency order as soon as they arrive.
+        timings = {}
+        abort = threading.Event()
+        with ThreadPoolExecutor(
+            max_workers=6, thread_name_prefix='presence_initialization_fetch'
+        ) as executor:
+            try:
+                endpoint_events = executor.submit(
+                    self._fetch_ami, Resource.DEVICE, 'DeviceStateList'
+                )
+                channel_events = executor.submit(
+                    self._fetch_ami, Resource.CHANNEL, 'CoreShowChannels'
+                )
+                tenants = self._prefetch(
+                    executor,
+                    abort,
+                    Resource.TENANT,
+                    self._stream_pages(self._auth.tenants.list, limit=10000),
+                )
+                users = self._prefetch(
+                    executor,
+                    abort,
+                    Resource.USER,
+                    self._stream_pages(
+                        self._confd.users.list, limit=1000, view='line_presence'
+                    ),
+                )
+                sessions = self._prefetch(
+                    executor,
+                    abort,
+                    Resource.SESSION,
+                    self._stream_pages(self._auth.sessions.list, limit=10000),
+                )
+                refresh_tokens = self._prefetch(
+                    executor,
+                    abort,
+                    Resource.REFRESH_TOKEN,
+                    self._stream_pages(self._auth.refresh_tokens.list, limit=10000),
+                )
+
+                with self._timed(timings, 'endpoints'):
+                    self.initiate_endpoints(endpoint_events.result())
+                with self._timed(timings, 'tenants'):
+                    self._initiate_tenants(tenants)
+                with self._timed(timings, 'users'):
+                    self._initiate_users(users)
+                with self._timed(timings, 'sessions'):
+                    self._initiate_sessions(sessions)
+                with self._timed(timings, 'refresh_tokens'):
+                    self._initiate_refresh_tokens(refresh_tokens)
+                with self._timed(timings, 'channels'):
+                    self.initiate_channels(channel_events.result())
+            except BaseException:
+                abort.set()
+                raise
+
         self.execute_post_hooks()
         self._in_progress.clear()
         self._is_initialized.set()
-        logger.info(
-            'Presence initialization completed in %.2fs', time.monotonic() - start
-        )
 
-    def initiate_tenants(self, tenants):
-        tenants = {tenant['uuid'] for tenant in tenants}
-        tenants_cached = {str(tenant.uuid) for tenant in self._dao.tenant.list_()}
+        duration = time.monotonic() - start
+        self._last_run = {
+            'duration': round(duration, 3),
+            'stages': timings,
+        }
+        logger.info('Presence initialization completed in %.2fs', duration)
+        logger.debug('Presence initialization stages: %s', timings)
 
-        tenants_missing = tenants - tenants_cached
-        tenants_expired = tenants_cached - tenants
+    def initiate_tenants(self, tenants):
+        self._initiate_tenants([tenants])
+
+    def _initiate_tenants(self, pages):
+        seen = set()
+        for tenants in pages:
+            uuids = {tenant['uuid'] for tenant in tenants}
+            seen |= uuids
+            with session_scope():
+                tenants_missing = uuids - self._dao.tenant.list_uuids()
+                new_tenants = []
+                for uuid in tenants_missing:
+                    logger.debug('Create tenant "%s"', uuid)
+                    new_tenants.append(Tenant(uuid=uuid))
+                self._dao.tenant.create_all(new_tenants)
 
         with session_scope():
-            new_tenants = []
-            for uuid in tenants_missing:
-                logger.debug('Create tenant "%s"', uuid)
-                new_tenants.append(Tenant(uuid=uuid))
-            self._dao.tenant.create_all(new_tenants)
-
+            tenants_expired = self._dao.tenant.list_uuids() - seen
             for uuid in tenants_expired:
                 logger.debug('Delete tenant "%s"', uuid)
             self._dao.tenant.delete_by_uuids(list(tenants_expired))
 
     def initiate_users(self, users):
-        self._add_and_remove_users(users)
-        self._add_and_remove_lines(users)
-        self._add_missing_endpoints(users)  # disconnected SCCP endpoints are missing
-        self._associate_line_endpoint(users)
-        self._update_services_users(users)
-
-    def _add_and_remove_users(self, users):
+        self._initiate_users([users])
+
+    def _initiate_users(self, pages):
+        seen_users = set()
+        seen_lines = set()
+        for users in pages:
+            self._add_users(users)
+            self._add_lines(users, seen_lines)
+            # disconnected SCCP endpoints are missing
+            self._add_missing_endpoints(users)
+            self._associate_line_endpoint(users)
+            self._update_services_users(users)
+            seen_users |= {user['uuid'] for user in users}
+
+        self._remove_expired_users(seen_users)
+        self._remove_expired_lines(seen_lines)
+
+    def _add_users(self, users):
         users = {(user['uuid'], user['tenant_uuid']) for user in users}
-        users_cached = {
-            (str(uuid), str(tenant_uuid))
-            for uuid, tenant_uuid in self._dao.user.list_uuids_with_tenant_uuids()
-        }
+        with session_scope():
+            users_cached = {
+                (str(uuid), str(tenant_uuid))
+                for uuid, tenant_uuid in self._dao.user.list_uuids_with_tenant_uuids(
+                    uuids={uuid for uuid, _ in users}
+                )
+            }
+            users_missing = users - users_cached
 
-        users_missing = users - users_cached
-        users_expired = users_cached - users
+            # Users moved to another tenant are recreated
+            moved_uuids = {uuid for uuid, _ in users_missing} & {
+                uuid for uuid, _ in users_cached
+            }
+            for uuid in moved_uuids:
+                logger.debug('Delete user "%s"', uuid)
+            self._dao.user.delete_by_uuids(list(moved_uuids))
 
-        with session_scope():
             # Avoid race condition between init tenant and init user
             existing_tenants = self._dao.tenant.list_uuids()
             missing_tenants = {t for _, t in users_missing} - existing_tenants
@@ -289,57 +475,62 @@ class Initiator:
                 )
             self._dao.user.create_all(new_users)
 
-            expired_uuids = []
-            for uuid, tenant_uuid in users_expired:
+    def _remove_expired_users(self, seen_uuids):
+        with session_scope():
+            expired_uuids = self._dao.user.list_uuids() - seen_uuids
+            for uuid in expired_uuids:
                 logger.debug('Delete user "%s"', uuid)
-                expired_uuids.append(uuid)
-            self._dao.user.delete_by_uuids(expired_uuids)
-
-    def _add_and_remove_lines(self, users):
-        lines = {
-            (line['id'], user['uuid'], user['tenant_uuid'])
-            for user in users
-            for line in user['lines']
-        }
-        lines_cached = {
-            (line.id, str(line.user_uuid), str(line.tenant_uuid))
-            for line in self._dao.line.list_()
-        }
+            self._dao.user.delete_by_uuids(list(expired_uuids))
 
-        lines_missing = lines - lines_cached
-        lines_expired = lines_cached - lines
-        lines_modified = {
-            id_
-            for id_, _, _ in lines_missing
-            if id_ in {id_ for id_, _, _ in lines_expired}
-        }
-        logger.debug('%d lines were modified (e.g. reassigned)', len(lines_modified))
-
-        expired_ids = {id_ for id_, _, _ in lines_expired}
-        logger.debug(
-            '%d lines expired (deleted or modified) to be flushed', len(expired_ids)
-        )
-        surviving_ids = {id_ for id_, _, _ in lines_cached} - expired_ids
-        logger.debug('%d lines remain valid', len(surviving_ids))
+    def _add_lines(self, users, seen_ids=None):
+        seen_ids = set() if seen_ids is None else seen_ids
+        lines = {}
+        for user in users:
+            for line in user['lines']:
+                id_ = line['id']
+                if id_ in seen_ids or id_ in lines:
+                    logger.warning(
+                        'Line "%s" already created. Line multi-users not supported', id_
+                    )
+                    continue
+                lines[id_] = user['uuid']
+        seen_ids |= lines.keys()
 
         with session_scope():
-            user_uuids = self._dao.user.list_uuids()
-
-            self._dao.line.delete_by_ids(list(expired_ids))
-
-            new_lines = {}
-            for id_, user_uuid, tenant_uuid in lines_missing:
+            lines_cached = {
+                line.id: str(line.user_uuid)
+                for line in self._dao.line.list_(ids=lines.keys())
+            }
+            lines_modified = [
+                id_
+                for id_, user_uuid in lines.items()
+                if id_ in lines_cached and lines_cached[id_] != user_uuid
+            ]
+            logger.debug(
+                '%d lines were modified (e.g. reassigned)', len(lines_modified)
+            )
+            self._dao.line.delete_by_ids(lines_modified)
+
+            user_uuids = self._dao.user.list_uuids(uuids=set(lines.values()))
+            new_lines = []
+            for id_, user_uuid in lines.items():
+                if id_ in lines_cached and id_ not in lines_modified:
+                    continue
                 if user_uuid not in user_uuids:
                     logger.warning('Line "%s" has no valid user "%s"', id_, user_uuid)
                     continue
-                if id_ in surviving_ids or id_ in new_lines:
-                    logger.warning(
-                        'Line "%s" already created. Line multi-users not supported', id_
-                    )
-                    continue
                 logger.debug('Create line "%s"', id_)
-                new_lines[id_] = Line(id=id_, user_uuid=user_uuid)
-            self._dao.line.create_all(list(new_lines.values()))
+                new_lines.append(Line(id=id_, user_uuid=user_uuid))
+            self._dao.line.create_all(new_lines)
+
+    def _remove_expired_lines(self, seen_ids):
+        with session_scope():
+            expired_ids = self._dao.line.list_ids() - seen_ids
+            logger.debug(
+                '%d lines expired (deleted or modified) to be flushed',
+                len(expired_ids),
+            )
+            self._dao.line.delete_by_ids(list(expired_ids))
 
     def _add_missing_endpoints(self, users):
         endpoint_names = set()
@@ -353,7 +544,7 @@ class Initiator:
                 endpoint_names.add(endpoint_name)
 
         with session_scope():
-            existing = self._dao.endpoint.list_names()
+            existing = self._dao.endpoint.list_names(names=endpoint_names)
             missing = [Endpoint(name=name) for name in endpoint_names - existing]
             logger.debug('missing endpoints: %s', missing)
             self._dao.endpoint.create_all(missing)
@@ -367,10 +558,13 @@ class Initiator:
                     desired[line['id']] = endpoint_name
 
         with session_scope():
-            cached = {line.id: line.endpoint_name for line in self._dao.line.list_()}
+            cached = {
+                line.id: line.endpoint_name
+                for line in self._dao.line.list_(ids=desired.keys())
+            }
             associations = []
             for line_id, endpoint_name in desired.items():
-                if cached.get(line_id) == endpoint_name:
+                if line_id not in cached or cached[line_id] == endpoint_name:
                     continue
                 logger.debug(
                     'Associate line "%s" with endpoint "%s"', line_id, endpoint_name
@@ -382,7 +576,7 @@ class Initiator:
         desired = {user['uuid']: user['services']['dnd']['enabled'] for user in users}
 
         with session_scope():
-            cached = self._dao.user.list_dnd()
+            cached = self._dao.user.list_dnd(uuids=desired.keys())
             changed = []
             for uuid, do_not_disturb in desired.items():
                 if cached.get(uuid) == do_not_disturb:
@@ -394,73 +588,97 @@ class Initiator:
             self._dao.user.update_dnd(changed)
 
     def initiate_sessions(self, sessions):
-        self._add_and_remove_sessions(sessions)
-        self._update_sessions(sessions)
-
-    def _add_and_remove_sessions(self, sessions):
-        sessions = {
-            (session['uuid'], session['user_uuid'], session['tenant_uuid'])
-            for session in sessions
-        }
-        sessions_cached = {
-            (str(session.uuid), str(session.user_uuid), str(session.tenant_uuid))
-            for session in self._dao.session.list_()
-        }
+        self._initiate_sessions([sessions])
 
-        sessions_missing = sessions - sessions_cached
-        sessions_expired = sessions_cached - sessions
+    def _initiate_sessions(self, pages):
+        seen = set()
+        for sessions in pages:
+            seen |= {session['uuid'] for session in sessions}
+            self._add_and_update_sessions(sessions)
+        self._remove_expired_sessions(seen)
 
+    def _add_and_update_sessions(self, sessions):
+        sessions_by_uuid = {session['uuid']: session for session in sessions}
         with session_scope():
-            user_uuids = self._dao.user.list_uuids()
+            sessions_cached = {
+                str(session.uuid): session
+                for session in self._dao.session.list_(uuids=sessions_by_uuid.keys())
+            }
+            user_uuids = self._dao.user.list_uuids(
+                uuids={session['user_uuid'] for session in sessions}
+            )
+
             new_sessions = []
-            for uuid, user_uuid, tenant_uuid in sessions_missing:
+            updates = []
+            for uuid, session in sessions_by_uuid.items():
+                user_uuid = session['user_uuid']
+                cached_session = sessions_cached.get(uuid)
+                if cached_session is not None:
+                    if session['mobile'] != cached_session.mobile:
+                        updates.append(
+                            {'uuid': cached_session.uuid, 'mobile': session['mobile']}
+                        )
+                    continue
+
                 if user_uuid not in user_uuids:
                     logger.debug('Session "%s" has no valid user "%s"', uuid, user_uuid)
                     continue
 
                 logger.debug('Create session "%s" for user "%s"', uuid, user_uuid)
-                new_sessions.append(Session(uuid=uuid, user_uuid=user_uuid))
+                new_sessions.append(
+                    Session(
+                        uuid=uuid,
+                        user_uuid=user_uuid,
+                        mobile=session.get('mobile', False),
+                    )
+                )
             self._dao.session.create_all(new_sessions)
+            self._dao.session.update_all(updates)
 
-            expired_uuids = []
-            for uuid, user_uuid, tenant_uuid in sessions_expired:
-                logger.debug('Delete session "%s" for user "%s"', uuid, user_uuid)
-                expired_uuids.append(uuid)
-            self._dao.session.delete_by_uuids(expired_uuids)
-
-    def _update_sessions(self, sessions):
-        sessions_by_uuid = {session['uuid']: session for session in sessions}
+    def _remove_expired_sessions(self, seen_uuids):
         with session_scope():
-            updates = []
-            for cached_session in self._dao.session.list_():
-                session = sessions_by_uuid.get(str(cached_session.uuid))
-                if session is not None and session['mobile'] != cached_session.mobile:
-                    updates.append(
-                        {'uuid': cached_session.uuid, 'mobile': session['mobile']}
-                    )
-            self._dao.session.update_all(updates)
+            expired_uuids = self._dao.session.list_uuids() - seen_uuids
+            for uuid in expired_uuids:
+                logger.debug('Delete session "%s"', uuid)
+            self._dao.session.delete_by_uuids(list(expired_uuids))
 
     def initiate_refresh_tokens(self, tokens):
-        self._add_and_remove_refresh_tokens(tokens)
-        self._update_refresh_tokens(tokens)
-
-    def _add_and_remove_refresh_tokens(self, tokens):
-        tokens = {
-            (token['client_id'], token['user_uuid'], token['tenant_uuid'])
-            for token in tokens
-        }
-        tokens_cached = {
-            (token.client_id, str(token.user_uuid), str(token.tenant_uuid))
-            for token in self._dao.refresh_token.list_()
-        }
+        self._initiate_refresh_tokens([tokens])
 
-        tokens_missing = tokens - tokens_cached
-        tokens_expired = tokens_cached - tokens
+    def _initiate_refresh_tokens(self, pages):
+        seen = set()
+        for tokens in pages:
+            seen |= {(token['client_id'], token['user_uuid']) for token in tokens}
+            self._add_and_update_refresh_tokens(tokens)
+        self._remove_expired_refresh_tokens(seen)
 
+    def _add_and_update_refresh_tokens(self, tokens):
+        tokens_by_key = {
+            (token['client_id'], token['user_uuid']): token for token in tokens
+        }
+        user_uuids = {user_uuid for _, user_uuid in tokens_by_key}
         with session_scope():
-            user_uuids = self._dao.user.list_uuids()
+            tokens_cached = {
+                (token.client_id, str(token.user_uuid)): token
+                for token in self._dao.refresh_token.list_(user_uuids=user_uuids)
+            }
+            user_uuids = self._dao.user.list_uuids(uuids=user_uuids)
+
             new_tokens = []
-            for client_id, user_uuid, tenant_uuid in tokens_missing:
+            updates = []
+            for (client_id, user_uuid), token in tokens_by_key.items():
+                cached_token = tokens_cached.get((client_id, user_uuid))
+                if cached_token is not None:
+                    if token['mobile'] != cached_token.mobile:
+                        updates.append(
+                            {
+                                'client_id': cached_token.client_id,
+                                'user_uuid': cached_token.user_uuid,
+                                'mobile': token['mobile'],
+                            }
+                        )
+                    continue
+
                 if user_uuid not in user_uuids:
                     logger.debug(
                         'Refresh token "%s" has no valid user "%s"',
@@ -473,74 +691,61 @@ class Initiator:
                     'Create refresh token "%s" for user "%s"', client_id, user_uuid
                 )
                 new_tokens.append(
-                    RefreshToken(client_id=client_id, user_uuid=user_uuid)
+                    RefreshToken(
+                        client_id=client_id,
+                        user_uuid=user_uuid,
+                        mobile=token.get('mobile', False),
+                    )
                 )
             self._dao.refresh_token.create_all(new_tokens)
+            self._dao.refresh_token.update_all(updates)
 
-            expired_keys = []
-            for client_id, user_uuid, tenant_uuid in tokens_expired:
+    def _remove_expired_refresh_tokens(self, seen_keys):
+        with session_scope():
+            expired_keys = self._dao.refresh_token.list_keys() - seen_keys
+            for client_id, user_uuid in expired_keys:
                 logger.debug(
                     'Delete refresh token "%s" for user "%s"', client_id, user_uuid
                 )
-                expired_keys.append((client_id, user_uuid))
-            self._dao.refresh_token.delete_by_keys(expired_keys)
-
-    def _update_refresh_tokens(self, tokens):
-        tokens_by_key = {
-            (token['user_uuid'], token['client_id']): token for token in tokens
-        }
-        with session_scope():
-            updates = []
-            for cached_token in self._dao.refresh_token.list_():
-                key = (str(cached_token.user_uuid), cached_token.client_id)
-                token = tokens_by_key.get(key)
-                if token is not None and token['mobile'] != cached_token.mobile:
-                    updates.append(
-                        {
-                            'client_id': cached_token.client_id,
-                            'user_uuid': cached_token.user_uuid,
-                            'mobile': token['mobile'],
-                        }
-                    )
-            self._dao.refresh_token.update_all(updates)
+            self._dao.refresh_token.delete_by_keys(list(expired_keys))
 
     def initiate_endpoints(self, events):
-        endpoints = {}
-        for event in events:
-            if event.get('Event') != 'DeviceStateChange':
-                continue
-
-            endpoint_name = event['Device']
-            if endpoint_name.startswith('Custom:'):
-                continue
-
-            state = DEVICE_STATE_MAP.get(event['State'], 'unavailable')
-            logger.debug('Create endpoint "%s" with state "%s"', endpoint_name, state)
-            endpoints[endpoint_name] = Endpoint(name=endpoint_name, state=state)
+        endpoints = extract_device_states(events)
 
         with session_scope():
-            logger.debug('Delete all endpoints')
-            self._dao.endpoint.delete_all()
-            self._dao.endpoint.create_all(list(endpoints.values()))
+            cached = {
+                endpoint.name: endpoint.state for endpoint in self._dao.endpoint.list_()
+            }
+            expired = [name for name in cached if name not in endpoints]
+            changed = []
+            for name, state in endpoints.items():
+                if cached.get(name) == state:
+                    continue
+                logger.debug('Set endpoint "%s" with state "%s"', name, state)
+                changed.append((name, state))
+
+            logger.debug(
+                'Endpoints: %d changed, %d deleted', len(changed), len(expired)
+            )
+            self._dao.endpoint.delete_by_names(expired)
+            self._dao.endpoint.upsert_all(changed)
 
     def initiate_channels(self, events):
-        with session_scope():
-            logger.debug('Delete all channels')
-            self._dao.channel.delete_all()
+        channels = extract_channel_states(events)
 
+        with session_scope():
             line_id_by_endpoint = {
                 line.endpoint_name: line.id
                 for line in self._dao.line.list_()
                 if line.endpoint_name
             }
+            cached = {
+                channel.name: (channel.state, channel.line_id)
+                for channel in self._dao.channel.list_()
+            }
 
-            channels = {}
-            for event in events:
-                if event.get('Event') != 'CoreShowChannel':
-                    continue
-
-                channel_name = event['Channel']
-                endpoint_name = extract_endpoint_from_channel(channel_name)
+            desired = {}
+            for channel_name, (state, endpoint_name) in channels.items():
                 line_id = line_id_by_endpoint.get(endpoint_name)
                 if line_id is None:
                     logger.debug(
@@ -549,14 +754,45 @@ class Initiator:
                         channel_name,
                     )
                     continue
+                desired[channel_name] = (state, line_id)
 
-                state = CHANNEL_STATE_MAP.get(event['ChannelStateDesc'], 'undefined')
-                if event['ChanVariable'].get('XIVO_ON_HOLD') == '1':
-                    state = 'holding'
+            expired = [name for name in cached if name not in desired]
+            changed = []
+            for channel_name, (state, line_id) in desired.items():
+                if cached.get(channel_name) == (state, line_id):
+                    continue
+                logger.debug('Set channel "%s" with state "%s"', channel_name, state)
+                changed.append((channel_name, state, line_id))
 
-                logger.debug('Create channel "%s" with state "%s"', channel_name, state)
-                channels[channel_name] = Channel(
-                    name=channel_name, state=state, line_id=line_id
-                )
+            logger.debug('Channels: %d changed, %d deleted', len(changed), len(expired))
+            self._dao.channel.delete_by_names(expired)
+            self._dao.channel.upsert_all(changed)
 
-            self._dao.channel.create_all(list(channels.values()))
+    def resync_asterisk(self):
+        """Refresh device and channel states only, e.g. after an Asterisk restart.
+
+        Users, sessions and tokens are left untouched. The Asterisk
+        snapshot is handed to the ``resync_hooks``. Device and channel
+        events received meanwhile are delayed until the ``post_resync_hooks``
+        so that the snapshot does not overwrite them.
+        """
+        start = time.monotonic()
+        self.execute_pre_resync_hooks()
+        self._resyncing.set()
+        try:
+            token = self._auth.token.new(expiration=self._token_expiration)['token']
+            self._amid.set_token(token)
+
+            endpoints = extract_device_states(self._amid.action('DeviceStateList'))
+            channels = extract_channel_states(self._amid.action('CoreShowChannels'))
+            for hook in self.resync_hooks:
+                logger.debug('Executing resync hook: %s', hook.__name__)
+                hook(endpoints, channels)
+        finally:
+            self.execute_post_resync_hooks()
+            self._resyncing.clear()
+
+        logger.info(
+            'Asterisk presence resynchronization completed in %.2fs',
+            time.monotonic() - start,
+        )
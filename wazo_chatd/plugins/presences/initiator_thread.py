@@ -17,6 +17,10 @@ class InitiatorThread:
         self._initiator = initiator
         self._started = False
         self._stopped = threading.Event()
+        self._resync_lock = threading.Lock()
+        self._resync_threads = []
+        self._resync_running = False
+        self._resync_pending = False
         self._retry_time = 0
         self._retry_time_failed = itertools.chain(
             (1, 2, 4, 8, 16), itertools.repeat(32)
@@ -31,6 +35,24 @@ class InitiatorThread:
         self._initiator.reset_initialized()
         self.start()
 
+    def resync(self):
+        if self._started:
+            logger.info('initiator thread is already running, not resynchronizing.')
+            return
+
+        with self._resync_lock:
+            if self._resync_running:
+                logger.info('Asterisk resynchronization already running, queuing.')
+                self._resync_pending = True
+                return
+
+            self._resync_running = True
+            self._resync_threads = [t for t in self._resync_threads if t.is_alive()]
+            thread_name = 'presence_resync'
+            thread = threading.Thread(target=self._resync_loop, name=thread_name)
+            self._resync_threads.append(thread)
+            thread.start()
+
     def start(self):
         if self._started:
             raise Exception('Initialization already started')
@@ -44,6 +66,35 @@ class InitiatorThread:
         self._stopped.set()
         logger.debug('joining presence initialization thread...')
         self._thread.join()
+        with self._resync_lock:
+            self._resync_pending = False
+            resync_threads = list(self._resync_threads)
+        for thread in resync_threads:
+            thread.join()
+
+    def _resync_loop(self):
+        # Requests received while running are coalesced into a single rerun
+        while True:
+            succeeded = self._resync()
+            with self._resync_lock:
+                if not (succeeded and self._resync_pending):
+                    self._resync_pending = False
+                    self._resync_running = False
+                    return
+                self._resync_pending = False
+
+    def _resync(self):
+        logger.info('Starting Asterisk presence resynchronization')
+        try:
+            self._initiator.resync_asterisk()
+        except Exception as e:
+            logger.warning(
+                'Error to resynchronize Asterisk presences (%s). Restarting initialization...',
+                e,
+            )
+            self.restart()
+            return False
+        return True
 
     def _run(self):
         self._initiate()
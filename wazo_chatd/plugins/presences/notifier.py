@@ -1,10 +1,17 @@
-# Copyright 2019-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import logging
+import threading
+
 from wazo_bus.resources.chatd.events import PresenceUpdatedEvent
+from xivo.status import Status
 
+from .engine import UserPresence
 from .schemas import UserPresenceSchema
 
+logger = logging.getLogger(__name__)
+
 
 class PresenceNotifier:
     def __init__(self, bus):
@@ -14,3 +21,96 @@ class PresenceNotifier:
         payload = UserPresenceSchema().dump(user)
         event = PresenceUpdatedEvent(payload, user.tenant_uuid)
         self._bus.publish(event)
+
+
+class CoalescingPresenceNotifier(PresenceNotifier):
+    """Publish at most one presence per user and per window.
+
+    Updates are collected by user until the window expires, then only
+    the latest presence of each user is published from a dedicated
+    thread. Engine presences are serialized at publish time; database
+    models are serialized right away since their session will be gone.
+    When ``max_pending`` users are already pending, the caller publishes
+    the presence of a new user itself.
+    """
+
+    def __init__(self, bus, window, max_pending):
+        super().__init__(bus)
+        self._window = window
+        self._max_pending = max_pending
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._published = 0
+        self._coalesced = 0
+        self._overflowed = 0
+        self._failed = 0
+
+    def updated(self, user):
+        user_uuid = str(user.uuid)
+        if isinstance(user, UserPresence):
+            payload = user
+        else:
+            payload = UserPresenceSchema().dump(user)
+
+        with self._condition:
+            if user_uuid in self._pending:
+                self._coalesced += 1
+            if user_uuid in self._pending or len(self._pending) < self._max_pending:
+                self._pending[user_uuid] = (user.tenant_uuid, payload)
+                self._condition.notify()
+                return
+            self._overflowed += 1
+
+        logger.warning('Presence publisher queue full, publishing from caller')
+        self._publish(user.tenant_uuid, payload)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='presence_publisher')
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread:
+            logger.debug('joining presence publisher thread...')
+            self._thread.join()
+
+    def provide_status(self, status):
+        status['presence_publisher']['status'] = Status.ok
+        status['presence_publisher']['pending'] = len(self._pending)
+        status['presence_publisher']['published'] = self._published
+        status['presence_publisher']['coalesced'] = self._coalesced
+        status['presence_publisher']['overflowed'] = self._overflowed
+        status['presence_publisher']['failed'] = self._failed
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                while not self._pending and not self._stopped.is_set():
+                    self._condition.wait()
+
+            self._stopped.wait(self._window)
+            self._publish_pending()
+
+        self._publish_pending()
+
+    def _publish_pending(self):
+        with self._condition:
+            pending, self._pending = self._pending, {}
+
+        for tenant_uuid, payload in pending.values():
+            self._publish(tenant_uuid, payload)
+
+    def _publish(self, tenant_uuid, payload):
+        if isinstance(payload, UserPresence):
+            payload = UserPresenceSchema().dump(payload)
+        try:
+            self._bus.publish(PresenceUpdatedEvent(payload, tenant_uuid))
+        except Exception:
+            self._failed += 1
+            logger.exception('Failed to publish presence of "%s"', payload['uuid'])
+        else:
+            self._published += 1
@@ -8,10 +8,12 @@ from wazo_auth_client import Client as AuthClient
 from wazo_confd_client import Client as ConfdClient
 
 from .bus_consume import BusEventHandler, BusInitiatorHandler
+from .engine import PresenceEngine, PresenceFlusher
 from .http import PresenceItemResource, PresenceListResource
 from .initiator import Initiator
 from .initiator_thread import InitiatorThread
-from .notifier import PresenceNotifier
+from .notifier import CoalescingPresenceNotifier, PresenceNotifier
+from .replay import ReplayLog
 from .services import PresenceService
 from .validator import status_validator
 
@@ -26,10 +28,23 @@ class Plugin:
         bus_consumer = dependencies['bus_consumer']
         bus_publisher = dependencies['bus_publisher']
         status_aggregator = dependencies['status_aggregator']
+        thread_manager = dependencies['thread_manager']
         status_validator.set_config(status_aggregator, config)
 
-        notifier = PresenceNotifier(bus_publisher)
-        service = PresenceService(dao, notifier)
+        presences_config = config['presences']
+        if presences_config['publish_window']:
+            notifier = CoalescingPresenceNotifier(
+                bus_publisher,
+                presences_config['publish_window'],
+                presences_config['publish_max_pending'],
+            )
+            thread_manager.manage(notifier)
+            status_aggregator.add_provider(notifier.provide_status)
+        else:
+            notifier = PresenceNotifier(bus_publisher)
+
+        engine = PresenceEngine(dao)
+        service = PresenceService(dao, engine, notifier)
         initialization = config['initialization']
 
         auth = AuthClient(**config['auth'])
@@ -43,14 +58,31 @@ class Plugin:
         initiator_thread = None
         if initialization['enabled']:
             initiator_thread = InitiatorThread(initiator)
-            thread_manager = dependencies['thread_manager']
             thread_manager.manage(initiator_thread)
 
-        bus_event_handler = BusEventHandler(dao, notifier, initiator_thread)
+            # The engine is only authoritative when fed by the initialization
+            initiator.pre_hooks.append(engine.unload)
+            initiator.post_hooks.append(engine.load)
+            thread_manager.manage(
+                PresenceFlusher(engine, presences_config['flush_interval'])
+            )
+
+        bus_event_handler = BusEventHandler(dao, engine, notifier, initiator_thread)
+        initiator.resync_hooks.append(bus_event_handler.on_asterisk_resync)
 
-        bus_initiator_handler = BusInitiatorHandler(bus_event_handler, initiator)
+        replay_log = ReplayLog(initialization['replay_max_size'])
+        status_aggregator.add_provider(replay_log.provide_status)
+        bus_initiator_handler = BusInitiatorHandler(
+            bus_event_handler,
+            initiator,
+            replay_log,
+            initialization['replay_batch_size'],
+        )
         bus_consumer.subscribe_decorators = [bus_initiator_handler.handle_init_process]
+        initiator.pre_hooks.append(bus_initiator_handler.on_init_start)
         initiator.post_hooks.append(bus_initiator_handler.on_init_complete)
+        initiator.pre_resync_hooks.append(bus_initiator_handler.on_resync_start)
+        initiator.post_resync_hooks.append(bus_initiator_handler.on_resync_complete)
 
         bus_event_handler.subscribe(bus_consumer)
 
@@ -0,0 +1,98 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import logging
+import threading
+from enum import Enum, auto
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayAction(Enum):
+    CREATE = auto()
+    UPDATE = auto()
+    DELETE = auto()
+
+
+class ReplayLog:
+    """Events delayed during initialization, to replay once it completes.
+
+    Events are grouped by the resource they target (e.g. a channel name
+    or a user uuid) and only the last effective one of each action is
+    kept: a newer update replaces the previous one and a deletion
+    replaces everything recorded for the resource. Events for new
+    resources are dropped once ``max_size`` resources are pending.
+
+    Once closed, events are refused so that the caller dispatches them
+    directly, until the log is opened again.
+    """
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._closed = False
+        self._delayed = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._replayed = 0
+        self._failed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, action, callback):
+        if key is None:
+            key = object()
+
+        with self._lock:
+            if self._closed:
+                return False
+
+            self._delayed += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self._max_size:
+                    self._dropped += 1
+                    logger.warning('Replay log full, dropping event for %s', key)
+                    return True
+                entry = self._entries[key] = {}
+
+            if action is ReplayAction.DELETE:
+                self._coalesced += len(entry)
+                entry.clear()
+            elif action in entry:
+                self._coalesced += 1
+            entry[action] = callback
+            return True
+
+    def open(self):
+        with self._lock:
+            self._closed = False
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            return self._drain()
+
+    def drain(self):
+        with self._lock:
+            return self._drain()
+
+    def _drain(self):
+        entries, self._entries = self._entries, {}
+        return [callback for entry in entries.values() for callback in entry.values()]
+
+    def mark_replayed(self, succeeded, failed):
+        self._replayed += succeeded
+        self._failed += failed
+
+    def provide_status(self, status):
+        status['presence_initialization']['replay'] = {
+            'pending': len(self._entries),
+            'delayed': self._delayed,
+            'coalesced': self._coalesced,
+            'dropped': self._dropped,
+            'replayed': self._replayed,
+            'failed': self._failed,
+        }
@@ -1,30 +1,47 @@
-# Copyright 2019-2024 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from marshmallow import post_dump, pre_load
 from xivo.mallow import fields
-from xivo.mallow.validate import OneOf
+from xivo.mallow.validate import OneOf, Range
 from xivo.mallow_helpers import Schema
 
 
+def merge_line_state(channels_state, endpoint_state):
+    if 'ringing' in channels_state:
+        return 'ringing'
+    elif 'progressing' in channels_state:
+        return 'progressing'
+    elif 'holding' in channels_state:
+        return 'holding'
+    elif 'talking' in channels_state:
+        return 'talking'
+    return endpoint_state or 'unavailable'
+
+
+def merge_user_line_state(line_states):
+    if 'ringing' in line_states:
+        return 'ringing'
+    elif 'progressing' in line_states:
+        return 'progressing'
+    elif 'holding' in line_states:
+        return 'holding'
+    elif 'talking' in line_states:
+        return 'talking'
+    elif 'available' in line_states:
+        return 'available'
+    return 'unavailable'
+
+
 class LinePresenceSchema(Schema):
     id = fields.Integer(dump_only=True)
     state = fields.String(dump_only=True)
 
     @post_dump(pass_original=True)
     def _set_state(self, data, raw_data, **kwargs):
-        if 'ringing' in raw_data.channels_state:
-            merged_state = 'ringing'
-        elif 'progressing' in raw_data.channels_state:
-            merged_state = 'progressing'
-        elif 'holding' in raw_data.channels_state:
-            merged_state = 'holding'
-        elif 'talking' in raw_data.channels_state:
-            merged_state = 'talking'
-        else:
-            merged_state = raw_data.endpoint_state or 'unavailable'
-
-        data['state'] = merged_state
+        data['state'] = merge_line_state(
+            raw_data.channels_state, raw_data.endpoint_state
+        )
         return data
 
 
@@ -47,21 +64,7 @@ class UserPresenceSchema(Schema):
     @post_dump
     def _set_line_state(self, user, **kwargs):
         line_states = [line['state'] for line in user['lines']]
-
-        if 'ringing' in line_states:
-            merged_state = 'ringing'
-        elif 'progressing' in line_states:
-            merged_state = 'progressing'
-        elif 'holding' in line_states:
-            merged_state = 'holding'
-        elif 'talking' in line_states:
-            merged_state = 'talking'
-        elif 'available' in line_states:
-            merged_state = 'available'
-        else:
-            merged_state = 'unavailable'
-
-        user['line_state'] = merged_state
+        user['line_state'] = merge_user_line_state(line_states)
         return user
 
     @post_dump(pass_original=True)
@@ -88,6 +91,9 @@ class UserPresenceSchema(Schema):
 class ListRequestSchema(Schema):
     recurse = fields.Boolean(load_default=False)
     user_uuid = fields.List(fields.UUID(), load_default=list, attribute='uuids')
+    since = fields.Integer(validate=Range(min=0), load_default=None)
+    limit = fields.Integer(validate=Range(min=0), load_default=None)
+    offset = fields.Integer(validate=Range(min=0), load_default=0)
 
     @pre_load
     def convert_user_uuid_to_list(self, data, **kwargs):
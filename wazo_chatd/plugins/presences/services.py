@@ -1,25 +1,34 @@
-# Copyright 2019 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import datetime
 
 
 class PresenceService:
-    def __init__(self, dao, notifier):
+    def __init__(self, dao, engine, notifier):
         self._dao = dao
+        self._engine = engine
         self._notifier = notifier
 
-    def list_(self, tenant_uuids, **filter_parameters):
-        return self._dao.user.list_(tenant_uuids, **filter_parameters)
-
-    def count(self, tenant_uuids, **filter_parameters):
-        return self._dao.user.count(tenant_uuids, **filter_parameters)
+    def list_page(self, tenant_uuids, **list_parameters):
+        if self._engine.is_loaded():
+            return self._engine.list_page(tenant_uuids, **list_parameters)
+        return self._dao.user.list_presences_page(tenant_uuids, **list_parameters)
 
     def get(self, tenant_uuids, user_uuid):
         return self._dao.user.get(tenant_uuids, user_uuid)
 
+    def get_presence(self, tenant_uuids, user_uuid):
+        if self._engine.is_loaded():
+            return self._engine.get(tenant_uuids, user_uuid)
+        return self._dao.user.get(tenant_uuids, user_uuid)
+
     def update(self, user):
         user.last_activity = datetime.datetime.utcnow()
         self._dao.user.update(user)
-        self._notifier.updated(user)
+        if self._engine.is_loaded():
+            self._notifier.updated(self._engine.sync_user(user))
+        else:
+            self._dao.user.bump_presence_revisions([user.uuid])
+            self._notifier.updated(user)
         return user
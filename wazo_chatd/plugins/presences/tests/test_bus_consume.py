@@ -1,18 +1,24 @@
-# Copyright 2023-2025 The Wazo Authors  (see the AUTHORS file)
+# Copyright 2023-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, call, patch
 
-from ..bus_consume import BusEventHandler
+from ..bus_consume import BusEventHandler, BusInitiatorHandler
+from ..initiator import Resource
+from ..replay import ReplayAction, ReplayLog
 
 
 class TestBusEventHandler(TestCase):
     def setUp(self):
         self.dao = Mock()
+        self.engine = Mock()
+        self.engine.is_loaded.return_value = True
         self.notifier = Mock()
         self.initiator_thread = Mock()
-        self.handler = BusEventHandler(self.dao, self.notifier, self.initiator_thread)
+        self.handler = BusEventHandler(
+            self.dao, self.engine, self.notifier, self.initiator_thread
+        )
 
     def test_on_device_state_change_ignored_on_hints(self):
         event = {
@@ -21,6 +27,7 @@ class TestBusEventHandler(TestCase):
         }
         self.handler._device_state_change(event)
         self.dao.endpoint.find_or_create.assert_not_called()
+        self.engine.update_endpoint.assert_not_called()
 
         event = {
             'State': 'unavailable',
@@ -28,6 +35,7 @@ class TestBusEventHandler(TestCase):
         }
         self.handler._device_state_change(event)
         self.dao.endpoint.find_or_create.assert_not_called()
+        self.engine.update_endpoint.assert_not_called()
 
         event = {
             'State': 'unavailable',
@@ -35,3 +43,203 @@ class TestBusEventHandler(TestCase):
         }
         self.handler._device_state_change(event)
         self.dao.endpoint.find_or_create.assert_not_called()
+        self.engine.update_endpoint.assert_not_called()
+
+    def test_on_device_state_change_applied_to_engine(self):
+        user = Mock()
+        self.engine.update_endpoint.return_value = user
+        event = {'State': 'INUSE', 'Device': 'PJSIP/abc'}
+
+        self.handler._device_state_change(event)
+
+        self.engine.update_endpoint.assert_called_once_with('PJSIP/abc', 'available')
+        self.notifier.updated.assert_called_once_with(user)
+        self.dao.endpoint.find_or_create.assert_not_called()
+
+    def test_on_device_state_change_unchanged_not_notified(self):
+        self.engine.update_endpoint.return_value = None
+        event = {'State': 'INUSE', 'Device': 'PJSIP/abc'}
+
+        self.handler._device_state_change(event)
+
+        self.notifier.updated.assert_not_called()
+
+    def test_on_channel_created_applied_to_engine(self):
+        user = Mock()
+        self.engine.add_channel.return_value = user
+        event = {'Channel': 'PJSIP/abc-00000001', 'ChannelStateDesc': 'Ringing'}
+
+        self.handler._channel_created(event)
+
+        self.engine.add_channel.assert_called_once_with(
+            'PJSIP/abc-00000001', 'ringing', 'PJSIP/abc'
+        )
+        self.notifier.updated.assert_called_once_with(user)
+        self.dao.line.find_by.assert_not_called()
+
+    def test_on_channel_hold_applied_to_engine(self):
+        user = Mock()
+        self.engine.update_channel.return_value = user
+        event = {'Channel': 'PJSIP/abc-00000001'}
+
+        self.handler._channel_hold(event)
+
+        self.engine.update_channel.assert_called_once_with(
+            'PJSIP/abc-00000001', 'holding'
+        )
+        self.notifier.updated.assert_called_once_with(user)
+        self.dao.channel.find.assert_not_called()
+
+    def test_on_channel_deleted_unknown_channel_not_notified(self):
+        self.engine.remove_channel.return_value = None
+        event = {'Channel': 'PJSIP/abc-00000001'}
+
+        self.handler._channel_deleted(event)
+
+        self.notifier.updated.assert_not_called()
+
+    def test_on_channel_updated_without_engine_bumps_revision(self):
+        self.engine.is_loaded.return_value = False
+        channel = self.dao.channel.find.return_value
+        event = {'Channel': 'PJSIP/abc-00000001', 'ChannelStateDesc': 'Up'}
+
+        with patch('wazo_chatd.plugins.presences.bus_consume.session_scope'):
+            self.handler._channel_updated(event)
+
+        self.dao.user.bump_presence_revisions.assert_called_once_with(
+            [channel.line.user.uuid]
+        )
+        self.notifier.updated.assert_called_once_with(channel.line.user)
+
+    def test_on_fullybooted_resyncs_when_engine_loaded(self):
+        self.handler._asterisk_fullybooted({})
+
+        self.initiator_thread.resync.assert_called_once_with()
+        self.initiator_thread.restart.assert_not_called()
+
+    def test_on_fullybooted_restarts_when_engine_not_loaded(self):
+        self.engine.is_loaded.return_value = False
+
+        self.handler._asterisk_fullybooted({})
+
+        self.initiator_thread.restart.assert_called_once_with()
+        self.initiator_thread.resync.assert_not_called()
+
+    def test_on_asterisk_resync_notifies_changed_users(self):
+        user = Mock()
+        self.engine.resync.return_value = [user]
+
+        self.handler.on_asterisk_resync({'PJSIP/abc': 'available'}, {})
+
+        self.engine.resync.assert_called_once_with({'PJSIP/abc': 'available'}, {})
+        self.notifier.updated.assert_called_once_with(user)
+
+
+class TestBusInitiatorHandler(TestCase):
+    def setUp(self):
+        self.initiator = Mock()
+        self.initiator.in_progress.return_value = True
+        self.initiator.has_fetched.return_value = True
+        self.replay_log = ReplayLog(max_size=10)
+        self.handler = BusInitiatorHandler(
+            Mock(), self.initiator, self.replay_log, replay_batch_size=2
+        )
+        self.channel_updated = Mock(
+            init_fetched_resource=Resource.CHANNEL,
+            init_replay_key=lambda event: ('channel', event['Channel']),
+            init_replay_action=ReplayAction.UPDATE,
+        )
+
+    def test_events_delayed_are_coalesced_per_resource(self):
+        wrapped = self.handler.handle_init_process(self.channel_updated)
+
+        wrapped({'Channel': 'PJSIP/abc-1', 'state': 'ringing'})
+        wrapped({'Channel': 'PJSIP/abc-1', 'state': 'talking'})
+        wrapped({'Channel': 'PJSIP/abc-2', 'state': 'ringing'})
+
+        self.channel_updated.assert_not_called()
+        assert len(self.replay_log) == 2
+
+    def test_events_dropped_before_resource_fetched(self):
+        self.initiator.has_fetched.return_value = False
+        wrapped = self.handler.handle_init_process(self.channel_updated)
+
+        wrapped({'Channel': 'PJSIP/abc-1'})
+
+        self.channel_updated.assert_not_called()
+        assert len(self.replay_log) == 0
+
+    def test_on_init_complete_replays_in_batches_and_clears(self):
+        wrapped = self.handler.handle_init_process(self.channel_updated)
+        for name in ('a', 'b', 'c'):
+            wrapped({'Channel': name})
+        self.channel_updated.side_effect = [None, Exception('boom'), None]
+
+        with patch(
+            'wazo_chatd.plugins.presences.bus_consume.shared_session_scope'
+        ) as shared_session_scope:
+            self.handler.on_init_complete()
+
+        assert shared_session_scope.call_count == 2
+        self.channel_updated.assert_has_calls(
+            [call({'Channel': 'a'}), call({'Channel': 'b'}), call({'Channel': 'c'})]
+        )
+        assert len(self.replay_log) == 0
+        self.handler.on_init_complete()
+        assert self.channel_updated.call_count == 3
+
+    def test_on_init_complete_replays_events_delayed_during_replay(self):
+        wrapped = self.handler.handle_init_process(self.channel_updated)
+        wrapped({'Channel': 'a'})
+
+        def delay_another(event):
+            if event['Channel'] == 'a':
+                wrapped({'Channel': 'b'})
+
+        self.channel_updated.side_effect = delay_another
+
+        with patch('wazo_chatd.plugins.presences.bus_consume.shared_session_scope'):
+            self.handler.on_init_complete()
+
+        self.channel_updated.assert_has_calls(
+            [call({'Channel': 'a'}), call({'Channel': 'b'})]
+        )
+        assert len(self.replay_log) == 0
+
+    def test_events_dispatched_directly_after_init_complete(self):
+        wrapped = self.handler.handle_init_process(self.channel_updated)
+
+        with patch('wazo_chatd.plugins.presences.bus_consume.shared_session_scope'):
+            self.handler.on_init_complete()
+        wrapped({'Channel': 'a'})
+
+        self.channel_updated.assert_called_once_with({'Channel': 'a'})
+        assert len(self.replay_log) == 0
+
+        self.handler.on_init_start()
+        wrapped({'Channel': 'b'})
+
+        self.channel_updated.assert_called_once_with({'Channel': 'a'})
+        assert len(self.replay_log) == 1
+
+    def test_asterisk_events_delayed_during_resync(self):
+        self.initiator.in_progress.return_value = False
+        self.initiator.resyncing.return_value = True
+        user_updated = Mock(
+            init_fetched_resource=Resource.USER,
+            init_replay_key=None,
+            init_replay_action=ReplayAction.UPDATE,
+        )
+        wrapped_channel = self.handler.handle_init_process(self.channel_updated)
+        wrapped_user = self.handler.handle_init_process(user_updated)
+
+        wrapped_channel({'Channel': 'a'})
+        wrapped_user({'uuid': 'a'})
+
+        self.channel_updated.assert_not_called()
+        user_updated.assert_called_once_with({'uuid': 'a'})
+
+        with patch('wazo_chatd.plugins.presences.bus_consume.shared_session_scope'):
+            self.handler.on_resync_complete()
+
+        self.channel_updated.assert_called_once_with({'Channel': 'a'})
@@ -0,0 +1,305 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from unittest import mock
+
+import pytest
+
+from wazo_chatd.exceptions import UnknownUserException
+
+from ..engine import PresenceEngine
+from ..schemas import UserPresenceSchema
+
+TENANT_UUID = '00000000-0000-4000-8000-0000000000a1'
+USER_UUID = '00000000-0000-4000-8000-000000000001'
+OTHER_USER_UUID = '00000000-0000-4000-8000-000000000002'
+
+
+def make_user(uuid=USER_UUID, lines=(), sessions=(), refresh_tokens=(), revision=0):
+    return mock.Mock(
+        uuid=uuid,
+        tenant_uuid=TENANT_UUID,
+        state='available',
+        status=None,
+        do_not_disturb=False,
+        last_activity=None,
+        presence_revision=revision,
+        lines=list(lines),
+        sessions=list(sessions),
+        refresh_tokens=list(refresh_tokens),
+    )
+
+
+def make_line(id_, endpoint_name=None, endpoint_state=None, channels=()):
+    return mock.Mock(
+        id=id_,
+        endpoint_name=endpoint_name,
+        endpoint_state=endpoint_state,
+        channels=list(channels),
+    )
+
+
+@pytest.fixture
+def dao():
+    dao = mock.Mock()
+    dao.user.bump_presence_revisions.return_value = {}
+    dao.user.list_presences.return_value = []
+    dao.endpoint.list_.return_value = []
+    return dao
+
+
+@pytest.fixture
+def engine(dao):
+    engine = PresenceEngine(dao)
+    engine.sync_user(make_user(lines=[make_line(1, 'PJSIP/abc', 'available')]))
+    return engine
+
+
+def test_add_channel_by_endpoint(engine: PresenceEngine):
+    user = engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+
+    assert user.uuid == USER_UUID
+    assert user.lines[0].channels_state == ['ringing']
+    assert UserPresenceSchema().dump(user)['line_state'] == 'ringing'
+
+
+def test_add_channel_unknown_endpoint(engine: PresenceEngine):
+    assert engine.add_channel('PJSIP/xyz-00000001', 'ringing', 'PJSIP/xyz') is None
+
+
+def test_update_and_remove_channel(engine: PresenceEngine):
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+
+    user = engine.update_channel('PJSIP/abc-00000001', 'holding')
+    assert user.lines[0].channels_state == ['holding']
+
+    user = engine.remove_channel('PJSIP/abc-00000001')
+    assert user.lines[0].channels_state == []
+    assert engine.update_channel('PJSIP/abc-00000001', 'talking') is None
+
+
+def test_update_endpoint_only_returns_user_on_change(engine: PresenceEngine):
+    assert engine.update_endpoint('PJSIP/abc', 'available') is None
+
+    user = engine.update_endpoint('PJSIP/abc', 'unavailable')
+
+    assert user.lines[0].endpoint_state == 'unavailable'
+
+
+def test_update_endpoint_without_line(engine: PresenceEngine):
+    assert engine.update_endpoint('PJSIP/unknown', 'available') is None
+
+
+def test_sync_user_keeps_channel_states(engine: PresenceEngine):
+    engine.add_channel('PJSIP/abc-00000001', 'talking', 'PJSIP/abc')
+    stale_line = make_line(1, 'PJSIP/abc', 'available', channels=[])
+
+    user = engine.sync_user(make_user(lines=[stale_line]))
+
+    assert user.lines[0].channels_state == ['talking']
+    assert engine.update_channel('PJSIP/abc-00000001', 'holding') is user
+
+
+def test_sync_user_reassigned_line(engine: PresenceEngine):
+    line = make_line(1, 'PJSIP/abc', 'available')
+
+    other = engine.sync_user(make_user(uuid=OTHER_USER_UUID, lines=[line]))
+
+    assert engine.find(USER_UUID).lines == ()
+    assert engine.update_endpoint('PJSIP/abc', 'unavailable') is other
+
+
+def test_list_and_get_by_tenant(engine: PresenceEngine):
+    assert [user.uuid for user in engine.list_([TENANT_UUID])] == [USER_UUID]
+    assert engine.list_(['00000000-0000-4000-8000-0000000000b2']) == []
+    assert engine.list_page([TENANT_UUID], uuids=[OTHER_USER_UUID]) == ([], 1, 0, 0)
+
+    assert engine.get([TENANT_UUID], USER_UUID).uuid == USER_UUID
+    with pytest.raises(UnknownUserException):
+        engine.get(['00000000-0000-4000-8000-0000000000b2'], USER_UUID)
+
+
+def test_remove_tenant(engine: PresenceEngine):
+    engine.remove_tenant(TENANT_UUID)
+
+    assert engine.find(USER_UUID) is None
+    assert engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc') is None
+
+
+def test_flush_persists_dirty_state(engine: PresenceEngine, dao):
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+    engine.add_channel('PJSIP/abc-00000002', 'ringing', 'PJSIP/abc')
+    engine.remove_channel('PJSIP/abc-00000002')
+    engine.update_endpoint('PJSIP/abc', 'unavailable')
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+
+    dao.endpoint.upsert_all.assert_called_once_with([('PJSIP/abc', 'unavailable')])
+    dao.channel.delete_by_names.assert_called_once_with(['PJSIP/abc-00000002'])
+    dao.channel.upsert_all.assert_called_once_with(
+        [('PJSIP/abc-00000001', 'ringing', 1)]
+    )
+
+    dao.reset_mock()
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+    dao.channel.upsert_all.assert_not_called()
+
+
+def test_flush_failure_keeps_dirty_state(engine: PresenceEngine, dao):
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+    dao.channel.upsert_all.side_effect = [Exception('db down'), None]
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        with pytest.raises(Exception):
+            engine.flush()
+        engine.flush()
+
+    assert dao.channel.upsert_all.call_count == 2
+    dao.channel.upsert_all.assert_called_with([('PJSIP/abc-00000001', 'ringing', 1)])
+
+
+def test_unload_drops_state(engine: PresenceEngine, dao):
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.unload()
+
+    assert not engine.is_loaded()
+    assert engine.find(USER_UUID) is None
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+    dao.channel.upsert_all.assert_not_called()
+
+
+def test_resync_returns_users_with_changed_line_state(engine: PresenceEngine):
+    engine._loaded = True
+    other_line = make_line(2, 'PJSIP/xyz', 'available')
+    engine.sync_user(make_user(uuid=OTHER_USER_UUID, lines=[other_line]))
+    engine.add_channel('PJSIP/abc-00000001', 'talking', 'PJSIP/abc')
+
+    users = engine.resync(
+        endpoints={'PJSIP/abc': 'available', 'PJSIP/xyz': 'available'},
+        channels={'PJSIP/xyz-00000001': ('ringing', 'PJSIP/xyz')},
+    )
+
+    assert [user.uuid for user in users] == [USER_UUID, OTHER_USER_UUID]
+    assert engine.find(USER_UUID).lines[0].channels_state == []
+    assert engine.find(OTHER_USER_UUID).lines[0].channels_state == ['ringing']
+
+
+def test_resync_unchanged_line_state_not_returned(engine: PresenceEngine, dao):
+    engine._loaded = True
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+    dao.reset_mock()
+
+    users = engine.resync(
+        endpoints={'PJSIP/abc': 'unavailable'},
+        channels={'PJSIP/abc-00000001': ('ringing', 'PJSIP/abc')},
+    )
+
+    assert users == []
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+    dao.endpoint.upsert_all.assert_called_once_with([('PJSIP/abc', 'unavailable')])
+    dao.channel.upsert_all.assert_called_once_with([])
+
+
+def test_resync_missing_endpoint_becomes_unavailable(engine: PresenceEngine):
+    engine._loaded = True
+
+    (user,) = engine.resync(endpoints={}, channels={})
+
+    assert user.lines[0].endpoint_state == 'unavailable'
+
+
+def test_resync_ignored_when_not_loaded(engine: PresenceEngine):
+    assert engine.resync(endpoints={}, channels={}) == []
+    assert engine.find(USER_UUID).lines[0].endpoint_state == 'available'
+
+
+def test_list_page(engine: PresenceEngine):
+    engine.sync_user(make_user(uuid=OTHER_USER_UUID))
+
+    users, total, filtered, _ = engine.list_page([TENANT_UUID], limit=1, offset=1)
+
+    assert [user.uuid for user in users] == [OTHER_USER_UUID]
+    assert (total, filtered) == (2, 2)
+
+    users, total, filtered, _ = engine.list_page(
+        [TENANT_UUID], uuids=[OTHER_USER_UUID], limit=1
+    )
+    assert [user.uuid for user in users] == [OTHER_USER_UUID]
+    assert (total, filtered) == (2, 1)
+
+
+def test_list_page_since(engine: PresenceEngine):
+    engine.sync_user(make_user(uuid=OTHER_USER_UUID, revision=7))
+    engine.find(USER_UUID).revision = 3
+
+    users, total, filtered, cursor = engine.list_page([TENANT_UUID], since=3)
+
+    assert [user.uuid for user in users] == [OTHER_USER_UUID]
+    assert (total, filtered, cursor) == (2, 1, 7)
+    assert engine.list_page([TENANT_UUID], since=7) == ([], 2, 0, 7)
+
+
+def test_flush_assigns_revisions_to_changed_users(engine: PresenceEngine, dao):
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+    dao.reset_mock()
+    engine.sync_user(make_user(uuid=OTHER_USER_UUID))
+    engine.add_channel('PJSIP/abc-00000001', 'ringing', 'PJSIP/abc')
+    dao.user.bump_presence_revisions.return_value = {USER_UUID: 12}
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.flush()
+
+    (user_uuids,), _ = dao.user.bump_presence_revisions.call_args
+    assert sorted(user_uuids) == [USER_UUID, OTHER_USER_UUID]
+    assert engine.find(USER_UUID).revision == 12
+    assert engine.find(OTHER_USER_UUID).revision == 0
+
+
+def test_sync_user_keeps_newer_revision(engine: PresenceEngine):
+    engine.find(USER_UUID).revision = 5
+
+    user = engine.sync_user(make_user(revision=2))
+
+    assert user.revision == 5
+
+
+def test_load_bumps_revisions_of_changed_users_only(dao):
+    line = make_line(1, 'PJSIP/abc', 'available')
+    dao.user.list_presences.return_value = [
+        make_user(lines=[line]),
+        make_user(uuid=OTHER_USER_UUID),
+    ]
+    engine = PresenceEngine(dao)
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.unload()
+        line.endpoint_state = 'unavailable'
+        dao.user.bump_presence_revisions.return_value = {USER_UUID: 8}
+        engine.load()
+
+    dao.user.bump_presence_revisions.assert_called_once_with([USER_UUID])
+    assert engine.find(USER_UUID).revision == 8
+    assert engine.find(OTHER_USER_UUID).revision == 0
+
+
+def test_reload_without_changes_keeps_revisions(dao):
+    dao.user.list_presences.return_value = [make_user(revision=3)]
+    engine = PresenceEngine(dao)
+
+    with mock.patch('wazo_chatd.plugins.presences.engine.session_scope'):
+        engine.load()
+        dao.user.bump_presence_revisions.reset_mock()
+        engine.unload()
+        engine.load()
+
+    dao.user.bump_presence_revisions.assert_called_once_with([])
+    assert engine.find(USER_UUID).revision == 3
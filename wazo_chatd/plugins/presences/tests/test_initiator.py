@@ -1,6 +1,8 @@
 # Copyright 2025-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import threading
+from collections import defaultdict
 from unittest import mock
 
 import pytest
@@ -11,6 +13,8 @@ from wazo_confd_client import Client as ConfdClient
 from wazo_chatd.database.queries import DAO
 from wazo_chatd.plugins.presences.initiator import (
     Initiator,
+    PagePrefetcher,
+    Resource,
     extract_endpoint_from_line,
     extract_endpoint_from_line_presence_view,
 )
@@ -67,6 +71,7 @@ def test_extract_endpoint_from_line_without_endpoint():
 
 
 def test_initiate_endpoints_dedupes_duplicate_devices(initiator: Initiator):
+    initiator._dao.endpoint.list_.return_value = []
     events = [
         {'Event': 'DeviceStateChange', 'Device': 'PJSIP/abc', 'State': 'INUSE'},
         {'Event': 'DeviceStateChange', 'Device': 'PJSIP/abc', 'State': 'UNAVAILABLE'},
@@ -75,16 +80,42 @@ def test_initiate_endpoints_dedupes_duplicate_devices(initiator: Initiator):
     with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
         initiator.initiate_endpoints(events)
 
-    initiator._dao.endpoint.create_all.assert_called_once()
-    (endpoints,) = initiator._dao.endpoint.create_all.call_args[0]
-    assert len(endpoints) == 1
-    assert endpoints[0].name == 'PJSIP/abc'
-    assert endpoints[0].state == 'unavailable'
+    initiator._dao.endpoint.upsert_all.assert_called_once_with(
+        [('PJSIP/abc', 'unavailable')]
+    )
+
+
+def test_initiate_endpoints_only_writes_differences(initiator: Initiator):
+    initiator._dao.endpoint.list_.return_value = [
+        mock.Mock(state='available'),
+        mock.Mock(state='available'),
+        mock.Mock(state='available'),
+    ]
+    for endpoint, name in zip(
+        initiator._dao.endpoint.list_.return_value,
+        ('PJSIP/same', 'PJSIP/changed', 'PJSIP/gone'),
+    ):
+        endpoint.name = name
+    events = [
+        {'Event': 'DeviceStateChange', 'Device': 'PJSIP/same', 'State': 'INUSE'},
+        {'Event': 'DeviceStateChange', 'Device': 'PJSIP/changed', 'State': 'BUSY'},
+        {'Event': 'DeviceStateChange', 'Device': 'PJSIP/new', 'State': 'INUSE'},
+    ]
+
+    with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
+        initiator.initiate_endpoints(events)
+
+    initiator._dao.endpoint.delete_all.assert_not_called()
+    initiator._dao.endpoint.delete_by_names.assert_called_once_with(['PJSIP/gone'])
+    initiator._dao.endpoint.upsert_all.assert_called_once_with(
+        [('PJSIP/changed', 'unavailable'), ('PJSIP/new', 'available')]
+    )
 
 
 def test_initiate_channels_dedupes_duplicate_channels(initiator: Initiator):
     line = mock.Mock(id=42, endpoint_name='PJSIP/abc')
     initiator._dao.line.list_.return_value = [line]
+    initiator._dao.channel.list_.return_value = []
     events = [
         {
             'Event': 'CoreShowChannel',
@@ -103,15 +134,90 @@ def test_initiate_channels_dedupes_duplicate_channels(initiator: Initiator):
     with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
         initiator.initiate_channels(events)
 
-    initiator._dao.channel.create_all.assert_called_once()
-    (channels,) = initiator._dao.channel.create_all.call_args[0]
-    assert len(channels) == 1
-    assert channels[0].name == 'PJSIP/abc-00000001'
-    assert channels[0].state == 'talking'
-    assert channels[0].line_id == 42
+    initiator._dao.channel.upsert_all.assert_called_once_with(
+        [('PJSIP/abc-00000001', 'talking', 42)]
+    )
+
+
+def test_initiate_channels_only_writes_differences(initiator: Initiator):
+    line = mock.Mock(id=42, endpoint_name='PJSIP/abc')
+    initiator._dao.line.list_.return_value = [line]
+    unchanged = mock.Mock(state='talking', line_id=42)
+    unchanged.name = 'PJSIP/abc-00000001'
+    gone = mock.Mock(state='ringing', line_id=42)
+    gone.name = 'PJSIP/abc-00000002'
+    initiator._dao.channel.list_.return_value = [unchanged, gone]
+    events = [
+        {
+            'Event': 'CoreShowChannel',
+            'Channel': 'PJSIP/abc-00000001',
+            'ChannelStateDesc': 'Up',
+            'ChanVariable': {},
+        },
+        {
+            'Event': 'CoreShowChannel',
+            'Channel': 'PJSIP/abc-00000003',
+            'ChannelStateDesc': 'Up',
+            'ChanVariable': {'XIVO_ON_HOLD': '1'},
+        },
+    ]
+
+    with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
+        initiator.initiate_channels(events)
+
+    initiator._dao.channel.delete_all.assert_not_called()
+    initiator._dao.channel.delete_by_names.assert_called_once_with(
+        ['PJSIP/abc-00000002']
+    )
+    initiator._dao.channel.upsert_all.assert_called_once_with(
+        [('PJSIP/abc-00000003', 'holding', 42)]
+    )
+
+
+def test_resync_asterisk_only_queries_amid(initiator: Initiator):
+    initiator._auth.token.new.return_value = {'token': 'a-token'}
+    initiator._amid.action.side_effect = [
+        [{'Event': 'DeviceStateChange', 'Device': 'PJSIP/abc', 'State': 'INUSE'}],
+        [
+            {
+                'Event': 'CoreShowChannel',
+                'Channel': 'PJSIP/abc-00000001',
+                'ChannelStateDesc': 'Ringing',
+                'ChanVariable': {},
+            }
+        ],
+    ]
+    hook = mock.Mock(__name__='hook')
+    initiator.resync_hooks.append(hook)
+
+    initiator.resync_asterisk()
+
+    hook.assert_called_once_with(
+        {'PJSIP/abc': 'available'},
+        {'PJSIP/abc-00000001': ('ringing', 'PJSIP/abc')},
+    )
+    initiator._confd.users.list.assert_not_called()
+    initiator._auth.tenants.list.assert_not_called()
+
+
+def test_resync_asterisk_runs_post_resync_hooks_while_resyncing(
+    initiator: Initiator,
+):
+    initiator._auth.token.new.return_value = {'token': 'a-token'}
+    initiator._amid.action.side_effect = Exception('boom')
+    resyncing = []
+    hook = mock.Mock(__name__='hook')
+    hook.side_effect = lambda: resyncing.append(initiator.resyncing())
+    initiator.post_resync_hooks.append(hook)
 
+    with pytest.raises(Exception):
+        initiator.resync_asterisk()
 
-def test_paginate_proxy(initiator: Initiator):
+    assert resyncing == [True]
+    assert not initiator.resyncing()
+
+
+def test_stream_pages(initiator: Initiator):
     def paginated_callback(recurse, limit, offset):
         return {
             'items': [{'id': offset + i} for i in range(1, limit + 1)],
@@ -119,26 +225,28 @@ def test_paginate_proxy(initiator: Initiator):
         }
 
     callback_mock = mock.Mock(side_effect=paginated_callback)
-    results = initiator._paginate_proxy(callback_mock, limit=2)
-    assert results == {
-        'items': [
-            {'id': 1},
-            {'id': 2},
-            {'id': 3},
-            {'id': 4},
-            {'id': 5},
-            {'id': 6},
-            {'id': 7},
-            {'id': 8},
-            {'id': 9},
-            {'id': 10},
-        ],
-        'total': 10,
-    }
+    pages = list(initiator._stream_pages(callback_mock, limit=2))
+    assert pages == [
+        [{'id': 1}, {'id': 2}],
+        [{'id': 3}, {'id': 4}],
+        [{'id': 5}, {'id': 6}],
+        [{'id': 7}, {'id': 8}],
+        [{'id': 9}, {'id': 10}],
+    ]
     assert callback_mock.call_count == 5
 
 
-def test_paginate_proxy_forwards_list_params(initiator: Initiator):
+def test_stream_pages_is_lazy(initiator: Initiator):
+    callback_mock = mock.Mock(return_value={'items': [{'id': 1}], 'total': 3})
+
+    pages = initiator._stream_pages(callback_mock, limit=1)
+    callback_mock.assert_not_called()
+
+    next(pages)
+    assert callback_mock.call_count == 1
+
+
+def test_stream_pages_forwards_list_params(initiator: Initiator):
     def paginated_callback(recurse, limit, offset, view):
         return {
             'items': [{'id': offset + i} for i in range(1, limit + 1)],
@@ -146,7 +254,7 @@ def test_paginate_proxy_forwards_list_params(initiator: Initiator):
         }
 
     callback_mock = mock.Mock(side_effect=paginated_callback)
-    initiator._paginate_proxy(callback_mock, limit=2, view='line_presence')
+    list(initiator._stream_pages(callback_mock, limit=2, view='line_presence'))
 
     assert callback_mock.call_count == 3
     for call in callback_mock.call_args_list:
@@ -154,7 +262,7 @@ def test_paginate_proxy_forwards_list_params(initiator: Initiator):
         assert call.kwargs['recurse'] is True
 
 
-def test_paginate_proxy_terminates_when_total_shrinks(initiator: Initiator):
+def test_stream_pages_terminates_when_total_shrinks(initiator: Initiator):
     # First page reports total=6 and returns 2 items; the dataset then shrinks
     # so later pages come back empty. offset stays at 2 < 6, so a naive loop
     # never advances and spins forever.
@@ -171,9 +279,47 @@ def test_paginate_proxy_terminates_when_total_shrinks(initiator: Initiator):
         return {'items': [], 'total': 2}
 
     callback_mock = mock.Mock(side_effect=paginated_callback)
-    result = initiator._paginate_proxy(callback_mock, limit=2)
+    pages = list(initiator._stream_pages(callback_mock, limit=2))
+
+    assert pages == [[{'id': 1}, {'id': 2}]]
+
+
+def test_page_prefetcher_bounds_pages_ahead():
+    fetched = []
 
-    assert result['items'] == [{'id': 1}, {'id': 2}]
+    def pages():
+        for i in range(5):
+            fetched.append(i)
+            yield [i]
+
+    on_fetched = mock.Mock()
+    prefetcher = PagePrefetcher(pages(), on_fetched, threading.Event(), depth=2)
+    thread = threading.Thread(target=prefetcher.run)
+    thread.start()
+
+    iterator = iter(prefetcher)
+    assert next(iterator) == [0]
+    thread.join(timeout=0.2)
+    assert len(fetched) <= 4
+    on_fetched.assert_not_called()
+
+    assert list(iterator) == [[1], [2], [3], [4]]
+    thread.join()
+    on_fetched.assert_called_once_with()
+
+
+def test_page_prefetcher_forwards_fetch_errors():
+    def pages():
+        yield [1]
+        raise Exception('auth down')
+
+    prefetcher = PagePrefetcher(pages(), mock.Mock(), threading.Event())
+    prefetcher.run()
+
+    iterator = iter(prefetcher)
+    assert next(iterator) == [1]
+    with pytest.raises(Exception, match='auth down'):
+        next(iterator)
 
 
 def test_initiate_fetches_users_with_line_presence_view(initiator: Initiator):
@@ -184,30 +330,62 @@ def test_initiate_fetches_users_with_line_presence_view(initiator: Initiator):
 
     for method_name in (
         'initiate_endpoints',
-        'initiate_tenants',
-        'initiate_users',
-        'initiate_sessions',
-        'initiate_refresh_tokens',
+        '_initiate_tenants',
+        '_initiate_users',
+        '_initiate_sessions',
+        '_initiate_refresh_tokens',
         'initiate_channels',
         'execute_post_hooks',
     ):
         setattr(initiator, method_name, mock.Mock())
 
     with mock.patch.object(
-        initiator, '_paginate_proxy', return_value={'items': [], 'total': 0}
-    ) as paginate_proxy_mock:
+        initiator, '_stream_pages', return_value=iter([])
+    ) as stream_pages_mock:
         initiator.initiate()
 
     users_calls = [
         call
-        for call in paginate_proxy_mock.call_args_list
+        for call in stream_pages_mock.call_args_list
         if call.args and call.args[0] is initiator._confd.users.list
     ]
     assert len(users_calls) == 1
     assert users_calls[0].kwargs.get('view') == 'line_presence'
 
 
-def test_add_and_remove_lines_reassigns_line_to_new_user(initiator: Initiator):
+def test_initiate_reports_stage_timings(initiator: Initiator):
+    initiator._auth = mock.MagicMock()
+    initiator._amid = mock.MagicMock()
+    initiator._confd = mock.MagicMock()
+    initiator._auth.token.new.return_value = {'token': 'a-token'}
+    initiator._initiate_users = mock.Mock(side_effect=lambda pages: list(pages))
+
+    for method_name in (
+        'initiate_endpoints',
+        '_initiate_tenants',
+        '_initiate_sessions',
+        '_initiate_refresh_tokens',
+        'initiate_channels',
+    ):
+        setattr(initiator, method_name, mock.Mock())
+
+    with mock.patch.object(initiator, '_stream_pages', return_value=iter([[{}]])):
+        initiator.initiate()
+
+    status = defaultdict(dict)
+    initiator.provide_status(status)
+    assert status['presence_initialization']['stages'].keys() == {
+        'endpoints',
+        'tenants',
+        'users',
+        'sessions',
+        'refresh_tokens',
+        'channels',
+    }
+    assert initiator.has_fetched(Resource.USER)
+
+
+def test_add_lines_reassigns_line_to_new_user(initiator: Initiator):
     tenant_uuid = 'tenant-1'
     user_a = 'user-a'
     user_b = 'user-b'
@@ -223,7 +401,7 @@ def test_add_and_remove_lines_reassigns_line_to_new_user(initiator: Initiator):
     ]
 
     with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
-        initiator._add_and_remove_lines(users)
+        initiator._add_lines(users)
 
     deleted_ids = set()
     for call in initiator._dao.line.delete_by_ids.call_args_list:
@@ -238,3 +416,27 @@ def test_add_and_remove_lines_reassigns_line_to_new_user(initiator: Initiator):
     # The line is still desired (moved to user B), so it must not be silently
     # lost: kept/reassigned (not deleted) or deleted and recreated.
     assert line_id not in deleted_ids or line_id in created_ids
+
+
+def test_add_lines_across_pages_rejects_multi_user_lines(initiator: Initiator):
+    initiator._dao.line.list_.return_value = []
+    initiator._dao.user.list_uuids.return_value = {'user-a', 'user-b'}
+    seen_ids = set()
+
+    with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
+        initiator._add_lines([{'uuid': 'user-a', 'lines': [{'id': 5}]}], seen_ids)
+        initiator._add_lines([{'uuid': 'user-b', 'lines': [{'id': 5}]}], seen_ids)
+
+    first_call, second_call = initiator._dao.line.create_all.call_args_list
+    assert [line.user_uuid for line in first_call.args[0]] == ['user-a']
+    assert second_call.args[0] == []
+    assert seen_ids == {5}
+
+
+def test_remove_expired_lines(initiator: Initiator):
+    initiator._dao.line.list_ids.return_value = {1, 2, 3}
+
+    with mock.patch('wazo_chatd.plugins.presences.initiator.session_scope'):
+        initiator._remove_expired_lines({1, 3})
+
+    initiator._dao.line.delete_by_ids.assert_called_once_with([2])
@@ -0,0 +1,41 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+from unittest import mock
+
+import pytest
+
+from ..initiator_thread import InitiatorThread
+
+
+@pytest.fixture
+def initiator():
+    return mock.Mock()
+
+
+def test_resync_requests_coalesced_while_running(initiator):
+    running, release, rerun = threading.Event(), threading.Event(), threading.Event()
+
+    def resync_asterisk():
+        if running.is_set():
+            rerun.set()
+            return
+        running.set()
+        release.wait(5)
+
+    initiator.resync_asterisk.side_effect = resync_asterisk
+    initiator_thread = InitiatorThread(initiator)
+    initiator_thread._thread = mock.Mock()
+
+    initiator_thread.resync()
+    assert running.wait(5)
+    initiator_thread.resync()
+    initiator_thread.resync()
+    release.set()
+    assert rerun.wait(5)
+    initiator_thread.stop()
+
+    assert initiator.resync_asterisk.call_count == 2
+    assert len(initiator_thread._resync_threads) == 1
+    assert not initiator_thread._resync_threads[0].is_alive()
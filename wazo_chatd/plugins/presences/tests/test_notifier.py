@@ -0,0 +1,94 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import defaultdict
+from unittest import mock
+
+import pytest
+
+from ..engine import UserPresence
+from ..notifier import CoalescingPresenceNotifier
+
+TENANT_UUID = '00000000-0000-4000-8000-0000000000a1'
+
+
+@pytest.fixture
+def bus():
+    return mock.Mock()
+
+
+@pytest.fixture
+def notifier(bus):
+    with mock.patch(
+        'wazo_chatd.plugins.presences.notifier.UserPresenceSchema'
+    ) as schema, mock.patch(
+        'wazo_chatd.plugins.presences.notifier.PresenceUpdatedEvent'
+    ) as event:
+        schema.return_value.dump.side_effect = lambda user: {
+            'uuid': user.uuid,
+            'state': user.state,
+        }
+        event.side_effect = lambda payload, tenant_uuid: (payload, tenant_uuid)
+        yield CoalescingPresenceNotifier(bus, window=0.1, max_pending=2)
+
+
+def test_only_latest_presence_is_published(notifier, bus):
+    notifier.updated(UserPresence('user-1', TENANT_UUID, state='available'))
+    notifier.updated(UserPresence('user-1', TENANT_UUID, state='away'))
+    notifier.updated(UserPresence('user-2', TENANT_UUID, state='available'))
+
+    notifier._publish_pending()
+
+    bus.publish.assert_has_calls(
+        [
+            mock.call(({'uuid': 'user-1', 'state': 'away'}, TENANT_UUID)),
+            mock.call(({'uuid': 'user-2', 'state': 'available'}, TENANT_UUID)),
+        ]
+    )
+    assert bus.publish.call_count == 2
+
+
+def test_new_users_published_from_caller_when_full(notifier, bus):
+    notifier.updated(UserPresence('user-1', TENANT_UUID))
+    notifier.updated(UserPresence('user-2', TENANT_UUID))
+    notifier.updated(UserPresence('user-3', TENANT_UUID, state='away'))
+
+    bus.publish.assert_called_once_with(
+        ({'uuid': 'user-3', 'state': 'away'}, TENANT_UUID)
+    )
+
+    notifier.updated(UserPresence('user-1', TENANT_UUID, state='away'))
+    notifier._publish_pending()
+
+    assert bus.publish.call_count == 3
+    status = defaultdict(dict)
+    notifier.provide_status(status)
+    assert status['presence_publisher'] == {
+        'status': mock.ANY,
+        'pending': 0,
+        'published': 3,
+        'coalesced': 1,
+        'overflowed': 1,
+        'failed': 0,
+    }
+
+
+def test_publish_failure_is_counted(notifier, bus):
+    bus.publish.side_effect = Exception('bus down')
+    notifier.updated(UserPresence('user-1', TENANT_UUID))
+
+    notifier._publish_pending()
+
+    status = defaultdict(dict)
+    notifier.provide_status(status)
+    assert status['presence_publisher']['failed'] == 1
+    assert status['presence_publisher']['published'] == 0
+
+
+def test_stop_publishes_pending(notifier, bus):
+    notifier.start()
+    notifier.updated(UserPresence('user-1', TENANT_UUID))
+
+    notifier.stop()
+
+    bus.publish.assert_called_once()
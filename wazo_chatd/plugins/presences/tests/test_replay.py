@@ -0,0 +1,85 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import defaultdict
+from unittest import mock
+
+import pytest
+
+from ..replay import ReplayAction, ReplayLog
+
+
+@pytest.fixture
+def replay_log():
+    return ReplayLog(max_size=2)
+
+
+def test_last_update_per_resource_is_kept(replay_log):
+    created, updated, updated_again = mock.Mock(), mock.Mock(), mock.Mock()
+
+    replay_log.add(('channel', 'a'), ReplayAction.CREATE, created)
+    replay_log.add(('channel', 'a'), ReplayAction.UPDATE, updated)
+    replay_log.add(('channel', 'a'), ReplayAction.UPDATE, updated_again)
+
+    assert replay_log.drain() == [created, updated_again]
+
+
+def test_delete_replaces_previous_events(replay_log):
+    deleted, created = mock.Mock(), mock.Mock()
+
+    replay_log.add(('user', 'a'), ReplayAction.CREATE, mock.Mock())
+    replay_log.add(('user', 'a'), ReplayAction.UPDATE, mock.Mock())
+    replay_log.add(('user', 'a'), ReplayAction.DELETE, deleted)
+    replay_log.add(('user', 'a'), ReplayAction.CREATE, created)
+
+    assert replay_log.drain() == [deleted, created]
+
+
+def test_events_without_key_are_all_kept(replay_log):
+    first, second = mock.Mock(), mock.Mock()
+
+    replay_log.add(None, ReplayAction.UPDATE, first)
+    replay_log.add(None, ReplayAction.UPDATE, second)
+
+    assert replay_log.drain() == [first, second]
+
+
+def test_new_resources_dropped_when_full(replay_log):
+    updated = mock.Mock()
+    replay_log.add(('channel', 'a'), ReplayAction.CREATE, mock.Mock())
+    replay_log.add(('channel', 'b'), ReplayAction.CREATE, mock.Mock())
+    replay_log.add(('channel', 'c'), ReplayAction.CREATE, mock.Mock())
+    replay_log.add(('channel', 'a'), ReplayAction.UPDATE, updated)
+
+    assert len(replay_log) == 2
+    status = defaultdict(dict)
+    replay_log.provide_status(status)
+    assert status['presence_initialization']['replay'] == {
+        'pending': 2,
+        'delayed': 4,
+        'coalesced': 0,
+        'dropped': 1,
+        'replayed': 0,
+        'failed': 0,
+    }
+
+
+def test_drain_clears_log(replay_log):
+    replay_log.add(('channel', 'a'), ReplayAction.CREATE, mock.Mock())
+
+    replay_log.drain()
+
+    assert len(replay_log) == 0
+    assert replay_log.drain() == []
+
+
+def test_closed_log_refuses_events_until_opened(replay_log):
+    pending, refused, accepted = mock.Mock(), mock.Mock(), mock.Mock()
+    replay_log.add(('channel', 'a'), ReplayAction.CREATE, pending)
+
+    assert replay_log.close() == [pending]
+    assert not replay_log.add(('channel', 'b'), ReplayAction.CREATE, refused)
+    replay_log.open()
+    assert replay_log.add(('channel', 'b'), ReplayAction.CREATE, accepted)
+
+    assert replay_log.drain() == [accepted]
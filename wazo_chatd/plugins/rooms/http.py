@@ -94,13 +94,18 @@ class UserMessageListResource(AuthResource):
     @required_acl('chatd.users.me.rooms.messages.read')
     def get(self):
         filter_parameters = MessageListRequestSchema().load(request.args)
+        with_counts = _with_counts(filter_parameters)
         messages = self._service.list_user_messages(
             token.tenant_uuid, token.user_uuid, **filter_parameters
         )
-        filtered = self._service.count_user_messages(
-            token.tenant_uuid, token.user_uuid, **filter_parameters
-        )
-        total = self._service.count_user_messages(token.tenant_uuid, token.user_uuid)
+        filtered = total = None
+        if with_counts:
+            filtered = self._service.count_user_messages(
+                token.tenant_uuid, token.user_uuid, **filter_parameters
+            )
+            total = self._service.count_user_messages(
+                token.tenant_uuid, token.user_uuid
+            )
         return {
             'items': MessageSchema().dump(messages, many=True),
             'filtered': filtered,
@@ -136,15 +141,26 @@ class UserRoomMessageListResource(AuthResource):
             raise UnknownRoomException(room_uuid)
 
         viewer_uuid = token.user_uuid
+        with_counts = _with_counts(filter_parameters)
         messages = self._service.list_messages(
             room, viewer_uuid=viewer_uuid, **filter_parameters
         )
-        filtered = self._service.count_messages(
-            room, viewer_uuid=viewer_uuid, **filter_parameters
-        )
-        total = self._service.count_messages(room, viewer_uuid=viewer_uuid)
+        filtered = total = None
+        if with_counts:
+            filtered = self._service.count_messages(
+                room, viewer_uuid=viewer_uuid, **filter_parameters
+            )
+            total = self._service.count_messages(room, viewer_uuid=viewer_uuid)
         return {
             'items': MessageSchema().dump(messages, many=True),
             'filtered': filtered,
             'total': total,
         }
+
+
+def _with_counts(filter_parameters):
+    # Counting defeats keyset pagination, so it is opt-in with a cursor
+    with_counts = filter_parameters.pop('count', None)
+    if with_counts is None:
+        return not (filter_parameters.get('before') or filter_parameters.get('after'))
+    return with_counts
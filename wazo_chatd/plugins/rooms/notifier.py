@@ -1,6 +1,8 @@
 # Copyright 2019-2026 The Wazo Authors  (see the AUTHORS file)
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from functools import partial
+
 from wazo_bus.resources.chatd.events import (
     UserRoomCreatedEvent,
     UserRoomMessageCreatedEvent,
@@ -10,8 +12,9 @@ from .schemas import MessageSchema, RoomSchema
 
 
 class RoomNotifier:
-    def __init__(self, bus):
+    def __init__(self, bus, fanout):
         self._bus = bus
+        self._fanout = fanout
 
     def created(self, room):
         room_json = RoomSchema().dump(room)
@@ -30,8 +33,7 @@ class RoomNotifier:
                 u for u in recipients if str(u.uuid) == str(message.user_uuid)
             ]
 
-        for user in recipients:
-            event = UserRoomMessageCreatedEvent(
-                message_json, room.uuid, room.tenant_uuid, user.uuid
-            )
-            self._bus.publish(event)
+        make_event = partial(
+            UserRoomMessageCreatedEvent, message_json, room.uuid, room.tenant_uuid
+        )
+        self._fanout.fan_out(make_event, [user.uuid for user in recipients])
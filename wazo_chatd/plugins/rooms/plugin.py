@@ -16,9 +16,10 @@ class Plugin:
         config = dependencies['config']
         dao = dependencies['dao']
         bus_publisher = dependencies['bus_publisher']
+        fanout_publisher = dependencies['fanout_publisher']
         hooks = dependencies['hooks']
 
-        notifier = RoomNotifier(bus_publisher)
+        notifier = RoomNotifier(bus_publisher, fanout_publisher)
         service = RoomService(config['uuid'], dao, notifier, hooks)
 
         api.add_resource(
@@ -69,20 +69,22 @@ class MessageSchema(Schema):
         return data
 
 
-class ListRequestSchema(_ListSchema):
+class _MessageListSchema(_ListSchema):
     default_sort_column = 'created_at'
     sort_columns = ['created_at']
     searchable_columns: list[str] = []
     default_direction = 'desc'
-    from_date = fields.DateTime()
 
+    before = fields.UUID()
+    after = fields.UUID()
+    count = fields.Boolean()
+
+
+class ListRequestSchema(_MessageListSchema):
+    from_date = fields.DateTime()
 
-class MessageListRequestSchema(_ListSchema):
-    default_sort_column = 'created_at'
-    sort_columns = ['created_at']
-    searchable_columns: list[str] = []
-    default_direction = 'desc'
 
+class MessageListRequestSchema(_MessageListSchema):
     search = fields.String()
     distinct = fields.String(validate=validate.OneOf(['room_uuid']))
 
@@ -6,6 +6,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from uuid import UUID
 
+from wazo_chatd.exceptions import UnknownRoomException
 from wazo_chatd.plugin_helpers.dependencies import MessageContext
 from wazo_chatd.plugin_helpers.hooks import Hooks
 
@@ -67,6 +68,15 @@ class RoomService:
         sender_identity_uuid: UUID | None = None,
     ) -> RoomMessage:
         self._set_default_message_values(message)
+        if sender_identity_uuid is None and not self._has_external_user(room):
+            # Nothing to deliver outside of wazo: no hook to run
+            self._dao.room.add_member_message(room, message)
+            self._notifier.message_created(room, message)
+            return message
+
+        if str(message.user_uuid) not in {str(user.uuid) for user in room.users}:
+            raise UnknownRoomException(room.uuid)
+
         context = MessageContext(
             room, message, sender_identity_uuid=sender_identity_uuid
         )
@@ -75,6 +85,10 @@ class RoomService:
         self._notifier.message_created(room, message)
         return message
 
+    @staticmethod
+    def _has_external_user(room: Room) -> bool:
+        return any(user.identity for user in room.users)
+
     def _set_default_message_values(self, message):
         message.wazo_uuid = self._wazo_uuid
 
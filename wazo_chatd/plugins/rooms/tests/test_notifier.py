@@ -6,13 +6,14 @@ from __future__ import annotations
 import unittest
 from unittest.mock import Mock
 
+from wazo_chatd.bus import FanoutPublisher
 from wazo_chatd.plugins.rooms.notifier import RoomNotifier
 
 
 class TestRoomNotifierMessageCreated(unittest.TestCase):
     def setUp(self) -> None:
         self.bus = Mock()
-        self.notifier = RoomNotifier(self.bus)
+        self.notifier = RoomNotifier(self.bus, FanoutPublisher(self.bus))
 
     def test_internal_message_notifies_all_users(self) -> None:
         room = Mock()
@@ -67,3 +68,22 @@ class TestRoomNotifierMessageCreated(unittest.TestCase):
         assert self.bus.publish.call_count == 1
         event = self.bus.publish.call_args[0][0]
         assert event.user_uuid == 'user-a'
+
+    def test_message_events_queued_to_fanout_publisher(self) -> None:
+        fanout = Mock()
+        notifier = RoomNotifier(self.bus, fanout)
+        room = Mock(uuid='room-uuid', tenant_uuid='tenant-uuid')
+        room.users = [
+            Mock(uuid='user-a', identity=None),
+            Mock(uuid='user-b', identity=None),
+        ]
+        message = Mock(meta=None, user_uuid='user-a')
+
+        notifier.message_created(room, message)
+
+        self.bus.publish.assert_not_called()
+        make_event, user_uuids = fanout.fan_out.call_args.args
+        assert user_uuids == ['user-a', 'user-b']
+        event = make_event('user-b')
+        assert event.user_uuid == 'user-b'
+        assert event.room_uuid == 'room-uuid'
@@ -28,6 +28,16 @@ class TestListRequestSchema(unittest.TestCase):
         result = self.schema().load({})
         assert_that(result, has_entries(order='created_at'))
 
+    def test_load_cursor(self):
+        message_uuid = uuid.uuid4()
+        result = self.schema().load({'before': str(message_uuid), 'count': 'true'})
+        assert_that(result, has_entries(before=message_uuid, count=True))
+
+        assert_that(
+            calling(self.schema().load).with_args({'after': 'not-a-uuid'}),
+            raises(ValidationError),
+        )
+
 
 class TestMessageListRequestSchema(unittest.TestCase):
     schema = MessageListRequestSchema
@@ -9,6 +9,7 @@ from unittest.mock import Mock
 
 import pytest
 
+from wazo_chatd.exceptions import UnknownRoomException
 from wazo_chatd.plugin_helpers.dependencies import MessageContext
 from wazo_chatd.plugin_helpers.hooks import Hooks
 from wazo_chatd.plugins.rooms.services import RoomService
@@ -66,8 +67,13 @@ class TestRoomServiceCreateMessage(unittest.TestCase):
             self.notifier,
             self.hooks,
         )
-        self.room = Mock()
-        self.message = Mock(wazo_uuid=None)
+        self.room = Mock(
+            users=[
+                Mock(uuid='user-a', identity=None),
+                Mock(uuid='user-ext', identity='+15559876'),
+            ]
+        )
+        self.message = Mock(wazo_uuid=None, user_uuid='user-a')
         self.sender_identity_uuid = uuid.uuid4()
 
     def test_create_message_persists_and_notifies(self) -> None:
@@ -109,3 +115,64 @@ class TestRoomServiceCreateMessage(unittest.TestCase):
         ctx = callback.call_args[0][0]
         assert isinstance(ctx, MessageContext)
         assert ctx.sender_identity_uuid is None
+
+    def test_create_message_rejects_non_member(self) -> None:
+        self.message.user_uuid = 'user-b'
+
+        with pytest.raises(UnknownRoomException):
+            self.service.create_message(self.room, self.message)
+
+        self.dao.room.add_message.assert_not_called()
+
+
+class TestRoomServiceCreateInternalMessage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dao = Mock()
+        self.notifier = Mock()
+        self.hooks = Hooks()
+        self.service = RoomService(
+            WAZO_UUID,
+            self.dao,
+            self.notifier,
+            self.hooks,
+        )
+        self.room = Mock(
+            users=[
+                Mock(uuid='user-a', identity=None),
+                Mock(uuid='user-b', identity=None),
+            ]
+        )
+        self.message = Mock(wazo_uuid=None, user_uuid='user-a')
+        self.callback = Mock()
+        self.hooks.register('before_message_creation', self.callback)
+
+    def test_inserts_without_hooks(self) -> None:
+        result = self.service.create_message(self.room, self.message)
+
+        self.callback.assert_not_called()
+        self.dao.room.add_message.assert_not_called()
+        self.dao.room.add_member_message.assert_called_once_with(
+            self.room, self.message
+        )
+        self.notifier.message_created.assert_called_once_with(self.room, self.message)
+        assert result is self.message
+        assert self.message.wazo_uuid == WAZO_UUID
+
+    def test_non_member_rejected_by_insert(self) -> None:
+        self.dao.room.add_member_message.side_effect = UnknownRoomException('room')
+
+        with pytest.raises(UnknownRoomException):
+            self.service.create_message(self.room, self.message)
+
+        self.notifier.message_created.assert_not_called()
+
+    def test_sender_identity_dispatches_hooks(self) -> None:
+        sender_identity_uuid = uuid.uuid4()
+
+        self.service.create_message(
+            self.room, self.message, sender_identity_uuid=sender_identity_uuid
+        )
+
+        self.callback.assert_called_once()
+        self.dao.room.add_message.assert_called_once_with(self.room, self.message)
+        self.dao.room.add_member_message.assert_not_called()
@@ -0,0 +1,95 @@
+# Copyright 2026 The Wazo Authors  (see the AUTHORS file)
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+from collections import defaultdict
+from unittest import TestCase
+from unittest.mock import Mock
+
+from ..bus import FanoutPublisher
+
+
+def _make_event(user_uuid):
+    return ('event', user_uuid)
+
+
+class TestFanoutPublisher(TestCase):
+    def setUp(self):
+        self.bus = Mock()
+
+    def test_publishes_from_caller_until_started(self):
+        publisher = FanoutPublisher(self.bus)
+
+        publisher.fan_out(_make_event, ['user-1', 'user-2'])
+
+        assert [call.args[0] for call in self.bus.publish.call_args_list] == [
+            ('event', 'user-1'),
+            ('event', 'user-2'),
+        ]
+
+    def test_publishes_from_thread_once_started(self):
+        published = threading.Event()
+        self.bus.publish.side_effect = lambda event: published.set()
+        publisher = FanoutPublisher(self.bus)
+        publisher.start()
+        try:
+            assert publisher.submit(_make_event, ['user-1'])
+            assert published.wait(timeout=5)
+        finally:
+            publisher.stop()
+
+        self.bus.publish.assert_called_once_with(('event', 'user-1'))
+
+    def test_queued_fan_outs_published_on_stop(self):
+        release = threading.Event()
+        self.bus.publish.side_effect = lambda event: release.wait(timeout=5)
+        publisher = FanoutPublisher(self.bus, batch_size=1)
+        publisher.start()
+
+        for user_uuid in ('user-1', 'user-2', 'user-3'):
+            publisher.fan_out(_make_event, [user_uuid])
+        release.set()
+        publisher.stop()
+
+        assert self.bus.publish.call_count == 3
+
+    def test_submit_refused_when_queue_full(self):
+        publisher = FanoutPublisher(self.bus, max_pending=1, overflow_timeout=0)
+        publisher._running.set()
+
+        assert publisher.submit(_make_event, ['user-1'])
+        assert not publisher.submit(_make_event, ['user-2'])
+
+        status = defaultdict(dict)
+        publisher.provide_status(status)
+        assert status['fanout_publisher']['pending'] == 1
+        assert status['fanout_publisher']['overflowed'] == 1
+
+    def test_submit_waits_for_room_when_queue_full(self):
+        publisher = FanoutPublisher(self.bus, max_pending=1, overflow_timeout=5)
+        publisher._running.set()
+        assert publisher.submit(_make_event, ['user-1'])
+
+        timer = threading.Timer(0.1, publisher._queue.get)
+        timer.start()
+        try:
+            assert publisher.submit(_make_event, ['user-2'])
+        finally:
+            timer.join()
+
+        assert publisher._queue.get_nowait()[2] == ['user-2']
+
+    def test_status_reports_histograms(self):
+        self.bus.publish.side_effect = [None, Exception('bus down')]
+        publisher = FanoutPublisher(self.bus)
+        publisher.start()
+        publisher.fan_out(_make_event, ['user-1', 'user-2'])
+        publisher.stop()
+
+        status = defaultdict(dict)
+        publisher.provide_status(status)
+        fanout_status = status['fanout_publisher']
+        assert fanout_status['published'] == 1
+        assert fanout_status['failed'] == 1
+        assert fanout_status['publish_latency']['count'] == 1
+        assert fanout_status['queue_depth']['count'] >= 1